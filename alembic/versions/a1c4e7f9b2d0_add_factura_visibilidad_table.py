@@ -0,0 +1,90 @@
+"""add_factura_visibilidad_table
+
+Revision ID: a1c4e7f9b2d0
+Revises: 445be0be5974
+Create Date: 2026-10-16 09:00:00.000000
+
+Tabla materializada factura_visibilidad (usuario_id, origen, factura_id).
+
+RAZÓN DEL CAMBIO:
+- "¿Qué facturas ve el usuario X?" se recalculaba en cada request recorriendo
+  workflows o asignaciones NIT → proveedores → facturas
+- Con la tabla, los listados por responsable son un EXISTS por PK
+- Se mantiene incrementalmente desde app.services.visibilidad_facturas
+  y se verifica/reconstruye con python -m app.scripts.visibilidad_facturas
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c4e7f9b2d0'
+down_revision: Union[str, Sequence[str], None] = '445be0be5974'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crea factura_visibilidad y la llena desde workflows y asignaciones activas."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'factura_visibilidad' in inspector.get_table_names():
+        print("Tabla factura_visibilidad ya existe, saltando creación")
+        return
+
+    op.create_table(
+        'factura_visibilidad',
+        sa.Column('usuario_id', sa.BigInteger(), nullable=False, comment='Usuario que ve la factura'),
+        sa.Column('origen', sa.String(20), nullable=False, comment='workflow | nit'),
+        sa.Column('factura_id', sa.BigInteger(), nullable=False, comment='Factura visible'),
+        sa.Column('creado_en', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+
+        sa.PrimaryKeyConstraint('usuario_id', 'origen', 'factura_id', name='pk_factura_visibilidad'),
+        sa.ForeignKeyConstraint(
+            ['usuario_id'], ['usuarios.id'],
+            name='fk_visibilidad_usuario_id', ondelete='CASCADE'
+        ),
+        sa.ForeignKeyConstraint(
+            ['factura_id'], ['facturas.id'],
+            name='fk_visibilidad_factura_id', ondelete='CASCADE'
+        ),
+        mysql_charset='utf8mb4'
+    )
+    op.create_index('idx_visibilidad_factura', 'factura_visibilidad', ['factura_id'])
+
+    # Carga inicial (misma lógica que visibilidad_facturas.reconstruir)
+    op.execute("""
+        INSERT INTO factura_visibilidad (usuario_id, origen, factura_id)
+        SELECT DISTINCT w.responsable_id, 'workflow', w.factura_id
+        FROM workflow_aprobacion_facturas w
+        WHERE w.responsable_id IS NOT NULL
+    """)
+    op.execute("""
+        INSERT INTO factura_visibilidad (usuario_id, origen, factura_id)
+        SELECT DISTINCT a.responsable_id, 'nit', f.id
+        FROM asignacion_nit_responsable a
+        JOIN proveedores p ON p.nit = a.nit
+        JOIN facturas f ON f.proveedor_id = p.id
+        WHERE a.activo = 1
+    """)
+    print("Tabla factura_visibilidad creada y poblada")
+
+
+def downgrade() -> None:
+    """Elimina factura_visibilidad."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'factura_visibilidad' not in inspector.get_table_names():
+        print("Tabla factura_visibilidad no existe, saltando downgrade")
+        return
+
+    op.drop_index('idx_visibilidad_factura', table_name='factura_visibilidad')
+    op.drop_table('factura_visibilidad')
@@ -0,0 +1,63 @@
+"""add_liderazgo_tareas
+
+Revision ID: a7d4e2c9f1b6
+Revises: f5c3a9d2e8b1
+Create Date: 2026-10-18 15:00:00.000000
+
+Leases de tareas periódicas para elegir un líder entre workers.
+
+RAZÓN DEL CAMBIO:
+- Con uvicorn --workers N cada proceso ejecutaba el barrido de automatización
+  y los jobs de notificaciones: las mismas facturas se procesaban y el mismo
+  resumen semanal se enviaba N veces
+- Cada tarea tiene ahora una fila con su titular y vencimiento; solo el
+  titular vigente la ejecuta (app.services.liderazgo)
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d4e2c9f1b6'
+down_revision: Union[str, Sequence[str], None] = 'f5c3a9d2e8b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crea liderazgo_tareas."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'liderazgo_tareas' in inspector.get_table_names():
+        print("Tabla liderazgo_tareas ya existe, saltando creación")
+        return
+
+    op.create_table(
+        'liderazgo_tareas',
+        sa.Column('tarea', sa.String(length=100), nullable=False, comment='Nombre de la tarea periódica'),
+        sa.Column('titular', sa.String(length=150), nullable=False, comment='host:pid:id del worker líder'),
+        sa.Column('vence_en', sa.DateTime(), nullable=False, comment='UTC; vencido = otro worker puede tomarlo'),
+        sa.Column('renovado_en', sa.DateTime(), nullable=False, comment='UTC de la última renovación'),
+        sa.PrimaryKeyConstraint('tarea', name='pk_liderazgo_tareas'),
+        mysql_charset='utf8mb4'
+    )
+    print("Tabla liderazgo_tareas creada (las filas se crean con la primera elección)")
+
+
+def downgrade() -> None:
+    """Elimina liderazgo_tareas."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'liderazgo_tareas' not in inspector.get_table_names():
+        print("Tabla liderazgo_tareas no existe, saltando downgrade")
+        return
+
+    op.drop_table('liderazgo_tareas')
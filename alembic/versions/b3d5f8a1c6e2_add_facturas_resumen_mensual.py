@@ -0,0 +1,90 @@
+"""add_facturas_resumen_mensual
+
+Revision ID: b3d5f8a1c6e2
+Revises: a1c4e7f9b2d0
+Create Date: 2026-10-16 11:00:00.000000
+
+Rollup mensual facturas_resumen_mensual (año, mes, proveedor_id, estado).
+
+RAZÓN DEL CAMBIO:
+- Los reportes por período (/facturas/periodos/*) re-escaneaban facturas
+  en cada request
+- El rollup guarda conteos y sumas (subtotal, IVA, total_a_pagar) ya agregados
+- Se mantiene en la misma transacción que las escrituras de facturas
+  (app.services.resumen_mensual) y se reconstruye con
+  python -m app.scripts.resumen_mensual --reconstruir
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d5f8a1c6e2'
+down_revision: Union[str, Sequence[str], None] = 'a1c4e7f9b2d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crea facturas_resumen_mensual y lo llena desde facturas."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'facturas_resumen_mensual' in inspector.get_table_names():
+        print("Tabla facturas_resumen_mensual ya existe, saltando creación")
+        return
+
+    op.create_table(
+        'facturas_resumen_mensual',
+        sa.Column('año', sa.SmallInteger(), nullable=False),
+        sa.Column('mes', sa.SmallInteger(), nullable=False),
+        sa.Column('proveedor_id', sa.BigInteger(), nullable=False, comment='0 = facturas sin proveedor'),
+        sa.Column('estado', sa.String(30), nullable=False, comment='EstadoFactura.value'),
+        sa.Column('total_facturas', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('facturas_con_monto', sa.Integer(), nullable=False, server_default='0',
+                  comment='Facturas con total_a_pagar no nulo (denominador del promedio)'),
+        sa.Column('subtotal_total', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('iva_total', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('monto_total', sa.Numeric(18, 2), nullable=False, server_default='0'),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('año', 'mes', 'proveedor_id', 'estado', name='pk_facturas_resumen_mensual'),
+        mysql_charset='utf8mb4'
+    )
+    op.create_index(
+        'idx_resumen_mensual_proveedor', 'facturas_resumen_mensual',
+        ['proveedor_id', 'año', 'mes']
+    )
+
+    # Carga inicial (misma lógica que resumen_mensual.reconstruir)
+    op.execute("""
+        INSERT INTO facturas_resumen_mensual
+            (año, mes, proveedor_id, estado, total_facturas, facturas_con_monto,
+             subtotal_total, iva_total, monto_total)
+        SELECT
+            YEAR(fecha_emision), MONTH(fecha_emision), COALESCE(proveedor_id, 0), estado,
+            COUNT(id), COUNT(total_a_pagar),
+            COALESCE(SUM(subtotal), 0), COALESCE(SUM(iva), 0), COALESCE(SUM(total_a_pagar), 0)
+        FROM facturas
+        WHERE fecha_emision IS NOT NULL
+        GROUP BY YEAR(fecha_emision), MONTH(fecha_emision), COALESCE(proveedor_id, 0), estado
+    """)
+    print("Tabla facturas_resumen_mensual creada y poblada")
+
+
+def downgrade() -> None:
+    """Elimina facturas_resumen_mensual."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'facturas_resumen_mensual' not in inspector.get_table_names():
+        print("Tabla facturas_resumen_mensual no existe, saltando downgrade")
+        return
+
+    op.drop_index('idx_resumen_mensual_proveedor', table_name='facturas_resumen_mensual')
+    op.drop_table('facturas_resumen_mensual')
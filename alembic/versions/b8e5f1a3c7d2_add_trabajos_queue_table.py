@@ -0,0 +1,87 @@
+"""add_trabajos_queue_table
+
+Revision ID: b8e5f1a3c7d2
+Revises: a7d4e2c9f1b6
+Create Date: 2026-10-19 10:00:00.000000
+
+Cola de trabajos en segundo plano persistida en BD.
+
+RAZÓN DEL CAMBIO:
+- Las notificaciones de POST /automation/procesar corrían en BackgroundTasks
+  (con la sesión del request ya cerrada) y la regeneración de patrones y la
+  sincronización de NITs bloqueaban el request: un reinicio perdía el trabajo
+  y un error no se reintentaba
+- Cada trabajo es ahora una fila con su estado, intentos, reserva con
+  vencimiento (visibility timeout) y último error (app.services.cola_trabajos)
+- El índice (cola, estado, disponible_en) sirve la reserva del próximo
+  trabajo y los conteos de GET /admin/trabajos
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e5f1a3c7d2'
+down_revision: Union[str, Sequence[str], None] = 'a7d4e2c9f1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crea trabajos."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'trabajos' in inspector.get_table_names():
+        print("Tabla trabajos ya existe, saltando creación")
+        return
+
+    op.create_table(
+        'trabajos',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('cola', sa.String(length=50), nullable=False, comment='Cola (límite de concurrencia propio)'),
+        sa.Column('tipo', sa.String(length=100), nullable=False, comment='Nombre de la tarea registrada'),
+        sa.Column('payload', sa.JSON(), nullable=True, comment='Argumentos de la tarea'),
+        sa.Column(
+            'estado',
+            sa.Enum('pendiente', 'en_proceso', 'completado', 'fallido', name='estadotrabajo'),
+            nullable=False
+        ),
+        sa.Column('intentos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_intentos', sa.Integer(), nullable=False, server_default='5'),
+        sa.Column('disponible_en', sa.DateTime(), nullable=False, comment='UTC; no se reserva antes (backoff)'),
+        sa.Column('bloqueado_por', sa.String(length=200), nullable=True, comment='Worker que lo tiene reservado'),
+        sa.Column('bloqueado_hasta', sa.DateTime(), nullable=True, comment='UTC; vencido = otro worker puede tomarlo'),
+        sa.Column('ultimo_error', sa.Text(), nullable=True),
+        sa.Column('resultado', sa.JSON(), nullable=True),
+        sa.Column('creado_en', sa.DateTime(), nullable=False, comment='UTC'),
+        sa.Column('iniciado_en', sa.DateTime(), nullable=True, comment='UTC del último intento'),
+        sa.Column('terminado_en', sa.DateTime(), nullable=True, comment='UTC'),
+        sa.PrimaryKeyConstraint('id', name='pk_trabajos'),
+        mysql_charset='utf8mb4'
+    )
+    op.create_index(
+        'idx_trabajos_cola_estado_disponible',
+        'trabajos',
+        ['cola', 'estado', 'disponible_en']
+    )
+    print("Tabla trabajos creada")
+
+
+def downgrade() -> None:
+    """Elimina trabajos."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'trabajos' not in inspector.get_table_names():
+        print("Tabla trabajos no existe, saltando downgrade")
+        return
+
+    op.drop_index('idx_trabajos_cola_estado_disponible', table_name='trabajos')
+    op.drop_table('trabajos')
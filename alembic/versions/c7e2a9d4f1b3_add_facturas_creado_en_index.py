@@ -0,0 +1,49 @@
+"""add_facturas_creado_en_index
+
+Revision ID: c7e2a9d4f1b3
+Revises: b3d5f8a1c6e2
+Create Date: 2026-10-16 12:00:00.000000
+
+Índice (creado_en, estado) para el dashboard mensual.
+
+RAZÓN DEL CAMBIO:
+- /dashboard/mes-actual, /alerta-mes y /historico filtraban con
+  MONTH(creado_en)/YEAR(creado_en): no indexable, recorrido completo
+- Ahora filtran con un rango semiabierto (DateHelper.create_año_mes_filter)
+  que sí puede usar este índice; fecha_emision ya tenía
+  idx_facturas_fecha_estado e idx_facturas_proveedor_fecha
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2a9d4f1b3'
+down_revision: Union[str, Sequence[str], None] = 'b3d5f8a1c6e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crea idx_facturas_creado_en_estado."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    indices = {ix['name'] for ix in inspect(bind).get_indexes('facturas')}
+
+    if 'idx_facturas_creado_en_estado' in indices:
+        print("Índice idx_facturas_creado_en_estado ya existe, saltando creación")
+        return
+
+    op.create_index(
+        'idx_facturas_creado_en_estado',
+        'facturas',
+        ['creado_en', 'estado'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Elimina idx_facturas_creado_en_estado."""
+    op.drop_index('idx_facturas_creado_en_estado', table_name='facturas')
@@ -0,0 +1,108 @@
+"""add_estadisticas_montos
+
+Revision ID: c9f2a6d4e1b3
+Revises: b8e5f1a3c7d2
+Create Date: 2026-10-20 09:00:00.000000
+
+Estadísticas de montos e intervalos por (proveedor_id, concepto_hash, año, mes).
+
+RAZÓN DEL CAMBIO:
+- La clasificación de proveedores y el análisis de patrones releían todo el
+  historial de facturas para recalcular media, desviación y CV
+- Cada mes guarda n, media y M2 (Welford) de total_a_pagar y de los días
+  desde la factura anterior; una ventana combina a lo sumo una fila por mes
+- Se mantiene en la misma transacción que las escrituras de facturas
+  (app.services.estadisticas_montos) y se reconstruye con
+  python -m app.scripts.estadisticas_montos --reconstruir
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f2a6d4e1b3'
+down_revision: Union[str, Sequence[str], None] = 'b8e5f1a3c7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crea estadisticas_montos y la llena desde facturas."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'estadisticas_montos' in inspector.get_table_names():
+        print("Tabla estadisticas_montos ya existe, saltando creación")
+        return
+
+    op.create_table(
+        'estadisticas_montos',
+        sa.Column('proveedor_id', sa.BigInteger(), nullable=False),
+        sa.Column('concepto_hash', sa.String(32), nullable=False, comment="'' = facturas sin concepto_hash"),
+        sa.Column('año', sa.SmallInteger(), nullable=False),
+        sa.Column('mes', sa.SmallInteger(), nullable=False),
+        sa.Column('n', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('media', sa.Float(53), nullable=False, server_default='0'),
+        sa.Column('m2', sa.Float(53), nullable=False, server_default='0',
+                  comment='Suma de cuadrados de las desviaciones (Welford)'),
+        sa.Column('minimo', sa.Numeric(15, 2), nullable=True),
+        sa.Column('maximo', sa.Numeric(15, 2), nullable=True),
+        sa.Column('primera_fecha', sa.Date(), nullable=True),
+        sa.Column('ultima_fecha', sa.Date(), nullable=True),
+        sa.Column('n_intervalos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('media_intervalo', sa.Float(53), nullable=False, server_default='0'),
+        sa.Column('m2_intervalo', sa.Float(53), nullable=False, server_default='0'),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('proveedor_id', 'concepto_hash', 'año', 'mes', name='pk_estadisticas_montos'),
+        mysql_charset='utf8mb4'
+    )
+    op.create_index(
+        'idx_estadisticas_montos_proveedor', 'estadisticas_montos',
+        ['proveedor_id', 'año', 'mes']
+    )
+
+    # Carga inicial (mismo historial que estadisticas_montos.reconstruir):
+    # M2 = varianza poblacional * n; el intervalo de cada factura con LAG
+    op.execute("""
+        INSERT INTO estadisticas_montos
+            (proveedor_id, concepto_hash, año, mes, n, media, m2, minimo, maximo,
+             primera_fecha, ultima_fecha, n_intervalos, media_intervalo, m2_intervalo)
+        SELECT
+            proveedor_id, concepto_hash, YEAR(fecha_emision), MONTH(fecha_emision),
+            COUNT(*), AVG(total_a_pagar), VAR_POP(total_a_pagar) * COUNT(*),
+            MIN(total_a_pagar), MAX(total_a_pagar), MIN(fecha_emision), MAX(fecha_emision),
+            COUNT(dias), COALESCE(AVG(dias), 0), COALESCE(VAR_POP(dias) * COUNT(dias), 0)
+        FROM (
+            SELECT
+                proveedor_id, COALESCE(concepto_hash, '') AS concepto_hash, fecha_emision, total_a_pagar,
+                DATEDIFF(fecha_emision, LAG(fecha_emision) OVER (
+                    PARTITION BY proveedor_id, COALESCE(concepto_hash, '') ORDER BY fecha_emision, id
+                )) AS dias
+            FROM facturas
+            WHERE estado IN ('aprobada', 'aprobada_auto', 'validada_contabilidad')
+              AND proveedor_id IS NOT NULL
+              AND fecha_emision IS NOT NULL
+              AND total_a_pagar > 0
+        ) historial
+        GROUP BY proveedor_id, concepto_hash, YEAR(fecha_emision), MONTH(fecha_emision)
+    """)
+    print("Tabla estadisticas_montos creada y poblada")
+
+
+def downgrade() -> None:
+    """Elimina estadisticas_montos."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'estadisticas_montos' not in inspector.get_table_names():
+        print("Tabla estadisticas_montos no existe, saltando downgrade")
+        return
+
+    op.drop_index('idx_estadisticas_montos_proveedor', table_name='estadisticas_montos')
+    op.drop_table('estadisticas_montos')
@@ -0,0 +1,52 @@
+"""add_actualizado_en_indexes
+
+Revision ID: d4a8e1f7b2c9
+Revises: c7e2a9d4f1b3
+Create Date: 2026-10-17 09:00:00.000000
+
+Índices sobre actualizado_en para los GET condicionales (ETag).
+
+RAZÓN DEL CAMBIO:
+- app.utils.conditional_get calcula el watermark con MAX(actualizado_en)
+  en cada GET de /facturas, /dashboard, /workflow/dashboard y
+  /asignacion-nit
+- Sin índice, MAX() recorre la tabla completa; con índice es una lectura
+  del extremo del B-tree
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8e1f7b2c9'
+down_revision: Union[str, Sequence[str], None] = 'c7e2a9d4f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDICES = (
+    ('idx_facturas_actualizado_en', 'facturas'),
+    ('idx_workflow_actualizado_en', 'workflow_aprobacion_facturas'),
+    ('idx_asignacion_actualizado_en', 'asignacion_nit_responsable'),
+)
+
+
+def upgrade() -> None:
+    """Crea los índices de actualizado_en que falten."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    for nombre, tabla in INDICES:
+        if nombre in {ix['name'] for ix in inspector.get_indexes(tabla)}:
+            print(f"Índice {nombre} ya existe, saltando creación")
+            continue
+        op.create_index(nombre, tabla, ['actualizado_en'], unique=False)
+
+
+def downgrade() -> None:
+    """Elimina los índices de actualizado_en."""
+    for nombre, tabla in INDICES:
+        op.drop_index(nombre, table_name=tabla)
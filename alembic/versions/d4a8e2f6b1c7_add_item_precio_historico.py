@@ -0,0 +1,120 @@
+"""add_item_precio_historico
+
+Revision ID: d4a8e2f6b1c7
+Revises: c9f2a6d4e1b3
+Create Date: 2026-10-21 09:00:00.000000
+
+Historial de precios unitarios por (proveedor_id, item_hash, año, mes).
+
+RAZÓN DEL CAMBIO:
+- La comparación de items (ComparadorItemsService) leía factura_items unido
+  a facturas por cada item para recalcular promedio, extremos y desviación
+- Cada mes guarda n, media y M2 (Welford) de precio_unitario, extremos,
+  cantidad media y el último item; una ventana combina una fila por mes
+- Se mantiene en la misma transacción que la creación de items
+  (app.services.item_precio_historico) y se reconstruye con
+  python -m app.scripts.item_precio_historico --reconstruir
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8e2f6b1c7'
+down_revision: Union[str, Sequence[str], None] = 'c9f2a6d4e1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Carga inicial (mismo historial que item_precio_historico.reconstruir):
+# M2 = varianza poblacional * n; el último item del mes con ROW_NUMBER
+CARGA_INICIAL = """
+    INSERT INTO item_precio_historico
+        (proveedor_id, item_hash, año, mes, n, media, m2, precio_min, precio_max,
+         media_cantidad, cantidad_min, cantidad_max,
+         ultimo_precio, ultima_cantidad, ultima_fecha, ultima_factura_id)
+    SELECT
+        proveedor_id, item_hash, año, mes,
+        COUNT(*), AVG(precio_unitario), VAR_POP(precio_unitario) * COUNT(*),
+        MIN(precio_unitario), MAX(precio_unitario),
+        AVG(cantidad), MIN(cantidad), MAX(cantidad),
+        MAX(CASE WHEN orden = 1 THEN precio_unitario END),
+        MAX(CASE WHEN orden = 1 THEN cantidad END),
+        MAX(CASE WHEN orden = 1 THEN fecha_emision END),
+        MAX(CASE WHEN orden = 1 THEN factura_id END)
+    FROM (
+        SELECT
+            f.proveedor_id, i.item_hash, YEAR(f.fecha_emision) AS año, MONTH(f.fecha_emision) AS mes,
+            i.precio_unitario, i.cantidad, f.fecha_emision, f.id AS factura_id,
+            ROW_NUMBER() OVER (
+                PARTITION BY f.proveedor_id, i.item_hash, YEAR(f.fecha_emision), MONTH(f.fecha_emision)
+                ORDER BY f.fecha_emision DESC, f.id DESC, i.id DESC
+            ) AS orden
+        FROM factura_items i
+        JOIN facturas f ON f.id = i.factura_id
+        WHERE i.item_hash IS NOT NULL
+          AND f.proveedor_id IS NOT NULL
+          AND f.fecha_emision IS NOT NULL
+    ) historial
+    GROUP BY proveedor_id, item_hash, año, mes
+"""
+
+
+def upgrade() -> None:
+    """Crea item_precio_historico y la llena desde factura_items."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'item_precio_historico' in inspector.get_table_names():
+        print("Tabla item_precio_historico ya existe, saltando creación")
+        return
+
+    op.create_table(
+        'item_precio_historico',
+        sa.Column('proveedor_id', sa.BigInteger(), nullable=False),
+        sa.Column('item_hash', sa.String(32), nullable=False),
+        sa.Column('año', sa.SmallInteger(), nullable=False),
+        sa.Column('mes', sa.SmallInteger(), nullable=False),
+        sa.Column('n', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('media', sa.Float(53), nullable=False, server_default='0'),
+        sa.Column('m2', sa.Float(53), nullable=False, server_default='0',
+                  comment='Suma de cuadrados de las desviaciones (Welford)'),
+        sa.Column('precio_min', sa.Numeric(15, 4), nullable=True),
+        sa.Column('precio_max', sa.Numeric(15, 4), nullable=True),
+        sa.Column('media_cantidad', sa.Float(53), nullable=False, server_default='0'),
+        sa.Column('cantidad_min', sa.Numeric(15, 4), nullable=True),
+        sa.Column('cantidad_max', sa.Numeric(15, 4), nullable=True),
+        sa.Column('ultimo_precio', sa.Numeric(15, 4), nullable=True),
+        sa.Column('ultima_cantidad', sa.Numeric(15, 4), nullable=True),
+        sa.Column('ultima_fecha', sa.Date(), nullable=True),
+        sa.Column('ultima_factura_id', sa.BigInteger(), nullable=True),
+        sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('proveedor_id', 'item_hash', 'año', 'mes', name='pk_item_precio_historico'),
+        mysql_charset='utf8mb4'
+    )
+    op.create_index(
+        'idx_item_precio_historico_proveedor', 'item_precio_historico',
+        ['proveedor_id', 'año', 'mes']
+    )
+
+    op.execute(CARGA_INICIAL)
+    print("Tabla item_precio_historico creada y poblada")
+
+
+def downgrade() -> None:
+    """Elimina item_precio_historico."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'item_precio_historico' not in inspector.get_table_names():
+        print("Tabla item_precio_historico no existe, saltando downgrade")
+        return
+
+    op.drop_index('idx_item_precio_historico_proveedor', table_name='item_precio_historico')
+    op.drop_table('item_precio_historico')
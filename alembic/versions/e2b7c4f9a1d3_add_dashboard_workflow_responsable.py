@@ -0,0 +1,82 @@
+"""add_dashboard_workflow_responsable
+
+Revision ID: e2b7c4f9a1d3
+Revises: d4a8e1f7b2c9
+Create Date: 2026-10-17 14:00:00.000000
+
+Contadores precalculados de /workflow/dashboard por responsable.
+
+RAZÓN DEL CAMBIO:
+- /workflow/dashboard resolvía NIT → proveedores del responsable y contaba
+  facturas estado por estado (12 consultas) en cada request
+- dashboard_workflow_responsable guarda esos contadores por responsable
+  (0 = global); las filas se materializan en la primera lectura y se
+  mantienen en la transacción de cada cambio de estado
+  (app.services.dashboard_workflow)
+- Se completa workflow_aprobacion_facturas.tiempo_total_aprobacion de los
+  workflows ya aprobados: es la fuente del tiempo promedio de aprobación
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b7c4f9a1d3'
+down_revision: Union[str, Sequence[str], None] = 'd4a8e1f7b2c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Crea dashboard_workflow_responsable y completa tiempo_total_aprobacion."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'dashboard_workflow_responsable' in inspector.get_table_names():
+        print("Tabla dashboard_workflow_responsable ya existe, saltando creación")
+    else:
+        op.create_table(
+            'dashboard_workflow_responsable',
+            sa.Column('responsable_id', sa.BigInteger(), nullable=False, comment='0 = dashboard global (admin)'),
+            sa.Column('tiene_proveedores', sa.Boolean(), nullable=False, server_default=sa.true(),
+                      comment='False si el responsable no tiene proveedores en su alcance'),
+            sa.Column('en_revision', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('aprobada', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('aprobada_auto', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('rechazada', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('validada_contabilidad', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('devuelta_contabilidad', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('pendientes_antiguas', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('antiguas_corte', sa.Date(), nullable=False),
+            sa.Column('aprobaciones_con_tiempo', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('segundos_aprobacion_total', sa.BigInteger(), nullable=False, server_default='0'),
+            sa.Column('actualizado_en', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint('responsable_id', name='pk_dashboard_workflow_responsable'),
+            mysql_charset='utf8mb4'
+        )
+        print("Tabla dashboard_workflow_responsable creada (las filas se materializan al leer)")
+
+    # Misma regla que dashboard_workflow.segundos_aprobacion
+    op.execute("""
+        UPDATE workflow_aprobacion_facturas
+        SET tiempo_total_aprobacion = GREATEST(0, TIMESTAMPDIFF(SECOND, COALESCE(creado_en, fecha_aprobacion), fecha_aprobacion))
+        WHERE fecha_aprobacion IS NOT NULL AND tiempo_total_aprobacion IS NULL
+    """)
+
+
+def downgrade() -> None:
+    """Elimina dashboard_workflow_responsable (tiempo_total_aprobacion se conserva)."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if 'dashboard_workflow_responsable' not in inspector.get_table_names():
+        print("Tabla dashboard_workflow_responsable no existe, saltando downgrade")
+        return
+
+    op.drop_table('dashboard_workflow_responsable')
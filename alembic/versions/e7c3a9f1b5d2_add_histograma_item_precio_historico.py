@@ -0,0 +1,80 @@
+"""add_histograma_item_precio_historico
+
+Revision ID: e7c3a9f1b5d2
+Revises: d4a8e2f6b1c7
+Create Date: 2026-10-22 09:00:00.000000
+
+Histograma logarítmico del precio unitario por fila de item_precio_historico.
+
+RAZÓN DEL CAMBIO:
+- La comparación de items debía informar p25/p50/p75 del precio histórico,
+  pero n, media y M2 (Welford) por mes no permiten obtener percentiles de
+  la ventana combinada
+- Cada fila guarda {cubeta: items} con cubeta = ceil(ln(precio) / ln γ),
+  γ = 1.01 / 0.99 (error relativo <= 1%); los meses se combinan sumando
+  conteos (app.services.item_precio_historico.cubeta_precio)
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a9f1b5d2'
+down_revision: Union[str, Sequence[str], None] = 'd4a8e2f6b1c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Mismas cubetas que cubeta_precio: el divisor es repr(math.log(1.01 / 0.99))
+HISTOGRAMAS = """
+    UPDATE item_precio_historico h
+    JOIN (
+        SELECT proveedor_id, item_hash, año, mes, JSON_OBJECTAGG(cubeta, items) AS histograma
+        FROM (
+            SELECT
+                f.proveedor_id, i.item_hash, YEAR(f.fecha_emision) AS año, MONTH(f.fecha_emision) AS mes,
+                CASE
+                    WHEN i.precio_unitario > 0
+                    THEN CAST(CEIL(LN(i.precio_unitario) / 0.020000666706669435) AS CHAR)
+                    ELSE 'z'
+                END AS cubeta,
+                COUNT(*) AS items
+            FROM factura_items i
+            JOIN facturas f ON f.id = i.factura_id
+            WHERE i.item_hash IS NOT NULL
+              AND f.proveedor_id IS NOT NULL
+              AND f.fecha_emision IS NOT NULL
+            GROUP BY f.proveedor_id, i.item_hash, año, mes, cubeta
+        ) cubetas
+        GROUP BY proveedor_id, item_hash, año, mes
+    ) c ON c.proveedor_id = h.proveedor_id AND c.item_hash = h.item_hash
+       AND c.año = h.año AND c.mes = h.mes
+    SET h.histograma = c.histograma
+"""
+
+
+def upgrade() -> None:
+    """Agrega item_precio_historico.histograma y lo llena desde factura_items."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    columnas = [col['name'] for col in inspector.get_columns('item_precio_historico')]
+    if 'histograma' in columnas:
+        print("Columna histograma ya existe, saltando")
+        return
+
+    op.add_column('item_precio_historico', sa.Column(
+        'histograma', sa.JSON(), nullable=True,
+        comment='{cubeta logarítmica del precio: items} para percentiles'
+    ))
+    op.execute(HISTOGRAMAS)
+    print("Columna histograma agregada y poblada")
+
+
+def downgrade() -> None:
+    """Elimina item_precio_historico.histograma."""
+    op.drop_column('item_precio_historico', 'histograma')
@@ -0,0 +1,64 @@
+"""add_automatizacion_pendiente_to_facturas
+
+Revision ID: f5c3a9d2e8b1
+Revises: e2b7c4f9a1d3
+Create Date: 2026-10-18 09:00:00.000000
+
+Marcador indexado de facturas con automatización pendiente.
+
+RAZÓN DEL CAMBIO:
+- Las facturas nuevas esperaban hasta una hora al scheduler de automatización,
+  que además buscaba "facturas sin workflow" con un anti-join sobre toda la
+  tabla facturas en cada ciclo
+- Ahora la ingesta encola la factura (app.services.automation.cola_automatizacion)
+  y el barrido periódico solo recorre las filas con automatizacion_pendiente = 1
+- Las facturas existentes quedan marcadas solo si siguen en revisión sin
+  haber pasado por la automatización (lo que procesaba el ciclo horario)
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c3a9d2e8b1'
+down_revision: Union[str, Sequence[str], None] = 'e2b7c4f9a1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Agrega facturas.automatizacion_pendiente con su índice."""
+    from sqlalchemy import inspect
+
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    columnas = [col['name'] for col in inspector.get_columns('facturas')]
+    if 'automatizacion_pendiente' in columnas:
+        print("Columna automatizacion_pendiente ya existe, saltando")
+        return
+
+    # Las filas existentes entran en 0; las nuevas (server_default) en 1
+    op.add_column('facturas', sa.Column(
+        'automatizacion_pendiente', sa.Boolean(), nullable=False, server_default=sa.text('0'),
+        comment='Workflow y decisión automática aún no intentados (cola de automatización)'
+    ))
+    op.execute("""
+        UPDATE facturas
+        SET automatizacion_pendiente = 1
+        WHERE estado = 'en_revision' AND fecha_procesamiento_auto IS NULL
+    """)
+    op.alter_column(
+        'facturas', 'automatizacion_pendiente',
+        existing_type=sa.Boolean(), existing_nullable=False, server_default=sa.text('1')
+    )
+    op.create_index('ix_facturas_automatizacion_pendiente', 'facturas', ['automatizacion_pendiente'], unique=False)
+    print("Columna automatizacion_pendiente agregada")
+
+
+def downgrade() -> None:
+    """Elimina facturas.automatizacion_pendiente."""
+    op.drop_index('ix_facturas_automatizacion_pendiente', table_name='facturas')
+    op.drop_column('facturas', 'automatizacion_pendiente')
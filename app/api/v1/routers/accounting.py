@@ -9,7 +9,7 @@ Autor: Equipo Senior de Desarrollo
 Fecha: 2025-11-18
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
 from datetime import datetime
 
@@ -23,6 +23,13 @@ from app.models.workflow_aprobacion import WorkflowAprobacionFactura
 from app.services.unified_email_service import UnifiedEmailService
 from app.services.email_template_service import EmailTemplateService
 from app.utils.logger import logger
+from app.utils.cursor_pagination import (
+    CursorInvalidoError,
+    aplicar_keyset,
+    contar_total,
+    encode_keyset_cursor,
+    paginar_keyset,
+)
 from pydantic import BaseModel, Field
 from typing import Optional
 
@@ -60,6 +67,11 @@ class ValidacionResponse(BaseModel):
 # ENDPOINT: Obtener facturas por revisar (Contador)
 # =====================================================================
 
+# Más recientes primero; id desempata creado_en
+ORDEN_POR_REVISAR = ((Factura.creado_en, True), (Factura.id, True))
+AMBITO_POR_REVISAR = "contabilidad_por_revisar"
+
+
 @router.get(
     "/facturas/por-revisar",
     response_model=dict,
@@ -73,14 +85,19 @@ class ValidacionResponse(BaseModel):
     - Facturas en estado 'aprobada' o 'aprobada_auto'
     - Información para tomar decisión de validación
     - Estadísticas de pendientes
+
+    **Paginación:** `pagina` (OFFSET) o `cursor` (keyset, usar
+    `paginacion.next_cursor`). `conteo=estimado` evita el COUNT(*) por página.
     """
 )
 async def obtener_facturas_por_revisar(
     current_user=Depends(require_role("contador")),
     db: Session = Depends(get_db),
     solo_pendientes: bool = True,
-    pagina: int = 1,
-    limit: int = 50
+    pagina: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    conteo: str = Query("exacto", pattern="^(exacto|estimado)$")
 ):
     """Obtener facturas pendientes de validación por Contador"""
 
@@ -94,13 +111,23 @@ async def obtener_facturas_por_revisar(
         # (en realidad esto es redundante porque la query ya filtra aprobadas)
         pass
 
-    # Ordenar por fecha más reciente
-    query = query.order_by(Factura.creado_en.desc())
+    # Paginación (más recientes primero)
+    total, total_estimado = contar_total(query, conteo)
 
-    # Paginación
-    total = query.count()
-    skip = (pagina - 1) * limit
-    facturas = query.offset(skip).limit(limit).all()
+    try:
+        if cursor or pagina == 1:
+            facturas, next_cursor = paginar_keyset(query, ORDEN_POR_REVISAR, limit, cursor, AMBITO_POR_REVISAR)
+        else:
+            skip = (pagina - 1) * limit
+            facturas = aplicar_keyset(query, ORDEN_POR_REVISAR, None, AMBITO_POR_REVISAR).offset(skip).limit(limit).all()
+            next_cursor = encode_keyset_cursor(
+                [facturas[-1].creado_en, facturas[-1].id], AMBITO_POR_REVISAR
+            ) if len(facturas) == limit else None
+    except CursorInvalidoError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
 
     # Convertir a schema
     facturas_data = [FacturaRead.model_validate(f) for f in facturas]
@@ -129,7 +156,9 @@ async def obtener_facturas_por_revisar(
         "paginacion": {
             "pagina": pagina,
             "limit": limit,
-            "total": total
+            "total": total,
+            "total_estimado": total_estimado,
+            "next_cursor": next_cursor
         },
         "estadisticas": estadisticas
     }
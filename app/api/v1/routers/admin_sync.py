@@ -1,16 +1,20 @@
 """
 Router administrativo para sincronización y mantenimiento
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from sqlalchemy import func, distinct
 
-from app.db.session import get_db
+from app.db.session import get_db, engine
+from app.db.pool_monitor import get_pool_status, log_pool_status, pool_stats
 from app.core.security import require_role
+from app.crud import factura as crud_factura
+from app.services import cola_trabajos
 from app.models.usuario import Usuario
 from app.models.workflow_aprobacion import AsignacionNitResponsable
 from app.models.factura import Factura
-from app.models.proveedor import Proveedor
 from app.utils.logger import logger
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -22,6 +26,7 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
     description="Reasigna TODAS las facturas basado en los NITs asignados en AsignacionNitResponsable"
 )
 def sincronizar_facturas(
+    en_segundo_plano: bool = Query(False, description="Encolar como trabajo y responder con su id"),
     db: Session = Depends(get_db),
     current_user=Depends(require_role("admin")),
 ):
@@ -35,89 +40,24 @@ def sincronizar_facturas(
     - Total de facturas actualizadas
     - Total de facturas que ya estaban correctas
     - Detalles por responsable
-    """
-    try:
-        usuarios = db.query(Usuario).all()
-
-        total_actualizadas = 0
-        total_ignoradas = 0
-        detalles = []
-
-        for resp in usuarios:
-            # Obtener NITs asignados
-            asignaciones = db.query(AsignacionNitResponsable.nit).filter(
-                AsignacionNitResponsable.responsable_id == resp.id,
-                AsignacionNitResponsable.activo == True
-            ).all()
-
-            nits_asignados = [nit for (nit,) in asignaciones if nit]
-
-            if not nits_asignados:
-                detalles.append({
-                    "responsable": resp.nombre,
-                    "actualizadas": 0,
-                    "ignoradas": 0,
-                    "nota": "Sin NITs asignados"
-                })
-                continue
-
-            # Obtener proveedores con esos NITs
-            proveedor_ids = db.query(Proveedor.id).filter(
-                Proveedor.nit.in_(nits_asignados)
-            ).all()
-            proveedor_ids = [pid for (pid,) in proveedor_ids]
-
-            if not proveedor_ids:
-                detalles.append({
-                    "responsable": resp.nombre,
-                    "actualizadas": 0,
-                    "ignoradas": 0,
-                    "nota": f"{len(nits_asignados)} NITs pero sin proveedores en BD"
-                })
-                continue
-
-            # Obtener facturas de esos proveedores
-            facturas = db.query(Factura).filter(
-                Factura.proveedor_id.in_(proveedor_ids)
-            ).all()
-
-            # Actualizar asignaciones
-            actualizadas = 0
-            ignoradas = 0
-
-            for factura in facturas:
-                if factura.responsable_id != resp.id:
-                    factura.responsable_id = resp.id
-                    actualizadas += 1
-                else:
-                    ignoradas += 1
-
-            if actualizadas > 0:
-                db.flush()
-
-            detalles.append({
-                "responsable": resp.nombre,
-                "nits_asignados": len(nits_asignados),
-                "proveedores": len(proveedor_ids),
-                "facturas_totales": len(facturas),
-                "actualizadas": actualizadas,
-                "ignoradas": ignoradas
-            })
 
-            total_actualizadas += actualizadas
-            total_ignoradas += ignoradas
+    Con en_segundo_plano=true se encola en la cola de mantenimiento
+    (ver GET /admin/trabajos).
+    """
+    if en_segundo_plano:
+        trabajo = cola_trabajos.encolar(db, "sincronizar_facturas_nit", cola=cola_trabajos.COLA_MANTENIMIENTO)
+        return {"exito": True, "en_segundo_plano": True, "trabajo_id": trabajo.id}
 
-        # Commit
+    try:
+        resultado = crud_factura.sincronizar_responsables_por_nit(db)
         db.commit()
 
-        logger.info(f"Sincronización completada por {current_user.usuario}: {total_actualizadas} actualizadas, {total_ignoradas} ignoradas")
+        logger.info(
+            f"Sincronización completada por {current_user.usuario}: "
+            f"{resultado['total_actualizadas']} actualizadas, {resultado['total_ignoradas']} ignoradas"
+        )
 
-        return {
-            "exito": True,
-            "total_actualizadas": total_actualizadas,
-            "total_ignoradas": total_ignoradas,
-            "detalles": detalles
-        }
+        return {"exito": True, **resultado}
 
     except Exception as e:
         db.rollback()
@@ -177,3 +117,65 @@ def ver_distribucion_facturas(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error obteniendo distribución: {str(e)}"
         )
+
+
+@router.get(
+    "/db-pool",
+    summary="Telemetría del pool de conexiones",
+    description="Conexiones en uso, overflow y tiempos de espera del pool de este worker"
+)
+def ver_estado_pool(
+    reset: bool = False,
+    current_user=Depends(require_role("admin")),
+):
+    """
+    Retorna el estado del pool de conexiones del proceso actual.
+
+    Los valores son por worker (cada proceso de uvicorn tiene su propio pool).
+    Con reset=true se reinician los contadores acumulados tras leerlos.
+    """
+    estado = get_pool_status(engine)
+    log_pool_status(engine)
+
+    if reset:
+        pool_stats.reset()
+
+    return estado
+
+
+@router.get(
+    "/trabajos",
+    summary="Estado de la cola de trabajos",
+    description="Profundidad, trabajos fallidos y latencia por cola"
+)
+def ver_estado_trabajos(
+    ventana_minutos: int = Query(60, ge=1, le=24 * 60),
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("admin")),
+):
+    """
+    Por cola: trabajos pendientes/en proceso/completados/fallidos, espera del
+    trabajo listo más antiguo y latencia (encolado → inicio) y duración
+    promedio de los completados en la ventana.
+    """
+    return cola_trabajos.estado_colas(db, ventana=timedelta(minutes=ventana_minutos))
+
+
+@router.post(
+    "/trabajos/{trabajo_id}/reintentar",
+    summary="Reintentar un trabajo fallido",
+    description="Devuelve un trabajo en dead-letter a pendiente con los intentos en cero"
+)
+def reintentar_trabajo(
+    trabajo_id: int,
+    db: Session = Depends(get_db),
+    current_user=Depends(require_role("admin")),
+):
+    if not cola_trabajos.reintentar(db, trabajo_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trabajo {trabajo_id} no existe o no está fallido"
+        )
+
+    logger.info(f"Trabajo {trabajo_id} reintentado por {current_user.usuario}")
+    return {"exito": True, "trabajo_id": trabajo_id}
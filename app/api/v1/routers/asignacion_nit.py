@@ -4,7 +4,7 @@ Reemplazo de responsable_proveedor, usando SOLO asignacion_nit_responsable.
 
  NUEVA ARQUITECTURA UNIFICADA
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from typing import List, Optional
@@ -20,6 +20,9 @@ from app.models.proveedor import Proveedor
 from app.models.factura import Factura
 from app.models.email_config import NitConfiguracion
 from app.services.audit_service import AuditService
+from app.services import visibilidad_facturas
+from app.utils.cursor_pagination import CursorInvalidoError, aplicar_keyset, paginar_keyset
+from app.utils.conditional_get import ValidadorCondicional
 from pydantic import BaseModel
 
 
@@ -207,6 +210,11 @@ def sincronizar_facturas_por_nit(db: Session, nit: str, responsable_id: int, res
             factura.responsable_id = responsable_id
             total_facturas += 1
 
+    # Visibilidad materializada: el nuevo responsable gana el NIT y el anterior lo pierde
+    visibilidad_facturas.sincronizar_nit(db, nit, responsable_id)
+    if responsable_anterior_id is not None:
+        visibilidad_facturas.sincronizar_nit(db, nit, responsable_anterior_id)
+
     if responsable_anterior_id is not None:
         logger.info(
             f"[PHASE 2] Sincronizadas {total_facturas} facturas para NIT {nit} "
@@ -272,12 +280,18 @@ def desasignar_facturas_por_nit(db: Session, nit: str, responsable_id: int):
 
 # ==================== ENDPOINTS ====================
 
+ORDEN_ASIGNACIONES = ((AsignacionNitResponsable.id, False),)
+
+
 @router.get("/", response_model=List[AsignacionNitResponse])
 def listar_asignaciones_nit(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     responsable_id: Optional[int] = Query(None),
     nit: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la respuesta anterior"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario)
 ):
@@ -298,8 +312,20 @@ def listar_asignaciones_nit(
     - GET /asignacion-nit/?responsable_id=1 -> Asignaciones activas de responsable 1
     - GET /asignacion-nit/?nit=800185449 -> Asignaciones activas del NIT
 
+    **Paginación:** sin skip (o con cursor) pagina por keyset en orden de id;
+    el cursor de la siguiente página viene en el header X-Next-Cursor.
+
+    **GET condicional:** responde 304 con If-None-Match si no cambió
+    ninguna asignación.
+
     **Nivel:** Enterprise Production-Ready
     """
+    # Watermark de asignaciones (se cuentan: los scripts de limpieza borran filas)
+    validador = ValidadorCondicional.desde_bd(db, request, ((AsignacionNitResponsable.actualizado_en, True),))
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+    validador.aplicar(response)
+
     query = db.query(AsignacionNitResponsable).filter(AsignacionNitResponsable.activo == True)
 
     if responsable_id is not None:
@@ -307,21 +333,34 @@ def listar_asignaciones_nit(
 
     # ENTERPRISE: Filtro por NIT con normalización automática usando NitValidator
     # Acepta NITs en cualquier formato y normaliza antes de buscar
+    nit_valido = True
     if nit is not None:
         # Normalizar el NIT de búsqueda usando NitValidator
-        es_valido, nit_normalizado_busqueda = NitValidator.validar_nit(nit)
+        nit_valido, nit_normalizado_busqueda = NitValidator.validar_nit(nit)
 
-        if not es_valido:
-            # NIT inválido, retornar lista vacía
-            asignaciones = []
-        else:
+        if nit_valido:
             # Búsqueda exacta con NIT normalizado (todos en BD están normalizados)
-            asignaciones = query.filter(
-                AsignacionNitResponsable.nit == nit_normalizado_busqueda
-            ).offset(skip).limit(limit).all()
+            query = query.filter(AsignacionNitResponsable.nit == nit_normalizado_busqueda)
+
+    if not nit_valido:
+        # NIT inválido, retornar lista vacía
+        asignaciones = []
+    elif cursor or not skip:
+        try:
+            asignaciones, next_cursor = paginar_keyset(
+                query, ORDEN_ASIGNACIONES, limit, cursor, ambito="asignaciones_nit"
+            )
+        except CursorInvalidoError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido"
+            )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
     else:
-        # Sin filtro de NIT, usar query normal con paginación en DB
-        asignaciones = query.offset(skip).limit(limit).all()
+        asignaciones = aplicar_keyset(
+            query, ORDEN_ASIGNACIONES, None, "asignaciones_nit"
+        ).offset(skip).limit(limit).all()
 
     # Enriquecer con datos completos del usuario
     resultado = []
@@ -472,6 +511,9 @@ def actualizar_asignacion_nit(
             f"Usuario cambiado: {responsable_anterior} -> {payload.responsable_id}, "
             f"{total_facturas} facturas sincronizadas (PHASE 2: Reassignment completo)"
         )
+    elif payload.activo is not None:
+        # Activación/desactivación sin cambio de usuario
+        visibilidad_facturas.sincronizar_nit(db, asignacion.nit, asignacion.responsable_id)
 
     db.commit()
     db.refresh(asignacion)
@@ -543,6 +585,8 @@ def eliminar_asignacion_nit(
     asignacion.actualizado_por = current_user.usuario
     asignacion.actualizado_en = datetime.utcnow()
 
+    visibilidad_facturas.sincronizar_nit(db, nit, responsable_id)
+
     db.commit()
 
     logger.info(
@@ -1087,6 +1131,7 @@ def crear_asignaciones_desde_nit_config(
                 asignacion_inactiva.activo = True
                 asignacion_inactiva.actualizado_por = "BULK_NIT_CONFIG"
                 asignacion_inactiva.actualizado_en = datetime.utcnow()
+                visibilidad_facturas.sincronizar_nit(db, nit_normalizado, payload.responsable_id)
                 reactivadas += 1
                 continue
 
@@ -1107,6 +1152,7 @@ def crear_asignaciones_desde_nit_config(
                 creado_en=datetime.utcnow()
             )
             db.add(nueva_asignacion)
+            visibilidad_facturas.sincronizar_nit(db, nit_normalizado, payload.responsable_id)
             creadas += 1
 
         except Exception as e:
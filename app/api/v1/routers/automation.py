@@ -11,7 +11,7 @@ Proporciona endpoints para:
 
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 import logging
 
@@ -19,6 +19,8 @@ from app.db.session import get_db
 from app.services.automation.automation_service import AutomationService
 from app.services.automation.notification_service import NotificationService, ConfiguracionNotificacion
 from app.services.audit_service import AuditService
+from app.services import cola_trabajos
+from app.services.metricas_automatizacion import get_metricas_cache
 from app.crud import factura as crud_factura
 from app.models.factura import Factura, EstadoFactura
 from app.models.workflow_aprobacion import TipoAprobacion
@@ -359,7 +361,7 @@ async def procesar_workflows_pendientes(
                 if incluir_no_aprobadas:
                     # Búsqueda manual sin filtro de estado (para primera ejecución)
                     from dateutil.relativedelta import relativedelta
-                    from sqlalchemy import extract, and_
+                    from app.utils.date_helpers import DateHelper
 
                     fecha_mes_anterior = factura.fecha_emision - relativedelta(months=1)
 
@@ -367,8 +369,9 @@ async def procesar_workflows_pendientes(
                         and_(
                             Factura.proveedor_id == factura.proveedor_id,
                             Factura.concepto_hash == factura.concepto_hash,
-                            extract('year', Factura.fecha_emision) == fecha_mes_anterior.year,
-                            extract('month', Factura.fecha_emision) == fecha_mes_anterior.month,
+                            DateHelper.create_año_mes_filter(
+                                Factura.fecha_emision, fecha_mes_anterior.year, fecha_mes_anterior.month
+                            ),
                             Factura.id != factura.id
                         )
                     ).order_by(Factura.fecha_emision.desc()).first()
@@ -543,7 +546,6 @@ async def procesar_workflows_pendientes(
 @router.post("/procesar", response_model=Dict[str, Any])
 async def procesar_facturas_pendientes(
     solicitud: SolicitudProcesamiento,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """
@@ -579,13 +581,16 @@ async def procesar_facturas_pendientes(
             modo_debug=solicitud.modo_debug
         )
 
-        # Programar envío de notificaciones en segundo plano
+        # Notificaciones como trabajo persistido: sobrevive a reinicios y se reintenta
         if resultado['resumen_general']['facturas_procesadas'] > 0:
-            background_tasks.add_task(
-                enviar_notificaciones_procesamiento,
-                db,
-                resultado
-            )
+            cola_trabajos.encolar(db, "notificaciones_procesamiento", {
+                "facturas_revision": [
+                    info['factura_id']
+                    for info in resultado.get('facturas_procesadas_detalle', [])
+                    if info.get('requiere_accion_manual', False)
+                ],
+                "resumen_general": resultado['resumen_general'],
+            }, cola=cola_trabajos.COLA_NOTIFICACIONES)
 
         return ResponseBase(
             success=True,
@@ -946,7 +951,8 @@ async def enviar_notificacion_resumen_manual(
 
 
 @router.get("/dashboard/metricas", summary="Métricas del Dashboard en Tiempo Real")
-async def obtener_metricas_dashboard(
+def obtener_metricas_dashboard(
+    refrescar: bool = Query(False, description="Ignorar el caché y recalcular"),
     db: Session = Depends(get_db)
 ):
     """
@@ -961,104 +967,13 @@ async def obtener_metricas_dashboard(
     - Estadísticas de la última ejecución
 
     **Optimizado para:**
-    - Respuesta rápida (< 500ms)
-    - Datos agregados y cacheables
-    - Formato listo para visualización
+    - Todos los contadores en una sola consulta (agregación condicional
+      sobre rangos de fecha_procesamiento_auto)
+    - Caché en memoria con TTL corto (AUTOMATION_METRICAS_CACHE_TTL), que se
+      invalida al confirmar cualquier cambio de estado de facturas
     """
     try:
-        from sqlalchemy import and_, func
-        from datetime import date
-
-        hoy = datetime.utcnow().date()
-
-        # Métricas del día actual
-        facturas_aprobadas_hoy = db.query(func.count(Factura.id)).filter(
-            and_(
-                Factura.estado == EstadoFactura.aprobada_auto,
-                func.date(Factura.fecha_procesamiento_auto) == hoy
-            )
-        ).scalar() or 0
-
-        facturas_revision_hoy = db.query(func.count(Factura.id)).filter(
-            and_(
-                Factura.estado == EstadoFactura.en_revision,
-                func.date(Factura.fecha_procesamiento_auto) == hoy
-            )
-        ).scalar() or 0
-
-        facturas_pendientes_total = db.query(func.count(Factura.id)).filter(
-            Factura.estado == EstadoFactura.en_revision
-        ).scalar() or 0
-
-        # Tasa de automatización del día
-        total_procesadas_hoy = facturas_aprobadas_hoy + facturas_revision_hoy
-        tasa_automatizacion = (
-            (facturas_aprobadas_hoy / total_procesadas_hoy * 100)
-            if total_procesadas_hoy > 0 else 0
-        )
-
-        # Últimas 10 facturas procesadas automáticamente
-        ultimas_facturas = db.query(Factura).filter(
-            Factura.fecha_procesamiento_auto.isnot(None)
-        ).order_by(
-            Factura.fecha_procesamiento_auto.desc()
-        ).limit(10).all()
-
-        ultimas_facturas_data = [
-            {
-                'id': f.id,
-                'numero_factura': f.numero_factura,
-                'proveedor': f.proveedor.razon_social if f.proveedor else 'N/A',
-                'total': float(f.total_a_pagar) if f.total_a_pagar else 0,
-                'estado': f.estado.value if f.estado else 'pendiente',
-                'confianza': float(f.confianza_automatica) if f.confianza_automatica else 0,
-                'fecha_procesamiento': f.fecha_procesamiento_auto.isoformat() if f.fecha_procesamiento_auto else None,
-                'motivo': f.motivo_decision or 'Sin motivo'
-            }
-            for f in ultimas_facturas
-        ]
-
-        # Estadísticas de la última semana
-        fecha_semana = datetime.utcnow() - timedelta(days=7)
-        facturas_semana = db.query(func.count(Factura.id)).filter(
-            and_(
-                Factura.fecha_procesamiento_auto >= fecha_semana,
-                Factura.estado.in_([EstadoFactura.aprobada_auto, EstadoFactura.en_revision])
-            )
-        ).scalar() or 0
-
-        facturas_aprobadas_semana = db.query(func.count(Factura.id)).filter(
-            and_(
-                Factura.fecha_procesamiento_auto >= fecha_semana,
-                Factura.estado == EstadoFactura.aprobada_auto
-            )
-        ).scalar() or 0
-
-        return {
-            'success': True,
-            'timestamp': datetime.utcnow().isoformat(),
-            'metricas_hoy': {
-                'facturas_aprobadas_automaticamente': facturas_aprobadas_hoy,
-                'facturas_en_revision_manual': facturas_revision_hoy,
-                'facturas_pendientes_procesamiento': facturas_pendientes_total,
-                'total_procesadas': total_procesadas_hoy,
-                'tasa_automatizacion_pct': round(tasa_automatizacion, 1)
-            },
-            'metricas_semana': {
-                'total_procesadas': facturas_semana,
-                'aprobadas_automaticamente': facturas_aprobadas_semana,
-                'tasa_automatizacion_pct': round(
-                    (facturas_aprobadas_semana / facturas_semana * 100) if facturas_semana > 0 else 0,
-                    1
-                )
-            },
-            'ultimas_facturas': ultimas_facturas_data,
-            'estado_sistema': {
-                'automatizacion_activa': True,
-                'ultima_ejecucion': ultimas_facturas[0].fecha_procesamiento_auto.isoformat() if ultimas_facturas else None,
-                'proxima_ejecucion_programada': 'Cada hora en punto'
-            }
-        }
+        return get_metricas_cache().get(db, force_refresh=refrescar)
 
     except Exception as e:
         raise HTTPException(
@@ -1067,48 +982,6 @@ async def obtener_metricas_dashboard(
         )
 
 
-# Función auxiliar para notificaciones en segundo plano
-async def enviar_notificaciones_procesamiento(db: Session, resultado_procesamiento: Dict[str, Any]):
-    """Envía notificaciones de procesamiento en segundo plano."""
-    try:
-        # Identificar facturas que requieren notificación
-        facturas_revision = []
-        facturas_aprobadas = []
-
-        for factura_info in resultado_procesamiento.get('facturas_procesadas', []):
-            if factura_info.get('requiere_accion_manual', False):
-                facturas_revision.append(factura_info['factura_id'])
-            elif factura_info.get('decision') == 'aprobacion_automatica':
-                facturas_aprobadas.append(factura_info['factura_id'])
-
-        # Enviar notificaciones para facturas que requieren revisión
-        for factura_id in facturas_revision:
-            factura = crud_factura.get_factura(db, factura_id)
-            if factura:
-                notification_service.notificar_revision_requerida(
-                    db=db,
-                    factura=factura,
-                    motivo=factura.motivo_decision or "Requiere revisión manual",
-                    confianza=float(factura.confianza_automatica or 0),
-                    patron_detectado=factura.patron_recurrencia or "no_detectado"
-                )
-
-        # Enviar resumen general si se procesaron facturas
-        if resultado_procesamiento['resumen_general']['facturas_procesadas'] > 0:
-            facturas_pendientes = crud_factura.get_facturas_pendientes_procesamiento(db)
-            notification_service.enviar_resumen_procesamiento(
-                db=db,
-                estadisticas_procesamiento=resultado_procesamiento,
-                facturas_pendientes=facturas_pendientes
-            )
-
-    except Exception as e:
-        # Registrar error pero no fallar el procesamiento principal
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.error(f"Error enviando notificaciones en segundo plano: {str(e)}")
-
-
 # ==================== DEBUG ENDPOINT ====================
 
 @router.get("/debug/conteos-workflows", summary="🔧 Debug: Conteos de Workflows y Facturas")
@@ -1327,117 +1200,20 @@ def notificar_aprobaciones_retroactivas(
     Envía notificaciones retroactivas para facturas que fueron aprobadas automáticamente
     pero nunca se notificó al usuario (antes de implementar las notificaciones).
 
-    Busca workflows en estado APROBADA_AUTO que no tengan notificación de tipo
-    APROBACION_AUTOMATICA y les envía la notificación correspondiente.
+    Se encola en la cola de notificaciones (tarea notificar_aprobaciones_retroactivas)
+    y la respuesta trae el trabajo_id; el resultado queda en GET /admin/trabajos.
     """
-    from app.models.workflow_aprobacion import WorkflowAprobacionFactura, EstadoFacturaWorkflow, TipoNotificacion, NotificacionWorkflow
-    from app.services.automation.notification_service import NotificationService
-
-    # Buscar workflows aprobados automáticamente
-    workflows_aprobados_auto = db.query(WorkflowAprobacionFactura).filter(
-        WorkflowAprobacionFactura.estado == EstadoFacturaWorkflow.APROBADA_AUTO,
-        WorkflowAprobacionFactura.tipo_aprobacion == TipoAprobacion.AUTOMATICA
-    ).limit(limite).all()
-
-    if not workflows_aprobados_auto:
-        return {
-            "success": True,
-            "message": "No hay workflows aprobados automáticamente sin notificar",
-            "data": {
-                "total_workflows": 0,
-                "notificaciones_enviadas": 0,
-                "errores": 0
-            }
-        }
-
-    notification_service = NotificationService()
-    notificaciones_enviadas = 0
-    errores = 0
-    detalles = []
-
-    for workflow in workflows_aprobados_auto:
-        try:
-            # Verificar si ya tiene notificación de aprobación automática
-            notificacion_existente = db.query(NotificacionWorkflow).filter(
-                NotificacionWorkflow.workflow_id == workflow.id,
-                NotificacionWorkflow.tipo == TipoNotificacion.APROBACION_AUTOMATICA
-            ).first()
-
-            if notificacion_existente:
-                logger.info(f"  ⏭️  Workflow {workflow.id} ya tiene notificación, saltando...")
-                continue
-
-            factura = workflow.factura
-            if not factura:
-                logger.warning(f"  ⚠️  Workflow {workflow.id} sin factura asociada")
-                errores += 1
-                continue
-
-            # Construir criterios cumplidos desde los datos guardados
-            criterios_cumplidos = []
-            if workflow.diferencias_detectadas:
-                diferencia_pct = workflow.diferencias_detectadas.get('diferencia_porcentual', 0)
-                criterios_cumplidos.append(f"Variación de monto: {diferencia_pct:.2f}%")
-
-            if workflow.porcentaje_similitud:
-                criterios_cumplidos.append(f"Similitud: {workflow.porcentaje_similitud}%")
-
-            if workflow.es_identica_mes_anterior:
-                criterios_cumplidos.append("Factura idéntica al mes anterior")
-
-            if not criterios_cumplidos:
-                criterios_cumplidos = ["Aprobada automáticamente por el sistema"]
-
-            # Construir información del patrón detectado
-            patron_detectado = "Mes sobre mes"
-            factura_referencia = None
-            variacion_monto = 0.0
-
-            if workflow.diferencias_detectadas:
-                variacion_monto = workflow.diferencias_detectadas.get('diferencia_porcentual', 0.0)
-                monto_anterior = workflow.diferencias_detectadas.get('monto_anterior', 0)
-                if monto_anterior:
-                    factura_referencia = f"Factura mes anterior: ${monto_anterior:,.2f}"
-
-            # Enviar notificación retroactiva
-            resultado = notification_service.notificar_aprobacion_automatica(
-                db=db,
-                factura=factura,
-                criterios_cumplidos=criterios_cumplidos,
-                confianza=0.95,  # Default para aprobaciones retroactivas
-                patron_detectado=patron_detectado,
-                factura_referencia=factura_referencia,
-                variacion_monto=variacion_monto
-            )
-
-            if resultado.get('exito'):
-                notificaciones_enviadas += resultado.get('notificaciones_enviadas', 0)
-                logger.info(f"   Notificación retroactiva enviada para workflow {workflow.id} - factura {factura.numero_factura}")
-
-                detalles.append({
-                    'workflow_id': workflow.id,
-                    'factura_id': factura.id,
-                    'numero_factura': factura.numero_factura,
-                    'responsable': workflow.responsable.nombre if workflow.responsable else 'N/A',
-                    'notificaciones_enviadas': resultado.get('notificaciones_enviadas', 0)
-                })
-            else:
-                errores += 1
-                logger.error(f"  ❌ Error enviando notificación para workflow {workflow.id}")
-
-        except Exception as e:
-            errores += 1
-            logger.error(f"  ❌ Error procesando workflow {workflow.id}: {str(e)}")
-
-    db.commit()
+    trabajo = cola_trabajos.encolar(
+        db, "notificar_aprobaciones_retroactivas", {"limite": limite},
+        cola=cola_trabajos.COLA_NOTIFICACIONES
+    )
 
     return {
         "success": True,
-        "message": f"Procesadas {len(workflows_aprobados_auto)} facturas aprobadas automáticamente",
+        "message": "Notificaciones retroactivas encoladas",
         "data": {
-            "total_workflows_revisados": len(workflows_aprobados_auto),
-            "notificaciones_enviadas": notificaciones_enviadas,
-            "errores": errores,
-            "detalles": detalles[:20]  # Primeros 20 para no sobrecargar
+            "en_segundo_plano": True,
+            "trabajo_id": trabajo.id,
+            "limite": limite
         }
-    }
\ No newline at end of file
+    }
@@ -6,12 +6,17 @@ Endpoints para vista principal del dashboard con filtrado dinámico:
 - Mes actual + estados activos (dashboard principal)
 - Alerta de fin de mes (contextual)
 - Histórico completo (vista separada)
+- Contadores en vivo por Server-Sent Events (sin polling)
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, extract, and_, or_
-from typing import List, Optional
+from sqlalchemy import func, and_, or_, case
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, date
 from calendar import monthrange
 
@@ -21,8 +26,13 @@ from app.models.factura import Factura, EstadoFactura
 from app.models.proveedor import Proveedor
 from app.models.workflow_aprobacion import WorkflowAprobacionFactura
 from app.schemas.factura import FacturaRead
+from app.schemas.common import CursorPaginatedResponse, CursorPaginationMetadata
 from pydantic import BaseModel, Field
 from app.utils.logger import logger
+from app.utils.date_helpers import DateHelper
+from app.utils.cursor_pagination import CursorInvalidoError, paginar_keyset
+from app.utils.conditional_get import ValidadorCondicional
+from app.services.eventos_dashboard import AMBITO_GLOBAL, ambito_de_responsable, get_difusor
 
 
 router = APIRouter(tags=["Dashboard"])
@@ -49,6 +59,7 @@ class DashboardMesActualResponse(BaseModel):
     estadisticas: EstadisticasMesActual
     facturas: List[FacturaRead]
     total_facturas: int = Field(description="Total de facturas retornadas")
+    next_cursor: Optional[str] = Field(None, description="Cursor para /mes-actual/facturas (None si no hay más)")
 
 
 class AlertaMesResponse(BaseModel):
@@ -77,6 +88,7 @@ class HistoricoResponse(BaseModel):
     estadisticas: EstadisticasHistorico
     facturas: List[FacturaRead]
     total_facturas: int = Field(description="Total de facturas retornadas")
+    next_cursor: Optional[str] = Field(None, description="Cursor para /historico/facturas (None si no hay más)")
 
 
 # ============================================================================
@@ -104,6 +116,70 @@ def get_dias_restantes_mes() -> int:
     return (ultimo_dia_mes - hoy).days
 
 
+ESTADOS_ACTIVOS = (
+    EstadoFactura.en_revision,
+    EstadoFactura.aprobada,
+    EstadoFactura.aprobada_auto,
+    EstadoFactura.rechazada,
+)
+
+# Listas paginadas: más recientes primero, id desempata creado_en
+ORDEN_DASHBOARD = ((Factura.creado_en, True), (Factura.id, True))
+
+# Watermark del GET condicional: estas vistas no dependen del usuario
+FUENTES_DASHBOARD = ((Factura.actualizado_en, False),)
+
+
+def filtros_mes(año: int, mes: int, estados=None) -> list:
+    """Filtros del período (rango sobre creado_en) y, opcionalmente, estados."""
+    filtros = [DateHelper.create_año_mes_filter(Factura.creado_en, año, mes)]
+    if estados is not None:
+        filtros.append(Factura.estado.in_(estados))
+    return filtros
+
+
+def contar_por_estado(db: Session, filtros: list) -> Dict[str, int]:
+    """
+    Total y conteo por estado en UNA consulta (agregación condicional).
+
+    Returns:
+        {"total": n, "en_revision": n, "aprobada": n, ...}
+    """
+    fila = db.query(
+        func.count(Factura.id).label("total"),
+        *[
+            func.count(case((Factura.estado == estado, Factura.id))).label(estado.value)
+            for estado in EstadoFactura
+        ]
+    ).filter(*filtros).one()
+
+    return {"total": fila.total, **{estado.value: getattr(fila, estado.value) for estado in EstadoFactura}}
+
+
+def pagina_facturas(
+    db: Session,
+    filtros: list,
+    limit: int,
+    cursor: Optional[str],
+    ambito: str
+) -> Tuple[List[FacturaRead], Optional[str]]:
+    """Una página keyset de facturas (solo se serializa la página)."""
+    query = db.query(Factura).options(
+        joinedload(Factura.proveedor),
+        joinedload(Factura.usuario)
+    ).filter(*filtros)
+
+    try:
+        facturas, next_cursor = paginar_keyset(query, ORDEN_DASHBOARD, limit, cursor, ambito)
+    except CursorInvalidoError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor inválido"
+        )
+
+    return [FacturaRead.model_validate(f) for f in facturas], next_cursor
+
+
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
@@ -125,10 +201,14 @@ def get_dias_restantes_mes() -> int:
     - validada_contabilidad (ya procesada)
     - devuelta_contabilidad (ya procesada)
 
-    Optimizado con índices en (año, mes, estado).
+    Optimizado con rango semiabierto sobre creado_en (idx_facturas_creado_en_estado).
     """
 )
 def get_dashboard_mes_actual(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="Facturas en la primera página"),
+    completo: bool = Query(False, description="Compatibilidad: todas las facturas del mes, orden por estado"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_usuario)
 ):
@@ -139,62 +219,63 @@ def get_dashboard_mes_actual(
     - Focus en facturas que requieren ACCIÓN
     - Sin saturación de información
     - Performance optimizada
+
+    Las estadísticas salen de una consulta agregada y solo se serializa la
+    primera página de facturas (siguientes: /mes-actual/facturas con
+    next_cursor): el costo depende de limit, no del volumen del mes.
+    completo=true devuelve la respuesta anterior con todas las facturas.
     """
     try:
         mes_actual, año_actual = get_mes_actual()
 
         logger.info(f"Dashboard mes actual solicitado: {MESES_ESPAÑOL[mes_actual]} {año_actual} por usuario {current_user.usuario}")
 
-        # Estados activos (facturas que requieren atención o son del mes)
-        estados_activos = [
-            EstadoFactura.en_revision.value,
-            EstadoFactura.aprobada.value,
-            EstadoFactura.aprobada_auto.value,
-            EstadoFactura.rechazada.value
-        ]
-
-        # Query principal: mes actual + estados activos
-        query = db.query(Factura).options(
-            joinedload(Factura.proveedor),
-            joinedload(Factura.usuario)
-        ).filter(
-            extract('month', Factura.creado_en) == mes_actual,
-            extract('year', Factura.creado_en) == año_actual,
-            Factura.estado.in_(estados_activos)
-        ).order_by(
-            # Priorizar por estado (las que requieren acción primero)
-            Factura.estado,
-            Factura.creado_en.desc()
+        validador = ValidadorCondicional.desde_bd(db, request, FUENTES_DASHBOARD, None, año_actual, mes_actual)
+        if validador.no_modificado():
+            return validador.respuesta_no_modificado()
+
+        filtros = filtros_mes(año_actual, mes_actual, ESTADOS_ACTIVOS)
+        conteos = contar_por_estado(db, filtros)
+
+        if completo:
+            facturas = [
+                FacturaRead.model_validate(f)
+                for f in db.query(Factura).options(
+                    joinedload(Factura.proveedor),
+                    joinedload(Factura.usuario)
+                ).filter(*filtros).order_by(
+                    # Priorizar por estado (las que requieren acción primero)
+                    Factura.estado,
+                    Factura.creado_en.desc()
+                ).all()
+            ]
+            next_cursor = None
+        else:
+            facturas, next_cursor = pagina_facturas(db, filtros, limit, None, "dashboard_mes_actual")
+
+        estadisticas = EstadisticasMesActual(
+            total=conteos["total"],
+            en_revision=conteos[EstadoFactura.en_revision.value],
+            aprobadas=conteos[EstadoFactura.aprobada.value],
+            aprobadas_auto=conteos[EstadoFactura.aprobada_auto.value],
+            rechazadas=conteos[EstadoFactura.rechazada.value]
         )
 
-        facturas = query.all()
-
-        # Calcular estadísticas
-        total = len(facturas)
-        en_revision = sum(1 for f in facturas if f.estado == EstadoFactura.en_revision.value)
-        aprobadas = sum(1 for f in facturas if f.estado == EstadoFactura.aprobada.value)
-        aprobadas_auto = sum(1 for f in facturas if f.estado == EstadoFactura.aprobada_auto.value)
-        rechazadas = sum(1 for f in facturas if f.estado == EstadoFactura.rechazada.value)
-
         logger.info(
-            f"Dashboard mes actual: {total} facturas "
-            f"(en_revision: {en_revision}, aprobadas: {aprobadas}, "
-            f"aprobadas_auto: {aprobadas_auto}, rechazadas: {rechazadas})"
+            f"Dashboard mes actual: {estadisticas.total} facturas "
+            f"(en_revision: {estadisticas.en_revision}, aprobadas: {estadisticas.aprobadas}, "
+            f"aprobadas_auto: {estadisticas.aprobadas_auto}, rechazadas: {estadisticas.rechazadas})"
         )
 
+        validador.aplicar(response)
         return DashboardMesActualResponse(
             mes=mes_actual,
             año=año_actual,
             nombre_mes=MESES_ESPAÑOL[mes_actual],
-            estadisticas=EstadisticasMesActual(
-                total=total,
-                en_revision=en_revision,
-                aprobadas=aprobadas,
-                aprobadas_auto=aprobadas_auto,
-                rechazadas=rechazadas
-            ),
-            facturas=[FacturaRead.model_validate(f) for f in facturas],
-            total_facturas=total
+            estadisticas=estadisticas,
+            facturas=facturas,
+            total_facturas=len(facturas),
+            next_cursor=next_cursor
         )
 
     except Exception as e:
@@ -205,6 +286,44 @@ def get_dashboard_mes_actual(
         )
 
 
+@router.get(
+    "/mes-actual/facturas",
+    response_model=CursorPaginatedResponse[FacturaRead],
+    summary="Facturas del mes actual (paginadas)",
+    description="Lista keyset de las facturas en estados activos del mes actual, más recientes primero."
+)
+def get_facturas_mes_actual(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor de la respuesta anterior"),
+    estado: Optional[EstadoFactura] = Query(None, description="Solo un estado activo"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_usuario)
+):
+    """Páginas siguientes del dashboard del mes actual."""
+    mes_actual, año_actual = get_mes_actual()
+
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_DASHBOARD, None, año_actual, mes_actual)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+
+    estados = [estado] if estado in ESTADOS_ACTIVOS else ESTADOS_ACTIVOS
+    facturas, next_cursor = pagina_facturas(
+        db, filtros_mes(año_actual, mes_actual, estados), limit, cursor, "dashboard_mes_actual"
+    )
+
+    validador.aplicar(response)
+    return CursorPaginatedResponse(
+        data=facturas,
+        cursor=CursorPaginationMetadata(
+            has_more=next_cursor is not None,
+            next_cursor=next_cursor,
+            count=len(facturas)
+        )
+    )
+
+
 @router.get(
     "/alerta-mes",
     response_model=AlertaMesResponse,
@@ -223,6 +342,8 @@ def get_dashboard_mes_actual(
     """
 )
 def get_alerta_mes(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_usuario)
 ):
@@ -238,6 +359,11 @@ def get_alerta_mes(
         mes_actual, año_actual = get_mes_actual()
         dias_restantes = get_dias_restantes_mes()
 
+        # dias_restantes cambia cada día: la fecha entra en el ETag
+        validador = ValidadorCondicional.desde_bd(db, request, FUENTES_DASHBOARD, None, date.today())
+        if validador.no_modificado():
+            return validador.respuesta_no_modificado()
+
         # Contar facturas pendientes del mes actual
         estados_pendientes = [
             EstadoFactura.en_revision.value,
@@ -246,8 +372,7 @@ def get_alerta_mes(
         ]
 
         facturas_pendientes = db.query(func.count(Factura.id)).filter(
-            extract('month', Factura.creado_en) == mes_actual,
-            extract('year', Factura.creado_en) == año_actual,
+            DateHelper.create_año_mes_filter(Factura.creado_en, año_actual, mes_actual),
             Factura.estado.in_(estados_pendientes)
         ).scalar()
 
@@ -273,6 +398,7 @@ def get_alerta_mes(
             f"pendientes={facturas_pendientes}, urgencia={nivel_urgencia}"
         )
 
+        validador.aplicar(response)
         return AlertaMesResponse(
             mostrar_alerta=mostrar_alerta,
             dias_restantes=dias_restantes,
@@ -310,8 +436,12 @@ def get_alerta_mes(
     """
 )
 def get_historico(
+    request: Request,
+    response: Response,
     mes: int = Query(..., ge=1, le=12, description="Mes a consultar (1-12)"),
     anio: int = Query(..., ge=2020, le=2100, description="Año a consultar"),
+    limit: int = Query(100, ge=1, le=500, description="Facturas en la primera página"),
+    completo: bool = Query(False, description="Compatibilidad: todas las facturas del período"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_usuario)
 ):
@@ -321,56 +451,61 @@ def get_historico(
     Progressive Disclosure:
     - Dashboard principal = Acción (mes actual, estados activos)
     - Histórico = Análisis (cualquier mes, todos los estados)
+
+    Igual que /mes-actual: estadísticas agregadas en SQL + primera página
+    (siguientes: /historico/facturas). completo=true conserva la respuesta
+    anterior con todas las facturas.
     """
     try:
         logger.info(f"Histórico solicitado: {MESES_ESPAÑOL[mes]} {anio} por usuario {current_user.usuario}")
 
-        # Query: mes específico + TODOS los estados
-        query = db.query(Factura).options(
-            joinedload(Factura.proveedor),
-            joinedload(Factura.usuario)
-        ).filter(
-            extract('month', Factura.creado_en) == mes,
-            extract('year', Factura.creado_en) == anio
-        ).order_by(
-            Factura.creado_en.desc()
-        )
-
-        facturas = query.all()
+        validador = ValidadorCondicional.desde_bd(db, request, FUENTES_DASHBOARD)
+        if validador.no_modificado():
+            return validador.respuesta_no_modificado()
 
-        # Calcular estadísticas completas
-        total = len(facturas)
-        validadas = sum(1 for f in facturas if f.estado == EstadoFactura.validada_contabilidad.value)
-        devueltas = sum(1 for f in facturas if f.estado == EstadoFactura.devuelta_contabilidad.value)
-        rechazadas = sum(1 for f in facturas if f.estado == EstadoFactura.rechazada.value)
+        # Query: mes específico + TODOS los estados
+        filtros = filtros_mes(anio, mes)
+        conteos = contar_por_estado(db, filtros)
+
+        if completo:
+            facturas = [
+                FacturaRead.model_validate(f)
+                for f in db.query(Factura).options(
+                    joinedload(Factura.proveedor),
+                    joinedload(Factura.usuario)
+                ).filter(*filtros).order_by(Factura.creado_en.desc()).all()
+            ]
+            next_cursor = None
+        else:
+            facturas, next_cursor = pagina_facturas(db, filtros, limit, None, f"dashboard_historico_{anio}_{mes}")
 
         # Pendientes = estados que aún requieren acción
-        estados_pendientes = [
-            EstadoFactura.en_revision.value,
-            EstadoFactura.aprobada.value,
-            EstadoFactura.aprobada_auto.value
-        ]
-        pendientes = sum(1 for f in facturas if f.estado in estados_pendientes)
+        estadisticas = EstadisticasHistorico(
+            total=conteos["total"],
+            validadas=conteos[EstadoFactura.validada_contabilidad.value],
+            devueltas=conteos[EstadoFactura.devuelta_contabilidad.value],
+            rechazadas=conteos[EstadoFactura.rechazada.value],
+            pendientes=sum(
+                conteos[estado.value]
+                for estado in (EstadoFactura.en_revision, EstadoFactura.aprobada, EstadoFactura.aprobada_auto)
+            )
+        )
 
         logger.info(
-            f"Histórico {MESES_ESPAÑOL[mes]} {anio}: {total} facturas "
-            f"(validadas: {validadas}, devueltas: {devueltas}, "
-            f"rechazadas: {rechazadas}, pendientes: {pendientes})"
+            f"Histórico {MESES_ESPAÑOL[mes]} {anio}: {estadisticas.total} facturas "
+            f"(validadas: {estadisticas.validadas}, devueltas: {estadisticas.devueltas}, "
+            f"rechazadas: {estadisticas.rechazadas}, pendientes: {estadisticas.pendientes})"
         )
 
+        validador.aplicar(response)
         return HistoricoResponse(
             mes=mes,
             año=anio,
             nombre_mes=MESES_ESPAÑOL[mes],
-            estadisticas=EstadisticasHistorico(
-                total=total,
-                validadas=validadas,
-                devueltas=devueltas,
-                rechazadas=rechazadas,
-                pendientes=pendientes
-            ),
-            facturas=[FacturaRead.model_validate(f) for f in facturas],
-            total_facturas=total
+            estadisticas=estadisticas,
+            facturas=facturas,
+            total_facturas=len(facturas),
+            next_cursor=next_cursor
         )
 
     except Exception as e:
@@ -379,3 +514,128 @@ def get_historico(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al obtener histórico: {str(e)}"
         )
+
+
+@router.get(
+    "/historico/facturas",
+    response_model=CursorPaginatedResponse[FacturaRead],
+    summary="Facturas de un período histórico (paginadas)",
+    description="Lista keyset de las facturas de un mes (todos los estados), más recientes primero."
+)
+def get_facturas_historico(
+    request: Request,
+    response: Response,
+    mes: int = Query(..., ge=1, le=12, description="Mes a consultar (1-12)"),
+    anio: int = Query(..., ge=2020, le=2100, description="Año a consultar"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor de la respuesta anterior"),
+    estado: Optional[EstadoFactura] = Query(None, description="Filtrar por estado"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_usuario)
+):
+    """Páginas siguientes de la vista histórica."""
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_DASHBOARD)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+
+    facturas, next_cursor = pagina_facturas(
+        db,
+        filtros_mes(anio, mes, [estado] if estado else None),
+        limit,
+        cursor,
+        f"dashboard_historico_{anio}_{mes}"
+    )
+
+    validador.aplicar(response)
+    return CursorPaginatedResponse(
+        data=facturas,
+        cursor=CursorPaginationMetadata(
+            has_more=next_cursor is not None,
+            next_cursor=next_cursor,
+            count=len(facturas)
+        )
+    )
+
+
+# Comentario SSE periódico para que proxies no corten la conexión ociosa
+SSE_KEEPALIVE_SEGUNDOS = 15
+
+
+@router.get(
+    "/eventos",
+    summary="Contadores en vivo (Server-Sent Events)",
+    description="""
+    Stream text/event-stream con los contadores de facturas por estado
+    (totales y mes actual por creado_en) del ámbito del usuario.
+
+    Eventos:
+    - snapshot: contadores completos (al conectar y tras cada re-sincronización)
+    - delta: solo las claves que cambiaron, con su incremento (+n / -n)
+
+    Reemplaza el polling de /workflow/dashboard y /dashboard/mes-actual para
+    los contadores. Requiere el header Authorization (usar fetch con
+    ReadableStream o un polyfill de EventSource que permita headers).
+    """
+)
+def stream_eventos_dashboard(
+    responsable_id: Optional[int] = Query(None, description="Solo admin: contadores de un responsable"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_usuario)
+):
+    """
+    Suscribe la conexión al ámbito del usuario.
+
+    Mismo alcance que /workflow/dashboard: un responsable solo ve sus
+    proveedores; un admin ve todo o, con responsable_id, el de ese
+    responsable; otros roles no pueden pedir responsable_id (403). Las
+    conexiones del mismo ámbito comparten un único cálculo.
+    """
+    from app.crud.factura import _obtener_proveedor_ids_de_responsable
+
+    rol = current_user.role.nombre if hasattr(current_user, 'role') else None
+    if rol == 'responsable':
+        responsable_id = current_user.id
+    elif responsable_id and rol != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Solo un admin puede ver los contadores de otro responsable"
+        )
+
+    if responsable_id:
+        ambito = ambito_de_responsable(responsable_id)
+        proveedor_ids = _obtener_proveedor_ids_de_responsable(db, responsable_id)
+    else:
+        ambito = AMBITO_GLOBAL
+        proveedor_ids = None
+
+    # La conexión puede durar horas: no retener una conexión del pool
+    db.close()
+
+    logger.info(f"Dashboard en vivo: {current_user.usuario} suscrito a {ambito}")
+
+    return StreamingResponse(
+        _stream_eventos(ambito, proveedor_ids, responsable_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _evento_sse(tipo: str, datos: dict) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(datos)}\n\n"
+
+
+async def _stream_eventos(ambito: str, proveedor_ids: Optional[List[int]], responsable_id: Optional[int]):
+    """Snapshot inicial y luego los eventos del ámbito hasta que el cliente se desconecta."""
+    difusor = get_difusor()
+    suscripcion = await difusor.suscribir(ambito, proveedor_ids, responsable_id)
+    try:
+        yield _evento_sse("snapshot", {"tipo": "snapshot", **suscripcion.snapshot})
+        while True:
+            try:
+                evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=SSE_KEEPALIVE_SEGUNDOS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _evento_sse(evento["tipo"], evento)
+    finally:
+        difusor.cancelar(suscripcion)
@@ -4,7 +4,7 @@ Endpoints REST para gestión de configuración de extracción de correos.
 
 CRUD completo para cuentas de correo, NITs y consulta de historial.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -30,11 +30,19 @@ from app.schemas.email_config import (
     ActualizarUltimaEjecucionResponse,
 )
 from app.crud import email_config as crud
+from app.models.email_config import CuentaCorreo, NitConfiguracion
 from app.utils.nit_validator import NitValidator
+from app.utils.conditional_get import ValidadorCondicional
 from datetime import datetime
 
 router = APIRouter(prefix="/email-config", tags=["Email Configuration"])
 
+# Watermark del GET condicional de la configuración del extractor (con borrados)
+FUENTES_CONFIGURACION_EXTRACTOR = (
+    (CuentaCorreo.actualizada_en, True),
+    (NitConfiguracion.actualizado_en, True),
+)
+
 
 # ==================== Endpoints Cuenta Correo ====================
 
@@ -447,6 +455,8 @@ def obtener_estadisticas_cuenta(
 
 @router.get("/configuracion-extractor-public", response_model=ConfiguracionExtractorResponse)
 def obtener_configuracion_para_extractor_public(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
 ):
     """
@@ -454,8 +464,13 @@ def obtener_configuracion_para_extractor_public(
 
     Obtiene configuración en formato JSON para el invoice_extractor.
 
-    Solo incluye cuentas activas con NITs activos.
+    Solo incluye cuentas activas con NITs activos. Soporta GET condicional
+    (If-None-Match): sin cambios en cuentas ni NITs responde 304.
     """
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_CONFIGURACION_EXTRACTOR)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+
     cuentas_activas = crud.get_cuentas_activas_para_extraccion(db)
 
     users = []
@@ -479,6 +494,7 @@ def obtener_configuracion_para_extractor_public(
             )
             total_nits += len(nits_activos)
 
+    validador.aplicar(response)
     return ConfiguracionExtractorResponse(
         users=users,
         total_cuentas=len(users),
@@ -543,6 +559,8 @@ def actualizar_ultimo_procesamiento(
 
 @router.get("/configuracion-extractor", response_model=ConfiguracionExtractorResponse)
 def obtener_configuracion_para_extractor(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user = Depends(require_role("admin")),
 ):
@@ -565,8 +583,13 @@ def obtener_configuracion_para_extractor(
     }
     ```
 
-    Solo incluye cuentas activas con NITs activos.
+    Solo incluye cuentas activas con NITs activos. Soporta GET condicional
+    (If-None-Match): sin cambios en cuentas ni NITs responde 304.
     """
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_CONFIGURACION_EXTRACTOR)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+
     cuentas_activas = crud.get_cuentas_activas_para_extraccion(db)
 
     users = []
@@ -590,6 +613,7 @@ def obtener_configuracion_para_extractor(
             )
             total_nits += len(nits_activos)
 
+    validador.aplicar(response)
     return ConfiguracionExtractorResponse(
         users=users,
         total_cuentas=len(users),
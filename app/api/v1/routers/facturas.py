@@ -1,11 +1,11 @@
 # app/api/v1/routers/facturas.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
 
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.core.config import settings
 from app.schemas.factura import FacturaCreate, FacturaRead, AprobacionRequest, RechazoRequest
 from fastapi.responses import Response
@@ -21,7 +21,9 @@ from app.core.security import get_current_usuario, require_role
 from app.crud.factura import (
     list_facturas,
     list_facturas_cursor,
+    list_facturas_keyset,
     list_all_facturas_for_dashboard,
+    iter_all_facturas_for_dashboard,
     count_facturas,
     get_factura,
     find_by_cufe,
@@ -33,9 +35,11 @@ from app.crud.factura import (
     get_estadisticas_periodo,
     get_años_disponibles,
     get_jerarquia_facturas,
+    FUENTES_FACTURAS,
 )
 from app.utils.logger import logger
-from app.utils.cursor_pagination import decode_cursor, build_cursor_from_factura
+from app.utils.cursor_pagination import decode_cursor, build_cursor_from_factura, CursorInvalidoError
+from app.utils.conditional_get import ValidadorCondicional
 import math
 
 
@@ -53,6 +57,8 @@ router = APIRouter(tags=["Facturas"])
     description="Endpoint optimizado para grandes volúmenes (10k+ facturas). Usa cursor-based pagination para performance constante O(1)."
 )
 def list_with_cursor(
+    request: Request,
+    response: Response,
     limit: int = 500,
     cursor: Optional[str] = None,
     nit: Optional[str] = None,
@@ -133,6 +139,11 @@ def list_with_cursor(
     else:
         logger.info(f"Admin {current_user.usuario} usando cursor pagination (todas)")
 
+    # GET condicional: 304 sin ejecutar la consulta ni serializar
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_FACTURAS, responsable_id)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+
     # Decodificar cursor si existe
     cursor_timestamp = None
     cursor_id = None
@@ -180,6 +191,7 @@ def list_with_cursor(
         count=len(facturas)
     )
 
+    validador.aplicar(response)
     return CursorPaginatedResponse(
         data=facturas,
         cursor=cursor_metadata
@@ -197,7 +209,10 @@ def list_with_cursor(
     description="Retorna todas las facturas sin límites de paginación. Exclusivo para dashboards administrativos que requieren vista completa del sistema."
 )
 def list_all_for_dashboard(
+    request: Request,
+    response: Response,
     solo_asignadas: bool = False,
+    formato: str = Query("json", pattern="^(json|ndjson)$", description="json (lista completa) o ndjson (streaming, una factura por línea)"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
@@ -224,6 +239,8 @@ def list_all_for_dashboard(
     -  Sin OFFSET (evita deep pagination problem)
     -  Lazy loading de relaciones para minimizar memoria
     -  Para datasets >50k facturas, considerar usar `/facturas/cursor` con scroll infinito
+    -  `formato=ndjson`: streaming en lotes keyset, una factura JSON por línea;
+       el primer byte llega enseguida y la memoria no crece con el dataset
 
     **Orden de resultados:**
     Cronológico descendente: Año ↓ → Mes ↓ → Fecha ↓ (más recientes primero)
@@ -272,6 +289,17 @@ def list_all_for_dashboard(
             f"[DASHBOARD COMPLETO] Admin {current_user.usuario} cargando TODAS las facturas del sistema"
         )
 
+    if formato == "ndjson":
+        return StreamingResponse(
+            _stream_facturas_ndjson(responsable_id, current_user.usuario),
+            media_type="application/x-ndjson"
+        )
+
+    # GET condicional: 304 sin ejecutar la consulta ni serializar
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_FACTURAS, responsable_id)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+
     # Obtener TODAS las facturas (sin límites)
     facturas = list_all_facturas_for_dashboard(
         db=db,
@@ -282,9 +310,28 @@ def list_all_for_dashboard(
         f"[DASHBOARD COMPLETO] Retornando {len(facturas)} facturas a {current_user.usuario}"
     )
 
+    validador.aplicar(response)
     return facturas
 
 
+def _stream_facturas_ndjson(responsable_id: Optional[int], usuario: str):
+    """
+    Serializa facturas de a una mientras se leen por lotes.
+
+    Usa su propia sesión: el generador sigue corriendo después de que el
+    endpoint retorna, cuando la sesión de get_db ya puede estar cerrada.
+    """
+    db = SessionLocal()
+    total = 0
+    try:
+        for factura in iter_all_facturas_for_dashboard(db, responsable_id=responsable_id):
+            yield FacturaRead.model_validate(factura).model_dump_json() + "\n"
+            total += 1
+    finally:
+        db.close()
+        logger.info(f"[DASHBOARD COMPLETO] Stream NDJSON: {total} facturas a {usuario}")
+
+
 # -----------------------------------------------------
 # Listar todas las facturas (con paginación empresarial)
 # -----------------------------------------------------
@@ -295,11 +342,15 @@ def list_all_for_dashboard(
     description="Obtiene facturas con metadata de paginación empresarial. Admin puede ver todas o solo asignadas, Usuario solo sus proveedores."
 )
 def list_all(
+    request: Request,
+    response: Response,
     page: int = 1,
     per_page: int = 500,
     nit: Optional[str] = None,
     numero_factura: Optional[str] = None,
     solo_asignadas: bool = False,
+    cursor: Optional[str] = Query(None, description="next_cursor de la respuesta anterior (keyset, reemplaza a page)"),
+    conteo: str = Query("exacto", pattern="^(exacto|estimado)$", description="exacto (COUNT) o estimado (optimizador, sin COUNT)"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
@@ -311,6 +362,9 @@ def list_all(
     **Parámetros de paginación:**
     - page: Página actual (base 1, default: 1)
     - per_page: Registros por página (default: 500, máximo: 2000)
+    - cursor: `pagination.next_cursor` de la respuesta anterior. Pagina por
+      keyset (sin OFFSET, tiempo constante en páginas profundas); `page` se ignora
+    - conteo: `estimado` evita el COUNT(*) por página (total aproximado)
 
     **Respuesta:**
     ```json
@@ -355,26 +409,52 @@ def list_all(
     else:
         logger.info(f"Admin {current_user.usuario} viendo todas las facturas")
 
+    # GET condicional: 304 sin ejecutar la consulta ni serializar
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_FACTURAS, responsable_id)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+
     # Obtener total de facturas
     total = count_facturas(
         db,
         nit=nit,
         numero_factura=numero_factura,
-        responsable_id=responsable_id
+        responsable_id=responsable_id,
+        modo=conteo
     )
 
-    # Calcular skip
-    skip = (page - 1) * per_page
-
-    # Obtener facturas paginadas
-    facturas = list_facturas(
-        db,
-        skip=skip,
-        limit=per_page,
-        nit=nit,
-        numero_factura=numero_factura,
-        responsable_id=responsable_id
-    )
+    if cursor or page == 1:
+        # Keyset: primera página o navegación con cursor
+        try:
+            facturas, next_cursor = list_facturas_keyset(
+                db,
+                limit=per_page,
+                cursor=cursor,
+                nit=nit,
+                numero_factura=numero_factura,
+                responsable_id=responsable_id
+            )
+        except CursorInvalidoError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido"
+            )
+        has_next = next_cursor is not None
+    else:
+        # Calcular skip
+        skip = (page - 1) * per_page
+
+        # Obtener facturas paginadas
+        facturas = list_facturas(
+            db,
+            skip=skip,
+            limit=per_page,
+            nit=nit,
+            numero_factura=numero_factura,
+            responsable_id=responsable_id
+        )
+        has_next = len(facturas) == per_page
+        next_cursor = build_cursor_from_factura(facturas[-1]) if has_next else None
 
     # Calcular metadata de paginación
     total_pages = math.ceil(total / per_page) if total > 0 else 1
@@ -384,10 +464,13 @@ def list_all(
         page=page,
         per_page=per_page,
         total_pages=total_pages,
-        has_next=page < total_pages,
-        has_prev=page > 1
+        has_next=has_next,
+        has_prev=bool(cursor) or page > 1,
+        next_cursor=next_cursor,
+        total_estimado=conteo == "estimado"
     )
 
+    validador.aplicar(response)
     return PaginatedResponse(
         data=facturas,
         pagination=pagination
@@ -838,6 +921,7 @@ def get_resumen_por_mes(
     año: Optional[int] = None,
     proveedor_id: Optional[int] = None,
     estado: Optional[str] = None,
+    en_vivo: bool = Query(False, description="Calcular sobre facturas en vez del rollup mensual (verificación)"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
@@ -865,7 +949,8 @@ def get_resumen_por_mes(
         db=db,
         año=año,
         proveedor_id=proveedor_id,
-        estado=estado
+        estado=estado,
+        en_vivo=en_vivo
     )
 
 
@@ -881,6 +966,7 @@ def get_resumen_por_mes(
 def get_resumen_detallado_por_mes(
     año: Optional[int] = None,
     proveedor_id: Optional[int] = None,
+    en_vivo: bool = Query(False, description="Calcular sobre facturas en vez del rollup mensual (verificación)"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
@@ -910,7 +996,8 @@ def get_resumen_detallado_por_mes(
     return get_facturas_resumen_por_mes_detallado(
         db=db,
         año=año,
-        proveedor_id=proveedor_id
+        proveedor_id=proveedor_id,
+        en_vivo=en_vivo
     )
 
 
@@ -1017,6 +1104,7 @@ def get_facturas_periodo(
 def get_stats_periodo(
     periodo: str,
     proveedor_id: Optional[int] = None,
+    en_vivo: bool = Query(False, description="Calcular sobre facturas en vez del rollup mensual (verificación)"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
@@ -1050,7 +1138,8 @@ def get_stats_periodo(
     return get_estadisticas_periodo(
         db=db,
         periodo=periodo,
-        proveedor_id=proveedor_id
+        proveedor_id=proveedor_id,
+        en_vivo=en_vivo
     )
 
 
@@ -1067,6 +1156,7 @@ def count_periodo(
     periodo: str,
     proveedor_id: Optional[int] = None,
     estado: Optional[str] = None,
+    en_vivo: bool = Query(False, description="Calcular sobre facturas en vez del rollup mensual (verificación)"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
@@ -1084,7 +1174,8 @@ def count_periodo(
         db=db,
         periodo=periodo,
         proveedor_id=proveedor_id,
-        estado=estado
+        estado=estado,
+        en_vivo=en_vivo
     )
 
     return {"periodo": periodo, "total": count}
@@ -1100,6 +1191,7 @@ def count_periodo(
     description="Retorna lista de años que tienen facturas registradas"
 )
 def get_años(
+    en_vivo: bool = Query(False, description="Calcular sobre facturas en vez del rollup mensual (verificación)"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
@@ -1109,7 +1201,7 @@ def get_años(
 
     Ejemplo: [2025, 2024, 2023]
     """
-    años = get_años_disponibles(db)
+    años = get_años_disponibles(db, en_vivo=en_vivo)
     return {"años": años}
 
 
@@ -1169,7 +1261,8 @@ def get_jerarquia(
 
     **Orden:** Año DESC → Mes DESC → Fecha DESC (más recientes primero)
 
-    **Performance:** Usa índice `idx_facturas_orden_cronologico` para queries ultra-rápidas
+    **Performance:** Totales con GROUP BY y top `limit_por_mes` por mes con ROW_NUMBER():
+    la memoria no crece con el tamaño de la tabla
     """
     return get_jerarquia_facturas(
         db=db,
@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from app.db.session import get_db
 from app.schemas.proveedor import ProveedorBase, ProveedorRead
 from app.schemas.common import ErrorResponse
-from app.crud.proveedor import create_proveedor, list_proveedores, get_proveedor, update_proveedor, delete_proveedor
+from app.crud.proveedor import (
+    create_proveedor, list_proveedores, list_proveedores_keyset, get_proveedor, update_proveedor, delete_proveedor
+)
 from app.core.security import get_current_usuario, require_role
 from app.utils.logger import logger
+from app.utils.cursor_pagination import CursorInvalidoError
 
 router = APIRouter(tags=["Proveedores"])
 
@@ -16,15 +19,28 @@ router = APIRouter(tags=["Proveedores"])
     "/",
     response_model=List[ProveedorRead],
     summary="Listar proveedores",
-    description="Obtiene una lista paginada de proveedores."
+    description="Obtiene una lista paginada de proveedores. Sin skip (o con cursor) pagina por keyset; "
+                "el cursor de la siguiente página viene en el header X-Next-Cursor."
 )
 def list_all(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user=Depends(get_current_usuario),
 ):
-    return list_proveedores(db, skip=skip, limit=limit)
+    if skip and not cursor:
+        return list_proveedores(db, skip=skip, limit=limit)
+
+    try:
+        proveedores, next_cursor = list_proveedores_keyset(db, limit=limit, cursor=cursor)
+    except CursorInvalidoError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return proveedores
 
 
 @router.post(
@@ -10,21 +10,25 @@ Endpoints para:
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from app.db.session import get_db
+from app.core.config import settings
 from app.core.security import get_current_usuario
 from app.services.workflow_automatico import WorkflowAutomaticoService
 from app.services.notificaciones import NotificacionService
+from app.services import cola_trabajos, dashboard_workflow, visibilidad_facturas
+from app.utils.cursor_pagination import CursorInvalidoError, aplicar_keyset, paginar_keyset
+from app.utils.conditional_get import ValidadorCondicional
 from app.models.workflow_aprobacion import (
     WorkflowAprobacionFactura,
     AsignacionNitResponsable,
     NotificacionWorkflow,
     EstadoFacturaWorkflow
 )
-from app.models.factura import Factura, EstadoFactura
 from app.schemas.factura import AprobacionRequest, RechazoRequest
 
 
@@ -37,6 +41,11 @@ class ProcesarFacturaRequest(BaseModel):
     factura_id: int
 
 
+class CompararItemsLoteRequest(BaseModel):
+    factura_ids: List[int] = Field(..., min_length=1, max_length=200, description="Facturas a comparar")
+    meses_historico: int = Field(12, ge=1, description="Meses de historial a analizar")
+
+
 class AsignacionNitRequest(BaseModel):
     nit: str
     nombre_proveedor: Optional[str] = None
@@ -361,17 +370,25 @@ def consultar_workflow(
     }
 
 
+ORDEN_WORKFLOWS = ((WorkflowAprobacionFactura.creado_en, True), (WorkflowAprobacionFactura.id, True))
+
+
 @router.get("/listar")
 def listar_workflows(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     estado: Optional[str] = None,
     responsable_id: Optional[int] = None,
     nit_proveedor: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Lista workflows con filtros opcionales.
+
+    Sin skip (o con cursor) pagina por keyset: el cursor de la siguiente
+    página viene en el header X-Next-Cursor.
     """
     query = db.query(WorkflowAprobacionFactura)
 
@@ -391,9 +408,18 @@ def listar_workflows(
     if nit_proveedor:
         query = query.filter(WorkflowAprobacionFactura.nit_proveedor == nit_proveedor)
 
-    workflows = query.order_by(
-        WorkflowAprobacionFactura.creado_en.desc()
-    ).offset(skip).limit(limit).all()
+    if cursor or not skip:
+        try:
+            workflows, next_cursor = paginar_keyset(query, ORDEN_WORKFLOWS, limit, cursor, ambito="workflows")
+        except CursorInvalidoError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cursor inválido"
+            )
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+    else:
+        workflows = aplicar_keyset(query, ORDEN_WORKFLOWS, None, "workflows").offset(skip).limit(limit).all()
 
     return [
         {
@@ -418,6 +444,8 @@ def listar_workflows(
 
 @router.get("/dashboard")
 def obtener_dashboard_workflow(
+    request: Request,
+    response: Response,
     responsable_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_usuario)
@@ -437,111 +465,28 @@ def obtener_dashboard_workflow(
     - Si es ADMIN sin responsable_id: Muestra TODAS las facturas
     - Si es ADMIN con responsable_id: Filtra por ese responsable
     """
-    from sqlalchemy import func
-    from app.crud.factura import _obtener_proveedor_ids_de_responsable
+    from app.crud.factura import FUENTES_FACTURAS
 
     # ENTERPRISE: Detectar automáticamente si es responsable
     # Si el usuario tiene rol 'responsable', filtrar automáticamente por sus NITs
     if hasattr(current_user, 'role') and current_user.role.nombre == 'responsable':
         responsable_id = current_user.id
 
-    # ENTERPRISE: Usar tabla Factura en lugar de WorkflowAprobacionFactura
-    # para soporte de múltiples usuarios por NIT
-    query = db.query(Factura)
-
-    if responsable_id:
-        # Obtener proveedores asignados al usuario (con normalización de NITs)
-        proveedor_ids = _obtener_proveedor_ids_de_responsable(db, responsable_id)
-
-        if not proveedor_ids:
-            # Sin proveedores asignados, retornar estadísticas vacías
-            return {
-                "total_pendientes": 0,
-                "total_en_revision": 0,
-                "total_aprobadas": 0,
-                "total_aprobadas_auto": 0,
-                "total_rechazadas": 0,
-                "pendientes_antiguas": 0,
-                "tiempo_promedio_aprobacion_horas": 0,
-                "tasa_aprobacion_automatica": 0,
-                "facturas_por_estado": {},
-                "total_aprobadas_automaticamente": 0,
-                "total_aprobadas_manualmente": 0,
-                "total_pendientes_revision": 0,
-                "pendientes_hace_mas_3_dias": 0,
-                "tiempo_promedio_aprobacion_segundos": 0,
-            }
-
-        # Filtrar por proveedores asignados
-        query = query.filter(Factura.proveedor_id.in_(proveedor_ids))
+    # GET condicional; "pendientes hace más de 3 días" cambia con la fecha
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES_FACTURAS, responsable_id, date.today())
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+    validador.aplicar(response)
 
-    # Contar por estado (usando tabla Factura)
-    facturas_por_estado = {}
-    for estado in EstadoFactura:
-        count = query.filter(Factura.estado == estado).count()
-        facturas_por_estado[estado.value] = count
-
-    # Estadísticas de aprobación
-    total_aprobadas_auto = query.filter(
-        Factura.estado == EstadoFactura.aprobada_auto
-    ).count()
-
-    total_aprobadas_manual = query.filter(
-        Factura.estado == EstadoFactura.aprobada
-    ).count()
-
-    total_rechazadas = query.filter(
-        Factura.estado == EstadoFactura.rechazada
-    ).count()
-
-    # NOTA: "pendiente" fue eliminado en refactorización reciente
-    total_pendientes = 0
-
-    total_en_revision = query.filter(
-        Factura.estado == EstadoFactura.en_revision
-    ).count()
-
-    # Total de aprobadas (manual + auto)
-    total_aprobadas = total_aprobadas_auto + total_aprobadas_manual
-
-    # Tiempo promedio de aprobación (no disponible en tabla Factura)
-    # Mantener en 0 por ahora
-    tiempo_promedio = 0
-
-    # Facturas en revisión hace más de 3 días
-    from datetime import datetime, timedelta
-    fecha_limite = datetime.now() - timedelta(days=3)
-
-    pendientes_antiguas = query.filter(
-        Factura.estado == EstadoFactura.en_revision,
-        Factura.fecha_emision <= fecha_limite
-    ).count()
-
-    # Calcular tasa de aprobación automática
-    total_facturas = total_aprobadas + total_rechazadas + total_en_revision
-    tasa_aprobacion_automatica = (
-        (total_aprobadas_auto / total_facturas * 100) if total_facturas > 0 else 0
-    )
+    # Contadores precalculados por responsable (lectura por PK); la primera
+    # lectura del día puede materializar la fila o renovar las antiguas
+    if settings.workflow_dashboard_precalculado:
+        fila = dashboard_workflow.obtener(db, responsable_id)
+        db.commit()
+    else:
+        fila = dashboard_workflow.calcular_en_vivo(db, responsable_id)
 
-    return {
-        # Campos compatibles con el frontend
-        "total_pendientes": total_pendientes,
-        "total_en_revision": total_en_revision,
-        "total_aprobadas": total_aprobadas,
-        "total_aprobadas_auto": total_aprobadas_auto,
-        "total_rechazadas": total_rechazadas,
-        "pendientes_antiguas": pendientes_antiguas,
-        "tiempo_promedio_aprobacion_horas": round(tiempo_promedio / 3600, 2) if tiempo_promedio else 0,
-        "tasa_aprobacion_automatica": round(tasa_aprobacion_automatica, 2),
-
-        # Campos adicionales para compatibilidad legacy
-        "facturas_por_estado": facturas_por_estado,
-        "total_aprobadas_automaticamente": total_aprobadas_auto,
-        "total_aprobadas_manualmente": total_aprobadas_manual,
-        "total_pendientes_revision": total_pendientes,
-        "pendientes_hace_mas_3_dias": pendientes_antiguas,
-        "tiempo_promedio_aprobacion_segundos": int(tiempo_promedio),
-    }
+    return dashboard_workflow.a_respuesta(fila)
 
 
 # ==================== ASIGNACIONES NIT-RESPONSABLE ====================
@@ -585,6 +530,7 @@ def crear_asignacion_nit(
     )
 
     db.add(nueva_asignacion)
+    visibilidad_facturas.sincronizar_nit(db, nueva_asignacion.nit, nueva_asignacion.responsable_id)
     db.commit()
     db.refresh(nueva_asignacion)
 
@@ -946,6 +892,8 @@ def analizar_patron_proveedor(
 @router.post("/regenerar-patrones")
 def regenerar_todos_patrones(
     limit: Optional[int] = Query(None, description="Límite de combinaciones a procesar"),
+    incremental: bool = Query(False, description="Solo proveedores con facturas modificadas desde el último análisis"),
+    en_segundo_plano: bool = Query(False, description="Encolar como trabajo y responder con su id"),
     db: Session = Depends(get_db)
 ):
     """
@@ -955,13 +903,23 @@ def regenerar_todos_patrones(
     - Inicialización del sistema
     - Recalibración después de cambios en algoritmo
     - Actualización masiva de patrones
+
+    Con en_segundo_plano=true se encola en la cola de mantenimiento (una
+    regeneración a la vez) y la respuesta trae el trabajo_id.
     """
+    if en_segundo_plano:
+        trabajo = cola_trabajos.encolar(
+            db, "regenerar_patrones", {"limit": limit, "incremental": incremental},
+            cola=cola_trabajos.COLA_MANTENIMIENTO
+        )
+        return {"exito": True, "en_segundo_plano": True, "trabajo_id": trabajo.id}
+
     from app.services.analisis_patrones import AnalizadorPatrones
 
     analizador = AnalizadorPatrones(db)
 
     try:
-        analizador.regenerar_todos_patrones(limit=limit)
+        resultado = analizador.regenerar_todos_patrones(limit=limit, incremental=incremental)
 
         # Contar patrones generados
         from app.models.patrones_facturas import PatronesFacturas, TipoPatron
@@ -981,6 +939,9 @@ def regenerar_todos_patrones(
             "exito": True,
             "mensaje": "Patrones regenerados exitosamente",
             "total_patrones": total,
+            "facturas_leidas": resultado["facturas_leidas"],
+            "patrones_nuevos": resultado["nuevos"],
+            "patrones_actualizados": resultado["actualizados"],
             "distribucion": {
                 "tipo_a_fijo": tipo_a,
                 "tipo_b_fluctuante": tipo_b,
@@ -996,6 +957,45 @@ def regenerar_todos_patrones(
 
 # ==================== ENDPOINT ENTERPRISE: COMPARACIÓN DE ITEMS ====================
 
+# Declarado antes de /comparar-factura-items/{factura_id} para que "batch" no se tome como id
+@router.post("/comparar-factura-items/batch")
+def comparar_facturas_items_lote(
+    request: CompararItemsLoteRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Comparación item por item de varias facturas en una llamada.
+
+    Mismo análisis que /comparar-factura-items/{factura_id}, con una consulta
+    de historial por proveedor para todas las facturas del lote.
+    """
+    from app.services.comparador_items import ComparadorItemsService
+    from datetime import datetime
+
+    try:
+        resultados = ComparadorItemsService(db).comparar_facturas_vs_historial(
+            factura_ids=request.factura_ids,
+            meses_historico=request.meses_historico
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error en análisis de items: {str(e)}"
+        )
+
+    return {
+        "exito": True,
+        "total": len(resultados),
+        "analisis": [
+            {"factura_id": factura_id, "analisis": resultados[factura_id]}
+            for factura_id in dict.fromkeys(request.factura_ids)
+            if factura_id in resultados
+        ],
+        "no_encontradas": [factura_id for factura_id in dict.fromkeys(request.factura_ids) if factura_id not in resultados],
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @router.post("/comparar-factura-items/{factura_id}")
 def comparar_factura_items(
     factura_id: int,
@@ -38,6 +38,113 @@ class Settings(BaseSettings):
     # --- Base de datos ---
     database_url: str = Field(..., env="DATABASE_URL")
 
+    # --- Pool de conexiones (engine único compartido por toda la app) ---
+    # Dimensionar con los datos de GET /api/v1/admin/db-pool (checked_out, overflow, espera)
+    db_pool_size: int = Field(10, env="DB_POOL_SIZE")
+    db_max_overflow: int = Field(20, env="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(30, env="DB_POOL_TIMEOUT")  # segundos esperando conexión libre
+    db_pool_recycle: int = Field(1800, env="DB_POOL_RECYCLE")  # < wait_timeout de MySQL
+    db_pool_pre_ping: bool = Field(True, env="DB_POOL_PRE_PING")
+    db_pool_slow_checkout_ms: int = Field(
+        200,
+        env="DB_POOL_SLOW_CHECKOUT_MS",
+        description="Loguear warning cuando obtener una conexión del pool tarda más que esto"
+    )
+
+    # --- Instrumentación SQL por request (X-DB-Queries / Server-Timing) ---
+    sql_instrumentation_enabled: bool = Field(True, env="SQL_INSTRUMENTATION_ENABLED")
+    sql_slow_query_ms: int = Field(500, env="SQL_SLOW_QUERY_MS")
+    sql_n_plus_one_threshold: int = Field(
+        10,
+        env="SQL_N_PLUS_ONE_THRESHOLD",
+        description="Veces que una misma sentencia puede repetirse en un request antes de reportar N+1"
+    )
+
+    # --- Reportes por período ---
+    facturas_resumen_mensual_enabled: bool = Field(
+        True,
+        env="FACTURAS_RESUMEN_MENSUAL_ENABLED",
+        description="Leer /facturas/periodos/* desde facturas_resumen_mensual (False = siempre en vivo)"
+    )
+
+    # --- Dashboards (métricas cacheadas y contadores en vivo) ---
+    automation_metricas_cache_ttl: int = Field(
+        15,
+        env="AUTOMATION_METRICAS_CACHE_TTL",
+        description="Segundos que se cachean las métricas de /automation/dashboard/metricas"
+    )
+    dashboard_eventos_resync_segundos: int = Field(
+        60,
+        env="DASHBOARD_EVENTOS_RESYNC_SEGUNDOS",
+        description="Cada cuánto /dashboard/eventos re-sincroniza los contadores con la BD"
+    )
+    workflow_dashboard_precalculado: bool = Field(
+        True,
+        env="WORKFLOW_DASHBOARD_PRECALCULADO",
+        description="Leer /workflow/dashboard desde dashboard_workflow_responsable (False = siempre en vivo)"
+    )
+
+    # --- Automatización ---
+    automation_procesamiento_en_lote: bool = Field(
+        True,
+        env="AUTOMATION_PROCESAMIENTO_EN_LOTE",
+        description="Precargar el historial de todas las facturas pendientes y confirmar una vez por ciclo (False = factura por factura)"
+    )
+    automation_workers: int = Field(
+        1,
+        env="AUTOMATION_WORKERS",
+        description="Workers en paralelo por ciclo, cada proveedor en un solo worker (1 = secuencial)"
+    )
+    automation_limite_facturas_ciclo: int = Field(
+        100,
+        env="AUTOMATION_LIMITE_FACTURAS_CICLO",
+        description="Máximo de facturas pendientes que procesa cada ciclo programado"
+    )
+    automation_cola_workers: int = Field(
+        2,
+        env="AUTOMATION_COLA_WORKERS",
+        description="Hilos que procesan la cola de facturas recién ingresadas (cada proveedor siempre en el mismo)"
+    )
+    automation_cola_capacidad: int = Field(
+        1000,
+        env="AUTOMATION_COLA_CAPACIDAD",
+        description="Facturas en espera en la cola; al llenarse quedan para el barrido periódico"
+    )
+    automation_barrido_minutos: int = Field(
+        360,
+        env="AUTOMATION_BARRIDO_MINUTOS",
+        description="Frecuencia del barrido de respaldo de facturas con automatización pendiente"
+    )
+
+    # --- Tareas periódicas (elección de líder entre workers) ---
+    lider_eleccion_habilitada: bool = Field(
+        True,
+        env="LIDER_ELECCION_HABILITADA",
+        description="Con varios workers, solo el titular del lease de cada tarea periódica la ejecuta (False = todos)"
+    )
+    lider_lease_segundos: int = Field(
+        60,
+        env="LIDER_LEASE_SEGUNDOS",
+        description="Vigencia del lease; si el líder muere, otro worker lo toma a lo sumo tras este tiempo"
+    )
+
+    # --- Cola de trabajos (tabla trabajos) ---
+    trabajos_en_proceso: bool = Field(
+        True,
+        env="TRABAJOS_EN_PROCESO",
+        description="Ejecutar los workers de la cola dentro de la API (False = solo python -m app.tasks.trabajos)"
+    )
+    trabajos_hilos: int = Field(
+        2,
+        env="TRABAJOS_HILOS",
+        description="Hilos consumidores por proceso; la concurrencia de cada cola la limita COLAS"
+    )
+    trabajos_espera_segundos: float = Field(
+        2.0,
+        env="TRABAJOS_ESPERA_SEGUNDOS",
+        description="Espera entre consultas cuando no hay trabajos disponibles"
+    )
+
     # --- CORS ---
     backend_cors_origins: List[str] | str = Field("", env="BACKEND_CORS_ORIGINS")
 
@@ -2,10 +2,12 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from sqlalchemy.orm import Session
 import asyncio
+from datetime import timedelta
 from threading import Thread
 
 from app.db.base import Base
-from app.db.session import engine, SessionLocal
+from app.db.session import engine
+from app.db.pool_monitor import log_pool_status
 from app.db.init_db import create_default_roles_and_admin
 from app.utils.logger import logger
 from app.core.config import settings
@@ -18,71 +20,32 @@ _scheduler_running = False
 
 def run_automation_task():
     """
-    Ejecuta la automatización de facturas en background.
-    Se ejecuta periódicamente según configuración.
+    Barrido de respaldo de la automatización de facturas.
 
-    Flujo:
-    1. Procesa facturas SIN workflows (crea workflows automáticamente)
-    2. Luego procesa facturas con workflows (toma decisiones de aprobación)
+    Las facturas nuevas se automatizan al ingresar (cola_automatizacion);
+    este barrido procesa las que conservan el marcador automatizacion_pendiente
+    (cola llena, otros procesos, reinicios): workflow si falta y decisión
+    automática, en paralelo por proveedor.
     """
     try:
-        from app.services.automation.automation_service import AutomationService
-        from app.services.workflow_automatico import WorkflowAutomaticoService
-        from sqlalchemy import and_
-        from app.models.factura import Factura
-        from app.models.workflow_aprobacion import WorkflowAprobacionFactura
+        from app.services.automation.cola_automatizacion import barrer_pendientes
+        from app.services.liderazgo import TAREA_AUTOMATIZACION, es_lider
 
-        db = SessionLocal()
-        try:
-            logger.info(" Iniciando automatización programada de facturas...")
-
-            # PASO 1: Crear workflows para facturas que no los tienen
-            logger.info(" [PASO 1] Creando workflows para facturas nuevas sin procesar...")
-            workflow_service = WorkflowAutomaticoService(db)
+        # Con varios workers solo el líder barre (los demás solo atienden su cola)
+        if not es_lider(TAREA_AUTOMATIZACION):
+            logger.debug(" Barrido de automatización omitido: este worker no es líder")
+            return
 
-            # Obtener facturas SIN workflows
-            facturas_sin_workflow = db.query(Factura).filter(
-                ~Factura.id.in_(
-                    db.query(WorkflowAprobacionFactura.factura_id)
-                )
-            ).limit(100).all()
-
-            workflows_creados = 0
-            for factura in facturas_sin_workflow:
-                try:
-                    resultado = workflow_service.procesar_factura_nueva(factura.id)
-                    if resultado.get('exito'):
-                        workflows_creados += 1
-                        logger.info(f"   Workflow creado para factura {factura.id}")
-                    else:
-                        logger.warning(f"  ⚠️  Workflow no se creó para factura {factura.id}: {resultado.get('error')}")
-                except Exception as e:
-                    logger.error(f"  ❌ Error creando workflow para factura {factura.id}: {str(e)}")
-
-            if workflows_creados > 0:
-                logger.info(f" [PASO 1]  {workflows_creados} workflows creados")
-                db.commit()
-
-            # PASO 2: Procesar facturas pendientes con automatización
-            logger.info(" [PASO 2] Procesando automatización de facturas pendientes...")
-            automation = AutomationService()
-            resultado = automation.procesar_facturas_pendientes(
-                db=db,
-                limite_facturas=100,  # Procesar hasta 100 facturas por ciclo
-                modo_debug=False
-            )
-
-            logger.info(
-                f" Automatización completada: "
-                f"{resultado['aprobadas_automaticamente']} aprobadas, "
-                f"{resultado['enviadas_revision']} a revisión, "
-                f"{resultado['errores']} errores"
-            )
+        logger.info(" Iniciando barrido de automatización de facturas...")
+        resultado = barrer_pendientes(settings.automation_limite_facturas_ciclo)
 
-        except Exception as e:
-            logger.error(f" Error en automatización programada: {str(e)}", exc_info=True)
-        finally:
-            db.close()
+        logger.info(
+            f" Automatización completada: "
+            f"{resultado['aprobadas_automaticamente']} aprobadas, "
+            f"{resultado['enviadas_revision']} a revisión, "
+            f"{resultado['errores']} errores "
+            f"({resultado['resumen_general']['facturas_por_segundo']} facturas/s)"
+        )
 
     except Exception as e:
         logger.error(f" Error crítico en task de automatización: {str(e)}", exc_info=True)
@@ -97,15 +60,15 @@ def schedule_automation_tasks():
 
     global _scheduler_running
 
-    # Configurar horarios de ejecución automática
-    # Ejecutar cada hora durante horario laboral
-    schedule.every().hour.at(":00").do(run_automation_task)
+    # Red de seguridad de la cola de automatización (las facturas nuevas se
+    # procesan al ingresar, no en este ciclo)
+    schedule.every(settings.automation_barrido_minutos).minutes.do(run_automation_task)
 
     # Ejecución especial: Lunes a las 8:00 AM (inicio de semana)
     schedule.every().monday.at("08:00").do(run_automation_task)
 
     logger.info(" Scheduler de automatización configurado")
-    logger.info("   - Cada hora en punto durante el día")
+    logger.info(f"   - Barrido de pendientes cada {settings.automation_barrido_minutos} minutos")
     logger.info("   - Lunes a las 8:00 AM")
 
     _scheduler_running = True
@@ -136,28 +99,37 @@ async def lifespan(app: FastAPI):
         finally:
             session.close()
 
+        # --- Elección de Líder ---
+        # Con uvicorn --workers N, cada tarea periódica corre solo en el
+        # worker que tiene su lease (failover automático si muere)
+        from app.services.liderazgo import iniciar_elector
+        iniciar_elector()
+
+        # --- Cola de Automatización ---
+        # Las facturas nuevas se automatizan en segundos al ingresar
+        from app.services.automation.cola_automatizacion import (
+            barrer_pendientes, iniciar_cola_automatizacion
+        )
+        iniciar_cola_automatizacion()
+
         # --- Automatización Inicial ---
-        # Ejecutar automatización al iniciar (modo asíncrono para no bloquear startup)
+        # Barrido sin período de gracia: lo que quedó en la cola al apagar o
+        # llegó mientras la app estaba abajo (no bloquea el startup)
         logger.info(" Ejecutando automatización inicial de facturas...")
 
         def run_initial_automation():
-            db = SessionLocal()
+            from app.services.liderazgo import TAREA_AUTOMATIZACION, es_lider
+            if not es_lider(TAREA_AUTOMATIZACION):
+                logger.info(" Automatización inicial omitida: este worker no es líder")
+                return
             try:
-                from app.services.automation.automation_service import AutomationService
-                automation = AutomationService()
-                resultado = automation.procesar_facturas_pendientes(
-                    db=db,
-                    limite_facturas=50,
-                    modo_debug=False
-                )
+                resultado = barrer_pendientes(gracia=timedelta(0))
                 logger.info(
                     f" Automatización inicial: {resultado['aprobadas_automaticamente']} aprobadas, "
                     f"{resultado['enviadas_revision']} a revisión"
                 )
             except Exception as e:
                 logger.error(f" Error en automatización inicial: {str(e)}")
-            finally:
-                db.close()
 
         # Ejecutar en background thread para no bloquear
         initial_thread = Thread(target=run_initial_automation, daemon=True)
@@ -183,6 +155,15 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             logger.warning(f"  Error iniciando scheduler de notificaciones: {str(e)}")
 
+        # --- Cola de Trabajos ---
+        # Workers de la tabla trabajos en este proceso (con TRABAJOS_EN_PROCESO=false
+        # corren aparte: python -m app.tasks.trabajos)
+        try:
+            from app.services.cola_trabajos import iniciar_trabajadores
+            iniciar_trabajadores()
+        except Exception as e:
+            logger.warning(f"  Error iniciando workers de la cola de trabajos: {str(e)}")
+
         logger.info(" Startup completado correctamente")
 
     except Exception as e:
@@ -200,6 +181,20 @@ async def lifespan(app: FastAPI):
         logger.info("   Deteniendo scheduler de automatización...")
         # El thread es daemon, se cerrará automáticamente
 
+    # Detener cola de automatización (lo pendiente conserva el marcador)
+    try:
+        from app.services.automation.cola_automatizacion import detener_cola_automatizacion
+        detener_cola_automatizacion()
+    except Exception as e:
+        logger.warning(f"  Error deteniendo cola de automatización: {str(e)}")
+
+    # Detener workers de la cola de trabajos (lo no terminado se reintenta al vencer su reserva)
+    try:
+        from app.services.cola_trabajos import detener_trabajadores
+        detener_trabajadores()
+    except Exception as e:
+        logger.warning(f"  Error deteniendo workers de la cola de trabajos: {str(e)}")
+
     # Detener scheduler de notificaciones
     try:
         from app.services.scheduler_notificaciones import detener_scheduler_notificaciones
@@ -207,4 +202,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"  Error deteniendo scheduler de notificaciones: {str(e)}")
 
+    # Liberar leases de tareas periódicas (otro worker las toma sin esperar el vencimiento)
+    try:
+        from app.services.liderazgo import detener_elector
+        detener_elector()
+    except Exception as e:
+        logger.warning(f"  Error liberando leases de tareas periódicas: {str(e)}")
+
+    # Telemetría final del pool (dimensionamiento de DB_POOL_SIZE / DB_MAX_OVERFLOW)
+    log_pool_status(engine)
+    engine.dispose()
+
     logger.info(" Aplicación cerrada correctamente")
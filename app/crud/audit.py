@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session
 from app.models.audit_log import AuditLog
 from typing import Optional
 
-def create_audit(db: Session, entidad: str, entidad_id: int, accion: str, usuario: str, detalle: Optional[dict] = None):
+def create_audit(db: Session, entidad: str, entidad_id: int, accion: str, usuario: str, detalle: Optional[dict] = None, commit: bool = True):
     log = AuditLog(entidad=entidad, entidad_id=entidad_id, accion=accion, usuario=usuario, detalle=detalle)
     db.add(log)
-    db.commit()
-    db.refresh(log)
+    # commit=False: el caller confirma junto con otros cambios (procesamiento en lote)
+    if commit:
+        db.commit()
+        db.refresh(log)
     return log
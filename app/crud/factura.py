@@ -1,100 +1,71 @@
 #app/crud/factura.py
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any, Tuple
-from sqlalchemy import and_, func, desc, or_, distinct
+from typing import Iterator, List, Optional, Dict, Any, Tuple
+from sqlalchemy import and_, func, desc, or_, distinct, exists
 from datetime import datetime, date
 
 from app.models.factura import Factura, EstadoFactura
+from app.models.factura_visibilidad import FacturaVisibilidad, ORIGEN_NIT, ORIGEN_WORKFLOW
+from app.models.factura_resumen_mensual import FacturaResumenMensual
 from app.models.proveedor import Proveedor
-from app.models.workflow_aprobacion import AsignacionNitResponsable
+from app.models.workflow_aprobacion import AsignacionNitResponsable, WorkflowAprobacionFactura
 from app.utils.nit_validator import NitValidator
+from app.utils.date_helpers import DateHelper
+from app.utils.cursor_pagination import contar_total, paginar_keyset
 
 
 # ==================== ENTERPRISE HELPERS ====================
 
 
-def _obtener_factura_ids_de_responsable(
+def filtro_visibilidad_responsable(
     db: Session, responsable_id: int, usar_workflow: bool = True
-) -> List[int]:
+):
     """
-    Obtiene los IDs de facturas que están asignadas al usuario.
+    Predicado SQL componible: facturas visibles para el usuario.
+
+    Resuelve contra la tabla materializada factura_visibilidad (PK
+    usuario_id, origen, factura_id): un EXISTS por índice, sin recorrer
+    workflows ni NIT → proveedor en cada request. Se usa igual en
+    listados, conteos y exportes:
+
+        query = query.filter(filtro_visibilidad_responsable(db, user_id))
 
     ENTERPRISE PATTERN (MULTI-RESPONSABLE SUPPORT):
-    - Con usar_workflow=True (default): Usa WorkflowAprobacionFactura (recomendado)
-      * Refleja la nueva arquitectura multi-responsable
+    - Con usar_workflow=True (default): filas origen='workflow'
       * Un responsable ve una factura si tiene un workflow para ella
-      * Soporta múltiples usuarios por NIT correctamente
+      * Si el usuario NO tiene ningún workflow, fallback a NITs asignados
+        (migración gradual, misma regla que antes)
 
-    - Con usar_workflow=False: Fallback a búsqueda por NITs asignados (legacy)
-      * Mantiene compatibilidad con sistema anterior
-      * Busca por AsignacionNitResponsable
+    - Con usar_workflow=False: Solo filas origen='nit' (legacy)
+      * AsignacionNitResponsable activas → Proveedor.nit → facturas
 
     Args:
         db: Sesión de base de datos
         responsable_id: ID del usuario
-        usar_workflow: Si True, usa WorkflowAprobacionFactura (default). Si False, usa NITs.
+        usar_workflow: Si True, usa visibilidad por workflow (default). Si False, usa NITs.
 
     Returns:
-        Lista de factura_ids asignadas al usuario
+        Expresión booleana de SQLAlchemy sobre Factura
     """
-    from app.models.workflow_aprobacion import WorkflowAprobacionFactura
+    origen = ORIGEN_NIT
 
     if usar_workflow:
-        # NUEVO (Arquitectura multi-responsable): Filtrar por WorkflowAprobacionFactura
-        # Una factura es "visible" para un usuario si tiene un workflow para ella
-        workflow_factura_ids = db.query(
-            distinct(WorkflowAprobacionFactura.factura_id)
-        ).filter(
-            WorkflowAprobacionFactura.responsable_id == responsable_id
-        ).all()
-
-        factura_ids = [fid for (fid,) in workflow_factura_ids]
-
-        if factura_ids:
-            return factura_ids
-
-        # Fallback a búsqueda por NITs si no hay workflows (migración gradual)
-        return _obtener_factura_ids_por_nits(db, responsable_id)
-    else:
-        # FALLBACK (Legacy): Filtrar por NITs asignados
-        return _obtener_factura_ids_por_nits(db, responsable_id)
-
-
-def _obtener_factura_ids_por_nits(db: Session, responsable_id: int) -> List[int]:
-    """
-    Obtiene factura IDs basadas en los NITs asignados al usuario.
-
-    Versión legacy para compatibilidad durante migración.
-
-    Returns:
-        Lista de factura_ids cuyos proveedores tienen NITs asignados al usuario
-    """
-    # Obtener NITs asignados al usuario (YA están normalizados en BD)
-    asignaciones = db.query(AsignacionNitResponsable.nit).filter(
-        AsignacionNitResponsable.responsable_id == responsable_id,
-        AsignacionNitResponsable.activo == True
-    ).all()
-
-    nits_asignados = [nit for (nit,) in asignaciones if nit]
-
-    if not nits_asignados:
-        return []
-
-    # Obtener IDs de proveedores con esos NITs
-    proveedor_ids = db.query(Proveedor.id).filter(
-        Proveedor.nit.in_(nits_asignados)
-    ).all()
-    proveedor_ids_list = [prov_id for (prov_id,) in proveedor_ids]
-
-    if not proveedor_ids_list:
-        return []
+        # Una sola consulta por PK decide la rama
+        tiene_workflows = db.query(
+            exists().where(
+                FacturaVisibilidad.usuario_id == responsable_id,
+                FacturaVisibilidad.origen == ORIGEN_WORKFLOW
+            )
+        ).scalar()
 
-    # Obtener facturas de esos proveedores
-    factura_ids = db.query(distinct(Factura.id)).filter(
-        Factura.proveedor_id.in_(proveedor_ids_list)
-    ).all()
+        if tiene_workflows:
+            origen = ORIGEN_WORKFLOW
 
-    return [fid for (fid,) in factura_ids]
+    return exists().where(
+        FacturaVisibilidad.usuario_id == responsable_id,
+        FacturaVisibilidad.origen == origen,
+        FacturaVisibilidad.factura_id == Factura.id
+    )
 
 
 def _obtener_proveedor_ids_de_responsable(db: Session, responsable_id: int) -> List[int]:
@@ -200,6 +171,7 @@ def count_facturas(
     nit: Optional[str] = None,
     numero_factura: Optional[str] = None,
     responsable_id: Optional[int] = None,
+    modo: str = "exacto",
 ) -> int:
     """
     Cuenta el total de facturas que coinciden con los filtros.
@@ -207,10 +179,12 @@ def count_facturas(
     ENTERPRISE: Si se filtra por responsable_id:
     - Filtra directamente por responsable_id en la factura (responsable asignado)
     - Una factura es "asignada" si tiene responsable_id = current_user.id
+
+    Con modo="estimado" devuelve la estimación del optimizador (sin COUNT(*)).
     """
     # Filtrar por facturas asignadas al usuario
     # Filtrar directamente por responsable_id en la factura
-    query = db.query(func.count(Factura.id))
+    query = db.query(Factura.id)
 
     if responsable_id:
         query = query.filter(Factura.responsable_id == responsable_id)
@@ -221,7 +195,8 @@ def count_facturas(
     if numero_factura:
         query = query.filter(Factura.numero_factura == numero_factura)
 
-    return query.scalar()
+    total, _ = contar_total(query, modo)
+    return total
 
 
 # -----------------------------------------------------
@@ -247,6 +222,56 @@ def list_facturas(
     Esto garantiza que "Facturas Asignadas" muestra solo las facturas del usuario,
     incluso cuando un NIT está compartido entre múltiples usuarios.
     """
+    query = _query_list_facturas(db, nit, numero_factura, responsable_id)
+
+    # Orden cronológico empresarial: más recientes primero
+    return query.order_by(
+        desc(Factura.fecha_emision),
+        desc(Factura.id)
+    ).offset(skip).limit(limit).all()
+
+
+# Mismo orden y ámbito que /facturas/cursor: los cursores son intercambiables
+ORDEN_FACTURAS = ((Factura.fecha_emision, True), (Factura.id, True))
+
+# Watermark de los GET condicionales sobre facturas (app.utils.conditional_get).
+# factura_visibilidad no entra: cambia junto con workflows, asignaciones o
+# facturas.responsable_id, que ya están aquí. Las asignaciones se cuentan
+# porque se borran.
+FUENTES_FACTURAS = (
+    (Factura.actualizado_en, False),
+    (WorkflowAprobacionFactura.actualizado_en, False),
+    (AsignacionNitResponsable.actualizado_en, True),
+)
+
+
+def list_facturas_keyset(
+    db: Session,
+    limit: int = 500,
+    cursor: Optional[str] = None,
+    nit: Optional[str] = None,
+    numero_factura: Optional[str] = None,
+    responsable_id: Optional[int] = None,
+) -> Tuple[List[Factura], Optional[str]]:
+    """
+    Igual que list_facturas pero paginando por keyset (sin OFFSET).
+
+    Returns:
+        Tupla (facturas, next_cursor)
+
+    Raises:
+        CursorInvalidoError: si el cursor fue manipulado
+    """
+    query = _query_list_facturas(db, nit, numero_factura, responsable_id)
+    return paginar_keyset(query, ORDEN_FACTURAS, limit, cursor, ambito="facturas")
+
+
+def _query_list_facturas(
+    db: Session,
+    nit: Optional[str],
+    numero_factura: Optional[str],
+    responsable_id: Optional[int],
+):
     from sqlalchemy.orm import joinedload, selectinload
 
     query = db.query(Factura).options(
@@ -266,11 +291,7 @@ def list_facturas(
     if numero_factura:
         query = query.filter(Factura.numero_factura == numero_factura)
 
-    # Orden cronológico empresarial: más recientes primero
-    return query.order_by(
-        desc(Factura.fecha_emision),
-        desc(Factura.id)
-    ).offset(skip).limit(limit).all()
+    return query
 
 
 # CURSOR-BASED PAGINATION (Para grandes volúmenes) ✨
@@ -320,13 +341,7 @@ def list_facturas_cursor(
 
     # ENTERPRISE: Filtrar por facturas asignadas al usuario (via workflows)
     if responsable_id:
-        factura_ids = _obtener_factura_ids_de_responsable(db, responsable_id, usar_workflow=True)
-
-        if not factura_ids:
-            return [], False  # Sin facturas asignadas
-
-        # Filtrar por IDs de facturas
-        query = query.filter(Factura.id.in_(factura_ids))
+        query = query.filter(filtro_visibilidad_responsable(db, responsable_id))
 
     if nit:
         query = query.join(Proveedor).filter(Proveedor.nit == nit)
@@ -417,13 +432,7 @@ def list_all_facturas_for_dashboard(
 
     # ENTERPRISE: Filtrar por facturas asignadas al usuario (via workflows)
     if responsable_id:
-        factura_ids = _obtener_factura_ids_de_responsable(db, responsable_id, usar_workflow=True)
-
-        if not factura_ids:
-            return []  # Sin facturas asignadas
-
-        # Filtrar por IDs de facturas
-        query = query.filter(Factura.id.in_(factura_ids))
+        query = query.filter(filtro_visibilidad_responsable(db, responsable_id))
 
     # Orden cronológico empresarial: más recientes primero
     return query.order_by(
@@ -432,6 +441,46 @@ def list_all_facturas_for_dashboard(
     ).all()
 
 
+def iter_all_facturas_for_dashboard(
+    db: Session,
+    responsable_id: Optional[int] = None,
+    batch_size: int = 500,
+) -> Iterator[Factura]:
+    """
+    Versión streaming de list_all_facturas_for_dashboard.
+
+    Recorre el mismo orden (fecha_emision DESC, id DESC) en lotes keyset de
+    batch_size con list_facturas_cursor y libera cada lote de la sesión
+    antes de pedir el siguiente: la memoria queda acotada a un lote sin
+    importar el tamaño de la tabla.
+
+    No usa un cursor de servidor (stream_results) porque con PyMySQL la
+    conexión queda ocupada hasta leer todo el resultado, y el
+    selectinload de workflow_history necesita consultar en la misma
+    conexión a mitad del recorrido.
+    """
+    cursor_timestamp = None
+    cursor_id = None
+
+    while True:
+        facturas, has_more = list_facturas_cursor(
+            db,
+            limit=batch_size,
+            cursor_timestamp=cursor_timestamp,
+            cursor_id=cursor_id,
+            responsable_id=responsable_id,
+        )
+
+        yield from facturas
+
+        if not has_more or not facturas:
+            return
+
+        cursor_timestamp = facturas[-1].fecha_emision
+        cursor_id = facturas[-1].id
+        db.expunge_all()
+
+
 # -----------------------------------------------------
 # Buscar por CUFE
 # -----------------------------------------------------
@@ -466,8 +515,12 @@ def find_by_numero_proveedor(db: Session, numero: str, proveedor_id: int) -> Opt
 # Crear factura
 # -----------------------------------------------------
 def create_factura(db: Session, data: dict) -> Factura:
+    from app.services.visibilidad_facturas import registrar_factura
+
     obj = Factura(**data)
     db.add(obj)
+    db.flush()
+    registrar_factura(db, obj)
     db.commit()
     db.refresh(obj)
     return obj
@@ -496,24 +549,96 @@ def update_factura(db: Session, factura: Factura, fields: dict) -> Factura:
 # -----------------------------------------------------
 # Obtener facturas pendientes para procesamiento automático
 # -----------------------------------------------------
-def get_facturas_pendientes_procesamiento(db: Session, limit: int = 50) -> List[Factura]:
+def get_facturas_pendientes_procesamiento(
+    db: Session,
+    limit: int = 50,
+    ids: Optional[List[int]] = None
+) -> List[Factura]:
     """
     Obtiene facturas en estado 'pendiente' que aún no han sido procesadas
     por el sistema de automatización
+
+    Args:
+        ids: Restringir a estas facturas (workers del modo paralelo); las
+            que ya se procesaron entre tanto se descartan
     """
+    query = db.query(Factura).filter(
+        and_(
+            Factura.estado == EstadoFactura.en_revision,
+            Factura.fecha_procesamiento_auto.is_(None)
+        )
+    )
+
+    if ids is not None:
+        query = query.filter(Factura.id.in_(ids))
+
     return (
-        db.query(Factura)
+        query
+        .order_by(Factura.creado_en.asc())  # Procesar las más antiguas primero
+        .limit(limit)
+        .all()
+    )
+
+
+def get_pendientes_procesamiento_por_proveedor(db: Session, limit: int = 50) -> Dict[Optional[int], List[int]]:
+    """
+    IDs de las mismas facturas que get_facturas_pendientes_procesamiento,
+    agrupados por proveedor_id (sin cargar las facturas).
+    """
+    filas = (
+        db.query(Factura.id, Factura.proveedor_id)
         .filter(
             and_(
                 Factura.estado == EstadoFactura.en_revision,
                 Factura.fecha_procesamiento_auto.is_(None)
             )
         )
-        .order_by(Factura.creado_en.asc())  # Procesar las más antiguas primero
+        .order_by(Factura.creado_en.asc())
         .limit(limit)
         .all()
     )
 
+    return _agrupar_por_proveedor(filas)
+
+
+def _agrupar_por_proveedor(filas) -> Dict[Optional[int], List[int]]:
+    grupos: Dict[Optional[int], List[int]] = {}
+    for factura_id, proveedor_id in filas:
+        grupos.setdefault(proveedor_id, []).append(factura_id)
+    return grupos
+
+
+def get_pendientes_automatizacion_por_proveedor(
+    db: Session,
+    limit: int = 100,
+    creadas_antes_de: Optional[datetime] = None
+) -> Dict[Optional[int], List[int]]:
+    """
+    IDs de facturas con automatizacion_pendiente (barrido de respaldo de la
+    cola de automatización), agrupados por proveedor_id. Usa el índice del
+    marcador en vez de buscar facturas sin workflow.
+
+    Args:
+        creadas_antes_de: Excluir las más recientes (probablemente aún en la cola)
+    """
+    query = db.query(Factura.id, Factura.proveedor_id).filter(
+        Factura.automatizacion_pendiente.is_(True)
+    )
+    if creadas_antes_de is not None:
+        query = query.filter(Factura.creado_en < creadas_antes_de)
+
+    return _agrupar_por_proveedor(query.order_by(Factura.id.asc()).limit(limit).all())
+
+
+def marcar_automatizacion_completa(db: Session, factura_ids: List[int]) -> None:
+    """Quita el marcador automatizacion_pendiente (workflow y decisión ya intentados)."""
+    if not factura_ids:
+        return
+    db.query(Factura).filter(Factura.id.in_(factura_ids)).update(
+        {Factura.automatizacion_pendiente: False}, synchronize_session=False
+    )
+    db.commit()
+
 
 # -----------------------------------------------------
 # Marcar factura como procesada automáticamente
@@ -622,19 +747,89 @@ def get_facturas_by_proveedor_fecha(
 # -----------------------------------------------------
 # Obtener resumen de facturas agrupadas por mes
 # -----------------------------------------------------
+def _usar_resumen_mensual(en_vivo: bool) -> bool:
+    """Los reportes leen del rollup salvo que se pida verificación en vivo."""
+    from app.core.config import settings
+    return settings.facturas_resumen_mensual_enabled and not en_vivo
+
+
+def _filtro_resumen(año: Optional[int] = None, mes: Optional[int] = None,
+                    proveedor_id: Optional[int] = None, estado: Optional[str] = None) -> list:
+    filtros = []
+    if año:
+        filtros.append(FacturaResumenMensual.año == año)
+    if mes:
+        filtros.append(FacturaResumenMensual.mes == mes)
+    if proveedor_id:
+        filtros.append(FacturaResumenMensual.proveedor_id == proveedor_id)
+    if estado:
+        filtros.append(FacturaResumenMensual.estado == getattr(estado, 'value', estado))
+    return filtros
+
+
 def get_facturas_resumen_por_mes(
     db: Session,
     año: Optional[int] = None,
     proveedor_id: Optional[int] = None,
-    estado: Optional[str] = None
+    estado: Optional[str] = None,
+    en_vivo: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Obtiene un resumen de facturas agrupadas por mes/año con totales.
-    Ahora calcula año/mes desde fecha_emision (campos eliminados de BD).
+
+    Lee del rollup facturas_resumen_mensual; con en_vivo=True agrega
+    directamente sobre facturas (verificación).
 
     Returns:
         Lista de diccionarios con: periodo, año, mes, total_facturas, monto_total
     """
+    if not _usar_resumen_mensual(en_vivo):
+        return _get_facturas_resumen_por_mes_en_vivo(db, año, proveedor_id, estado)
+
+    R = FacturaResumenMensual
+    total_facturas = func.sum(R.total_facturas)
+
+    result = db.query(
+        R.año,
+        R.mes,
+        total_facturas.label('total_facturas'),
+        func.sum(R.monto_total).label('monto_total'),
+        func.sum(R.subtotal_total).label('subtotal_total'),
+        func.sum(R.iva_total).label('iva_total')
+    ).filter(
+        *_filtro_resumen(año=año, proveedor_id=proveedor_id, estado=estado)
+    ).group_by(
+        R.año, R.mes
+    ).having(
+        total_facturas > 0
+    ).order_by(
+        desc(R.año), desc(R.mes)
+    ).all()
+
+    return [
+        {
+            "periodo": f"{int(row.año)}-{int(row.mes):02d}",
+            "año": int(row.año),
+            "mes": int(row.mes),
+            "total_facturas": int(row.total_facturas),
+            "monto_total": float(row.monto_total) if row.monto_total else 0.0,
+            "subtotal_total": float(row.subtotal_total) if row.subtotal_total else 0.0,
+            "iva_total": float(row.iva_total) if row.iva_total else 0.0
+        }
+        for row in result
+    ]
+
+
+def _get_facturas_resumen_por_mes_en_vivo(
+    db: Session,
+    año: Optional[int] = None,
+    proveedor_id: Optional[int] = None,
+    estado: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Versión en vivo de get_facturas_resumen_por_mes (escanea facturas).
+    Calcula año/mes desde fecha_emision (campos eliminados de BD).
+    """
     from sqlalchemy import extract
 
     query = db.query(
@@ -647,7 +842,7 @@ def get_facturas_resumen_por_mes(
     ).filter(Factura.fecha_emision.isnot(None))
 
     if año:
-        query = query.filter(extract('year', Factura.fecha_emision) == año)
+        query = query.filter(DateHelper.create_año_mes_filter(Factura.fecha_emision, año))
 
     if proveedor_id:
         query = query.filter(Factura.proveedor_id == proveedor_id)
@@ -683,7 +878,8 @@ def get_facturas_resumen_por_mes(
 def get_facturas_resumen_por_mes_detallado(
     db: Session,
     año: Optional[int] = None,
-    proveedor_id: Optional[int] = None
+    proveedor_id: Optional[int] = None,
+    en_vivo: bool = False
 ) -> List[Dict[str, Any]]:
     """
     Obtiene un resumen DETALLADO de facturas agrupadas por mes/año CON DESGLOSE POR ESTADO.
@@ -694,65 +890,87 @@ def get_facturas_resumen_por_mes_detallado(
 
     Ideal para dashboards que necesitan visualizar distribución de estados.
 
+    Una sola consulta: GROUP BY año/mes con agregación condicional por estado
+    (antes eran 8 consultas por período). Lee del rollup
+    facturas_resumen_mensual; con en_vivo=True agrega sobre facturas con un
+    rango semiabierto de fecha_emision para que use el índice de fecha.
+
     Returns:
         Lista de diccionarios con: periodo, año, mes, total_facturas, monto_total, facturas_por_estado{}
     """
-    from sqlalchemy import extract
+    from sqlalchemy import extract, case
 
-    # Obtener todos los períodos (año/mes)
-    periodos_query = db.query(
-        extract('year', Factura.fecha_emision).label('año'),
-        extract('month', Factura.fecha_emision).label('mes'),
-    ).filter(Factura.fecha_emision.isnot(None)).distinct()
+    estados_desglose = (
+        EstadoFactura.en_revision,
+        EstadoFactura.aprobada,
+        EstadoFactura.aprobada_auto,
+        EstadoFactura.rechazada,
+    )
+
+    if _usar_resumen_mensual(en_vivo):
+        R = FacturaResumenMensual
+        total_facturas = func.sum(R.total_facturas)
+
+        result = db.query(
+            R.año.label('año'),
+            R.mes.label('mes'),
+            total_facturas.label('total_facturas'),
+            func.sum(R.monto_total).label('monto_total'),
+            func.sum(R.subtotal_total).label('subtotal_total'),
+            func.sum(R.iva_total).label('iva_total'),
+            *[
+                func.sum(case((R.estado == estado.value, R.total_facturas), else_=0)).label(estado.value)
+                for estado in estados_desglose
+            ]
+        ).filter(
+            *_filtro_resumen(año=año, proveedor_id=proveedor_id)
+        ).group_by(R.año, R.mes).having(total_facturas > 0).order_by(desc(R.año), desc(R.mes)).all()
+
+        return _formatear_resumen_detallado(result, estados_desglose)
+
+    anio_col = extract('year', Factura.fecha_emision)
+    mes_col = extract('month', Factura.fecha_emision)
+
+    query = db.query(
+        anio_col.label('año'),
+        mes_col.label('mes'),
+        func.count(Factura.id).label('total_facturas'),
+        func.sum(Factura.total_a_pagar).label('monto_total'),
+        func.sum(Factura.subtotal).label('subtotal_total'),
+        func.sum(Factura.iva).label('iva_total'),
+        *[
+            func.count(case((Factura.estado == estado, Factura.id))).label(estado.value)
+            for estado in estados_desglose
+        ]
+    ).filter(Factura.fecha_emision.isnot(None))
 
     if año:
-        periodos_query = periodos_query.filter(extract('year', Factura.fecha_emision) == año)
+        query = query.filter(DateHelper.create_año_mes_filter(Factura.fecha_emision, año))
 
-    periodos = periodos_query.order_by(desc('año'), desc('mes')).all()
+    if proveedor_id:
+        query = query.filter(Factura.proveedor_id == proveedor_id)
 
-    result_detallado = []
+    result = query.group_by(anio_col, mes_col).order_by(desc('año'), desc('mes')).all()
 
-    for período_año, período_mes in periodos:
-        # Query base para este período
-        base_query = db.query(Factura).filter(
-            extract('year', Factura.fecha_emision) == período_año,
-            extract('month', Factura.fecha_emision) == período_mes
-        )
+    return _formatear_resumen_detallado(result, estados_desglose)
 
-        if proveedor_id:
-            base_query = base_query.filter(Factura.proveedor_id == proveedor_id)
-
-        # Contar por estado
-        en_revision = base_query.filter(Factura.estado == EstadoFactura.en_revision).count()
-        aprobada = base_query.filter(Factura.estado == EstadoFactura.aprobada).count()
-        aprobada_auto = base_query.filter(Factura.estado == EstadoFactura.aprobada_auto).count()
-        rechazada = base_query.filter(Factura.estado == EstadoFactura.rechazada).count()
-
-        # Totales globales
-        total_facturas = base_query.count()
-
-        if total_facturas > 0:  # Solo incluir períodos con datos
-            monto_total = base_query.with_entities(func.sum(Factura.total_a_pagar)).scalar() or 0.0
-            subtotal_total = base_query.with_entities(func.sum(Factura.subtotal)).scalar() or 0.0
-            iva_total = base_query.with_entities(func.sum(Factura.iva)).scalar() or 0.0
-
-            result_detallado.append({
-                "periodo": f"{int(período_año)}-{int(período_mes):02d}",
-                "año": int(período_año),
-                "mes": int(período_mes),
-                "total_facturas": total_facturas,
-                "monto_total": float(monto_total),
-                "subtotal_total": float(subtotal_total),
-                "iva_total": float(iva_total),
-                "facturas_por_estado": {
-                    "en_revision": en_revision,
-                    "aprobada": aprobada,
-                    "aprobada_auto": aprobada_auto,
-                    "rechazada": rechazada
-                }
-            })
 
-    return result_detallado
+def _formatear_resumen_detallado(result, estados_desglose) -> List[Dict[str, Any]]:
+    return [
+        {
+            "periodo": f"{int(row.año)}-{int(row.mes):02d}",
+            "año": int(row.año),
+            "mes": int(row.mes),
+            "total_facturas": int(row.total_facturas),
+            "monto_total": float(row.monto_total or 0.0),
+            "subtotal_total": float(row.subtotal_total or 0.0),
+            "iva_total": float(row.iva_total or 0.0),
+            "facturas_por_estado": {
+                estado.value: int(getattr(row, estado.value)) for estado in estados_desglose
+            }
+        }
+        for row in result
+    ]
 
 
 # -----------------------------------------------------
@@ -773,14 +991,8 @@ def get_facturas_por_periodo(
     Args:
         periodo: Período en formato "YYYY-MM" (ej: "2025-07")
     """
-    from sqlalchemy import extract
-
-    # Parsear periodo "YYYY-MM"
-    año, mes = map(int, periodo.split('-'))
-
     query = db.query(Factura).filter(
-        extract('year', Factura.fecha_emision) == año,
-        extract('month', Factura.fecha_emision) == mes
+        DateHelper.create_periodo_filter(Factura.fecha_emision, periodo)
     )
 
     if proveedor_id:
@@ -799,20 +1011,23 @@ def count_facturas_por_periodo(
     db: Session,
     periodo: str,
     proveedor_id: Optional[int] = None,
-    estado: Optional[str] = None
+    estado: Optional[str] = None,
+    en_vivo: bool = False
 ) -> int:
     """
     Cuenta facturas de un período específico.
-    Ahora usa fecha_emision (periodo_factura eliminado de BD).
+    Lee del rollup mensual; con en_vivo=True cuenta sobre facturas (fecha_emision).
     """
-    from sqlalchemy import extract
+    año, mes = DateHelper.parse_periodo(periodo)
 
-    # Parsear periodo "YYYY-MM"
-    año, mes = map(int, periodo.split('-'))
+    if _usar_resumen_mensual(en_vivo):
+        total = db.query(func.sum(FacturaResumenMensual.total_facturas)).filter(
+            *_filtro_resumen(año=año, mes=mes, proveedor_id=proveedor_id, estado=estado)
+        ).scalar()
+        return int(total or 0)
 
     query = db.query(func.count(Factura.id)).filter(
-        extract('year', Factura.fecha_emision) == año,
-        extract('month', Factura.fecha_emision) == mes
+        DateHelper.create_año_mes_filter(Factura.fecha_emision, año, mes)
     )
 
     if proveedor_id:
@@ -830,22 +1045,20 @@ def count_facturas_por_periodo(
 def get_estadisticas_periodo(
     db: Session,
     periodo: str,
-    proveedor_id: Optional[int] = None
+    proveedor_id: Optional[int] = None,
+    en_vivo: bool = False
 ) -> Dict[str, Any]:
     """
     Obtiene estadísticas detalladas de un período específico.
-    Ahora usa fecha_emision (periodo_factura eliminado de BD).
+    Lee del rollup mensual; con en_vivo=True agrega sobre facturas (fecha_emision).
     """
-    from sqlalchemy import extract
+    año, mes = DateHelper.parse_periodo(periodo)
 
-    # Parsear periodo "YYYY-MM"
-    año, mes = map(int, periodo.split('-'))
+    if _usar_resumen_mensual(en_vivo):
+        return _get_estadisticas_periodo_resumen(db, periodo, año, mes, proveedor_id)
 
     # Filtros base
-    periodo_filter = and_(
-        extract('year', Factura.fecha_emision) == año,
-        extract('month', Factura.fecha_emision) == mes
-    )
+    periodo_filter = DateHelper.create_año_mes_filter(Factura.fecha_emision, año, mes)
 
     query = db.query(Factura).filter(periodo_filter)
 
@@ -896,16 +1109,63 @@ def get_estadisticas_periodo(
     }
 
 
+def _get_estadisticas_periodo_resumen(
+    db: Session, periodo: str, año: int, mes: int, proveedor_id: Optional[int]
+) -> Dict[str, Any]:
+    """get_estadisticas_periodo desde el rollup: una fila por estado, totales en Python."""
+    R = FacturaResumenMensual
+    cantidad = func.sum(R.total_facturas)
+
+    filas = db.query(
+        R.estado,
+        cantidad.label('cantidad'),
+        func.sum(R.facturas_con_monto).label('con_monto'),
+        func.sum(R.monto_total).label('monto'),
+        func.sum(R.subtotal_total).label('subtotal'),
+        func.sum(R.iva_total).label('iva')
+    ).filter(
+        *_filtro_resumen(año=año, mes=mes, proveedor_id=proveedor_id)
+    ).group_by(R.estado).having(cantidad > 0).order_by(R.estado).all()
+
+    total_facturas = sum(int(f.cantidad) for f in filas)
+    con_monto = sum(int(f.con_monto) for f in filas)
+    monto_total = sum(float(f.monto or 0) for f in filas)
+
+    return {
+        "periodo": periodo,
+        "total_facturas": total_facturas,
+        "monto_total": monto_total,
+        "subtotal": sum(float(f.subtotal or 0) for f in filas),
+        "iva": sum(float(f.iva or 0) for f in filas),
+        "promedio": monto_total / con_monto if con_monto else 0.0,
+        "por_estado": [
+            {
+                "estado": f.estado,
+                "cantidad": int(f.cantidad),
+                "monto": float(f.monto) if f.monto else 0.0
+            }
+            for f in filas
+        ]
+    }
+
+
 # -----------------------------------------------------
 # Obtener años disponibles
 # -----------------------------------------------------
-def get_años_disponibles(db: Session) -> List[int]:
+def get_años_disponibles(db: Session, en_vivo: bool = False) -> List[int]:
     """
     Obtiene lista de años que tienen facturas registradas.
-    Ahora usa fecha_emision (año_factura eliminado de BD).
+    Lee del rollup mensual; con en_vivo=True consulta facturas (fecha_emision).
     """
     from sqlalchemy import extract
 
+    if _usar_resumen_mensual(en_vivo):
+        R = FacturaResumenMensual
+        result = db.query(R.año).group_by(R.año).having(
+            func.sum(R.total_facturas) > 0
+        ).order_by(desc(R.año)).all()
+        return [int(row.año) for row in result]
+
     result = db.query(
         extract('year', Factura.fecha_emision).label('año')
     ).filter(
@@ -942,68 +1202,91 @@ def get_jerarquia_facturas(
         "2024": {...}
     }
 
-    Optimizado con índices: idx_facturas_orden_cronologico, idx_facturas_año_mes_estado
+    Dos consultas, memoria acotada sin importar el tamaño de la tabla:
+    - Totales por mes con GROUP BY año/mes
+    - Solo las limit_por_mes facturas más recientes de cada mes, con
+      ROW_NUMBER() particionado por año/mes y únicamente las columnas
+      que se devuelven (sin cargar Factura ni sus relaciones)
     """
-    from collections import defaultdict
     from sqlalchemy import extract
 
-    query = db.query(Factura).filter(Factura.fecha_emision.isnot(None))
-
-    # Filtros opcionales
-    if año:
-        query = query.filter(extract('year', Factura.fecha_emision) == año)
+    anio_col = extract('year', Factura.fecha_emision)
+    mes_col = extract('month', Factura.fecha_emision)
 
-    if mes:
-        query = query.filter(extract('month', Factura.fecha_emision) == mes)
+    filtros = [
+        Factura.fecha_emision.isnot(None),
+        DateHelper.create_año_mes_filter(Factura.fecha_emision, año, mes)
+    ]
 
     if proveedor_id:
-        query = query.filter(Factura.proveedor_id == proveedor_id)
+        filtros.append(Factura.proveedor_id == proveedor_id)
 
     if estado:
-        query = query.filter(Factura.estado == estado)
+        filtros.append(Factura.estado == estado)
 
-    # Ordenar cronológicamente: más recientes primero
-    facturas = query.order_by(
-        desc(Factura.fecha_emision),
-        desc(Factura.id)
+    # Totales por mes (más recientes primero)
+    totales = db.query(
+        anio_col.label('año'),
+        mes_col.label('mes'),
+        func.count(Factura.id).label('total_facturas'),
+        func.sum(Factura.total_a_pagar).label('monto_total'),
+        func.sum(Factura.subtotal).label('subtotal'),
+        func.sum(Factura.iva).label('iva')
+    ).filter(*filtros).group_by(anio_col, mes_col).order_by(desc('año'), desc('mes')).all()
+
+    jerarquia: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for row in totales:
+        jerarquia.setdefault(str(int(row.año)), {})[str(int(row.mes)).zfill(2)] = {
+            "total_facturas": int(row.total_facturas),
+            "monto_total": float(row.monto_total or 0),
+            "subtotal": float(row.subtotal or 0),
+            "iva": float(row.iva or 0),
+            "facturas": []
+        }
+
+    if not jerarquia or limit_por_mes <= 0:
+        return jerarquia
+
+    # Top-N por mes: ROW_NUMBER() OVER (PARTITION BY año, mes ORDER BY fecha DESC)
+    ranking = db.query(
+        Factura.id.label('id'),
+        Factura.numero_factura.label('numero_factura'),
+        Factura.fecha_emision.label('fecha_emision'),
+        Factura.total_a_pagar.label('total_a_pagar'),
+        Factura.estado.label('estado'),
+        Factura.proveedor_id.label('proveedor_id'),
+        Factura.cufe.label('cufe'),
+        anio_col.label('año'),
+        mes_col.label('mes'),
+        func.row_number().over(
+            partition_by=(anio_col, mes_col),
+            order_by=(desc(Factura.fecha_emision), desc(Factura.id))
+        ).label('posicion')
+    ).filter(*filtros).subquery()
+
+    filas = db.query(ranking).filter(
+        ranking.c.posicion <= limit_por_mes
+    ).order_by(
+        desc(ranking.c.año), desc(ranking.c.mes), ranking.c.posicion
     ).all()
 
-    # Construir jerarquía
-    jerarquia = defaultdict(lambda: defaultdict(lambda: {
-        "total_facturas": 0,
-        "monto_total": 0.0,
-        "subtotal": 0.0,
-        "iva": 0.0,
-        "facturas": []
-    }))
-
-    for factura in facturas:
-        # Derivar año y mes desde fecha_emision
-        año_key = str(factura.fecha_emision.year) if factura.fecha_emision else "0000"
-        mes_key = str(factura.fecha_emision.month).zfill(2) if factura.fecha_emision else "00"  # "01", "02", etc.
-
-        mes_data = jerarquia[año_key][mes_key]
-
-        # Agregar a contadores
-        mes_data["total_facturas"] += 1
-        mes_data["monto_total"] += float(factura.total_a_pagar or 0)
-        mes_data["subtotal"] += float(factura.subtotal or 0)
-        mes_data["iva"] += float(factura.iva or 0)
-
-        # Agregar factura (limitado por mes para performance)
-        if len(mes_data["facturas"]) < limit_por_mes:
-            mes_data["facturas"].append({
-                "id": factura.id,
-                "numero_factura": factura.numero_factura,
-                "fecha_emision": factura.fecha_emision.isoformat() if factura.fecha_emision else None,
-                "total": float(factura.total_a_pagar or 0),
-                "estado": factura.estado.value if hasattr(factura.estado, 'value') else factura.estado,
-                "proveedor_id": factura.proveedor_id,
-                "cufe": factura.cufe
-            })
+    for fila in filas:
+        jerarquia[str(int(fila.año))][str(int(fila.mes)).zfill(2)]["facturas"].append({
+            "id": fila.id,
+            "numero_factura": fila.numero_factura,
+            "fecha_emision": fila.fecha_emision.isoformat() if fila.fecha_emision else None,
+            "total": float(fila.total_a_pagar or 0),
+            "estado": fila.estado.value if hasattr(fila.estado, 'value') else fila.estado,
+            "proveedor_id": fila.proveedor_id,
+            "cufe": fila.cufe
+        })
+
+    return jerarquia
+
 
-    # Convertir defaultdict a dict normal para JSON
-    return {año: dict(meses) for año, meses in jerarquia.items()}
+# Orden de las búsquedas de historial: fecha_emision descendente con id como
+# desempate (orden total). HistorialPrecargado lo reproduce en memoria.
+ORDEN_HISTORIAL = (desc(Factura.fecha_emision), desc(Factura.id))
 
 
 # -----------------------------------------------------
@@ -1036,7 +1319,6 @@ def find_facturas_mes_anterior(
         Lista de facturas del mes anterior del mismo proveedor
     """
     from dateutil.relativedelta import relativedelta
-    from sqlalchemy import extract
 
     # Calcular fecha del mes anterior
     fecha_mes_anterior = fecha_actual - relativedelta(months=1)
@@ -1045,8 +1327,9 @@ def find_facturas_mes_anterior(
     query = db.query(Factura).filter(
         and_(
             Factura.proveedor_id == proveedor_id,
-            extract('year', Factura.fecha_emision) == fecha_mes_anterior.year,
-            extract('month', Factura.fecha_emision) == fecha_mes_anterior.month,
+            DateHelper.create_año_mes_filter(
+                Factura.fecha_emision, fecha_mes_anterior.year, fecha_mes_anterior.month
+            ),
             # Solo considerar facturas aprobadas
             or_(
                 Factura.estado == EstadoFactura.aprobada,
@@ -1063,7 +1346,7 @@ def find_facturas_mes_anterior(
     if numero_factura:
         query = query.filter(Factura.numero_factura != numero_factura)
 
-    facturas = query.order_by(desc(Factura.fecha_emision)).limit(limit).all()
+    facturas = query.order_by(*ORDEN_HISTORIAL).limit(limit).all()
 
     return facturas
 
@@ -1134,7 +1417,7 @@ def find_facturas_by_orden_compra(
     if proveedor_id:
         query = query.filter(Factura.proveedor_id == proveedor_id)
 
-    return query.order_by(desc(Factura.fecha_emision)).all()
+    return query.order_by(*ORDEN_HISTORIAL).all()
 
 
 # -----------------------------------------------------
@@ -1167,7 +1450,7 @@ def find_facturas_by_concepto_hash(
     if proveedor_id:
         query = query.filter(Factura.proveedor_id == proveedor_id)
 
-    return query.order_by(desc(Factura.fecha_emision)).limit(limit).all()
+    return query.order_by(*ORDEN_HISTORIAL).limit(limit).all()
 
 
 # -----------------------------------------------------
@@ -1200,4 +1483,94 @@ def find_facturas_by_concepto_proveedor(
         )
     )
 
-    return query.order_by(desc(Factura.fecha_emision)).limit(limit).all()
+    return query.order_by(*ORDEN_HISTORIAL).limit(limit).all()
+
+
+# ==================== SINCRONIZACIÓN DE RESPONSABLES ====================
+
+
+def sincronizar_responsables_por_nit(db: Session) -> Dict[str, Any]:
+    """
+    Reasigna responsable_id de TODAS las facturas según los NITs activos en
+    AsignacionNitResponsable. No hace commit (lo decide el caller).
+
+    Returns:
+        Totales de actualizadas/ignoradas y detalle por responsable
+    """
+    from app.models.usuario import Usuario
+
+    usuarios = db.query(Usuario).all()
+
+    total_actualizadas = 0
+    total_ignoradas = 0
+    detalles = []
+
+    for resp in usuarios:
+        # Obtener NITs asignados
+        asignaciones = db.query(AsignacionNitResponsable.nit).filter(
+            AsignacionNitResponsable.responsable_id == resp.id,
+            AsignacionNitResponsable.activo == True
+        ).all()
+
+        nits_asignados = [nit for (nit,) in asignaciones if nit]
+
+        if not nits_asignados:
+            detalles.append({
+                "responsable": resp.nombre,
+                "actualizadas": 0,
+                "ignoradas": 0,
+                "nota": "Sin NITs asignados"
+            })
+            continue
+
+        # Obtener proveedores con esos NITs
+        proveedor_ids = db.query(Proveedor.id).filter(
+            Proveedor.nit.in_(nits_asignados)
+        ).all()
+        proveedor_ids = [pid for (pid,) in proveedor_ids]
+
+        if not proveedor_ids:
+            detalles.append({
+                "responsable": resp.nombre,
+                "actualizadas": 0,
+                "ignoradas": 0,
+                "nota": f"{len(nits_asignados)} NITs pero sin proveedores en BD"
+            })
+            continue
+
+        # Obtener facturas de esos proveedores
+        facturas = db.query(Factura).filter(
+            Factura.proveedor_id.in_(proveedor_ids)
+        ).all()
+
+        # Actualizar asignaciones
+        actualizadas = 0
+        ignoradas = 0
+
+        for factura in facturas:
+            if factura.responsable_id != resp.id:
+                factura.responsable_id = resp.id
+                actualizadas += 1
+            else:
+                ignoradas += 1
+
+        if actualizadas > 0:
+            db.flush()
+
+        detalles.append({
+            "responsable": resp.nombre,
+            "nits_asignados": len(nits_asignados),
+            "proveedores": len(proveedor_ids),
+            "facturas_totales": len(facturas),
+            "actualizadas": actualizadas,
+            "ignoradas": ignoradas
+        })
+
+        total_actualizadas += actualizadas
+        total_ignoradas += ignoradas
+
+    return {
+        "total_actualizadas": total_actualizadas,
+        "total_ignoradas": total_ignoradas,
+        "detalles": detalles
+    }
@@ -29,6 +29,7 @@ from app.models.proveedor import Proveedor
 from app.schemas.proveedor import ProveedorBase
 from app.utils.nit_validator import NitValidator
 from app.utils.normalizacion import normalizar_email, normalizar_razon_social
+from app.utils.cursor_pagination import paginar_keyset
 from app.services.provider_management import (
     ProviderManagementService,
     ProviderManagementException,
@@ -79,7 +80,30 @@ def list_proveedores(
     if solo_auto_creados:
         query = query.filter(Proveedor.es_auto_creado == True)
 
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(Proveedor.id).offset(skip).limit(limit).all()
+
+
+def list_proveedores_keyset(
+    db: Session,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    solo_auto_creados: bool = False
+) -> Tuple[List[Proveedor], Optional[str]]:
+    """
+    Lista proveedores por keyset (orden de id, sin OFFSET).
+
+    Returns:
+        Tupla (proveedores, next_cursor)
+
+    Raises:
+        CursorInvalidoError: si el cursor fue manipulado
+    """
+    query = db.query(Proveedor)
+
+    if solo_auto_creados:
+        query = query.filter(Proveedor.es_auto_creado == True)
+
+    return paginar_keyset(query, ((Proveedor.id, False),), limit, cursor, ambito="proveedores")
 
 
 def get_proveedor_by_nit(db: Session, nit: str) -> Optional[Proveedor]:
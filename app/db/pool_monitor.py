@@ -0,0 +1,125 @@
+# app/db/pool_monitor.py
+"""
+Telemetría del pool de conexiones.
+
+El engine de la app usa InstrumentedQueuePool, que mide cuánto espera cada
+checkout por una conexión libre. Con esos datos (más checked_out / overflow
+del propio pool) se dimensionan DB_POOL_SIZE y DB_MAX_OVERFLOW con carga real
+en lugar de adivinar.
+"""
+import time
+from threading import Lock
+from typing import Any, Dict
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+
+class PoolStats:
+    """Contadores acumulados del pool (thread-safe, en memoria del proceso)."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = 0
+            self.timeouts = 0
+            self.slow_checkouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.desde = time.time()
+
+    def record_wait(self, segundos: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += segundos
+            if segundos > self.wait_max:
+                self.wait_max = segundos
+            if segundos * 1000 >= settings.db_pool_slow_checkout_ms:
+                self.slow_checkouts += 1
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            promedio = self.wait_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "slow_checkouts": self.slow_checkouts,
+                "wait_avg_ms": round(promedio * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "desde": self.desde,
+            }
+
+
+# Singleton por proceso: sobrevive a pool.recreate() (engine.dispose())
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que registra el tiempo de espera de cada checkout."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except sa_exc.TimeoutError:
+            pool_stats.record_timeout()
+            logger.error(
+                "Pool de conexiones agotado: %s conexiones en uso, overflow=%s "
+                "(timeout=%ss). Revisar DB_POOL_SIZE / DB_MAX_OVERFLOW",
+                self.checkedout(), self.overflow(), self._timeout
+            )
+            raise
+        finally:
+            espera = time.perf_counter() - inicio
+            pool_stats.record_wait(espera)
+            if espera * 1000 >= settings.db_pool_slow_checkout_ms:
+                logger.warning(
+                    "Checkout lento del pool: %.1f ms (en uso=%s, overflow=%s)",
+                    espera * 1000, self.checkedout(), self.overflow()
+                )
+
+
+def get_pool_status(engine: Engine) -> Dict[str, Any]:
+    """Estado actual del pool del engine + estadísticas acumuladas."""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool_class": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+
+    status["recycle"] = pool._recycle
+    status["pre_ping"] = pool._pre_ping
+    status["stats"] = pool_stats.snapshot()
+    return status
+
+
+def log_pool_status(engine: Engine) -> None:
+    """Hook de log: vuelca el estado del pool (startup/shutdown o bajo demanda)."""
+    status = get_pool_status(engine)
+    stats = status["stats"]
+    logger.info(
+        "Pool DB [%s]: size=%s checked_out=%s overflow=%s | checkouts=%s "
+        "espera_prom=%sms espera_max=%sms lentos=%s timeouts=%s",
+        status["pool_class"], status.get("size"), status.get("checked_out"),
+        status.get("overflow"), stats["checkouts"], stats["wait_avg_ms"],
+        stats["wait_max_ms"], stats["slow_checkouts"], stats["timeouts"]
+    )
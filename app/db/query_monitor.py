@@ -0,0 +1,113 @@
+# app/db/query_monitor.py
+"""
+Instrumentación de SQL basada en eventos de SQLAlchemy.
+
+- Cuenta sentencias y tiempo total de BD por request (o por cualquier bloque
+  envuelto en track_queries()).
+- Detecta N+1: la misma "forma" de sentencia (SQL parametrizado, sin valores)
+  repetida muchas veces en un mismo request.
+- Slow-query log por encima de SQL_SLOW_QUERY_MS, con o sin request activo.
+
+El contador vive en un ContextVar: los endpoints sync corren en el threadpool
+de Starlette, que copia el contexto, así que las queries del thread se suman
+al request que las originó.
+"""
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.utils.logger import logger
+
+
+class QueryStats:
+    """Acumulador de sentencias ejecutadas dentro de un request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.count += 1
+        self.total_time += elapsed
+        self.shapes[_shape(statement)] += 1
+
+    @property
+    def total_ms(self) -> float:
+        return self.total_time * 1000
+
+    def repeated_shapes(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Formas de sentencia repetidas >= threshold veces (candidatas a N+1)."""
+        threshold = threshold or settings.sql_n_plus_one_threshold
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def _shape(statement: str) -> str:
+    # Las sentencias llegan parametrizadas (%s / ?), basta con colapsar espacios
+    return " ".join(statement.split())
+
+
+def get_current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """
+    Cuenta las sentencias ejecutadas dentro del bloque.
+
+    Uso (tests / benchmarks):
+        with track_queries() as stats:
+            crud.algo(db)
+        assert stats.count <= 2
+    """
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_stack = conn.info.get("query_start_time")
+    if not start_stack:
+        return
+    elapsed = time.perf_counter() - start_stack.pop()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+
+    if elapsed * 1000 >= settings.sql_slow_query_ms:
+        logger.warning(
+            "Slow query (%.1f ms): %s", elapsed * 1000, _shape(statement)[:500]
+        )
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra los listeners de instrumentación en el engine (idempotente)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def report_n_plus_one(stats: QueryStats, origen: str) -> None:
+    """Loguea las formas de sentencia repetidas de un request."""
+    for shape, veces in stats.repeated_shapes():
+        logger.warning(
+            "Posible N+1 en %s: %sx %s", origen, veces, shape[:300]
+        )
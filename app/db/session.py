@@ -1,12 +1,77 @@
 # app/db/session.py
+"""
+Engine y sesiones de base de datos.
+
+ÚNICO punto donde se crea el engine de la aplicación. app.core.database
+re-exporta estos mismos objetos, así todos los routers comparten un solo pool
+sin importar de dónde importen get_db.
+"""
+from typing import Generator, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+
 from app.core.config import settings
-from typing import Generator
+from app.db.pool_monitor import InstrumentedQueuePool
+from app.db.query_monitor import instrument_engine
+from app.services.resumen_mensual import registrar_mantenimiento as registrar_resumen_mensual
+from app.services.metricas_automatizacion import registrar_invalidacion as registrar_invalidacion_metricas
+from app.services.eventos_dashboard import registrar_publicacion as registrar_eventos_dashboard
+from app.services.dashboard_workflow import registrar_mantenimiento as registrar_dashboard_workflow
+from app.services.estadisticas_montos import registrar_mantenimiento as registrar_estadisticas_montos
+from app.services.item_precio_historico import registrar_mantenimiento as registrar_item_precio_historico
+
+
+def create_db_engine(database_url: Optional[str] = None) -> Engine:
+    """
+    Crea un engine con la política de pool definida en Settings.
+
+    SQLite (tests/scripts locales) usa el pool por defecto del dialecto:
+    no admite pool_size/max_overflow en todas sus variantes.
+    """
+    url = database_url or settings.database_url
+    kwargs = {
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "future": True,
+    }
+
+    if not url.startswith("sqlite"):
+        kwargs.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+
+    return create_engine(url, **kwargs)
 
-engine = create_engine(settings.database_url, pool_pre_ping=True, future=True)
+
+engine = create_db_engine()
+if settings.sql_instrumentation_enabled:
+    instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Rollup facturas_resumen_mensual: se actualiza en cada flush que toca facturas
+registrar_resumen_mensual()
+
+# Caché de /automation/dashboard/metricas: se invalida al confirmar cambios de facturas
+registrar_invalidacion_metricas()
+
+# /dashboard/eventos: publica los cambios de facturas confirmados a las conexiones SSE
+registrar_eventos_dashboard()
+
+# Contadores de /workflow/dashboard por responsable: se actualizan en cada flush que cambia estados
+registrar_dashboard_workflow()
+
+# Estadísticas de montos por proveedor/concepto: Welford en cada flush que cambia el historial aprobado
+registrar_estadisticas_montos()
+
+# Historial de precios por item: Welford en cada flush que crea, cambia o elimina items
+registrar_item_precio_historico()
+
+
 def get_db() -> Generator:
     db = SessionLocal()
     try:
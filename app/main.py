@@ -3,6 +3,7 @@ from app.api.v1 import api_router
 from app.core.config import settings
 from app.core.lifespan import lifespan
 from app.utils.cors import setup_cors
+from app.utils.sql_metrics import setup_sql_metrics
 
 
 def create_app() -> FastAPI:
@@ -31,6 +32,9 @@ def create_app() -> FastAPI:
     # --- Configuración CORS ---
     setup_cors(app)
 
+    # --- Instrumentación SQL por request ---
+    setup_sql_metrics(app)
+
     # --- Rutas centralizadas ---
     app.include_router(api_router)
 
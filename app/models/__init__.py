@@ -14,6 +14,13 @@ from .workflow_aprobacion import (
     NotificacionWorkflow
 )
 from .patrones_facturas import PatronesFacturas, TipoPatron
+from .factura_visibilidad import FacturaVisibilidad
+from .factura_resumen_mensual import FacturaResumenMensual
+from .dashboard_workflow_responsable import DashboardWorkflowResponsable
+from .estadistica_montos import EstadisticaMontos
+from .item_precio_historico import ItemPrecioHistorico
+from .liderazgo_tarea import LiderazgoTarea
+from .trabajo import Trabajo, EstadoTrabajo
 from .email_config import CuentaCorreo, NitConfiguracion, HistorialExtraccion
 
 __all__ = [
@@ -29,6 +36,14 @@ __all__ = [
     "NotificacionWorkflow",
     "PatronesFacturas",
     "TipoPatron",
+    "FacturaVisibilidad",
+    "FacturaResumenMensual",
+    "DashboardWorkflowResponsable",
+    "EstadisticaMontos",
+    "ItemPrecioHistorico",
+    "LiderazgoTarea",
+    "Trabajo",
+    "EstadoTrabajo",
     "CuentaCorreo",
     "NitConfiguracion",
     "HistorialExtraccion",
@@ -0,0 +1,60 @@
+# app/models/dashboard_workflow_responsable.py
+"""
+Contadores precalculados de /workflow/dashboard, una fila por responsable.
+
+El dashboard pasa a ser una lectura por PK en vez de resolver NIT →
+proveedores y contar facturas en cada request. Las filas se materializan
+la primera vez que se consultan y luego se mantienen en la misma
+transacción que los cambios de estado (ver app.services.dashboard_workflow).
+Reconciliación: python -m app.scripts.dashboard_workflow --verificar
+"""
+from sqlalchemy import Column, BigInteger, Integer, Boolean, Date, DateTime
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+# Fila del dashboard de administrador (todas las facturas, sin filtro de responsable)
+GLOBAL = 0
+
+
+class DashboardWorkflowResponsable(Base):
+    """
+    Facturas por estado, pendientes antiguas y sumas de tiempo de aprobación
+    del alcance de un responsable (proveedores de sus NITs asignados).
+    """
+    __tablename__ = "dashboard_workflow_responsable"
+
+    responsable_id = Column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False,
+        comment="0 = dashboard global (admin)"
+    )
+    tiene_proveedores = Column(
+        Boolean, nullable=False, default=True,
+        comment="False si el responsable no tiene proveedores en su alcance"
+    )
+
+    # Una columna por EstadoFactura
+    en_revision = Column(Integer, nullable=False, default=0)
+    aprobada = Column(Integer, nullable=False, default=0)
+    aprobada_auto = Column(Integer, nullable=False, default=0)
+    rechazada = Column(Integer, nullable=False, default=0)
+    validada_contabilidad = Column(Integer, nullable=False, default=0)
+    devuelta_contabilidad = Column(Integer, nullable=False, default=0)
+
+    # En revisión con fecha_emision <= antiguas_corte; el corte avanza cada día
+    pendientes_antiguas = Column(Integer, nullable=False, default=0)
+    antiguas_corte = Column(Date, nullable=False)
+
+    # Tiempo de aprobación (workflow.fecha_aprobacion - workflow.creado_en)
+    aprobaciones_con_tiempo = Column(Integer, nullable=False, default=0)
+    segundos_aprobacion_total = Column(BigInteger, nullable=False, default=0)
+
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return (
+            f"<DashboardWorkflowResponsable(responsable={self.responsable_id}, "
+            f"en_revision={self.en_revision}, antiguas={self.pendientes_antiguas})>"
+        )
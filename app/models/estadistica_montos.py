@@ -0,0 +1,56 @@
+# app/models/estadistica_montos.py
+"""
+Estadísticas de montos e intervalos por (proveedor, concepto_hash, año, mes).
+
+Media y M2 de Welford por mes: las estadísticas de una ventana (12 meses,
+90 días...) se obtienen combinando a lo sumo un puñado de filas, sin volver
+a leer el historial de facturas. Se mantiene en la misma transacción en que
+las facturas entran o salen del historial aprobado (ver
+app.services.estadisticas_montos) y se reconstruye con:
+    python -m app.scripts.estadisticas_montos --reconstruir
+"""
+from sqlalchemy import Column, BigInteger, Integer, SmallInteger, String, Numeric, Float, Date, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+# concepto_hash forma parte de la PK: las facturas sin hash se acumulan en ''
+SIN_CONCEPTO = ""
+
+
+class EstadisticaMontos(Base):
+    """
+    Acumuladores de Welford (n, media, m2) de total_a_pagar y de los días
+    desde la factura anterior del mismo proveedor y concepto.
+    """
+    __tablename__ = "estadisticas_montos"
+
+    proveedor_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    concepto_hash = Column(String(32), primary_key=True, comment="'' = facturas sin concepto_hash")
+    año = Column(SmallInteger, primary_key=True, autoincrement=False)
+    mes = Column(SmallInteger, primary_key=True, autoincrement=False)
+
+    n = Column(Integer, nullable=False, default=0)
+    media = Column(Float(53), nullable=False, default=0)
+    m2 = Column(Float(53), nullable=False, default=0, comment="Suma de cuadrados de las desviaciones (Welford)")
+    minimo = Column(Numeric(15, 2), nullable=True)
+    maximo = Column(Numeric(15, 2), nullable=True)
+    primera_fecha = Column(Date, nullable=True)
+    ultima_fecha = Column(Date, nullable=True)
+
+    # Intervalo de cada factura con la anterior del mismo proveedor/concepto (en días)
+    n_intervalos = Column(Integer, nullable=False, default=0)
+    media_intervalo = Column(Float(53), nullable=False, default=0)
+    m2_intervalo = Column(Float(53), nullable=False, default=0)
+
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_estadisticas_montos_proveedor", "proveedor_id", "año", "mes"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<EstadisticaMontos(proveedor={self.proveedor_id}, concepto={self.concepto_hash or '-'}, "
+            f"{self.año}-{self.mes:02d}, n={self.n}, media={self.media})>"
+        )
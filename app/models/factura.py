@@ -1,6 +1,6 @@
 # app/models/factura.py
 from sqlalchemy import Column, BigInteger, String, Date, Numeric, Enum, Boolean, ForeignKey, DateTime, UniqueConstraint, JSON
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 import enum
@@ -96,6 +96,8 @@ class Factura(Base):
     # Metadata y auditoría
     fecha_procesamiento_auto = Column(DateTime(timezone=True), nullable=True,
                                      comment="Cuándo se ejecutó el procesamiento automático")
+    automatizacion_pendiente = Column(Boolean, nullable=False, default=True, server_default=text("1"), index=True,
+                                      comment="Workflow y decisión automática aún no intentados (cola de automatización)")
 
     # CAMPOS PARA MATCHING Y COMPARACIÓN EMPRESARIAL ✨
 
@@ -0,0 +1,55 @@
+# app/models/factura_resumen_mensual.py
+"""
+Rollup mensual de facturas por (año, mes, proveedor, estado).
+
+Alimenta los endpoints de reportes por período (/facturas/periodos/*) sin
+re-escanear la tabla facturas. Se mantiene en la misma transacción en que
+se crean, modifican o eliminan facturas (ver app.services.resumen_mensual)
+y se reconstruye con: python -m app.scripts.resumen_mensual --reconstruir
+"""
+from sqlalchemy import Column, BigInteger, Integer, SmallInteger, String, Numeric, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+# proveedor_id forma parte de la PK: las facturas sin proveedor se acumulan en 0
+SIN_PROVEEDOR = 0
+
+
+class FacturaResumenMensual(Base):
+    """
+    Contadores y sumas de facturas agrupadas por fecha_emision (año/mes),
+    proveedor y estado.
+    """
+    __tablename__ = "facturas_resumen_mensual"
+
+    año = Column(SmallInteger, primary_key=True, autoincrement=False)
+    mes = Column(SmallInteger, primary_key=True, autoincrement=False)
+    proveedor_id = Column(
+        BigInteger,
+        primary_key=True,
+        autoincrement=False,
+        comment="0 = facturas sin proveedor"
+    )
+    estado = Column(String(30), primary_key=True, comment="EstadoFactura.value")
+
+    total_facturas = Column(Integer, nullable=False, default=0)
+    facturas_con_monto = Column(
+        Integer, nullable=False, default=0,
+        comment="Facturas con total_a_pagar no nulo (denominador del promedio)"
+    )
+    subtotal_total = Column(Numeric(18, 2), nullable=False, default=0)
+    iva_total = Column(Numeric(18, 2), nullable=False, default=0)
+    monto_total = Column(Numeric(18, 2), nullable=False, default=0)
+
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_resumen_mensual_proveedor", "proveedor_id", "año", "mes"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<FacturaResumenMensual({self.año}-{self.mes:02d}, proveedor={self.proveedor_id}, "
+            f"estado={self.estado}, total={self.total_facturas})>"
+        )
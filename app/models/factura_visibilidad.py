@@ -0,0 +1,62 @@
+# app/models/factura_visibilidad.py
+"""
+Tabla materializada de visibilidad: qué facturas puede ver cada usuario.
+
+Antes, "¿qué facturas ve el usuario X?" se recalculaba en cada request
+(workflows del usuario o, si no tiene, NITs asignados → proveedores → facturas).
+Esta tabla guarda el resultado ya resuelto y se mantiene incrementalmente
+desde app.services.visibilidad_facturas:
+
+- Al crear workflows (origen='workflow')
+- Al crear, editar o desactivar asignaciones NIT → usuario (origen='nit')
+- Al crear facturas de NITs ya asignados (origen='nit')
+- Al reasignar facturas en sincronizar_facturas_por_nit
+
+Reconstrucción y verificación: python -m app.scripts.visibilidad_facturas
+"""
+from sqlalchemy import Column, BigInteger, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+ORIGEN_WORKFLOW = "workflow"
+ORIGEN_NIT = "nit"
+
+
+class FacturaVisibilidad(Base):
+    """
+    Par (usuario, factura) visible, con el origen que lo produjo.
+
+    Se guardan ambos orígenes porque la regla de visibilidad es:
+    facturas con workflow del usuario; si el usuario no tiene ningún
+    workflow, facturas de sus NITs asignados (fallback legacy).
+    """
+    __tablename__ = "factura_visibilidad"
+
+    usuario_id = Column(
+        BigInteger,
+        ForeignKey("usuarios.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="Usuario que ve la factura"
+    )
+    origen = Column(
+        String(20),
+        primary_key=True,
+        comment="workflow | nit"
+    )
+    factura_id = Column(
+        BigInteger,
+        ForeignKey("facturas.id", ondelete="CASCADE"),
+        primary_key=True,
+        comment="Factura visible"
+    )
+    creado_en = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # PK (usuario_id, origen, factura_id) cubre los listados por usuario;
+        # este índice cubre el mantenimiento por factura
+        Index("idx_visibilidad_factura", "factura_id"),
+    )
+
+    def __repr__(self):
+        return f"<FacturaVisibilidad(usuario={self.usuario_id}, factura={self.factura_id}, origen={self.origen})>"
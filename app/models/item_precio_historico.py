@@ -0,0 +1,57 @@
+# app/models/item_precio_historico.py
+"""
+Historial de precios unitarios por (proveedor, item_hash, año, mes).
+
+Media y M2 de Welford del precio unitario, histograma para percentiles,
+cantidad y último precio de cada mes: la comparación de items de una
+factura combina los meses completos de su ventana en una sola consulta.
+Se mantiene en cada flush que crea, modifica o elimina items (ver
+app.services.item_precio_historico) y se reconstruye con:
+    python -m app.scripts.item_precio_historico --reconstruir
+"""
+from sqlalchemy import Column, BigInteger, Integer, SmallInteger, String, Numeric, Float, Date, DateTime, Index, JSON
+from sqlalchemy.sql import func
+from app.db.base import Base
+
+
+class ItemPrecioHistorico(Base):
+    """
+    Acumulador de Welford (n, media, m2) de precio_unitario de un item en un
+    mes, con extremos y el último precio facturado.
+    """
+    __tablename__ = "item_precio_historico"
+
+    proveedor_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    item_hash = Column(String(32), primary_key=True)
+    año = Column(SmallInteger, primary_key=True, autoincrement=False)
+    mes = Column(SmallInteger, primary_key=True, autoincrement=False)
+
+    n = Column(Integer, nullable=False, default=0)
+    media = Column(Float(53), nullable=False, default=0)
+    m2 = Column(Float(53), nullable=False, default=0, comment="Suma de cuadrados de las desviaciones (Welford)")
+    precio_min = Column(Numeric(15, 4), nullable=True)
+    precio_max = Column(Numeric(15, 4), nullable=True)
+    histograma = Column(JSON, nullable=True,
+                        comment="{cubeta logarítmica del precio: items} para percentiles")
+
+    media_cantidad = Column(Float(53), nullable=False, default=0)
+    cantidad_min = Column(Numeric(15, 4), nullable=True)
+    cantidad_max = Column(Numeric(15, 4), nullable=True)
+
+    # Último item del mes por (fecha_emision, factura_id, id)
+    ultimo_precio = Column(Numeric(15, 4), nullable=True)
+    ultima_cantidad = Column(Numeric(15, 4), nullable=True)
+    ultima_fecha = Column(Date, nullable=True)
+    ultima_factura_id = Column(BigInteger, nullable=True)
+
+    actualizado_en = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_item_precio_historico_proveedor", "proveedor_id", "año", "mes"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<ItemPrecioHistorico(proveedor={self.proveedor_id}, item={self.item_hash}, "
+            f"{self.año}-{self.mes:02d}, n={self.n}, media={self.media})>"
+        )
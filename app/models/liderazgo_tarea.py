@@ -0,0 +1,24 @@
+# app/models/liderazgo_tarea.py
+"""
+Leases de tareas periódicas entre workers (elección de líder).
+
+Con uvicorn --workers N cada proceso levanta los schedulers; solo el
+titular vigente del lease de una tarea la ejecuta. Un lease vencido (el
+titular murió o perdió la BD) lo toma otro worker en la siguiente
+renovación (ver app.services.liderazgo).
+"""
+from sqlalchemy import Column, String, DateTime
+from app.db.base import Base
+
+
+class LiderazgoTarea(Base):
+    """Titular actual de una tarea periódica y hasta cuándo vale su lease."""
+    __tablename__ = "liderazgo_tareas"
+
+    tarea = Column(String(100), primary_key=True, comment="Nombre de la tarea periódica")
+    titular = Column(String(150), nullable=False, comment="host:pid:id del worker líder")
+    vence_en = Column(DateTime, nullable=False, comment="UTC; vencido = otro worker puede tomarlo")
+    renovado_en = Column(DateTime, nullable=False, comment="UTC de la última renovación")
+
+    def __repr__(self):
+        return f"<LiderazgoTarea(tarea={self.tarea}, titular={self.titular}, vence_en={self.vence_en})>"
@@ -0,0 +1,58 @@
+# app/models/trabajo.py
+"""
+Cola de trabajos en segundo plano persistida en BD.
+
+Reemplaza BackgroundTasks y hilos daemon para trabajo que no debe perderse
+al reiniciar (notificaciones, regeneración de patrones, sincronización de
+NITs). El ciclo de vida y los workers están en app.services.cola_trabajos.
+"""
+import enum
+
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Enum, JSON, Index
+from app.db.base import Base
+
+
+class EstadoTrabajo(enum.Enum):
+    """
+    - pendiente: espera su turno (disponible_en) o un reintento con backoff
+    - en_proceso: reservado por un worker hasta bloqueado_hasta (visibility
+      timeout); si el worker muere, al vencer vuelve a estar disponible
+    - completado: terminó sin error
+    - fallido: agotó max_intentos (dead-letter; se reintenta a mano)
+    """
+    pendiente = "pendiente"
+    en_proceso = "en_proceso"
+    completado = "completado"
+    fallido = "fallido"
+
+
+class Trabajo(Base):
+    __tablename__ = "trabajos"
+
+    # Integer en SQLite: BIGINT no es alias de ROWID y no autoincrementa
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    cola = Column(String(50), nullable=False, comment="Cola (límite de concurrencia propio)")
+    tipo = Column(String(100), nullable=False, comment="Nombre de la tarea registrada")
+    payload = Column(JSON, nullable=True, comment="Argumentos de la tarea")
+
+    estado = Column(Enum(EstadoTrabajo), nullable=False, default=EstadoTrabajo.pendiente)
+    intentos = Column(Integer, nullable=False, default=0)
+    max_intentos = Column(Integer, nullable=False, default=5)
+
+    disponible_en = Column(DateTime, nullable=False, comment="UTC; no se reserva antes (backoff)")
+    bloqueado_por = Column(String(200), nullable=True, comment="Worker que lo tiene reservado")
+    bloqueado_hasta = Column(DateTime, nullable=True, comment="UTC; vencido = otro worker puede tomarlo")
+
+    ultimo_error = Column(Text, nullable=True)
+    resultado = Column(JSON, nullable=True)
+
+    creado_en = Column(DateTime, nullable=False, comment="UTC")
+    iniciado_en = Column(DateTime, nullable=True, comment="UTC del último intento")
+    terminado_en = Column(DateTime, nullable=True, comment="UTC")
+
+    __table_args__ = (
+        Index("idx_trabajos_cola_estado_disponible", "cola", "estado", "disponible_en"),
+    )
+
+    def __repr__(self):
+        return f"<Trabajo(id={self.id}, cola={self.cola}, tipo={self.tipo}, estado={self.estado})>"
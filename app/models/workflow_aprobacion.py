@@ -265,6 +265,8 @@ class WorkflowAprobacionFactura(Base):
         Index('idx_workflow_estado_responsable', 'estado', 'responsable_id'),
         Index('idx_workflow_nit_fecha', 'nit_proveedor', 'email_fecha_recepcion'),
         Index('idx_workflow_estado_fecha', 'estado', 'fecha_cambio_estado'),
+        # Watermark de GET condicionales: MAX(actualizado_en)
+        Index('idx_workflow_actualizado_en', 'actualizado_en'),
     )
 
 
@@ -354,6 +356,7 @@ class AsignacionNitResponsable(Base):
         UniqueConstraint('nit', 'responsable_id', name='uq_nit_responsable'),
         Index('idx_asignacion_nit', 'nit'),
         Index('idx_asignacion_responsable', 'responsable_id'),
+        Index('idx_asignacion_actualizado_en', 'actualizado_en'),
     )
 
 
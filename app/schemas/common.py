@@ -21,6 +21,8 @@ class PaginationMetadata(BaseModel):
     total_pages: int = Field(..., description="Total de páginas disponibles")
     has_next: bool = Field(..., description="Indica si hay página siguiente")
     has_prev: bool = Field(..., description="Indica si hay página anterior")
+    next_cursor: Optional[str] = Field(None, description="Cursor keyset para la siguiente página (alternativa a page)")
+    total_estimado: bool = Field(False, description="True si total es una estimación del optimizador (conteo=estimado)")
 
     class Config:
         json_schema_extra = {
@@ -0,0 +1,107 @@
+"""
+Script de reconciliación de dashboard_workflow_responsable.
+
+Funciones:
+1. Verificar que cada fila materializada coincide con el cálculo en vivo
+2. Reparar las filas con drift (escrituras fuera del ORM, cambios de NIT de
+   proveedores, carreras entre materialización y cambios de estado)
+
+Uso:
+    # Verificar consistencia (exit code 1 si hay diferencias)
+    python -m app.scripts.dashboard_workflow --verificar
+
+    # Reparar filas con drift (programable en cron, p. ej. cada hora)
+    python -m app.scripts.dashboard_workflow --reparar
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app.db.session import create_db_engine
+from app.services import dashboard_workflow
+
+
+def get_db():
+    """Obtiene sesión de base de datos."""
+    engine = create_db_engine()
+    SessionLocal = sessionmaker(bind=engine)
+    return SessionLocal(), engine
+
+
+def verificar(db) -> bool:
+    """Muestra el resultado del verificador de consistencia."""
+    resultado = dashboard_workflow.verificar_consistencia(db)
+
+    print("\n" + "="*90)
+    print("CONSISTENCIA - DASHBOARD_WORKFLOW_RESPONSABLE")
+    print("="*90)
+    print(f"{'Filas materializadas':<25} {resultado['filas']}")
+    print(f"{'Diferencias':<25} {resultado['diferencias']}")
+
+    if resultado["ejemplos"]:
+        print(f"\nColumnas: {', '.join(resultado['columnas'])}")
+        print("responsable -> esperado | materializado")
+        for responsable_id, esperado, materializado in resultado["ejemplos"]:
+            print(f"   {responsable_id} -> {esperado} | {materializado}")
+
+    print("-"*90)
+    print("CONSISTENTE" if resultado["consistente"] else "INCONSISTENTE: ejecutar --reparar")
+    print("="*90 + "\n")
+
+    return resultado["consistente"]
+
+
+def reparar(db) -> None:
+    """Corrige las filas con drift en una sola transacción."""
+    print("\nReparando dashboard_workflow_responsable...")
+    try:
+        corregidas = dashboard_workflow.reparar(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"   {corregidas} filas corregidas")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Reconciliación de los contadores de /workflow/dashboard"
+    )
+
+    parser.add_argument(
+        '--verificar',
+        action='store_true',
+        help='Comparar cada fila contra el cálculo en vivo'
+    )
+
+    parser.add_argument(
+        '--reparar',
+        action='store_true',
+        help='Reescribir las filas que difieren'
+    )
+
+    args = parser.parse_args()
+
+    # Si no se pasa ningún argumento, mostrar ayuda
+    if not any(vars(args).values()):
+        parser.print_help()
+        return
+
+    db, engine = get_db()
+
+    try:
+        if args.reparar:
+            reparar(db)
+
+        if args.verificar and not verificar(db):
+            sys.exit(1)
+
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    main()
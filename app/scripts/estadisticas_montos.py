@@ -0,0 +1,112 @@
+"""
+Script de mantenimiento de estadisticas_montos (Welford por proveedor/concepto/mes).
+
+Funciones:
+1. Verificar que la tabla coincide con las estadísticas calculadas en vivo desde facturas
+2. Reconstruirla completa (tras cargas masivas con SQL directo o si el verificador reporta diferencias)
+
+Uso:
+    # Verificar consistencia (exit code 1 si hay diferencias)
+    python -m app.scripts.estadisticas_montos --verificar
+
+    # Reconstruir la tabla completa
+    python -m app.scripts.estadisticas_montos --reconstruir
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app.db.session import create_db_engine
+from app.services import estadisticas_montos
+
+
+def get_db():
+    """Obtiene sesión de base de datos."""
+    engine = create_db_engine()
+    SessionLocal = sessionmaker(bind=engine)
+    return SessionLocal(), engine
+
+
+def _resumen(estadisticas) -> str:
+    if estadisticas is None:
+        return "-"
+    return f"({estadisticas.n}, {estadisticas.montos.media:.2f})"
+
+
+def verificar(db) -> bool:
+    """Muestra el resultado del verificador de consistencia."""
+    resultado = estadisticas_montos.verificar_consistencia(db)
+
+    print("\n" + "="*90)
+    print("CONSISTENCIA - ESTADISTICAS_MONTOS")
+    print("="*90)
+    print(f"{'Grupos esperados':<25} {resultado['grupos_esperados']}")
+    print(f"{'Filas en la tabla':<25} {resultado['grupos_materializados']}")
+    print(f"{'Diferencias':<25} {resultado['diferencias']}")
+
+    if resultado["ejemplos"]:
+        print("\n(proveedor, concepto_hash, año, mes) -> esperado | tabla (n, media)")
+        for clave, esperado, tabla in resultado["ejemplos"]:
+            print(f"   {clave} -> {_resumen(esperado)} | {_resumen(tabla)}")
+
+    print("-"*90)
+    print("CONSISTENTE" if resultado["consistente"] else "INCONSISTENTE: ejecutar --reconstruir")
+    print("="*90 + "\n")
+
+    return resultado["consistente"]
+
+
+def reconstruir(db) -> None:
+    """Reconstruye la tabla en una sola transacción."""
+    print("\nReconstruyendo estadisticas_montos...")
+    try:
+        filas = estadisticas_montos.reconstruir(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"   {filas} filas (proveedor, concepto_hash, año, mes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mantenimiento de estadisticas_montos"
+    )
+
+    parser.add_argument(
+        '--verificar',
+        action='store_true',
+        help='Comparar la tabla contra facturas'
+    )
+
+    parser.add_argument(
+        '--reconstruir',
+        action='store_true',
+        help='Reconstruir la tabla completa'
+    )
+
+    args = parser.parse_args()
+
+    # Si no se pasa ningún argumento, mostrar ayuda
+    if not any(vars(args).values()):
+        parser.print_help()
+        return
+
+    db, engine = get_db()
+
+    try:
+        if args.reconstruir:
+            reconstruir(db)
+
+        if args.verificar and not verificar(db):
+            sys.exit(1)
+
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    main()
@@ -0,0 +1,112 @@
+"""
+Script de mantenimiento de item_precio_historico (Welford del precio unitario por proveedor/item/mes).
+
+Funciones:
+1. Verificar que la tabla coincide con el historial calculado en vivo desde factura_items
+2. Reconstruirla completa (tras cargas masivas con SQL directo o si el verificador reporta diferencias)
+
+Uso:
+    # Verificar consistencia (exit code 1 si hay diferencias)
+    python -m app.scripts.item_precio_historico --verificar
+
+    # Reconstruir la tabla completa
+    python -m app.scripts.item_precio_historico --reconstruir
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app.db.session import create_db_engine
+from app.services import item_precio_historico
+
+
+def get_db():
+    """Obtiene sesión de base de datos."""
+    engine = create_db_engine()
+    SessionLocal = sessionmaker(bind=engine)
+    return SessionLocal(), engine
+
+
+def _resumen(historial) -> str:
+    if historial is None:
+        return "-"
+    return f"({historial.n}, {historial.precios.media:.2f})"
+
+
+def verificar(db) -> bool:
+    """Muestra el resultado del verificador de consistencia."""
+    resultado = item_precio_historico.verificar_consistencia(db)
+
+    print("\n" + "="*90)
+    print("CONSISTENCIA - ITEM_PRECIO_HISTORICO")
+    print("="*90)
+    print(f"{'Grupos esperados':<25} {resultado['grupos_esperados']}")
+    print(f"{'Filas en la tabla':<25} {resultado['grupos_materializados']}")
+    print(f"{'Diferencias':<25} {resultado['diferencias']}")
+
+    if resultado["ejemplos"]:
+        print("\n(proveedor, item_hash, año, mes) -> esperado | tabla (n, precio medio)")
+        for clave, esperado, tabla in resultado["ejemplos"]:
+            print(f"   {clave} -> {_resumen(esperado)} | {_resumen(tabla)}")
+
+    print("-"*90)
+    print("CONSISTENTE" if resultado["consistente"] else "INCONSISTENTE: ejecutar --reconstruir")
+    print("="*90 + "\n")
+
+    return resultado["consistente"]
+
+
+def reconstruir(db) -> None:
+    """Reconstruye la tabla en una sola transacción."""
+    print("\nReconstruyendo item_precio_historico...")
+    try:
+        filas = item_precio_historico.reconstruir(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"   {filas} filas (proveedor, item_hash, año, mes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mantenimiento de item_precio_historico"
+    )
+
+    parser.add_argument(
+        '--verificar',
+        action='store_true',
+        help='Comparar la tabla contra factura_items'
+    )
+
+    parser.add_argument(
+        '--reconstruir',
+        action='store_true',
+        help='Reconstruir la tabla completa'
+    )
+
+    args = parser.parse_args()
+
+    # Si no se pasa ningún argumento, mostrar ayuda
+    if not any(vars(args).values()):
+        parser.print_help()
+        return
+
+    db, engine = get_db()
+
+    try:
+        if args.reconstruir:
+            reconstruir(db)
+
+        if args.verificar and not verificar(db):
+            sys.exit(1)
+
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    main()
@@ -22,14 +22,14 @@ Uso:
 
 import argparse
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from app.db.session import create_db_engine
 
 
 def get_db():
     """Obtiene sesión de base de datos."""
-    engine = create_engine(settings.database_url)
+    engine = create_db_engine()
     SessionLocal = sessionmaker(bind=engine)
     return SessionLocal(), engine
 
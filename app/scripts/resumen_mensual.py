@@ -0,0 +1,106 @@
+"""
+Script de mantenimiento del rollup facturas_resumen_mensual.
+
+Funciones:
+1. Verificar que el rollup coincide con el agregado en vivo de facturas
+2. Reconstruirlo completo (tras cargas masivas con SQL directo o si el verificador reporta diferencias)
+
+Uso:
+    # Verificar consistencia (exit code 1 si hay diferencias)
+    python -m app.scripts.resumen_mensual --verificar
+
+    # Reconstruir rollup completo
+    python -m app.scripts.resumen_mensual --reconstruir
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app.db.session import create_db_engine
+from app.services import resumen_mensual
+
+
+def get_db():
+    """Obtiene sesión de base de datos."""
+    engine = create_db_engine()
+    SessionLocal = sessionmaker(bind=engine)
+    return SessionLocal(), engine
+
+
+def verificar(db) -> bool:
+    """Muestra el resultado del verificador de consistencia."""
+    resultado = resumen_mensual.verificar_consistencia(db)
+
+    print("\n" + "="*90)
+    print("CONSISTENCIA - FACTURAS_RESUMEN_MENSUAL")
+    print("="*90)
+    print(f"{'Grupos esperados':<25} {resultado['grupos_esperados']}")
+    print(f"{'Grupos en rollup':<25} {resultado['grupos_materializados']}")
+    print(f"{'Diferencias':<25} {resultado['diferencias']}")
+
+    if resultado["ejemplos"]:
+        print("\n(año, mes, proveedor, estado) -> esperado | rollup")
+        for clave, esperado, rollup in resultado["ejemplos"]:
+            print(f"   {clave} -> {esperado} | {rollup}")
+
+    print("-"*90)
+    print("CONSISTENTE" if resultado["consistente"] else "INCONSISTENTE: ejecutar --reconstruir")
+    print("="*90 + "\n")
+
+    return resultado["consistente"]
+
+
+def reconstruir(db) -> None:
+    """Reconstruye el rollup en una sola transacción."""
+    print("\nReconstruyendo facturas_resumen_mensual...")
+    try:
+        filas = resumen_mensual.reconstruir(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"   {filas} filas (año, mes, proveedor, estado)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mantenimiento del rollup facturas_resumen_mensual"
+    )
+
+    parser.add_argument(
+        '--verificar',
+        action='store_true',
+        help='Comparar el rollup contra facturas'
+    )
+
+    parser.add_argument(
+        '--reconstruir',
+        action='store_true',
+        help='Reconstruir el rollup completo'
+    )
+
+    args = parser.parse_args()
+
+    # Si no se pasa ningún argumento, mostrar ayuda
+    if not any(vars(args).values()):
+        parser.print_help()
+        return
+
+    db, engine = get_db()
+
+    try:
+        if args.reconstruir:
+            reconstruir(db)
+
+        if args.verificar and not verificar(db):
+            sys.exit(1)
+
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    main()
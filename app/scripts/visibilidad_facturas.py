@@ -0,0 +1,108 @@
+"""
+Script de mantenimiento de la tabla materializada factura_visibilidad.
+
+Funciones:
+1. Verificar que la tabla coincide con workflows + asignaciones NIT activas
+2. Reconstruirla completa (tras cargas masivas o si el verificador reporta diferencias)
+
+Uso:
+    # Verificar consistencia (exit code 1 si hay diferencias)
+    python -m app.scripts.visibilidad_facturas --verificar
+
+    # Reconstruir tabla completa
+    python -m app.scripts.visibilidad_facturas --reconstruir
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from sqlalchemy.orm import sessionmaker
+from app.db.session import create_db_engine
+from app.services import visibilidad_facturas
+
+
+def get_db():
+    """Obtiene sesión de base de datos."""
+    engine = create_db_engine()
+    SessionLocal = sessionmaker(bind=engine)
+    return SessionLocal(), engine
+
+
+def verificar(db) -> bool:
+    """Muestra el resultado del verificador de consistencia."""
+    resultado = visibilidad_facturas.verificar_consistencia(db)
+
+    print("\n" + "="*70)
+    print("CONSISTENCIA - FACTURA_VISIBILIDAD")
+    print("="*70)
+    print(f"{'Filas esperadas':<25} {resultado['esperadas']}")
+    print(f"{'Filas materializadas':<25} {resultado['materializadas']}")
+    print(f"{'Faltantes':<25} {resultado['faltantes']}")
+    print(f"{'Sobrantes':<25} {resultado['sobrantes']}")
+
+    for titulo, clave in (("Faltantes", "ejemplos_faltantes"), ("Sobrantes", "ejemplos_sobrantes")):
+        if resultado[clave]:
+            print(f"\n{titulo} (usuario_id, origen, factura_id):")
+            for fila in resultado[clave]:
+                print(f"   {fila}")
+
+    print("-"*70)
+    print("CONSISTENTE" if resultado["consistente"] else "INCONSISTENTE: ejecutar --reconstruir")
+    print("="*70 + "\n")
+
+    return resultado["consistente"]
+
+
+def reconstruir(db) -> None:
+    """Reconstruye la tabla en una sola transacción."""
+    print("\nReconstruyendo factura_visibilidad...")
+    try:
+        totales = visibilidad_facturas.reconstruir(db)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    print(f"   {totales['workflow']} filas por workflow, {totales['nit']} filas por NIT")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mantenimiento de la tabla factura_visibilidad"
+    )
+
+    parser.add_argument(
+        '--verificar',
+        action='store_true',
+        help='Comparar la tabla contra las tablas fuente'
+    )
+
+    parser.add_argument(
+        '--reconstruir',
+        action='store_true',
+        help='Reconstruir la tabla completa'
+    )
+
+    args = parser.parse_args()
+
+    # Si no se pasa ningún argumento, mostrar ayuda
+    if not any(vars(args).values()):
+        parser.print_help()
+        return
+
+    db, engine = get_db()
+
+    try:
+        if args.reconstruir:
+            reconstruir(db)
+
+        if args.verificar and not verificar(db):
+            sys.exit(1)
+
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    print(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    main()
@@ -11,12 +11,14 @@ from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from decimal import Decimal
-import statistics
 import hashlib
 
 from app.models.factura import Factura
 from app.models.patrones_facturas import PatronesFacturas, TipoPatron
 from app.models.proveedor import Proveedor
+from app.services import estadisticas_montos, regeneracion_patrones
+from app.services.estadisticas_montos import ESTADOS_HISTORIAL, Acumulador, EstadisticasMontos
+from app.services.regeneracion_patrones import GrupoFacturas
 
 
 class AnalizadorPatrones:
@@ -60,7 +62,8 @@ class AnalizadorPatrones:
         proveedor_id: int,
         concepto_hash: str,
         meses_atras: int = 12,
-        excluir_factura_id: Optional[int] = None
+        excluir_factura_id: Optional[int] = None,
+        limit: Optional[int] = None
     ) -> List[Factura]:
         """
         Obtiene facturas históricas del mismo proveedor y concepto.
@@ -70,6 +73,7 @@ class AnalizadorPatrones:
             concepto_hash: Hash del concepto normalizado
             meses_atras: Cantidad de meses hacia atrás a analizar
             excluir_factura_id: ID de factura a excluir (la actual)
+            limit: Máximo de facturas (las más recientes)
         """
         fecha_limite = datetime.now() - timedelta(days=meses_atras * 30)
 
@@ -78,14 +82,17 @@ class AnalizadorPatrones:
                 Factura.proveedor_id == proveedor_id,
                 Factura.concepto_hash == concepto_hash,
                 Factura.fecha_emision >= fecha_limite,
-                Factura.estado.in_(["aprobada", "aprobada_auto"])  # Solo facturas aprobadas
+                Factura.estado.in_(ESTADOS_HISTORIAL)  # Solo facturas aprobadas
             )
         )
 
         if excluir_factura_id:
             query = query.filter(Factura.id != excluir_factura_id)
 
-        return query.order_by(Factura.fecha_emision.desc()).all()
+        query = query.order_by(Factura.fecha_emision.desc())
+        if limit:
+            query = query.limit(limit)
+        return query.all()
 
     def calcular_estadisticas(self, montos: List[Decimal]) -> Dict:
         """
@@ -94,7 +101,21 @@ class AnalizadorPatrones:
         Returns:
             Dict con promedio, min, max, desviación, CV, rangos
         """
-        if not montos:
+        acumulado = Acumulador()
+        for monto in montos:
+            acumulado.agregar(float(monto))
+        return self.estadisticas_desde_historial(EstadisticasMontos(
+            montos=acumulado,
+            minimo=min(montos, default=None),
+            maximo=max(montos, default=None),
+        ))
+
+    def estadisticas_desde_historial(self, historial: EstadisticasMontos) -> Dict:
+        """
+        Mismo resultado que calcular_estadisticas, a partir de estadísticas ya
+        acumuladas (estadisticas_montos).
+        """
+        if not historial.n:
             return {
                 "promedio": Decimal(0),
                 "minimo": Decimal(0),
@@ -105,21 +126,9 @@ class AnalizadorPatrones:
                 "rango_superior": Decimal(0),
             }
 
-        # Convertir a float para cálculos estadísticos
-        montos_float = [float(m) for m in montos]
-
-        promedio = statistics.mean(montos_float)
-        minimo = min(montos_float)
-        maximo = max(montos_float)
-
-        # Desviación estándar (solo si hay más de 1 valor)
-        if len(montos_float) > 1:
-            desviacion = statistics.stdev(montos_float)
-        else:
-            desviacion = 0
-
-        # Coeficiente de variación: (desv / promedio) * 100
-        cv = (desviacion / promedio * 100) if promedio > 0 else 0
+        montos: Acumulador = historial.montos
+        promedio = montos.media
+        desviacion = montos.desviacion
 
         # Rango esperado: promedio ± 2 * desviación (95% confianza)
         rango_inferior = max(0, promedio - 2 * desviacion)
@@ -127,10 +136,10 @@ class AnalizadorPatrones:
 
         return {
             "promedio": Decimal(str(round(promedio, 2))),
-            "minimo": Decimal(str(round(minimo, 2))),
-            "maximo": Decimal(str(round(maximo, 2))),
+            "minimo": Decimal(str(round(float(historial.minimo), 2))),
+            "maximo": Decimal(str(round(float(historial.maximo), 2))),
             "desviacion": Decimal(str(round(desviacion, 2))),
-            "cv": Decimal(str(round(cv, 2))),
+            "cv": Decimal(str(round(montos.cv, 2))),
             "rango_inferior": Decimal(str(round(rango_inferior, 2))),
             "rango_superior": Decimal(str(round(rango_superior, 2))),
         }
@@ -183,14 +192,11 @@ class AnalizadorPatrones:
         """
         concepto_hash = self.calcular_hash_concepto(concepto_normalizado)
 
-        # Obtener facturas históricas
-        facturas = self.obtener_facturas_historicas(
-            proveedor_id,
-            concepto_hash,
-            meses_atras=self.MESES_ANALISIS
-        )
+        # Estadísticas del historial (estadisticas_montos, sin releer facturas)
+        desde = (datetime.now() - timedelta(days=self.MESES_ANALISIS * 30)).date()
+        historial_montos = estadisticas_montos.de_concepto(self.db, proveedor_id, concepto_hash, desde=desde)
 
-        if not facturas:
+        if not historial_montos.n:
             # Sin historial = Tipo C
             if not guardar:
                 return None
@@ -214,20 +220,13 @@ class AnalizadorPatrones:
             self.db.commit()
             return historial
 
-        # Extraer montos y preparar datos
-        montos = [f.total for f in facturas if f.total]
-
-        # Contar meses únicos
-        periodos_unicos = set(f.periodo_factura for f in facturas if f.periodo_factura)
-        meses_con_pagos = len(periodos_unicos)
-
-        # Calcular estadísticas
-        stats = self.calcular_estadisticas(montos)
+        meses_con_pagos = historial_montos.meses
+        stats = self.estadisticas_desde_historial(historial_montos)
 
         # Clasificar patrón
         tipo = self.clasificar_patron(
             stats["cv"],
-            len(montos),
+            historial_montos.n,
             meses_con_pagos
         )
 
@@ -235,16 +234,14 @@ class AnalizadorPatrones:
         # Tipo A siempre puede, Tipo B con baja variación puede
         puede_aprobar = 1 if tipo in [TipoPatron.TIPO_A, TipoPatron.TIPO_B] else 0
 
-        # Preparar detalle de pagos (últimos 12)
-        pagos_detalle = [
-            {
-                "periodo": f.periodo_factura,
-                "monto": float(f.total),
-                "factura_id": f.id,
-                "fecha": f.fecha_emision.isoformat() if f.fecha_emision else None,
-            }
-            for f in facturas[:12]
-        ]
+        # Preparar detalle de pagos (últimos 12): única lectura de facturas
+        facturas = self.obtener_facturas_historicas(
+            proveedor_id,
+            concepto_hash,
+            meses_atras=self.MESES_ANALISIS,
+            limit=12
+        )
+        pagos_detalle = [self._pago_detalle(f.id, f.fecha_emision, f.total_a_pagar) for f in facturas]
 
         # Último pago
         ultimo = facturas[0] if facturas else None
@@ -260,7 +257,7 @@ class AnalizadorPatrones:
         if historial_existente:
             # Actualizar existente
             historial_existente.tipo_patron = tipo
-            historial_existente.pagos_analizados = len(montos)
+            historial_existente.pagos_analizados = historial_montos.n
             historial_existente.meses_con_pagos = meses_con_pagos
             historial_existente.monto_promedio = stats["promedio"]
             historial_existente.monto_minimo = stats["minimo"]
@@ -272,7 +269,7 @@ class AnalizadorPatrones:
             historial_existente.puede_aprobar_auto = puede_aprobar
             historial_existente.pagos_detalle = pagos_detalle
             historial_existente.ultimo_pago_fecha = ultimo.fecha_emision if ultimo else None
-            historial_existente.ultimo_pago_monto = ultimo.total if ultimo else None
+            historial_existente.ultimo_pago_monto = ultimo.total_a_pagar if ultimo else None
             historial_existente.fecha_analisis = datetime.now()
             historial = historial_existente
         else:
@@ -282,7 +279,7 @@ class AnalizadorPatrones:
                 concepto_normalizado=concepto_normalizado,
                 concepto_hash=concepto_hash,
                 tipo_patron=tipo,
-                pagos_analizados=len(montos),
+                pagos_analizados=historial_montos.n,
                 meses_con_pagos=meses_con_pagos,
                 monto_promedio=stats["promedio"],
                 monto_minimo=stats["minimo"],
@@ -294,7 +291,7 @@ class AnalizadorPatrones:
                 puede_aprobar_auto=puede_aprobar,
                 pagos_detalle=pagos_detalle,
                 ultimo_pago_fecha=ultimo.fecha_emision if ultimo else None,
-                ultimo_pago_monto=ultimo.total if ultimo else None,
+                ultimo_pago_monto=ultimo.total_a_pagar if ultimo else None,
             )
             self.db.add(historial)
 
@@ -343,7 +340,7 @@ class AnalizadorPatrones:
             }
 
         # Evaluar según tipo de patrón
-        monto_factura = factura.total
+        monto_factura = factura.total_a_pagar
 
         if historial.tipo_patron == TipoPatron.TIPO_A:
             # Tipo A: Debe ser muy similar al promedio
@@ -422,41 +419,60 @@ class AnalizadorPatrones:
                 }
             }
 
-    def regenerar_todos_patrones(self, limit: Optional[int] = None):
+    def regenerar_todos_patrones(self, limit: Optional[int] = None, incremental: bool = False) -> Dict:
         """
         Regenera todos los patrones históricos analizando proveedores y conceptos únicos.
         Útil para inicialización o recalibración del sistema.
-        """
-        # Obtener todas las combinaciones únicas de proveedor + concepto
-        query = self.db.query(
-            Factura.proveedor_id,
-            Factura.concepto_normalizado
-        ).filter(
-            and_(
-                Factura.proveedor_id.isnot(None),
-                Factura.concepto_normalizado.isnot(None),
-                Factura.estado.in_(["aprobada", "aprobada_auto"])
-            )
-        ).distinct()
 
-        if limit:
-            query = query.limit(limit)
+        Lee las facturas de la ventana en una sola pasada (regeneracion_patrones)
+        en vez de una consulta por combinación proveedor-concepto.
 
-        combinaciones = query.all()
+        Args:
+            limit: Límite de combinaciones proveedor-concepto
+            incremental: Solo proveedores con facturas modificadas desde el último análisis
+        """
+        desde = (datetime.now() - timedelta(days=self.MESES_ANALISIS * 30)).date()
+        return regeneracion_patrones.regenerar(
+            self.db,
+            clave=lambda fila: fila.concepto_normalizado,
+            construir=self._patron_desde_grupo,
+            desde=desde,
+            estados=ESTADOS_HISTORIAL,
+            incremental=incremental,
+            limite=limit,
+        )
 
-        print(f"Regenerando patrones para {len(combinaciones)} combinaciones proveedor-concepto...")
+    def _patron_desde_grupo(self, grupo: GrupoFacturas) -> Dict:
+        """Mismos valores que analizar_proveedor_concepto, a partir del grupo acumulado."""
+        stats = self.estadisticas_desde_historial(grupo.estadisticas)
+        tipo = self.clasificar_patron(stats["cv"], grupo.n, len(grupo.meses))
+        _, ultima_fecha, ultimo_monto = grupo.ultimas[-1]
 
-        for i, (proveedor_id, concepto) in enumerate(combinaciones, 1):
-            try:
-                self.analizar_proveedor_concepto(
-                    proveedor_id,
-                    concepto,
-                    guardar=True
-                )
-                if i % 10 == 0:
-                    print(f"Procesados {i}/{len(combinaciones)}...")
-            except Exception as e:
-                print(f"Error procesando proveedor {proveedor_id}: {e}")
-                continue
+        return {
+            "proveedor_id": grupo.proveedor_id,
+            "concepto_normalizado": grupo.concepto_normalizado,
+            "concepto_hash": grupo.concepto_hash,
+            "tipo_patron": tipo,
+            "pagos_analizados": grupo.n,
+            "meses_con_pagos": len(grupo.meses),
+            "monto_promedio": stats["promedio"],
+            "monto_minimo": stats["minimo"],
+            "monto_maximo": stats["maximo"],
+            "desviacion_estandar": stats["desviacion"],
+            "coeficiente_variacion": stats["cv"],
+            "rango_inferior": stats["rango_inferior"],
+            "rango_superior": stats["rango_superior"],
+            "puede_aprobar_auto": 1 if tipo in [TipoPatron.TIPO_A, TipoPatron.TIPO_B] else 0,
+            "pagos_detalle": [self._pago_detalle(*pago) for pago in reversed(grupo.ultimas)],
+            "ultimo_pago_fecha": ultima_fecha,
+            "ultimo_pago_monto": ultimo_monto,
+        }
 
-        print("Regeneración completada.")
+    def _pago_detalle(self, factura_id: int, fecha, monto: Decimal) -> Dict:
+        """Elemento de pagos_detalle."""
+        return {
+            "periodo": fecha.strftime("%Y-%m") if fecha else None,
+            "monto": float(monto),
+            "factura_id": factura_id,
+            "fecha": fecha.isoformat() if fecha else None,
+        }
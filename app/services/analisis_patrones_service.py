@@ -15,20 +15,18 @@ Este es el componente de PRODUCCIÓN que reemplaza al bootstrap inicial del Exce
 Fecha: 2025-10-08
 """
 
-import hashlib
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from decimal import Decimal
-from collections import defaultdict
-import statistics
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
 
 from app.models.factura import Factura, EstadoFactura
 from app.models.patrones_facturas import PatronesFacturas, TipoPatron
-from app.models.proveedor import Proveedor
+from app.services import regeneracion_patrones
+from app.services.estadisticas_montos import Acumulador
+from app.services.regeneracion_patrones import GrupoFacturas
 
 
 # Configurar logging
@@ -79,7 +77,8 @@ class AnalizadorPatronesService:
         ventana_meses: int = 12,
         solo_proveedores: Optional[List[int]] = None,
         estados_facturas: Optional[List[EstadoFactura]] = None,
-        forzar_recalculo: bool = False
+        forzar_recalculo: bool = False,
+        incremental: bool = False
     ) -> Dict[str, Any]:
         """
         Analiza facturas de la BD y actualiza patrones en patrones_facturas.
@@ -89,6 +88,7 @@ class AnalizadorPatronesService:
             solo_proveedores: Lista de IDs de proveedores a analizar (None = todos)
             estados_facturas: Estados de facturas a considerar (None = aprobadas y pagadas)
             forzar_recalculo: Si True, recalcula todos los patrones incluso si ya existen
+            incremental: Solo proveedores con facturas modificadas desde el último análisis
 
         Returns:
             Diccionario con resultados del análisis
@@ -96,41 +96,45 @@ class AnalizadorPatronesService:
         logger.info(f"Iniciando análisis de patrones desde BD (ventana: {ventana_meses} meses)")
 
         try:
-            # 1. Obtener facturas relevantes
+            # 1-4. Leer facturas en una pasada, agrupar, calcular y persistir por lotes
             fecha_desde = datetime.now() - timedelta(days=ventana_meses * 30)
 
             if estados_facturas is None:
                 estados_facturas = [EstadoFactura.aprobada, EstadoFactura.aprobada_auto]
 
-            facturas = self._obtener_facturas_para_analisis(
-                fecha_desde=fecha_desde,
+            resultado = regeneracion_patrones.regenerar(
+                self.db,
+                clave=self._clave_grupo,
+                construir=self._patron_desde_grupo,
+                desde=fecha_desde.date(),
+                estados=estados_facturas,
+                incremental=incremental,
                 solo_proveedores=solo_proveedores,
-                estados=estados_facturas
+                hay_cambios=None if forzar_recalculo else self._hay_cambios_significativos
             )
+            patrones_calculados = resultado['patrones']
+
+            self.stats['facturas_analizadas'] = resultado['facturas_leidas']
+            self.stats['patrones_detectados'] = len(patrones_calculados)
+            self.stats['patrones_nuevos'] = resultado['nuevos']
+            self.stats['patrones_actualizados'] = resultado['actualizados']
+            for tipo_anterior, tipo_nuevo in resultado['cambios_tipo']:
+                if self._es_mejora_patron(tipo_anterior, tipo_nuevo):
+                    self.stats['patrones_mejorados'] += 1
+                else:
+                    self.stats['patrones_degradados'] += 1
 
-            logger.info(f"     {len(facturas)} facturas obtenidas para análisis")
-            self.stats['facturas_analizadas'] = len(facturas)
-
-            if len(facturas) < self.MIN_FACTURAS_PATRON:
-                logger.warning("Insuficientes facturas para análisis de patrones")
-                return self._generar_resultado(exito=False, mensaje="Insuficientes facturas")
-
-            # 2. Agrupar facturas por proveedor + concepto
-            grupos = self._agrupar_facturas_por_patron(facturas)
-            logger.info(f"     {len(grupos)} grupos de patrones detectados")
-
-            # 3. Calcular estadísticas para cada grupo
-            patrones_calculados = self._calcular_estadisticas_grupos(grupos, ventana_meses)
-            logger.info(f"     Estadísticas calculadas para {len(patrones_calculados)} patrones")
-
-            # 4. Persistir o actualizar patrones
-            self._persistir_patrones(patrones_calculados, forzar_recalculo)
+            logger.info(f"     {resultado['facturas_leidas']} facturas leídas, {resultado['grupos']} grupos")
             logger.info(
                 "Patrones persistidos: %d nuevos, %d actualizados",
                 self.stats['patrones_nuevos'],
                 self.stats['patrones_actualizados']
             )
 
+            if not incremental and resultado['facturas_leidas'] < self.MIN_FACTURAS_PATRON:
+                logger.warning("Insuficientes facturas para análisis de patrones")
+                return self._generar_resultado(exito=False, mensaje="Insuficientes facturas")
+
             # 5. Analizar cambios en patrones existentes
             cambios_detectados = self._detectar_cambios_patrones(patrones_calculados)
 
@@ -141,69 +145,13 @@ class AnalizadorPatronesService:
             )
 
         except Exception as e:
+            self.db.rollback()
             logger.error(f"Error en análisis de patrones: {str(e)}")
             return self._generar_resultado(
                 exito=False,
                 mensaje=f"Error: {str(e)}"
             )
 
-    def _obtener_facturas_para_analisis(
-        self,
-        fecha_desde: datetime,
-        solo_proveedores: Optional[List[int]],
-        estados: List[EstadoFactura]
-    ) -> List[Factura]:
-        """
-        Obtiene facturas de la BD que cumplen criterios para análisis.
-        """
-        query = self.db.query(Factura).filter(
-            Factura.fecha_emision >= fecha_desde.date(),
-            Factura.estado.in_(estados),
-            Factura.total_a_pagar.isnot(None),
-            Factura.total_a_pagar > 0,
-            Factura.proveedor_id.isnot(None)
-        )
-
-        if solo_proveedores:
-            query = query.filter(Factura.proveedor_id.in_(solo_proveedores))
-
-        # Ordenar por fecha para análisis temporal
-        facturas = query.order_by(Factura.fecha_emision.asc()).all()
-
-        return facturas
-
-    def _agrupar_facturas_por_patron(self, facturas: List[Factura]) -> Dict[str, List[Factura]]:
-        """
-        Agrupa facturas por proveedor + concepto normalizado.
-
-        Estrategia de agrupación:
-        1. Si existe concepto_normalizado → usar ese
-        2. Si existe concepto_hash → usar ese
-        3. Si no → generar hash del concepto_principal
-        """
-        grupos = defaultdict(list)
-
-        for factura in facturas:
-            # Obtener o generar concepto normalizado
-            concepto_normalizado = self._obtener_concepto_normalizado(factura)
-
-            if not concepto_normalizado:
-                # Si no hay concepto, agrupar solo por proveedor (patrón genérico)
-                concepto_normalizado = "servicio_general"
-
-            # Generar clave única: proveedor_id|concepto_normalizado
-            key = f"{factura.proveedor_id}|{concepto_normalizado}"
-            grupos[key].append(factura)
-
-        # Filtrar grupos que no cumplan mínimos
-        grupos_validos = {
-            key: facturas_grupo
-            for key, facturas_grupo in grupos.items()
-            if len(facturas_grupo) >= self.MIN_FACTURAS_PATRON
-        }
-
-        return grupos_validos
-
     def _obtener_concepto_normalizado(self, factura: Factura) -> Optional[str]:
         """
         Obtiene o genera el concepto normalizado de una factura.
@@ -223,129 +171,89 @@ class AnalizadorPatronesService:
         # Si no hay concepto, retornar None
         return None
 
-    def _calcular_estadisticas_grupos(
-        self,
-        grupos: Dict[str, List[Factura]],
-        ventana_meses: int
-    ) -> List[Dict[str, Any]]:
-        """
-        Calcula estadísticas detalladas para cada grupo de facturas.
+    def _clave_grupo(self, fila: Any) -> str:
         """
-        patrones_calculados = []
+        Concepto de agrupación de una factura (proveedor + concepto).
 
-        for key, facturas_grupo in grupos.items():
-            try:
-                proveedor_id_str, concepto_normalizado = key.split('|', 1)
-                proveedor_id = int(proveedor_id_str)
-
-                # Extraer montos y fechas
-                montos = [float(f.total_a_pagar) for f in facturas_grupo if f.total_a_pagar]
-                fechas = [f.fecha_emision for f in facturas_grupo]
+        Si no hay concepto, se agrupa solo por proveedor (patrón genérico).
+        """
+        return self._obtener_concepto_normalizado(fila) or "servicio_general"
 
-                if len(montos) < self.MIN_FACTURAS_PATRON:
-                    continue
+    def _patron_desde_grupo(self, grupo: GrupoFacturas) -> Optional[Dict[str, Any]]:
+        """
+        Calcula las estadísticas de un grupo de facturas y el patrón a persistir.
 
-                # Calcular meses únicos
-                meses_unicos = set((f.year, f.month) for f in fechas)
+        Returns:
+            Valores de patrones_facturas, o None si el grupo no cumple los mínimos
+        """
+        if grupo.n < self.MIN_FACTURAS_PATRON or len(grupo.meses) < self.MIN_MESES_DIFERENTES:
+            return None
+
+        # Estadísticas básicas (acumuladas en la lectura, Welford)
+        montos = grupo.estadisticas.montos
+        monto_promedio = Decimal(str(montos.media))
+        desviacion_std = Decimal(str(montos.desviacion))
+
+        # Coeficiente de variación (CV%)
+        cv = (desviacion_std / monto_promedio * 100) if monto_promedio > 0 else Decimal('0')
+
+        # Clasificar tipo de patrón
+        if cv < self.UMBRAL_TIPO_A:
+            tipo_patron = TipoPatron.TIPO_A
+        elif cv < self.UMBRAL_TIPO_B:
+            tipo_patron = TipoPatron.TIPO_B
+        else:
+            tipo_patron = TipoPatron.TIPO_C
+
+        # Determinar si puede aprobar automáticamente
+        puede_aprobar_auto = self._puede_aprobar_automaticamente(
+            tipo_patron=tipo_patron,
+            cantidad_facturas=grupo.n,
+            meses_diferentes=len(grupo.meses),
+            cv=cv
+        )
 
-                if len(meses_unicos) < self.MIN_MESES_DIFERENTES:
-                    continue
+        # Calcular rangos para TIPO_B
+        rango_inferior = None
+        rango_superior = None
+        if tipo_patron == TipoPatron.TIPO_B:
+            rango_inferior = max(Decimal('0'), monto_promedio - (2 * desviacion_std))
+            rango_superior = monto_promedio + (2 * desviacion_std)
 
-                # Estadísticas básicas
-                monto_promedio = Decimal(str(statistics.mean(montos)))
-                monto_minimo = Decimal(str(min(montos)))
-                monto_maximo = Decimal(str(max(montos)))
-                desviacion_std = Decimal(str(statistics.stdev(montos))) if len(montos) > 1 else Decimal('0')
+        # Última factura (para tracking)
+        _, ultima_fecha, ultimo_monto = grupo.ultimas[-1]
 
-                # Coeficiente de variación (CV%)
-                cv = (desviacion_std / monto_promedio * 100) if monto_promedio > 0 else Decimal('0')
+        return {
+            'proveedor_id': grupo.proveedor_id,
+            'concepto_normalizado': grupo.concepto_normalizado,
+            'concepto_hash': grupo.concepto_hash,
+            'tipo_patron': tipo_patron,
+            'pagos_analizados': grupo.n,
+            'meses_con_pagos': len(grupo.meses),
+            'monto_promedio': monto_promedio,
+            'monto_minimo': grupo.estadisticas.minimo,
+            'monto_maximo': grupo.estadisticas.maximo,
+            'desviacion_estandar': desviacion_std,
+            'coeficiente_variacion': cv,
+            'rango_inferior': rango_inferior,
+            'rango_superior': rango_superior,
+            'frecuencia_detectada': self._detectar_frecuencia_temporal(grupo.estadisticas.intervalos),
+            'ultimo_pago_fecha': ultima_fecha,
+            'ultimo_pago_monto': ultimo_monto,
+            'puede_aprobar_auto': 1 if puede_aprobar_auto else 0,
+            'umbral_alerta': self._calcular_umbral_alerta(tipo_patron, cv),
+            'version_algoritmo': "2.0"  # Versión de producción
+        }
 
-                # Clasificar tipo de patrón
-                if cv < self.UMBRAL_TIPO_A:
-                    tipo_patron = TipoPatron.TIPO_A
-                elif cv < self.UMBRAL_TIPO_B:
-                    tipo_patron = TipoPatron.TIPO_B
-                else:
-                    tipo_patron = TipoPatron.TIPO_C
-
-                # Análisis de frecuencia temporal
-                frecuencia_detectada = self._detectar_frecuencia_temporal(fechas)
-
-                # Determinar si puede aprobar automáticamente
-                puede_aprobar_auto = self._puede_aprobar_automaticamente(
-                    tipo_patron=tipo_patron,
-                    cantidad_facturas=len(facturas_grupo),
-                    meses_diferentes=len(meses_unicos),
-                    cv=cv
-                )
-
-                # Calcular rangos para TIPO_B
-                rango_inferior = None
-                rango_superior = None
-                if tipo_patron == TipoPatron.TIPO_B:
-                    rango_inferior = max(Decimal('0'), monto_promedio - (2 * desviacion_std))
-                    rango_superior = monto_promedio + (2 * desviacion_std)
-
-                # Umbral de alerta
-                umbral_alerta = self._calcular_umbral_alerta(tipo_patron, cv)
-
-                # Generar hash del concepto
-                concepto_hash = hashlib.md5(concepto_normalizado.encode('utf-8')).hexdigest()
-
-                # Última factura (para tracking)
-                ultima_factura = max(facturas_grupo, key=lambda f: f.fecha_emision)
-
-                # Construir patrón
-                patron = {
-                    'proveedor_id': proveedor_id,
-                    'concepto_normalizado': concepto_normalizado,
-                    'concepto_hash': concepto_hash,
-                    'tipo_patron': tipo_patron,
-                    'pagos_analizados': len(facturas_grupo),
-                    'meses_con_pagos': len(meses_unicos),
-                    'monto_promedio': monto_promedio,
-                    'monto_minimo': monto_minimo,
-                    'monto_maximo': monto_maximo,
-                    'desviacion_estandar': desviacion_std,
-                    'coeficiente_variacion': cv,
-                    'rango_inferior': rango_inferior,
-                    'rango_superior': rango_superior,
-                    'frecuencia_detectada': frecuencia_detectada,
-                    'ultimo_pago_fecha': ultima_factura.fecha_emision,
-                    'ultimo_pago_monto': ultima_factura.total_a_pagar,
-                    'puede_aprobar_auto': 1 if puede_aprobar_auto else 0,
-                    'umbral_alerta': umbral_alerta,
-                    'facturas_ids': [f.id for f in facturas_grupo],
-                    'ventana_meses': ventana_meses
-                }
-
-                patrones_calculados.append(patron)
-                self.stats['patrones_detectados'] += 1
-
-            except Exception as e:
-                logger.error(f"Error calculando estadísticas para grupo {key}: {str(e)}")
-                self.stats['errores'] += 1
-
-        return patrones_calculados
-
-    def _detectar_frecuencia_temporal(self, fechas: List[datetime]) -> str:
+    def _detectar_frecuencia_temporal(self, intervalos: Acumulador) -> str:
         """
-        Detecta la frecuencia temporal del patrón (mensual, quincenal, etc).
+        Detecta la frecuencia temporal del patrón (mensual, quincenal, etc)
+        a partir de los días entre facturas consecutivas.
         """
-        if len(fechas) < 2:
-            return "unica"
-
-        # Calcular diferencias entre fechas consecutivas
-        fechas_ordenadas = sorted(fechas)
-        diferencias_dias = [
-            (fechas_ordenadas[i+1] - fechas_ordenadas[i]).days
-            for i in range(len(fechas_ordenadas) - 1)
-        ]
-
-        if not diferencias_dias:
+        if not intervalos.n:
             return "unica"
 
-        promedio_dias = statistics.mean(diferencias_dias)
+        promedio_dias = intervalos.media
 
         # Clasificar frecuencia
         if promedio_dias <= 10:
@@ -398,55 +306,6 @@ class AnalizadorPatronesService:
         else:  # TIPO_C
             return Decimal('50.0')  # 50% para valores excepcionales
 
-    def _persistir_patrones(
-        self,
-        patrones: List[Dict[str, Any]],
-        forzar_recalculo: bool
-    ) -> None:
-        """
-        Persiste o actualiza patrones en patrones_facturas.
-        """
-        for patron in patrones:
-            try:
-                # Buscar patrón existente
-                patron_existente = self.db.query(PatronesFacturas).filter(
-                    PatronesFacturas.proveedor_id == patron['proveedor_id'],
-                    PatronesFacturas.concepto_hash == patron['concepto_hash']
-                ).first()
-
-                if patron_existente:
-                    # Verificar si hay cambios significativos
-                    if forzar_recalculo or self._hay_cambios_significativos(patron_existente, patron):
-                        self._actualizar_patron(patron_existente, patron)
-                        self.stats['patrones_actualizados'] += 1
-
-                        # Detectar mejoras/degradaciones
-                        if patron_existente.tipo_patron != patron['tipo_patron']:
-                            if self._es_mejora_patron(patron_existente.tipo_patron, patron['tipo_patron']):
-                                self.stats['patrones_mejorados'] += 1
-                            else:
-                                self.stats['patrones_degradados'] += 1
-                else:
-                    # Crear nuevo patrón
-                    self._crear_patron(patron)
-                    self.stats['patrones_nuevos'] += 1
-
-                # Commit cada 20 patrones
-                if (self.stats['patrones_nuevos'] + self.stats['patrones_actualizados']) % 20 == 0:
-                    self.db.commit()
-
-            except Exception as e:
-                self.db.rollback()
-                logger.error(f"Error persistiendo patrón: {str(e)}")
-                self.stats['errores'] += 1
-
-        # Commit final
-        try:
-            self.db.commit()
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error en commit final: {str(e)}")
-
     def _hay_cambios_significativos(
         self,
         patron_existente: PatronesFacturas,
@@ -484,53 +343,6 @@ class AnalizadorPatronesService:
         jerarquia = {TipoPatron.TIPO_A: 3, TipoPatron.TIPO_B: 2, TipoPatron.TIPO_C: 1}
         return jerarquia[tipo_nuevo] > jerarquia[tipo_anterior]
 
-    def _crear_patron(self, patron: Dict[str, Any]) -> None:
-        """Crea un nuevo registro en patrones_facturas."""
-        nuevo_patron = PatronesFacturas(
-            proveedor_id=patron['proveedor_id'],
-            concepto_normalizado=patron['concepto_normalizado'],
-            concepto_hash=patron['concepto_hash'],
-            tipo_patron=patron['tipo_patron'],
-            pagos_analizados=patron['pagos_analizados'],
-            meses_con_pagos=patron['meses_con_pagos'],
-            monto_promedio=patron['monto_promedio'],
-            monto_minimo=patron['monto_minimo'],
-            monto_maximo=patron['monto_maximo'],
-            desviacion_estandar=patron['desviacion_estandar'],
-            coeficiente_variacion=patron['coeficiente_variacion'],
-            rango_inferior=patron['rango_inferior'],
-            rango_superior=patron['rango_superior'],
-            frecuencia_detectada=patron['frecuencia_detectada'],
-            ultimo_pago_fecha=patron['ultimo_pago_fecha'],
-            ultimo_pago_monto=patron['ultimo_pago_monto'],
-            puede_aprobar_auto=patron['puede_aprobar_auto'],
-            umbral_alerta=patron['umbral_alerta'],
-            fecha_analisis=datetime.utcnow(),
-            version_algoritmo="2.0"  # Versión de producción
-        )
-
-        self.db.add(nuevo_patron)
-
-    def _actualizar_patron(self, patron_existente: PatronesFacturas, patron_nuevo: Dict[str, Any]) -> None:
-        """Actualiza un patrón existente con nuevos datos."""
-        patron_existente.tipo_patron = patron_nuevo['tipo_patron']
-        patron_existente.pagos_analizados = patron_nuevo['pagos_analizados']
-        patron_existente.meses_con_pagos = patron_nuevo['meses_con_pagos']
-        patron_existente.monto_promedio = patron_nuevo['monto_promedio']
-        patron_existente.monto_minimo = patron_nuevo['monto_minimo']
-        patron_existente.monto_maximo = patron_nuevo['monto_maximo']
-        patron_existente.desviacion_estandar = patron_nuevo['desviacion_estandar']
-        patron_existente.coeficiente_variacion = patron_nuevo['coeficiente_variacion']
-        patron_existente.rango_inferior = patron_nuevo['rango_inferior']
-        patron_existente.rango_superior = patron_nuevo['rango_superior']
-        patron_existente.frecuencia_detectada = patron_nuevo['frecuencia_detectada']
-        patron_existente.ultimo_pago_fecha = patron_nuevo['ultimo_pago_fecha']
-        patron_existente.ultimo_pago_monto = patron_nuevo['ultimo_pago_monto']
-        patron_existente.puede_aprobar_auto = patron_nuevo['puede_aprobar_auto']
-        patron_existente.umbral_alerta = patron_nuevo['umbral_alerta']
-        patron_existente.fecha_analisis = datetime.utcnow()
-        patron_existente.version_algoritmo = "2.0"
-
     def _detectar_cambios_patrones(self, patrones: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Detecta y reporta cambios significativos en los patrones."""
         return {
@@ -6,17 +6,19 @@ Este módulo contiene toda la lógica para:
 - Detectar patrones de recurrencia
 - Generar fingerprints de facturas
 - Tomar decisiones automáticas
-- Procesar facturas pendientes
+- Procesar facturas pendientes (en paralelo por proveedor)
 """
 
 from .automation_service import AutomationService
 from .pattern_detector import PatternDetector
 from .fingerprint_generator import FingerprintGenerator
 from .decision_engine import DecisionEngine
+from .procesamiento_paralelo import ProcesadorParalelo
 
 __all__ = [
     "AutomationService",
     "PatternDetector", 
     "FingerprintGenerator",
-    "DecisionEngine"
+    "DecisionEngine",
+    "ProcesadorParalelo"
 ]
\ No newline at end of file
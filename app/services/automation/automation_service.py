@@ -15,8 +15,10 @@ INTEGRACIÓN CON PATRONES_FACTURAS:
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Tuple, Optional
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.models.factura import Factura, EstadoFactura
 from app.models.patrones_facturas import PatronesFacturas, TipoPatron
 from app.crud import factura as crud_factura
@@ -26,6 +28,7 @@ from app.crud import audit as crud_audit
 from .fingerprint_generator import FingerprintGenerator
 from .pattern_detector import PatternDetector, ResultadoAnalisisPatron
 from .decision_engine import DecisionEngine, ResultadoDecision, TipoDecision
+from .historial_precargado import HistorialBD, HistorialPrecargado
 
 
 # Configurar logging
@@ -56,7 +59,8 @@ class AutomationService:
         self, 
         db: Session, 
         limite_facturas: int = 50,
-        modo_debug: bool = False
+        modo_debug: bool = False,
+        en_lote: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
         Procesa todas las facturas pendientes de automatización.
@@ -65,12 +69,13 @@ class AutomationService:
             db: Sesión de base de datos
             limite_facturas: Máximo número de facturas a procesar
             modo_debug: Si True, incluye información detallada de debug
+            en_lote: Precargar el historial de todas las facturas en una
+                consulta y confirmar una sola vez al final. None = según
+                settings.automation_procesamiento_en_lote
             
         Returns:
             Resumen del procesamiento realizado
         """
-        self.stats['tiempo_inicio'] = datetime.utcnow()
-        
         try:
             # Obtener facturas pendientes de procesamiento
             facturas_pendientes = crud_factura.get_facturas_pendientes_procesamiento(
@@ -79,41 +84,100 @@ class AutomationService:
             
             logger.info(f"Iniciando procesamiento de {len(facturas_pendientes)} facturas pendientes")
             
-            resultados = []
-            
-            for factura in facturas_pendientes:
-                try:
-                    resultado = self.procesar_factura_individual(db, factura, modo_debug)
-                    resultados.append(resultado)
-                    self.stats['facturas_procesadas'] += 1
-                    
-                    # Actualizar estadísticas
-                    if resultado['decision'] == TipoDecision.APROBACION_AUTOMATICA.value:
-                        self.stats['aprobadas_automaticamente'] += 1
-                    else:
-                        self.stats['enviadas_revision'] += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error procesando factura {factura.id}: {str(e)}")
-                    self.stats['errores'] += 1
-                    
-                    # Registrar error en auditoría
-                    self._registrar_error_auditoria(db, factura, str(e))
-            
-            self.stats['tiempo_fin'] = datetime.utcnow()
-            
-            return self._generar_resumen_procesamiento(resultados, modo_debug)
+            return self.procesar_facturas(db, facturas_pendientes, modo_debug, en_lote)
             
         except Exception as e:
             logger.error(f"Error general en procesamiento de facturas: {str(e)}")
             self.stats['errores'] += 1
             raise
 
+    def procesar_facturas(
+        self,
+        db: Session,
+        facturas: List[Factura],
+        modo_debug: bool = False,
+        en_lote: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """
+        Procesa una lista de facturas ya cargadas en `db`, en orden.
+
+        Lo usan procesar_facturas_pendientes y cada worker del modo paralelo
+        (ver procesamiento_paralelo), con las facturas de sus proveedores.
+        """
+        self.stats['tiempo_inicio'] = datetime.utcnow()
+        if en_lote is None:
+            en_lote = settings.automation_procesamiento_en_lote
+        
+        resultados = None
+        
+        if en_lote and facturas:
+            try:
+                historial = HistorialPrecargado.cargar(
+                    db, facturas, self._concepto_hash_esperado
+                )
+                resultados, errores = self._procesar_facturas(
+                    db, facturas, modo_debug, historial
+                )
+                db.commit()
+            except SQLAlchemyError as e:
+                # Nada del lote quedó confirmado: reprocesar factura por factura
+                db.rollback()
+                logger.error(f"Error confirmando el lote, se reprocesa factura por factura: {str(e)}")
+                resultados = None
+        
+        if resultados is None:
+            resultados, errores = self._procesar_facturas(db, facturas, modo_debug)
+        
+        # Actualizar estadísticas
+        for resultado in resultados:
+            self.stats['facturas_procesadas'] += 1
+            if resultado['decision'] == TipoDecision.APROBACION_AUTOMATICA.value:
+                self.stats['aprobadas_automaticamente'] += 1
+            else:
+                self.stats['enviadas_revision'] += 1
+        self.stats['errores'] += errores
+        
+        self.stats['tiempo_fin'] = datetime.utcnow()
+        
+        return self._generar_resumen_procesamiento(resultados, modo_debug)
+
+    def _procesar_facturas(
+        self,
+        db: Session,
+        facturas: List[Factura],
+        modo_debug: bool,
+        historial: Optional[HistorialPrecargado] = None
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Procesa las facturas en orden.
+
+        Con historial precargado no se hace commit por factura: el caller
+        confirma el lote completo.
+
+        Returns:
+            (resultados, número de errores no controlados)
+        """
+        resultados = []
+        errores = 0
+        
+        for factura in facturas:
+            try:
+                resultados.append(self.procesar_factura_individual(db, factura, modo_debug, historial))
+            except Exception as e:
+                logger.error(f"Error procesando factura {factura.id}: {str(e)}")
+                errores += 1
+                
+                # Registrar error en auditoría
+                self._registrar_error_auditoria(db, factura, str(e), confirmar=historial is None)
+        
+        return resultados, errores
+
     def procesar_factura_individual(
         self, 
         db: Session, 
         factura: Factura,
-        modo_debug: bool = False
+        modo_debug: bool = False,
+        historial: Optional[HistorialPrecargado] = None
     ) -> Dict[str, Any]:
         """
         Procesa una factura individual para determinar si debe ser aprobada automáticamente.
@@ -122,10 +186,13 @@ class AutomationService:
             db: Sesión de base de datos
             factura: Factura a procesar
             modo_debug: Si incluir información detallada
+            historial: Historial precargado del lote. Si se pasa, la decisión
+                se toma en memoria y los cambios quedan en la sesión sin commit
             
         Returns:
             Resultado del procesamiento de la factura
         """
+        confirmar = historial is None
         logger.info(f"Procesando factura {factura.numero_factura} (ID: {factura.id})")
         
         try:
@@ -136,35 +203,19 @@ class AutomationService:
                 )
             
             # 2. Enriquecer datos de la factura si es necesario
-            self._enriquecer_datos_factura(db, factura)
+            self._enriquecer_datos_factura(db, factura, confirmar)
             
             # 3. Buscar facturas históricas similares
-            facturas_historicas = self._buscar_facturas_historicas(db, factura)
-
-            # 3.5. 🔑 NUEVA LÓGICA: Comparar con mes anterior (prioridad máxima)
-            factura_mes_anterior = facturas_historicas[0] if facturas_historicas else None
-            comparacion_mes_anterior = self.pattern_detector.comparar_con_mes_anterior(
-                factura_nueva=factura,
-                factura_mes_anterior=factura_mes_anterior,
-                tolerancia_porcentaje=5.0  # 5% de tolerancia configurable
-            )
-
-            # 4. Analizar patrones de recurrencia (análisis adicional)
-            resultado_patron = self.pattern_detector.analizar_patron_recurrencia(
-                factura, facturas_historicas
-            )
+            facturas_historicas = self._buscar_facturas_historicas(db, factura, historial)
 
-            # 5. Tomar decisión final (incorporando comparación mes anterior)
-            resultado_decision = self.decision_engine.tomar_decision(
-                factura, resultado_patron, facturas_historicas,
-                comparacion_mes_anterior=comparacion_mes_anterior
-            )
+            # 3.5 - 5. Comparar con mes anterior, analizar patrones y decidir
+            resultado_patron, resultado_decision = self._decidir(factura, facturas_historicas)
             
             # 6. Aplicar la decisión a la base de datos
-            self._aplicar_decision(db, factura, resultado_decision, resultado_patron)
+            self._aplicar_decision(db, factura, resultado_decision, resultado_patron, confirmar)
             
             # 7. Registrar en auditoría
-            self._registrar_auditoria(db, factura, resultado_decision, resultado_patron)
+            self._registrar_auditoria(db, factura, resultado_decision, resultado_patron, confirmar)
             
             return self._crear_resultado_exitoso(
                 factura, resultado_decision, resultado_patron, modo_debug
@@ -174,6 +225,33 @@ class AutomationService:
             logger.error(f"Error procesando factura {factura.id}: {str(e)}")
             return self._crear_resultado_error(factura, str(e))
 
+    def _decidir(
+        self,
+        factura: Factura,
+        facturas_historicas: List[Factura]
+    ) -> Tuple[ResultadoAnalisisPatron, ResultadoDecision]:
+        """Pipeline de decisión (solo en memoria, sin acceso a BD)."""
+        # 🔑 NUEVA LÓGICA: Comparar con mes anterior (prioridad máxima)
+        factura_mes_anterior = facturas_historicas[0] if facturas_historicas else None
+        comparacion_mes_anterior = self.pattern_detector.comparar_con_mes_anterior(
+            factura_nueva=factura,
+            factura_mes_anterior=factura_mes_anterior,
+            tolerancia_porcentaje=5.0  # 5% de tolerancia configurable
+        )
+
+        # Analizar patrones de recurrencia (análisis adicional)
+        resultado_patron = self.pattern_detector.analizar_patron_recurrencia(
+            factura, facturas_historicas
+        )
+
+        # Tomar decisión final (incorporando comparación mes anterior)
+        resultado_decision = self.decision_engine.tomar_decision(
+            factura, resultado_patron, facturas_historicas,
+            comparacion_mes_anterior=comparacion_mes_anterior
+        )
+
+        return resultado_patron, resultado_decision
+
     def _validar_datos_minimos(self, factura: Factura) -> bool:
         """Valida que la factura tenga los datos mínimos necesarios."""
         return all([
@@ -184,7 +262,30 @@ class AutomationService:
             factura.cufe
         ])
 
-    def _enriquecer_datos_factura(self, db: Session, factura: Factura) -> None:
+    def _concepto_hash_esperado(self, factura: Factura) -> Optional[str]:
+        """concepto_hash que tendrá la factura después de enriquecerla."""
+        if not factura.concepto_hash and factura.concepto_normalizado:
+            fingerprints = self.fingerprint_gen.generar_fingerprint_desde_factura(factura)
+            return fingerprints['principal'][:32]
+        return factura.concepto_hash
+
+    def _actualizar_factura(self, db: Session, factura: Factura, campos: Dict[str, Any], confirmar: bool) -> None:
+        """
+        update_factura (commit + refresh) o, en lote, solo asignar en la sesión.
+
+        En lote el estado se asigna como EstadoFactura, igual que quedaría
+        tras el refresh: las facturas siguientes del lote lo comparan así.
+        """
+        if confirmar:
+            crud_factura.update_factura(db, factura, campos)
+            return
+
+        for campo, valor in campos.items():
+            if campo == 'estado' and isinstance(valor, str):
+                valor = EstadoFactura(valor)
+            setattr(factura, campo, valor)
+
+    def _enriquecer_datos_factura(self, db: Session, factura: Factura, confirmar: bool = True) -> None:
         """
         Enriquece los datos de la factura si faltan campos de automatización.
         """
@@ -193,8 +294,7 @@ class AutomationService:
         
         # Generar concepto hash si falta
         if not factura.concepto_hash and factura.concepto_normalizado:
-            fingerprints = self.fingerprint_gen.generar_fingerprint_desde_factura(factura)
-            campos_actualizacion['concepto_hash'] = fingerprints['principal'][:32]
+            campos_actualizacion['concepto_hash'] = self._concepto_hash_esperado(factura)
             actualizar = True
         
         # Clasificar tipo de factura si falta
@@ -204,7 +304,7 @@ class AutomationService:
             actualizar = True
         
         if actualizar:
-            crud_factura.update_factura(db, factura, campos_actualizacion)
+            self._actualizar_factura(db, factura, campos_actualizacion, confirmar)
 
     def _clasificar_tipo_factura_basico(self, factura: Factura) -> str:
         """Clasificación básica del tipo de factura."""
@@ -215,21 +315,23 @@ class AutomationService:
         else:
             return "factura_estandar"
 
-    def _buscar_facturas_historicas(self, db: Session, factura: Factura) -> List[Factura]:
+    def _buscar_facturas_historicas(
+        self,
+        db: Session,
+        factura: Factura,
+        historial: Optional[HistorialPrecargado] = None
+    ) -> List[Factura]:
         """
         Busca facturas históricas similares para análisis de patrones.
+
+        Con historial precargado las búsquedas se resuelven en memoria;
+        el resultado es el mismo que contra la BD.
         """
+        fuente = historial if historial is not None else HistorialBD(db)
         facturas_historicas = []
 
         # PRIORIDAD 1: Buscar factura del mes anterior (lógica principal de aprobación)
-        factura_mes_anterior = crud_factura.find_factura_mes_anterior(
-            db=db,
-            proveedor_id=factura.proveedor_id,
-            fecha_actual=factura.fecha_emision,
-            concepto_hash=factura.concepto_hash,
-            concepto_normalizado=factura.concepto_normalizado,
-            numero_factura=factura.numero_factura
-        )
+        factura_mes_anterior = fuente.mes_anterior(factura)
 
         # Si encontramos factura del mes anterior, agregarla primero (máxima prioridad)
         if factura_mes_anterior:
@@ -237,15 +339,15 @@ class AutomationService:
 
         # Buscar por concepto normalizado si existe
         if factura.concepto_normalizado:
-            facturas_por_concepto = crud_factura.find_facturas_by_concepto_proveedor(
-                db, factura.proveedor_id, factura.concepto_normalizado, limit=12
+            facturas_por_concepto = fuente.por_concepto(
+                factura.proveedor_id, factura.concepto_normalizado, limit=12
             )
             facturas_historicas.extend(facturas_por_concepto)
 
         # Buscar por hash de concepto si existe
         if factura.concepto_hash:
-            facturas_por_hash = crud_factura.find_facturas_by_concepto_hash(
-                db, factura.concepto_hash, factura.proveedor_id, limit=8
+            facturas_por_hash = fuente.por_concepto_hash(
+                factura.concepto_hash, factura.proveedor_id, limit=8
             )
             # Evitar duplicados
             ids_existentes = {f.id for f in facturas_historicas}
@@ -255,8 +357,8 @@ class AutomationService:
 
         # Buscar por orden de compra si existe
         if factura.orden_compra_numero:
-            facturas_por_oc = crud_factura.find_facturas_by_orden_compra(
-                db, factura.orden_compra_numero, factura.proveedor_id
+            facturas_por_oc = fuente.por_orden_compra(
+                factura.orden_compra_numero, factura.proveedor_id
             )
             ids_existentes = {f.id for f in facturas_historicas}
             facturas_historicas.extend([
@@ -278,7 +380,8 @@ class AutomationService:
         db: Session, 
         factura: Factura, 
         resultado_decision: ResultadoDecision,
-        resultado_patron: ResultadoAnalisisPatron
+        resultado_patron: ResultadoAnalisisPatron,
+        confirmar: bool = True
     ) -> None:
         """
         Aplica la decisión tomada actualizando la factura en la base de datos.
@@ -300,14 +403,15 @@ class AutomationService:
         elif resultado_decision.decision == TipoDecision.REVISION_MANUAL:
             campos_actualizacion['estado'] = EstadoFactura.en_revision.value
         
-        crud_factura.update_factura(db, factura, campos_actualizacion)
+        self._actualizar_factura(db, factura, campos_actualizacion, confirmar)
 
     def _registrar_auditoria(
         self, 
         db: Session, 
         factura: Factura, 
         resultado_decision: ResultadoDecision,
-        resultado_patron: ResultadoAnalisisPatron
+        resultado_patron: ResultadoAnalisisPatron,
+        confirmar: bool = True
     ) -> None:
         """
         Registra la decisión en el log de auditoría.
@@ -340,10 +444,11 @@ class AutomationService:
             entidad_id=factura.id,
             accion=accion,
             usuario="sistema_automatico",
-            detalle=detalles_auditoria
+            detalle=detalles_auditoria,
+            commit=confirmar
         )
 
-    def _registrar_error_auditoria(self, db: Session, factura: Factura, error: str) -> None:
+    def _registrar_error_auditoria(self, db: Session, factura: Factura, error: str, confirmar: bool = True) -> None:
         """Registra errores de procesamiento en auditoría."""
         crud_audit.create_audit(
             db=db,
@@ -351,7 +456,8 @@ class AutomationService:
             entidad_id=factura.id,
             accion="error_procesamiento_automatico",
             usuario="sistema_automatico",
-            detalle={'error': error, 'timestamp': datetime.utcnow().isoformat()}
+            detalle={'error': error, 'timestamp': datetime.utcnow().isoformat()},
+            commit=confirmar
         )
 
     def _crear_resultado_exitoso(
@@ -461,6 +567,9 @@ class AutomationService:
                 'enviadas_revision': self.stats['enviadas_revision'],
                 'errores': self.stats['errores'],
                 'tiempo_procesamiento_segundos': tiempo_total,
+                'facturas_por_segundo': (
+                    round(len(resultados) / tiempo_total, 2) if tiempo_total else None
+                ),
                 'tasa_automatizacion': (
                     self.stats['aprobadas_automaticamente'] / max(self.stats['facturas_procesadas'], 1) * 100
                 )
@@ -0,0 +1,221 @@
+# app/services/automation/cola_automatizacion.py
+"""
+Automatización de facturas al ingresar, en vez de esperar al ciclo horario.
+
+Flujo:
+- process_and_persist_invoice (ingesta y POST /facturas) encola cada
+  factura nueva al terminar de persistirla.
+- Los workers de la cola (AUTOMATION_COLA_WORKERS hilos, una sesión cada
+  uno) la procesan en segundos con automatizar(): workflow si falta,
+  decisión automática y limpieza del marcador automatizacion_pendiente.
+  Cada proveedor va siempre al mismo worker (ver procesamiento_paralelo).
+- Backpressure: la cola es acotada (AUTOMATION_COLA_CAPACIDAD). Si está
+  llena, encolar no bloquea la ingesta: la factura conserva el marcador.
+- El barrido periódico (barrer_pendientes, cada AUTOMATION_BARRIDO_MINUTOS)
+  es la red de seguridad: facturas que no entraron a la cola, de otros
+  procesos o de un reinicio. Recorre el índice del marcador.
+
+La cola es por proceso y se pierde al reiniciar; lo que quedaba en ella
+conserva el marcador y lo recoge el barrido.
+"""
+
+import queue
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import factura as crud_factura
+from app.db.session import SessionLocal
+from app.models.workflow_aprobacion import WorkflowAprobacionFactura
+from app.services.workflow_automatico import WorkflowAutomaticoService
+from app.utils.logger import logger
+
+from .automation_service import AutomationService
+from .procesamiento_paralelo import ProcesadorParalelo
+
+
+# Facturas que un worker toma de una vez (historial precargado en lote)
+MAX_LOTE = 50
+
+# El barrido deja pasar las facturas recientes: probablemente siguen en la cola
+GRACIA_BARRIDO = timedelta(minutes=10)
+
+
+def automatizar(db: Session, factura_ids: List[int], modo_debug: bool = False) -> Dict[str, Any]:
+    """
+    Pipeline de automatización de facturas recién ingresadas.
+
+    1. Crea el workflow de las que no lo tienen (reintento si falló en la ingesta)
+    2. Decisión automática de las que siguen pendientes
+    3. Quita el marcador automatizacion_pendiente
+
+    Si algo falla con una excepción, el marcador se conserva y el barrido
+    reintenta.
+
+    Returns:
+        Resumen de AutomationService.procesar_facturas
+    """
+    con_workflow = set(db.scalars(
+        select(WorkflowAprobacionFactura.factura_id)
+        .where(WorkflowAprobacionFactura.factura_id.in_(factura_ids))
+    ))
+
+    sin_workflow = sorted(set(factura_ids) - con_workflow)
+    if sin_workflow:
+        workflow_service = WorkflowAutomaticoService(db)
+        for factura_id in sin_workflow:
+            try:
+                resultado = workflow_service.procesar_factura_nueva(factura_id)
+                if not resultado.get('exito'):
+                    logger.warning(f"Workflow no se creó para factura {factura_id}: {resultado.get('error')}")
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error creando workflow para factura {factura_id}: {str(e)}")
+
+    facturas = crud_factura.get_facturas_pendientes_procesamiento(
+        db, limit=len(factura_ids), ids=factura_ids
+    )
+    resumen = AutomationService().procesar_facturas(db, facturas, modo_debug)
+
+    crud_factura.marcar_automatizacion_completa(db, factura_ids)
+    return resumen
+
+
+def barrer_pendientes(
+    limite_facturas: Optional[int] = None,
+    gracia: timedelta = GRACIA_BARRIDO
+) -> Dict[str, Any]:
+    """
+    Barrido de respaldo: automatiza las facturas que conservan el marcador,
+    en paralelo por proveedor (settings.automation_workers).
+    """
+    db = SessionLocal()
+    try:
+        grupos = crud_factura.get_pendientes_automatizacion_por_proveedor(
+            db,
+            limit=limite_facturas or settings.automation_limite_facturas_ciclo,
+            creadas_antes_de=datetime.now() - gracia if gracia else None
+        )
+    finally:
+        db.close()
+
+    return ProcesadorParalelo(procesar_grupo=automatizar).procesar_grupos(grupos)
+
+
+class ColaAutomatizacion:
+    """
+    Cola acotada de facturas por automatizar, una subcola por worker.
+
+    El worker de una factura se elige por proveedor_id: las facturas de un
+    mismo proveedor se procesan en orden y nunca en paralelo.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        capacidad: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+        procesar: Callable[[Session, List[int]], Any] = automatizar
+    ):
+        self.workers = max(1, workers)
+        self.session_factory = session_factory
+        self.procesar = procesar
+        self._colas = [queue.Queue(maxsize=max(1, capacidad // self.workers)) for _ in range(self.workers)]
+        self._hilos: List[threading.Thread] = []
+        self._activa = threading.Event()
+        self.rechazadas = 0
+
+    def iniciar(self) -> None:
+        self._activa.set()
+        self._hilos = [
+            threading.Thread(target=self._worker, args=(cola,), name=f"cola-automatizacion-{i}", daemon=True)
+            for i, cola in enumerate(self._colas)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def detener(self, timeout: float = 10.0) -> None:
+        """Termina el lote en curso de cada worker; lo que queda en cola lo recoge el barrido."""
+        self._activa.clear()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self._hilos = []
+
+    def pendientes(self) -> int:
+        return sum(cola.qsize() for cola in self._colas)
+
+    def encolar(self, factura_id: int, proveedor_id: Optional[int]) -> bool:
+        """
+        Encola sin bloquear. False si la cola está detenida o llena: la
+        factura queda para el barrido periódico.
+        """
+        if not self._activa.is_set():
+            return False
+        try:
+            self._colas[(proveedor_id or 0) % self.workers].put_nowait(factura_id)
+            return True
+        except queue.Full:
+            self.rechazadas += 1
+            logger.warning(f"Cola de automatización llena: factura {factura_id} queda para el barrido")
+            return False
+
+    def _worker(self, cola: "queue.Queue[int]") -> None:
+        while self._activa.is_set():
+            try:
+                lote = [cola.get(timeout=1)]
+            except queue.Empty:
+                continue
+            while len(lote) < MAX_LOTE:
+                try:
+                    lote.append(cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            db = self.session_factory()
+            try:
+                self.procesar(db, lote)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Error automatizando facturas {lote}: {str(e)}", exc_info=True)
+            finally:
+                db.close()
+
+
+# Cola global del proceso
+_cola: Optional[ColaAutomatizacion] = None
+
+
+def iniciar_cola_automatizacion() -> None:
+    """Inicia los workers de la cola. Se ejecuta al iniciar la aplicación (en lifespan)."""
+    global _cola
+
+    if _cola is not None:
+        logger.warning("Cola de automatización ya está iniciada")
+        return
+
+    _cola = ColaAutomatizacion(settings.automation_cola_workers, settings.automation_cola_capacidad)
+    _cola.iniciar()
+    logger.info(
+        f"Cola de automatización iniciada: {_cola.workers} workers, "
+        f"capacidad {settings.automation_cola_capacidad}"
+    )
+
+
+def detener_cola_automatizacion() -> None:
+    """Detiene los workers de la cola. Se ejecuta al cerrar la aplicación (en lifespan)."""
+    global _cola
+
+    if _cola is not None:
+        pendientes = _cola.pendientes()
+        _cola.detener()
+        _cola = None
+        logger.info(f"Cola de automatización detenida ({pendientes} facturas quedan para el barrido)")
+
+
+def encolar_factura(factura_id: int, proveedor_id: Optional[int]) -> bool:
+    """Encola una factura recién persistida; False si no hay cola o está llena."""
+    return _cola.encolar(factura_id, proveedor_id) if _cola is not None else False
@@ -0,0 +1,192 @@
+# app/services/automation/historial_precargado.py
+"""
+Búsquedas de historial para AutomationService.
+
+En modo individual (HistorialBD) cada factura dispara hasta 4 consultas:
+mes anterior, concepto normalizado, hash de concepto y orden de compra.
+
+En modo lote (HistorialPrecargado) las facturas pendientes se agrupan por
+proveedor y TODOS los candidatos se cargan con una sola consulta; las 4
+búsquedas se resuelven en memoria con los mismos filtros, límites y orden
+(crud_factura.ORDEN_HISTORIAL) que las de app.crud.factura.
+
+Los filtros se evalúan sobre los valores ACTUALES de los objetos de la
+sesión: si una factura del lote se aprueba o se le genera concepto_hash,
+las siguientes la ven igual que la verían en la BD en modo individual.
+"""
+
+import unicodedata
+from collections import defaultdict
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.crud import factura as crud_factura
+from app.models.factura import Factura, EstadoFactura
+from app.utils.date_helpers import DateHelper
+
+
+_APROBADAS = (EstadoFactura.aprobada.value, EstadoFactura.aprobada_auto.value)
+
+
+def _valor_estado(estado) -> Optional[str]:
+    return getattr(estado, "value", estado)
+
+
+def _texto_mysql(valor: Optional[str]) -> Optional[str]:
+    """Igualdad de la collation *_ai_ci de MySQL: sin mayúsculas ni acentos."""
+    if valor is None:
+        return None
+    sin_acentos = unicodedata.normalize("NFKD", valor).encode("ascii", "ignore").decode("ascii")
+    return sin_acentos.casefold()
+
+
+def _texto_exacto(valor: Optional[str]) -> Optional[str]:
+    return valor
+
+
+def _mes_anterior(fecha: date):
+    anterior = fecha - relativedelta(months=1)
+    return DateHelper.get_periodo_bounds(anterior.year, anterior.month)
+
+
+class HistorialBD:
+    """Búsquedas de historial contra la BD, una consulta por búsqueda."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def mes_anterior(self, factura: Factura) -> Optional[Factura]:
+        return crud_factura.find_factura_mes_anterior(
+            db=self.db,
+            proveedor_id=factura.proveedor_id,
+            fecha_actual=factura.fecha_emision,
+            concepto_hash=factura.concepto_hash,
+            concepto_normalizado=factura.concepto_normalizado,
+            numero_factura=factura.numero_factura
+        )
+
+    def por_concepto(self, proveedor_id: int, concepto_normalizado: str, limit: int = 12) -> List[Factura]:
+        return crud_factura.find_facturas_by_concepto_proveedor(
+            self.db, proveedor_id, concepto_normalizado, limit=limit
+        )
+
+    def por_concepto_hash(self, concepto_hash: str, proveedor_id: Optional[int], limit: int = 8) -> List[Factura]:
+        return crud_factura.find_facturas_by_concepto_hash(
+            self.db, concepto_hash, proveedor_id, limit=limit
+        )
+
+    def por_orden_compra(self, orden_compra_numero: str, proveedor_id: Optional[int]) -> List[Factura]:
+        return crud_factura.find_facturas_by_orden_compra(
+            self.db, orden_compra_numero, proveedor_id
+        )
+
+
+class HistorialPrecargado:
+    """
+    Candidatos de historial de un lote, por proveedor, ordenados como
+    ORDEN_HISTORIAL (fecha_emision desc, id desc).
+    """
+
+    def __init__(self, por_proveedor: Dict[int, List[Factura]], texto: Callable = _texto_exacto):
+        self.por_proveedor = por_proveedor
+        self._texto = texto
+
+    @classmethod
+    def cargar(
+        cls,
+        db: Session,
+        facturas: Iterable[Factura],
+        concepto_hash_de: Callable[[Factura], Optional[str]]
+    ) -> "HistorialPrecargado":
+        """
+        Una consulta con todos los candidatos de las facturas del lote.
+
+        Args:
+            db: Sesión de base de datos
+            facturas: Facturas pendientes del lote
+            concepto_hash_de: concepto_hash que tendrá cada factura después
+                de enriquecerla (puede generarse durante el lote)
+        """
+        facturas = [f for f in facturas if f.proveedor_id and f.fecha_emision]
+        texto = _texto_mysql if db.get_bind().dialect.name == "mysql" else _texto_exacto
+        if not facturas:
+            return cls({}, texto)
+
+        conceptos = {f.concepto_normalizado for f in facturas if f.concepto_normalizado}
+        hashes = {h for h in map(concepto_hash_de, facturas) if h}
+        ordenes = {f.orden_compra_numero for f in facturas if f.orden_compra_numero}
+        meses = [_mes_anterior(f.fecha_emision) for f in facturas]
+
+        condiciones = [
+            and_(
+                Factura.fecha_emision >= min(inicio for inicio, _ in meses),
+                Factura.fecha_emision < max(fin for _, fin in meses),
+                Factura.estado.in_([EstadoFactura.aprobada, EstadoFactura.aprobada_auto])
+            )
+        ]
+        if conceptos:
+            condiciones.append(Factura.concepto_normalizado.in_(conceptos))
+        if hashes:
+            condiciones.append(Factura.concepto_hash.in_(hashes))
+        if ordenes:
+            condiciones.append(Factura.orden_compra_numero.in_(ordenes))
+
+        candidatos = db.query(Factura).filter(
+            Factura.proveedor_id.in_({f.proveedor_id for f in facturas}),
+            or_(*condiciones)
+        ).all()
+
+        # Las facturas del lote también son candidatas: en la BD aún no están
+        # aprobadas ni tienen concepto_hash, pero pueden tenerlo al llegar su turno
+        por_id: Dict[int, Dict[int, Factura]] = defaultdict(dict)
+        for factura in (*candidatos, *facturas):
+            por_id[factura.proveedor_id][factura.id] = factura
+
+        por_proveedor = {
+            proveedor_id: sorted(filas.values(), key=lambda f: (f.fecha_emision, f.id), reverse=True)
+            for proveedor_id, filas in por_id.items()
+        }
+        return cls(por_proveedor, texto)
+
+    def _de(self, proveedor_id: Optional[int]) -> List[Factura]:
+        return self.por_proveedor.get(proveedor_id, [])
+
+    def _igual(self, a: Optional[str], b: Optional[str]) -> bool:
+        return a is not None and b is not None and self._texto(a) == self._texto(b)
+
+    def mes_anterior(self, factura: Factura) -> Optional[Factura]:
+        inicio, fin = _mes_anterior(factura.fecha_emision)
+        for f in self._de(factura.proveedor_id):
+            if not (inicio <= f.fecha_emision < fin):
+                continue
+            if _valor_estado(f.estado) not in _APROBADAS:
+                continue
+            if factura.concepto_hash and not self._igual(f.concepto_hash, factura.concepto_hash):
+                continue
+            # numero_factura != x en SQL también descarta los NULL
+            if factura.numero_factura and (f.numero_factura is None or self._igual(f.numero_factura, factura.numero_factura)):
+                continue
+            return f
+        return None
+
+    def por_concepto(self, proveedor_id: int, concepto_normalizado: str, limit: int = 12) -> List[Factura]:
+        return [
+            f for f in self._de(proveedor_id)
+            if self._igual(f.concepto_normalizado, concepto_normalizado)
+        ][:limit]
+
+    def por_concepto_hash(self, concepto_hash: str, proveedor_id: Optional[int], limit: int = 8) -> List[Factura]:
+        return [
+            f for f in self._de(proveedor_id)
+            if self._igual(f.concepto_hash, concepto_hash)
+        ][:limit]
+
+    def por_orden_compra(self, orden_compra_numero: str, proveedor_id: Optional[int]) -> List[Factura]:
+        return [
+            f for f in self._de(proveedor_id)
+            if self._igual(f.orden_compra_numero, orden_compra_numero)
+        ]
@@ -10,10 +10,10 @@ nueva factura sigue un patrón establecido.
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 from decimal import Decimal
-import statistics
 from dataclasses import dataclass
 
 from app.models.factura import Factura
+from app.services.estadisticas_montos import Acumulador
 from .fingerprint_generator import FingerprintGenerator
 
 
@@ -139,9 +139,12 @@ class PatternDetector:
         if not diferencias_dias:
             return PatronTemporal("insuficiente", 0.0, 0.0, False, 0.0)
         
-        # Estadísticas básicas
-        promedio_dias = statistics.mean(diferencias_dias)
-        desviacion = statistics.stdev(diferencias_dias) if len(diferencias_dias) > 1 else 0.0
+        # Estadísticas básicas (Welford, igual que estadisticas_montos)
+        intervalos = Acumulador()
+        for diff in diferencias_dias:
+            intervalos.agregar(diff)
+        promedio_dias = intervalos.media
+        desviacion = intervalos.desviacion
         
         # Clasificar tipo de patrón
         tipo_patron = self._clasificar_patron_temporal(promedio_dias)
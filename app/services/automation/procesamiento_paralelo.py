@@ -0,0 +1,217 @@
+# app/services/automation/procesamiento_paralelo.py
+"""
+Procesamiento de facturas pendientes con varios workers en paralelo.
+
+Las facturas pendientes se particionan por proveedor_id y cada proveedor se
+asigna a UN solo worker: las lecturas de historial (siempre del mismo
+proveedor) y las escrituras de estado de un proveedor nunca compiten entre
+workers, y dentro del grupo se conserva el orden de procesamiento del modo
+secuencial.
+
+Cada worker es un hilo con su propia sesión (SessionLocal no es thread-safe)
+que toma grupos de una cola compartida, los más grandes primero, y los
+procesa con AutomationService.procesar_facturas (una transacción por
+proveedor). El número de workers se configura con settings.automation_workers
+y no debería superar el pool de conexiones (db_pool_size + db_max_overflow).
+
+El barrido de cola_automatizacion reutiliza el reparto con otro procesamiento
+por grupo (procesar_grupo).
+"""
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import factura as crud_factura
+from app.db.session import SessionLocal
+from app.utils.logger import logger
+
+from .automation_service import AutomationService
+
+
+@dataclass
+class EstadisticasWorker:
+    """Throughput de un worker durante un ciclo."""
+    worker: int
+    proveedores: int = 0
+    facturas_procesadas: int = 0
+    aprobadas_automaticamente: int = 0
+    enviadas_revision: int = 0
+    errores: int = 0
+    segundos: float = 0.0
+
+    @property
+    def facturas_por_segundo(self) -> Optional[float]:
+        return round(self.facturas_procesadas / self.segundos, 2) if self.segundos else None
+
+    def a_dict(self) -> Dict[str, Any]:
+        datos = asdict(self)
+        datos['segundos'] = round(self.segundos, 3)
+        datos['facturas_por_segundo'] = self.facturas_por_segundo
+        return datos
+
+
+class ProcesadorParalelo:
+    """
+    Reparte las facturas pendientes entre workers, un proveedor por worker.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        en_lote: Optional[bool] = None,
+        procesar_grupo: Optional[Callable[[Session, List[int], bool], Dict[str, Any]]] = None
+    ):
+        self.workers = max(1, workers or settings.automation_workers)
+        self.session_factory = session_factory
+        self.en_lote = en_lote
+        self.procesar_grupo = procesar_grupo or self._procesar_pendientes
+
+        conexiones = settings.db_pool_size + settings.db_max_overflow
+        if self.workers >= conexiones:
+            logger.warning(
+                f"{self.workers} workers de automatización para {conexiones} conexiones del pool: "
+                f"los workers esperarán conexiones libres"
+            )
+
+    def procesar_facturas_pendientes(
+        self,
+        limite_facturas: int = 50,
+        modo_debug: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Procesa hasta `limite_facturas` facturas pendientes en paralelo.
+
+        Returns:
+            Resumen con la forma de AutomationService.procesar_facturas_pendientes
+            más 'workers' (estadísticas por worker)
+        """
+        db = self.session_factory()
+        try:
+            grupos = crud_factura.get_pendientes_procesamiento_por_proveedor(db, limit=limite_facturas)
+        finally:
+            db.close()
+
+        return self.procesar_grupos(grupos, modo_debug)
+
+    def procesar_grupos(
+        self,
+        grupos: Dict[Optional[int], List[int]],
+        modo_debug: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Procesa grupos de facturas ya particionados ({proveedor_id: [ids]}),
+        cada grupo en un solo worker con procesar_grupo.
+        """
+        tiempo_inicio = datetime.utcnow()
+        reloj = time.perf_counter()
+
+        # Grupos grandes primero: los chicos rellenan al final y los workers terminan parejo
+        cola: "queue.SimpleQueue[Tuple[Optional[int], List[int]]]" = queue.SimpleQueue()
+        for proveedor_id, ids in sorted(grupos.items(), key=lambda grupo: len(grupo[1]), reverse=True):
+            cola.put((proveedor_id, ids))
+
+        n_workers = max(1, min(self.workers, len(grupos)))
+        estadisticas = [EstadisticasWorker(worker=i) for i in range(n_workers)]
+        detalles: List[List[Dict[str, Any]]] = [[] for _ in range(n_workers)]
+
+        logger.info(
+            f"Procesamiento paralelo: {sum(map(len, grupos.values()))} facturas de "
+            f"{len(grupos)} proveedores con {n_workers} workers"
+        )
+
+        with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="automation") as pool:
+            futuros = [
+                pool.submit(self._worker, cola, estadisticas[i], detalles[i], modo_debug)
+                for i in range(n_workers)
+            ]
+            for futuro in futuros:
+                futuro.result()
+
+        return self._generar_resumen(
+            estadisticas,
+            [detalle for detalles_worker in detalles for detalle in detalles_worker],
+            tiempo_inicio,
+            time.perf_counter() - reloj
+        )
+
+    def _worker(
+        self,
+        cola: "queue.SimpleQueue[Tuple[Optional[int], List[int]]]",
+        estadisticas: EstadisticasWorker,
+        detalles: List[Dict[str, Any]],
+        modo_debug: bool
+    ) -> None:
+        """Toma proveedores de la cola hasta vaciarla, con una sola sesión."""
+        db = self.session_factory()
+        try:
+            while True:
+                try:
+                    proveedor_id, ids = cola.get_nowait()
+                except queue.Empty:
+                    return
+
+                reloj = time.perf_counter()
+                try:
+                    resumen = self.procesar_grupo(db, ids, modo_debug)
+                    estadisticas.facturas_procesadas += resumen['facturas_procesadas']
+                    estadisticas.aprobadas_automaticamente += resumen['aprobadas_automaticamente']
+                    estadisticas.enviadas_revision += resumen['enviadas_revision']
+                    estadisticas.errores += resumen['errores']
+                    detalles.extend(resumen['facturas_procesadas_detalle'])
+                except Exception as e:
+                    db.rollback()
+                    logger.error(f"Error procesando facturas del proveedor {proveedor_id}: {str(e)}")
+                    estadisticas.errores += len(ids)
+                finally:
+                    estadisticas.proveedores += 1
+                    estadisticas.segundos += time.perf_counter() - reloj
+                    # El identity map no debe crecer con cada proveedor
+                    db.expunge_all()
+        finally:
+            db.close()
+
+    def _procesar_pendientes(self, db: Session, ids: List[int], modo_debug: bool) -> Dict[str, Any]:
+        """Decisión automática de las facturas del grupo que siguen pendientes."""
+        facturas = crud_factura.get_facturas_pendientes_procesamiento(db, limit=len(ids), ids=ids)
+        return AutomationService().procesar_facturas(db, facturas, modo_debug, self.en_lote)
+
+    @staticmethod
+    def _generar_resumen(
+        estadisticas: List[EstadisticasWorker],
+        detalles: List[Dict[str, Any]],
+        tiempo_inicio: datetime,
+        segundos: float
+    ) -> Dict[str, Any]:
+        procesadas = sum(e.facturas_procesadas for e in estadisticas)
+        aprobadas = sum(e.aprobadas_automaticamente for e in estadisticas)
+        revision = sum(e.enviadas_revision for e in estadisticas)
+        errores = sum(e.errores for e in estadisticas)
+
+        return {
+            'facturas_procesadas': procesadas,
+            'aprobadas_automaticamente': aprobadas,
+            'enviadas_revision': revision,
+            'errores': errores,
+            'tiempo_inicio': tiempo_inicio,
+            'tiempo_fin': datetime.utcnow(),
+            'resumen_general': {
+                'facturas_procesadas': procesadas,
+                'aprobadas_automaticamente': aprobadas,
+                'enviadas_revision': revision,
+                'errores': errores,
+                'tiempo_procesamiento_segundos': segundos,
+                'facturas_por_segundo': round(procesadas / segundos, 2) if segundos else None,
+                'tasa_automatizacion': aprobadas / max(procesadas, 1) * 100,
+                'workers': len(estadisticas),
+            },
+            'workers': [e.a_dict() for e in estadisticas],
+            'facturas_procesadas_detalle': detalles
+        }
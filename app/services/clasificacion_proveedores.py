@@ -12,18 +12,18 @@ Este servicio se integra al workflow para:
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
 from decimal import Decimal
-from statistics import mean, stdev
 
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 
-from app.models.factura import Factura, EstadoFactura
 from app.models.proveedor import Proveedor
 from app.models.workflow_aprobacion import (
     AsignacionNitResponsable,
     TipoServicioProveedor,
     NivelConfianzaProveedor
 )
+from app.services import estadisticas_montos
+from app.services.estadisticas_montos import EstadisticasMontos
 
 
 class ClasificacionProveedoresService:
@@ -137,15 +137,15 @@ class ClasificacionProveedoresService:
             # Proveedor nuevo sin facturas → Clasificación por defecto
             return self._clasificar_proveedor_sin_historial(asignacion)
 
-        # Analizar facturas históricas
-        facturas = self._obtener_facturas_para_analisis(proveedor.id)
+        # Estadísticas del historial (estadisticas_montos, sin releer facturas)
+        historial = self._obtener_historial(proveedor.id)
 
-        if len(facturas) < self.CONFIG['facturas_minimas']:
+        if historial.n < self.CONFIG['facturas_minimas']:
             # Proveedor con pocas facturas → Clasificación conservadora
             return self._clasificar_proveedor_sin_historial(asignacion)
 
         # Calcular estadísticas
-        estadisticas = self._calcular_estadisticas(facturas)
+        estadisticas = self._calcular_estadisticas(historial)
 
         # Determinar clasificación
         tipo_servicio = self._determinar_tipo_servicio(estadisticas['cv'])
@@ -169,7 +169,7 @@ class ClasificacionProveedoresService:
         # Metadata de clasificación
         asignacion.metadata_riesgos = {
             'fecha_clasificacion': datetime.now().isoformat(),
-            'facturas_analizadas': len(facturas),
+            'facturas_analizadas': historial.n,
             'cv_calculado': round(estadisticas['cv'], 2),
             'antiguedad_dias': estadisticas['antiguedad_dias'],
             'monto_promedio': float(estadisticas['monto_promedio']),
@@ -187,7 +187,7 @@ class ClasificacionProveedoresService:
             'nivel_confianza': nivel_confianza,
             'cv': estadisticas['cv'],
             'requiere_oc': requiere_oc,
-            'facturas_analizadas': len(facturas)
+            'facturas_analizadas': historial.n
         }
 
     def clasificar_nuevo_proveedor_on_the_fly(
@@ -323,15 +323,15 @@ class ClasificacionProveedoresService:
         if not proveedor:
             return None
 
-        facturas_recientes = self._obtener_facturas_para_analisis(
+        historial_reciente = self._obtener_historial(
             proveedor.id,
             dias=90  # Últimos 3 meses
         )
 
-        if len(facturas_recientes) < 3:
+        if historial_reciente.n < 3:
             return None
 
-        estadisticas_recientes = self._calcular_estadisticas(facturas_recientes)
+        estadisticas_recientes = self._calcular_estadisticas(historial_reciente)
         cv_actual = float(asignacion.coeficiente_variacion_historico)
         cv_reciente = estadisticas_recientes['cv']
 
@@ -433,30 +433,21 @@ class ClasificacionProveedoresService:
             'razon': 'Sin historial suficiente'
         }
 
-    def _obtener_facturas_para_analisis(
+    def _obtener_historial(
         self,
         proveedor_id: int,
         dias: int = 365
-    ) -> list:
-        """Obtiene facturas para análisis estadístico."""
-        fecha_limite = datetime.now() - timedelta(days=dias)
-
-        return self.db.query(Factura).filter(
-            Factura.proveedor_id == proveedor_id,
-            Factura.fecha_emision >= fecha_limite,
-            Factura.estado.in_([
-                EstadoFactura.aprobada,
-                EstadoFactura.aprobada_auto,
-                EstadoFactura.pagada,
-                EstadoFactura.en_revision  # Incluir para cálculo estadístico de CV
-            ])
-        ).all()
-
-    def _calcular_estadisticas(self, facturas: list) -> Dict[str, Any]:
-        """Calcula estadísticas de facturas."""
-        montos = [float(f.total_a_pagar) for f in facturas if f.total_a_pagar]
+    ) -> EstadisticasMontos:
+        """
+        Estadísticas del historial aprobado del proveedor (todos sus conceptos)
+        en los meses que cubren los últimos `dias` días.
+        """
+        desde = (datetime.now() - timedelta(days=dias)).date()
+        return estadisticas_montos.de_proveedor(self.db, proveedor_id, desde=desde)
 
-        if not montos:
+    def _calcular_estadisticas(self, historial: EstadisticasMontos) -> Dict[str, Any]:
+        """Calcula estadísticas de clasificación a partir del historial acumulado."""
+        if not historial.n:
             return {
                 'cv': 999.0,
                 'monto_promedio': 0,
@@ -465,38 +456,14 @@ class ClasificacionProveedoresService:
                 'fecha_primera_factura': None
             }
 
-        monto_promedio = mean(montos)
-        desviacion = stdev(montos) if len(montos) > 1 else 0
-        cv = (desviacion / monto_promedio * 100) if monto_promedio > 0 else 0
-
-        from datetime import date as date_type
-
-        fechas = [f.fecha_emision for f in facturas if f.fecha_emision]
-        fecha_primera = min(fechas) if fechas else datetime.now()
-
-        # Convertir date a datetime si es necesario (date no tiene hora, datetime sí)
-        if isinstance(fecha_primera, date_type) and not isinstance(fecha_primera, datetime):
-            fecha_primera = datetime.combine(fecha_primera, datetime.min.time())
-
-        antiguedad_dias = (datetime.now() - fecha_primera).days
-
-        meses_unicos = set()
-        for f in facturas:
-            if f.fecha_emision:
-                meses_unicos.add(f"{f.fecha_emision.year}-{f.fecha_emision.month:02d}")
-
-        # Convertir fecha_primera a date para retorno
-        if isinstance(fecha_primera, datetime):
-            fecha_primera_date = fecha_primera.date()
-        else:
-            fecha_primera_date = fecha_primera
+        fecha_primera = historial.primera_fecha
 
         return {
-            'cv': cv,
-            'monto_promedio': monto_promedio,
-            'antiguedad_dias': antiguedad_dias,
-            'meses_con_facturas': len(meses_unicos),
-            'fecha_primera_factura': fecha_primera_date
+            'cv': historial.montos.cv,
+            'monto_promedio': historial.montos.media,
+            'antiguedad_dias': (datetime.now().date() - fecha_primera).days,
+            'meses_con_facturas': historial.meses,
+            'fecha_primera_factura': fecha_primera
         }
 
     def _determinar_tipo_servicio(self, cv: float) -> TipoServicioProveedor:
@@ -0,0 +1,508 @@
+# app/services/cola_trabajos.py
+"""
+Cola de trabajos persistida en BD (tabla trabajos).
+
+Trabajo que antes corría en BackgroundTasks o hilos daemon (y se perdía al
+reiniciar) se encola con encolar() y lo ejecuta un pool de workers, dentro
+del proceso de la API o aparte:
+    python -m app.tasks.trabajos --hilos 4
+
+- Tareas: funciones registradas con @tarea("nombre", cola=...); reciben una
+  sesión propia y el payload como kwargs (ver app.tasks.trabajos).
+- Reserva: UPDATE condicional del trabajo elegido (gana un solo worker, igual
+  en MySQL y SQLite). La reserva vale hasta bloqueado_hasta (visibility
+  timeout de la cola) y un latido la extiende mientras la tarea corre: si el
+  worker muere, el trabajo vuelve a estar disponible y el siguiente intento
+  cuenta.
+- Reintentos: backoff exponencial (30 s, 1 min, 2 min... hasta 1 h); al
+  agotar max_intentos queda "fallido" (dead-letter) hasta reintentar() a mano.
+- Concurrencia por cola: cada trabajo en curso ocupa una ranura de la cola,
+  que es un lease de app.services.liderazgo (cola:<nombre>:<n>); sin ranura
+  libre el worker no reserva de esa cola. Un worker sin trabajos disponibles
+  solo lee (no toma ranuras en cada sondeo).
+- Al menos una vez: un trabajo puede ejecutarse de nuevo si su worker murió
+  a mitad de camino; las tareas deben tolerarlo.
+"""
+import json
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.trabajo import EstadoTrabajo, Trabajo
+from app.services.liderazgo import adquirir, identidad_proceso, liberar
+from app.utils.logger import logger
+
+
+@dataclass(frozen=True)
+class ConfigCola:
+    concurrencia: int
+    visibilidad_segundos: int
+
+
+COLA_DEFAULT = "default"
+COLA_NOTIFICACIONES = "notificaciones"
+COLA_MANTENIMIENTO = "mantenimiento"
+
+COLAS: Dict[str, ConfigCola] = {
+    COLA_DEFAULT: ConfigCola(concurrencia=4, visibilidad_segundos=300),
+    COLA_NOTIFICACIONES: ConfigCola(concurrencia=2, visibilidad_segundos=300),
+    # Procesos masivos: uno a la vez en todo el sistema
+    COLA_MANTENIMIENTO: ConfigCola(concurrencia=1, visibilidad_segundos=1800),
+}
+
+BACKOFF_BASE_SEGUNDOS = 30
+BACKOFF_MAX_SEGUNDOS = 3600
+
+
+@dataclass(frozen=True)
+class Tarea:
+    nombre: str
+    funcion: Callable[..., Any]
+    cola: str
+    max_intentos: int
+
+
+_TAREAS: Dict[str, Tarea] = {}
+
+
+def tarea(nombre: str, cola: str = COLA_DEFAULT, max_intentos: int = 5):
+    """Registra una función como tarea de la cola: funcion(db, **payload)."""
+    if cola not in COLAS:
+        raise ValueError(f"Cola desconocida: {cola}")
+
+    def decorador(funcion):
+        _TAREAS[nombre] = Tarea(nombre, funcion, cola, max_intentos)
+        return funcion
+    return decorador
+
+
+def backoff(intentos: int) -> timedelta:
+    """Espera antes del siguiente intento tras `intentos` fallidos."""
+    return timedelta(seconds=min(BACKOFF_MAX_SEGUNDOS, BACKOFF_BASE_SEGUNDOS * 2 ** max(0, intentos - 1)))
+
+
+# ==================== PRODUCTOR ====================
+
+
+def encolar(
+    db: Session,
+    tipo: str,
+    payload: Optional[Dict[str, Any]] = None,
+    cola: Optional[str] = None,
+    retraso: Optional[timedelta] = None,
+    max_intentos: Optional[int] = None,
+    commit: bool = True
+) -> Trabajo:
+    """
+    Encola un trabajo. Con commit=False entra en la transacción del caller
+    (se encola solo si esa transacción confirma).
+
+    La cola y max_intentos salen del registro de la tarea si está importada
+    en este proceso; si no, de los argumentos (o COLA_DEFAULT / 5).
+    """
+    registrada = _TAREAS.get(tipo)
+    ahora = datetime.utcnow()
+    trabajo = Trabajo(
+        cola=cola or (registrada.cola if registrada else COLA_DEFAULT),
+        tipo=tipo,
+        payload=payload or {},
+        estado=EstadoTrabajo.pendiente,
+        intentos=0,
+        max_intentos=max_intentos or (registrada.max_intentos if registrada else 5),
+        disponible_en=ahora + (retraso or timedelta(0)),
+        creado_en=ahora,
+    )
+    db.add(trabajo)
+    if commit:
+        db.commit()
+    else:
+        db.flush()
+    return trabajo
+
+
+# ==================== CONSUMIDOR ====================
+
+
+def _disponible(ahora: datetime):
+    return or_(
+        and_(Trabajo.estado == EstadoTrabajo.pendiente, Trabajo.disponible_en <= ahora),
+        # Visibility timeout vencido: el worker que lo tenía murió o se colgó
+        and_(Trabajo.estado == EstadoTrabajo.en_proceso, Trabajo.bloqueado_hasta <= ahora),
+    )
+
+
+def hay_disponibles(db: Session, cola: str, ahora: Optional[datetime] = None) -> bool:
+    """Si la cola tiene algún trabajo para reservar (solo lectura)."""
+    return db.scalar(
+        select(Trabajo.id).where(Trabajo.cola == cola, _disponible(ahora or datetime.utcnow())).limit(1)
+    ) is not None
+
+
+def reservar(db: Session, cola: str, titular: str, ahora: Optional[datetime] = None) -> Optional[Trabajo]:
+    """Reserva el próximo trabajo disponible de la cola (o None)."""
+    ahora = ahora or datetime.utcnow()
+    visibilidad = timedelta(seconds=COLAS[cola].visibilidad_segundos)
+
+    # Si otro worker gana el candidato, se intenta con el siguiente
+    for _ in range(3):
+        candidato = db.scalar(
+            select(Trabajo.id)
+            .where(Trabajo.cola == cola, _disponible(ahora))
+            .order_by(Trabajo.disponible_en, Trabajo.id)
+            .limit(1)
+        )
+        if candidato is None:
+            return None
+
+        reservado = db.execute(
+            update(Trabajo)
+            .where(Trabajo.id == candidato, _disponible(ahora))
+            .values(
+                estado=EstadoTrabajo.en_proceso,
+                intentos=Trabajo.intentos + 1,
+                bloqueado_por=titular,
+                bloqueado_hasta=ahora + visibilidad,
+                iniciado_en=ahora,
+            )
+        )
+        db.commit()
+        if reservado.rowcount == 1:
+            return db.get(Trabajo, candidato)
+    return None
+
+
+def _cerrar(db: Session, trabajo_id: int, titular: str, **valores) -> bool:
+    """Cambia el estado solo si el trabajo sigue reservado por `titular`."""
+    cerrado = db.execute(
+        update(Trabajo)
+        .where(
+            Trabajo.id == trabajo_id,
+            Trabajo.estado == EstadoTrabajo.en_proceso,
+            Trabajo.bloqueado_por == titular,
+        )
+        .values(bloqueado_por=None, bloqueado_hasta=None, **valores)
+    )
+    db.commit()
+    if cerrado.rowcount != 1:
+        logger.warning(f"Trabajo {trabajo_id}: la reserva venció y lo tomó otro worker")
+    return cerrado.rowcount == 1
+
+
+def _serializable(resultado: Any) -> Any:
+    return json.loads(json.dumps(resultado, default=str)) if resultado is not None else None
+
+
+def ejecutar(db: Session, trabajo: Trabajo, titular: str) -> EstadoTrabajo:
+    """Ejecuta un trabajo reservado y registra el resultado, el reintento o el fallo definitivo."""
+    trabajo_id, tipo, intentos, max_intentos = trabajo.id, trabajo.tipo, trabajo.intentos, trabajo.max_intentos
+    ahora = datetime.utcnow()
+
+    if intentos > max_intentos:
+        # Se reservó de nuevo tras vencer su última reserva: no quedan intentos
+        _cerrar(db, trabajo_id, titular, estado=EstadoTrabajo.fallido, terminado_en=ahora,
+                ultimo_error=trabajo.ultimo_error or "Reserva vencida en todos los intentos")
+        return EstadoTrabajo.fallido
+
+    registrada = _TAREAS.get(tipo)
+    if registrada is None:
+        _cerrar(db, trabajo_id, titular, estado=EstadoTrabajo.fallido, terminado_en=ahora,
+                ultimo_error=f"Tarea no registrada: {tipo}")
+        return EstadoTrabajo.fallido
+
+    try:
+        resultado = registrada.funcion(db, **(trabajo.payload or {}))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        error = f"{type(e).__name__}: {str(e)}"
+        if intentos >= max_intentos:
+            logger.error(f"Trabajo {trabajo_id} ({tipo}) fallido tras {intentos} intentos: {error}")
+            _cerrar(db, trabajo_id, titular, estado=EstadoTrabajo.fallido,
+                    terminado_en=datetime.utcnow(), ultimo_error=error)
+            return EstadoTrabajo.fallido
+
+        logger.warning(f"Trabajo {trabajo_id} ({tipo}) intento {intentos}/{max_intentos}: {error}")
+        _cerrar(db, trabajo_id, titular, estado=EstadoTrabajo.pendiente,
+                disponible_en=datetime.utcnow() + backoff(intentos), ultimo_error=error)
+        return EstadoTrabajo.pendiente
+
+    _cerrar(db, trabajo_id, titular, estado=EstadoTrabajo.completado,
+            terminado_en=datetime.utcnow(), resultado=_serializable(resultado))
+    return EstadoTrabajo.completado
+
+
+def extender_reserva(db: Session, trabajo_id: int, titular: str, hasta: datetime) -> bool:
+    """Extiende bloqueado_hasta solo si el trabajo sigue reservado por `titular`."""
+    extendido = db.execute(
+        update(Trabajo)
+        .where(
+            Trabajo.id == trabajo_id,
+            Trabajo.estado == EstadoTrabajo.en_proceso,
+            Trabajo.bloqueado_por == titular,
+        )
+        .values(bloqueado_hasta=hasta)
+    )
+    db.commit()
+    return extendido.rowcount == 1
+
+
+class _Latido:
+    """
+    Renueva la reserva del trabajo y el lease de la ranura cada tercio del
+    visibility timeout mientras la tarea corre, con su propia sesión (la del
+    worker la usa la tarea). Sin latido, una tarea más larga que el timeout
+    la reservaría otro worker y correría dos veces.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        trabajo_id: int,
+        ranura: str,
+        titular: str,
+        duracion: timedelta
+    ):
+        self.session_factory = session_factory
+        self.trabajo_id = trabajo_id
+        self.ranura = ranura
+        self.titular = titular
+        self.duracion = duracion
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._latir_periodicamente,
+                                      name=f"latido-trabajo-{trabajo_id}", daemon=True)
+
+    def latir(self) -> None:
+        db = self.session_factory()
+        try:
+            hasta = datetime.utcnow() + self.duracion
+            if not extender_reserva(db, self.trabajo_id, self.titular, hasta):
+                logger.warning(f"Trabajo {self.trabajo_id}: no se pudo extender la reserva (la tomó otro worker)")
+            if not adquirir(db, self.ranura, self.titular, self.duracion):
+                logger.warning(f"Trabajo {self.trabajo_id}: se perdió la ranura '{self.ranura}'")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Trabajo {self.trabajo_id}: error en el latido: {str(e)}")
+        finally:
+            db.close()
+
+    def __enter__(self) -> "_Latido":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._detener.set()
+        self._hilo.join()
+
+    def _latir_periodicamente(self) -> None:
+        intervalo = self.duracion.total_seconds() / 3
+        while not self._detener.wait(intervalo):
+            self.latir()
+
+
+def procesar_uno(
+    session_factory: Callable[[], Session],
+    cola: str,
+    titular: str
+) -> bool:
+    """
+    Si la cola tiene trabajos disponibles, ocupa una ranura, reserva uno y
+    lo ejecuta con latido.
+
+    Returns:
+        True si ejecutó un trabajo
+    """
+    config = COLAS[cola]
+    duracion = timedelta(seconds=config.visibilidad_segundos)
+
+    db = session_factory()
+    try:
+        # Consulta barata antes de escribir en liderazgo_tareas
+        if not hay_disponibles(db, cola):
+            return False
+
+        ranura = next(
+            (f"cola:{cola}:{n}" for n in range(config.concurrencia)
+             if adquirir(db, f"cola:{cola}:{n}", titular, duracion)),
+            None
+        )
+        if ranura is None:
+            return False
+
+        try:
+            trabajo = reservar(db, cola, titular)
+            if trabajo is None:
+                return False
+            with _Latido(session_factory, trabajo.id, ranura, titular, duracion):
+                ejecutar(db, trabajo, titular)
+            return True
+        finally:
+            liberar(db, ranura, titular)
+    finally:
+        db.close()
+
+
+# ==================== ADMINISTRACIÓN ====================
+
+
+def reintentar(db: Session, trabajo_id: int) -> bool:
+    """Devuelve un trabajo fallido (dead-letter) a pendiente con intentos en cero."""
+    reintentado = db.execute(
+        update(Trabajo)
+        .where(Trabajo.id == trabajo_id, Trabajo.estado == EstadoTrabajo.fallido)
+        .values(estado=EstadoTrabajo.pendiente, intentos=0, disponible_en=datetime.utcnow(), terminado_en=None)
+    )
+    db.commit()
+    return reintentado.rowcount == 1
+
+
+def purgar_completados(db: Session, dias: int = 7) -> int:
+    """Elimina trabajos completados hace más de `dias` días."""
+    limite = datetime.utcnow() - timedelta(days=dias)
+    eliminados = db.query(Trabajo).filter(
+        Trabajo.estado == EstadoTrabajo.completado,
+        Trabajo.terminado_en < limite
+    ).delete(synchronize_session=False)
+    db.commit()
+    return eliminados
+
+
+def _promedio_segundos(intervalos: Iterable) -> Optional[float]:
+    segundos = [(fin - inicio).total_seconds() for inicio, fin in intervalos if inicio and fin]
+    return round(sum(segundos) / len(segundos), 2) if segundos else None
+
+
+def estado_colas(db: Session, ventana: timedelta = timedelta(hours=1)) -> Dict[str, Any]:
+    """
+    Profundidad y latencia por cola.
+
+    - pendientes / listos (ya disponibles) / en_proceso / fallidos
+    - espera_max_segundos: antigüedad del trabajo listo más viejo
+    - latencia/duración promedio de los completados en la ventana
+    """
+    ahora = datetime.utcnow()
+    desde = ahora - ventana
+
+    conteos: Dict[str, Dict[str, int]] = {
+        cola: {estado.value: 0 for estado in EstadoTrabajo} for cola in COLAS
+    }
+    for cola, estado, total in db.execute(
+        select(Trabajo.cola, Trabajo.estado, func.count(Trabajo.id)).group_by(Trabajo.cola, Trabajo.estado)
+    ):
+        conteos.setdefault(cola, {e.value: 0 for e in EstadoTrabajo})[estado.value] = total
+
+    listos = dict(db.execute(
+        select(Trabajo.cola, func.min(Trabajo.disponible_en))
+        .where(Trabajo.estado == EstadoTrabajo.pendiente, Trabajo.disponible_en <= ahora)
+        .group_by(Trabajo.cola)
+    ).all())
+
+    completados: Dict[str, List] = {}
+    for cola, creado, iniciado, terminado in db.execute(
+        select(Trabajo.cola, Trabajo.creado_en, Trabajo.iniciado_en, Trabajo.terminado_en)
+        .where(Trabajo.estado == EstadoTrabajo.completado, Trabajo.terminado_en >= desde)
+        .limit(5000)
+    ):
+        completados.setdefault(cola, []).append((creado, iniciado, terminado))
+
+    colas = {}
+    for cola, por_estado in conteos.items():
+        filas = completados.get(cola, [])
+        mas_viejo = listos.get(cola)
+        colas[cola] = {
+            **por_estado,
+            "concurrencia": COLAS[cola].concurrencia if cola in COLAS else None,
+            "espera_max_segundos": round((ahora - mas_viejo).total_seconds(), 2) if mas_viejo else 0,
+            "completados_ventana": len(filas),
+            "latencia_promedio_segundos": _promedio_segundos((c, i) for c, i, _ in filas),
+            "duracion_promedio_segundos": _promedio_segundos((i, t) for _, i, t in filas),
+        }
+
+    return {"ventana_minutos": int(ventana.total_seconds() // 60), "colas": colas}
+
+
+# ==================== WORKERS ====================
+
+
+class PoolTrabajadores:
+    """Hilos que consumen las colas; cada uno con su identidad y su sesión por trabajo."""
+
+    def __init__(
+        self,
+        hilos: int,
+        colas: Optional[Iterable[str]] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        espera_segundos: float = 2.0
+    ):
+        self.hilos = max(1, hilos)
+        self.colas = tuple(colas or COLAS)
+        self.session_factory = session_factory
+        self.espera_segundos = espera_segundos
+        self._identidad = identidad_proceso()
+        self._detener = threading.Event()
+        self._hilos: List[threading.Thread] = []
+
+    def iniciar(self) -> None:
+        self._hilos = [
+            threading.Thread(target=self._trabajar, args=(f"{self._identidad}:{i}",),
+                             name=f"trabajos-{i}", daemon=True)
+            for i in range(self.hilos)
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def detener(self, timeout: float = 30.0) -> None:
+        """Termina el trabajo en curso de cada hilo (si tarda más, su reserva vence y se reintenta)."""
+        self._detener.set()
+        for hilo in self._hilos:
+            hilo.join(timeout)
+        self._hilos = []
+
+    def esperar(self) -> None:
+        for hilo in self._hilos:
+            while hilo.is_alive():
+                hilo.join(1)
+
+    def _trabajar(self, titular: str) -> None:
+        while not self._detener.is_set():
+            trabajo_hecho = False
+            for cola in self.colas:
+                try:
+                    trabajo_hecho |= procesar_uno(self.session_factory, cola, titular)
+                except Exception as e:
+                    logger.error(f"Error en worker de la cola '{cola}': {str(e)}", exc_info=True)
+            if not trabajo_hecho:
+                self._detener.wait(self.espera_segundos)
+
+
+# Pool del proceso de la API
+_pool: Optional[PoolTrabajadores] = None
+
+
+def iniciar_trabajadores() -> None:
+    """Inicia los workers dentro del proceso. Se ejecuta al iniciar la aplicación (en lifespan)."""
+    global _pool
+
+    if _pool is not None or not settings.trabajos_en_proceso:
+        return
+
+    import app.tasks.trabajos  # noqa: F401  (registra las tareas)
+
+    _pool = PoolTrabajadores(settings.trabajos_hilos, espera_segundos=settings.trabajos_espera_segundos)
+    _pool.iniciar()
+    logger.info(f"Workers de la cola de trabajos iniciados: {_pool.hilos} hilos, colas {', '.join(_pool.colas)}")
+
+
+def detener_trabajadores() -> None:
+    """Detiene los workers del proceso. Se ejecuta al cerrar la aplicación (en lifespan)."""
+    global _pool
+
+    if _pool is not None:
+        _pool.detener()
+        _pool = None
+        logger.info("Workers de la cola de trabajos detenidos")
@@ -9,15 +9,18 @@ Fecha: 2025-10-09
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from collections import defaultdict
+from typing import Callable, List, Dict, Any, Optional, Sequence, Tuple
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
 
 from app.models.factura import Factura
 from app.models.factura_item import FacturaItem
+from app.services import item_precio_historico
+from app.services.indice_similitud_items import IndiceMinHash, get_indices_proveedores
 from app.services.item_normalizer import ItemNormalizerService
+from app.services.item_precio_historico import Mes, PreciosItem
 
 
 logger = logging.getLogger(__name__)
@@ -85,13 +88,78 @@ class ComparadorItemsService:
         if not factura:
             raise ValueError(f"Factura {factura_id} no encontrada")
 
-        if not factura.items:
-            logger.warning(f"Factura {factura_id} no tiene items")
-            return self._resultado_vacio()
+        return self._comparar_facturas([factura], meses_historico)[factura.id]
 
-        # Calcular fecha límite para histórico
-        fecha_limite = factura.fecha_emision - timedelta(days=meses_historico * 30)
+    def comparar_facturas_vs_historial(
+        self,
+        factura_ids: Sequence[int],
+        meses_historico: int = 12
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Compara varias facturas contra su histórico.
+
+        Una consulta de facturas (con sus items) y una consulta de historial
+        por proveedor, en vez de una por item.
+
+        Returns:
+            {factura_id: resultado de comparar_factura_vs_historial};
+            las facturas inexistentes no aparecen
+        """
+        logger.info(f"Comparando {len(factura_ids)} facturas vs histórico...")
+
+        facturas = self.db.query(Factura).filter(Factura.id.in_(set(factura_ids))).all()
+        return self._comparar_facturas(facturas, meses_historico)
+
+    def _comparar_facturas(
+        self,
+        facturas: List[Factura],
+        meses_historico: int
+    ) -> Dict[int, Dict[str, Any]]:
+        """Agrupa las facturas por proveedor y compara cada una contra el historial del grupo."""
+        resultados = {}
+        por_proveedor = defaultdict(list)
+
+        for factura in facturas:
+            if not factura.items:
+                logger.warning(f"Factura {factura.id} no tiene items")
+                resultados[factura.id] = self._resultado_vacio()
+            else:
+                por_proveedor[factura.proveedor_id].append(factura)
+
+        for proveedor_id, facturas_proveedor in por_proveedor.items():
+            # Ventana de cada factura: meses completos anteriores a su mes más
+            # los items de su mes con fecha anterior
+            historial, items_mes = self._buscar_historial_items(
+                proveedor_id=proveedor_id,
+                item_hashes={item.item_hash for f in facturas_proveedor for item in f.items if item.item_hash},
+                fechas=[factura.fecha_emision for factura in facturas_proveedor],
+                meses_historico=meses_historico
+            )
+            # Items parecidos para sugerir en los items nuevos: el índice se
+            # obtiene solo si alguna factura del grupo tiene un item nuevo
+            indice = self._indice_proveedor(proveedor_id) if proveedor_id is not None else None
+
+            for factura in facturas_proveedor:
+                resultados[factura.id] = self._comparar_factura(
+                    factura, historial, items_mes, meses_historico, indice=indice
+                )
+
+        return resultados
+
+    def _comparar_factura(
+        self,
+        factura: Factura,
+        historial: Dict[str, Dict[Mes, PreciosItem]],
+        items_mes: Dict[str, List[Tuple[date, int, Decimal, Decimal]]],
+        meses_historico: int,
+        indice: Optional[Callable[[], IndiceMinHash]] = None
+    ) -> Dict[str, Any]:
+        """
+        Compara los items de una factura con el historial ya cargado de su proveedor.
 
+        `indice` devuelve el índice de similitud del proveedor; se llama solo
+        para sugerir items parecidos a los items nuevos.
+        """
         # Comparar cada item
         items_ok = []
         items_con_alertas = []
@@ -99,11 +167,11 @@ class ComparadorItemsService:
         nuevos_items = []
 
         for item in factura.items:
-            resultado_item = self._comparar_item_individual(
-                item,
-                factura,
-                fecha_limite
+            precios = item_precio_historico.historial_item(
+                historial.get(item.item_hash, {}), items_mes.get(item.item_hash, []),
+                factura.fecha_emision, meses_historico
             )
+            resultado_item = self._comparar_item_individual(item, precios)
 
             if resultado_item['tiene_historial']:
                 if resultado_item['alertas']:
@@ -112,6 +180,8 @@ class ComparadorItemsService:
                 else:
                     items_ok.append(resultado_item)
             else:
+                if indice is not None:
+                    resultado_item['items_similares'] = self._items_similares(indice(), item)
                 nuevos_items.append(resultado_item)
 
         # Calcular recomendación final
@@ -122,7 +192,7 @@ class ComparadorItemsService:
         )
 
         return {
-            'factura_id': factura_id,
+            'factura_id': factura.id,
             'items_analizados': len(factura.items),
             'items_ok': len(items_ok),
             'items_con_alertas': len(items_con_alertas),
@@ -136,15 +206,35 @@ class ComparadorItemsService:
             'timestamp': datetime.utcnow().isoformat()
         }
 
+    def _indice_proveedor(self, proveedor_id: int) -> Callable[[], IndiceMinHash]:
+        """Índice de similitud del proveedor, obtenido en la primera llamada."""
+        obtenido: List[IndiceMinHash] = []
+
+        def obtener() -> IndiceMinHash:
+            if not obtenido:
+                obtenido.append(get_indices_proveedores().obtener(self.db, proveedor_id))
+            return obtenido[0]
+        return obtener
+
+    def _items_similares(self, indice: IndiceMinHash, item: FacturaItem, limite: int = 3) -> List[Dict[str, Any]]:
+        """Items del proveedor con descripción parecida (Jaccard de palabras) a un item nuevo."""
+        return [
+            {'item_hash': item_hash, 'similitud': round(similitud, 3)}
+            for item_hash, similitud in indice.buscar(item.descripcion_normalizada, limite=limite + 1)
+            if item_hash != item.item_hash
+        ][:limite]
+
     def _comparar_item_individual(
         self,
         item: FacturaItem,
-        factura: Factura,
-        fecha_limite: datetime
+        precios: PreciosItem
     ) -> Dict[str, Any]:
         """
         Compara un item individual contra su histórico.
 
+        Args:
+            precios: Historial del item en la ventana (item_precio_historico)
+
         Returns:
             Dict con análisis del item
         """
@@ -160,15 +250,7 @@ class ComparadorItemsService:
             'historial': None
         }
 
-        # Buscar items similares en facturas anteriores del mismo proveedor
-        items_historicos = self._buscar_items_historicos(
-            proveedor_id=factura.proveedor_id,
-            item_hash=item.item_hash,
-            fecha_limite=fecha_limite,
-            fecha_actual=factura.fecha_emision
-        )
-
-        if not items_historicos:
+        if not precios.n:
             # Item nuevo sin historial
             resultado['alertas'].append({
                 'tipo': 'item_nuevo',
@@ -180,7 +262,7 @@ class ComparadorItemsService:
 
         # Tiene historial - analizar estadísticas
         resultado['tiene_historial'] = True
-        resultado['historial'] = self._calcular_estadisticas_historico(items_historicos)
+        resultado['historial'] = self._calcular_estadisticas_historico(precios)
 
         # Comparar precio unitario
         alertas_precio = self._comparar_precio_unitario(
@@ -202,79 +284,57 @@ class ComparadorItemsService:
     # BÚSQUEDA Y ESTADÍSTICAS
     # ============================================================================
 
-    def _buscar_items_historicos(
+    def _buscar_historial_items(
         self,
-        proveedor_id: int,
-        item_hash: str,
-        fecha_limite: datetime,
-        fecha_actual: datetime
-    ) -> List[FacturaItem]:
+        proveedor_id: Optional[int],
+        item_hashes: set,
+        fechas: List[date],
+        meses_historico: int
+    ) -> Tuple[Dict[str, Dict[Mes, PreciosItem]], Dict[str, List[Tuple[date, int, Decimal, Decimal]]]]:
         """
-        Busca items históricos del mismo tipo.
+        Historial de todos los item_hash de un proveedor para facturas de
+        esas fechas: los meses completos en una consulta a
+        item_precio_historico y el mes de cada factura en otra a factura_items.
 
         Returns:
-            Lista de FacturaItem históricos
+            ({item_hash: {(año, mes): PreciosItem}}, {item_hash: [(fecha, factura_id, precio, cantidad)]})
         """
-        if not item_hash:
-            return []
-
-        # Query: Items del mismo proveedor, mismo hash, en ventana de tiempo
-        items = self.db.query(FacturaItem).join(Factura).filter(
-            and_(
-                Factura.proveedor_id == proveedor_id,
-                FacturaItem.item_hash == item_hash,
-                Factura.fecha_emision >= fecha_limite,
-                Factura.fecha_emision < fecha_actual
-            )
-        ).order_by(Factura.fecha_emision.desc()).all()
-
-        return items
+        if proveedor_id is None:
+            return {}, {}
+        ventanas = [item_precio_historico.ventana(fecha, meses_historico) for fecha in fechas]
+        meses = item_precio_historico.meses_por_item(
+            self.db, proveedor_id, item_hashes,
+            min(desde for desde, _ in ventanas), max(hasta for _, hasta in ventanas)
+        )
+        return meses, item_precio_historico.items_del_mes(self.db, proveedor_id, item_hashes, fechas)
 
-    def _calcular_estadisticas_historico(
-        self,
-        items_historicos: List[FacturaItem]
-    ) -> Dict[str, Any]:
+    def _calcular_estadisticas_historico(self, precios: PreciosItem) -> Dict[str, Any]:
         """
         Calcula estadísticas del histórico de items.
 
         Returns:
-            Dict con promedio, min, max, desv. estándar
+            Dict con promedio, min, max, desv. estándar y percentiles 25/50/75
+            (del histograma: error relativo <= 1%)
         """
-        if not items_historicos:
+        if not precios.n:
             return None
 
-        # Extraer precios y cantidades
-        precios = [float(item.precio_unitario) for item in items_historicos]
-        cantidades = [float(item.cantidad) for item in items_historicos]
-
-        # Calcular estadísticas de precio
-        precio_promedio = sum(precios) / len(precios)
-        precio_min = min(precios)
-        precio_max = max(precios)
-
-        # Desviación estándar
-        if len(precios) > 1:
-            varianza_precio = sum((p - precio_promedio) ** 2 for p in precios) / len(precios)
-            precio_desv = varianza_precio ** 0.5
-        else:
-            precio_desv = 0
-
-        # Estadísticas de cantidad
-        cantidad_promedio = sum(cantidades) / len(cantidades)
-        cantidad_min = min(cantidades)
-        cantidad_max = max(cantidades)
+        _, _, ultimo_precio, ultima_cantidad = precios.ultimo
 
         return {
-            'veces_facturado': len(items_historicos),
-            'precio_promedio': precio_promedio,
-            'precio_min': precio_min,
-            'precio_max': precio_max,
-            'precio_desv_std': precio_desv,
-            'cantidad_promedio': cantidad_promedio,
-            'cantidad_min': cantidad_min,
-            'cantidad_max': cantidad_max,
-            'ultimo_precio': precios[0] if precios else None,
-            'ultima_cantidad': cantidades[0] if cantidades else None
+            'veces_facturado': precios.n,
+            'precio_promedio': precios.precios.media,
+            'precio_min': float(precios.precio_min),
+            'precio_max': float(precios.precio_max),
+            'precio_desv_std': precios.desviacion_poblacional,
+            'precio_p25': precios.percentil(0.25),
+            'precio_p50': precios.percentil(0.5),
+            'precio_p75': precios.percentil(0.75),
+            'cantidad_promedio': precios.media_cantidad,
+            'cantidad_min': float(precios.cantidad_min),
+            'cantidad_max': float(precios.cantidad_max),
+            'ultimo_precio': float(ultimo_precio),
+            'ultima_cantidad': float(ultima_cantidad)
         }
 
     # ============================================================================
@@ -0,0 +1,524 @@
+# app/services/dashboard_workflow.py
+"""
+Contadores precalculados de /workflow/dashboard (tabla dashboard_workflow_responsable).
+
+Antes cada request resolvía NIT → proveedores del responsable y contaba
+facturas estado por estado. Ahora:
+
+- La fila de un responsable se calcula la primera vez que se consulta
+  (materializar) y desde ahí el dashboard es una lectura por PK.
+- Un listener after_flush aplica a las filas existentes el delta de cada
+  cambio de estado de factura y de cada aprobación de workflow, en la MISMA
+  transacción (igual que app.services.resumen_mensual).
+- Los cambios de alcance (asignaciones NIT creadas, editadas o eliminadas;
+  facturas que cambian de responsable en el modelo sin asignaciones)
+  eliminan la fila afectada: se vuelve a materializar en la próxima lectura.
+- "Pendientes hace más de 3 días" depende de la fecha: la fila guarda el
+  corte con que se contó y se recalcula una vez al día, en la primera lectura.
+
+El tiempo de aprobación se toma de workflow.tiempo_total_aprobacion, que un
+listener before_flush completa al registrar fecha_aprobacion.
+
+Quedan fuera las escrituras que no pasan por el ORM (SQL directo,
+query.update() masivos) y los cambios de NIT de proveedores. Para esos casos:
+    python -m app.scripts.dashboard_workflow --verificar
+    python -m app.scripts.dashboard_workflow --reparar
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, delete, event, func, inspect, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.crud.factura import _obtener_proveedor_ids_de_responsable
+from app.models.dashboard_workflow_responsable import DashboardWorkflowResponsable, GLOBAL
+from app.models.factura import Factura, EstadoFactura
+from app.models.proveedor import Proveedor
+from app.models.workflow_aprobacion import AsignacionNitResponsable, WorkflowAprobacionFactura
+from app.utils.logger import logger
+
+
+DIAS_PENDIENTE_ANTIGUA = 3
+
+# Una columna por EstadoFactura en la tabla
+COLUMNAS_ESTADO = tuple(estado.value for estado in EstadoFactura)
+
+_COLUMNAS_CONTADORES = COLUMNAS_ESTADO + (
+    "pendientes_antiguas", "aprobaciones_con_tiempo", "segundos_aprobacion_total"
+)
+
+# Atributos que mueven los contadores o el alcance
+_CAMPOS_FACTURA = ("proveedor_id", "estado", "fecha_emision", "responsable_id")
+_CAMPOS_ASIGNACION = ("responsable_id", "nit", "activo")
+
+
+def corte_antiguas(hoy: Optional[date] = None) -> date:
+    """Fecha de emisión máxima de una factura en revisión "antigua"."""
+    return (hoy or date.today()) - timedelta(days=DIAS_PENDIENTE_ANTIGUA)
+
+
+def _valor_estado(estado) -> Optional[str]:
+    return getattr(estado, "value", estado)
+
+
+def segundos_aprobacion(creado_en: Optional[datetime], fecha_aprobacion: Optional[datetime]) -> Optional[int]:
+    """Segundos enteros entre la creación del workflow y su aprobación."""
+    if fecha_aprobacion is None:
+        return None
+    inicio = creado_en or fecha_aprobacion
+    return max(0, int((fecha_aprobacion.replace(microsecond=0) - inicio.replace(microsecond=0)).total_seconds()))
+
+
+# ==================== CÁLCULO DESDE FACTURAS ====================
+
+
+def calcular(db: Session, responsable_id: int, corte: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Valores de la fila de un responsable (GLOBAL = todas las facturas),
+    contados en vivo: 1 consulta agrupada por estado + 1 de tiempos.
+    """
+    corte = corte or corte_antiguas()
+    proveedor_ids = None if responsable_id == GLOBAL else _obtener_proveedor_ids_de_responsable(db, responsable_id)
+
+    valores = {columna: 0 for columna in _COLUMNAS_CONTADORES}
+    valores.update(
+        responsable_id=responsable_id,
+        tiene_proveedores=proveedor_ids is None or bool(proveedor_ids),
+        antiguas_corte=corte,
+    )
+    if proveedor_ids is not None and not proveedor_ids:
+        return valores
+
+    filtro = [] if proveedor_ids is None else [Factura.proveedor_id.in_(proveedor_ids)]
+
+    por_estado = db.execute(
+        select(
+            Factura.estado,
+            func.count(Factura.id),
+            func.sum(case(
+                (and_(Factura.estado == EstadoFactura.en_revision, Factura.fecha_emision <= corte), 1),
+                else_=0
+            )),
+        ).where(*filtro).group_by(Factura.estado)
+    )
+    for estado, n, antiguas in por_estado:
+        valores[_valor_estado(estado)] = int(n)
+        valores["pendientes_antiguas"] += int(antiguas or 0)
+
+    W = WorkflowAprobacionFactura
+    aprobaciones, segundos = db.execute(
+        select(func.count(W.tiempo_total_aprobacion), func.coalesce(func.sum(W.tiempo_total_aprobacion), 0))
+        .select_from(W)
+        .join(Factura, Factura.id == W.factura_id)
+        .where(W.tiempo_total_aprobacion.isnot(None), *filtro)
+    ).one()
+    valores["aprobaciones_con_tiempo"] = int(aprobaciones)
+    valores["segundos_aprobacion_total"] = int(segundos)
+
+    return valores
+
+
+def calcular_en_vivo(db: Session, responsable_id: Optional[int]) -> DashboardWorkflowResponsable:
+    """Fila calculada sin leer ni escribir la tabla (objeto transitorio)."""
+    return DashboardWorkflowResponsable(**calcular(db, responsable_id or GLOBAL))
+
+
+# ==================== LECTURA ====================
+
+
+def _materializar(db: Session, responsable_id: int, corte: date) -> DashboardWorkflowResponsable:
+    valores = calcular(db, responsable_id, corte)
+    try:
+        with db.begin_nested():
+            db.execute(insert(DashboardWorkflowResponsable).values(**valores))
+    except IntegrityError:
+        # Otro request la materializó primero; los valores son equivalentes
+        pass
+    return DashboardWorkflowResponsable(**valores)
+
+
+def _renovar_antiguas(db: Session, fila: DashboardWorkflowResponsable, corte: date) -> None:
+    """Recuenta pendientes_antiguas con el corte de hoy (una vez al día por fila)."""
+    antiguas = db.query(func.count(Factura.id)).filter(
+        Factura.estado == EstadoFactura.en_revision,
+        Factura.fecha_emision <= corte,
+    )
+    if fila.responsable_id != GLOBAL:
+        proveedor_ids = _obtener_proveedor_ids_de_responsable(db, fila.responsable_id)
+        antiguas = antiguas.filter(Factura.proveedor_id.in_(proveedor_ids)) if proveedor_ids else None
+
+    fila.pendientes_antiguas = (antiguas.scalar() or 0) if antiguas is not None else 0
+    fila.antiguas_corte = corte
+
+
+def obtener(db: Session, responsable_id: Optional[int]) -> DashboardWorkflowResponsable:
+    """
+    Fila del dashboard: lectura por PK; la materializa si no existe y
+    renueva pendientes_antiguas si el corte cambió de día.
+
+    No hace commit: el caller confirma (si hubo escritura) o revierte.
+    """
+    clave = responsable_id or GLOBAL
+    corte = corte_antiguas()
+
+    fila = db.get(DashboardWorkflowResponsable, clave)
+    if fila is None:
+        return _materializar(db, clave, corte)
+
+    if fila.antiguas_corte != corte:
+        _renovar_antiguas(db, fila, corte)
+    return fila
+
+
+def a_respuesta(fila: DashboardWorkflowResponsable) -> Dict[str, Any]:
+    """Respuesta de /workflow/dashboard (mismos campos que el cálculo en vivo anterior)."""
+    if not fila.tiene_proveedores:
+        facturas_por_estado = {}
+    else:
+        facturas_por_estado = {columna: getattr(fila, columna) for columna in COLUMNAS_ESTADO}
+
+    total_aprobadas_auto = fila.aprobada_auto
+    total_aprobadas_manual = fila.aprobada
+    total_aprobadas = total_aprobadas_auto + total_aprobadas_manual
+    total_rechazadas = fila.rechazada
+    total_en_revision = fila.en_revision
+    # NOTA: "pendiente" fue eliminado en refactorización reciente
+    total_pendientes = 0
+
+    tiempo_promedio = (
+        fila.segundos_aprobacion_total / fila.aprobaciones_con_tiempo
+        if fila.aprobaciones_con_tiempo else 0
+    )
+
+    total_facturas = total_aprobadas + total_rechazadas + total_en_revision
+    tasa_aprobacion_automatica = (
+        (total_aprobadas_auto / total_facturas * 100) if total_facturas > 0 else 0
+    )
+
+    return {
+        # Campos compatibles con el frontend
+        "total_pendientes": total_pendientes,
+        "total_en_revision": total_en_revision,
+        "total_aprobadas": total_aprobadas,
+        "total_aprobadas_auto": total_aprobadas_auto,
+        "total_rechazadas": total_rechazadas,
+        "pendientes_antiguas": fila.pendientes_antiguas,
+        "tiempo_promedio_aprobacion_horas": round(tiempo_promedio / 3600, 2) if tiempo_promedio else 0,
+        "tasa_aprobacion_automatica": round(tasa_aprobacion_automatica, 2),
+
+        # Campos adicionales para compatibilidad legacy
+        "facturas_por_estado": facturas_por_estado,
+        "total_aprobadas_automaticamente": total_aprobadas_auto,
+        "total_aprobadas_manualmente": total_aprobadas_manual,
+        "total_pendientes_revision": total_pendientes,
+        "pendientes_hace_mas_3_dias": fila.pendientes_antiguas,
+        "tiempo_promedio_aprobacion_segundos": int(tiempo_promedio),
+    }
+
+
+# ==================== MANTENIMIENTO EN EL FLUSH ====================
+
+
+def _previos(obj, campos: Iterable[str], cargar: bool = True) -> Dict[str, Any]:
+    """Valores antes del flush. cargar=False para objetos eliminados."""
+    estado = inspect(obj)
+    valores = {}
+    for campo in campos:
+        historial = estado.attrs[campo].history
+        if historial.deleted:
+            valores[campo] = historial.deleted[0]
+        elif historial.unchanged:
+            valores[campo] = historial.unchanged[0]
+        else:
+            valores[campo] = getattr(obj, campo) if cargar else estado.dict.get(campo)
+    return valores
+
+
+def _actuales(obj, campos: Iterable[str]) -> Dict[str, Any]:
+    return {campo: getattr(obj, campo) for campo in campos}
+
+
+def _cambiado(obj, campos: Iterable[str]) -> bool:
+    estado = inspect(obj)
+    return any(estado.attrs[campo].history.has_changes() for campo in campos)
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    """Completa tiempo_total_aprobacion de los workflows que registran aprobación."""
+    for obj in (*session.new, *session.dirty):
+        if not isinstance(obj, WorkflowAprobacionFactura):
+            continue
+        if obj in session.dirty and not inspect(obj).attrs.fecha_aprobacion.history.has_changes():
+            continue
+        obj.tiempo_total_aprobacion = segundos_aprobacion(obj.creado_en, obj.fecha_aprobacion)
+
+
+class _Cambios:
+    """Lo que un flush aporta a los contadores, antes de repartirlo por responsable."""
+
+    def __init__(self):
+        # (proveedor_id, estado, fecha_emision, signo)
+        self.facturas: List[Tuple[Optional[int], Optional[str], Optional[date], int]] = []
+        # (factura_id, segundos, signo)
+        self.aprobaciones: List[Tuple[int, int, int]] = []
+        # Responsables cuyo alcance puede haber cambiado
+        self.alcance_asignacion: Set[int] = set()
+        self.alcance_factura: Set[int] = set()
+
+    def factura(self, valores: Dict[str, Any], signo: int) -> None:
+        self.facturas.append((
+            valores["proveedor_id"], _valor_estado(valores["estado"]), valores["fecha_emision"], signo
+        ))
+
+    def vacio(self) -> bool:
+        return not (self.facturas or self.aprobaciones or self.alcance_asignacion or self.alcance_factura)
+
+
+def _recolectar(session: Session) -> _Cambios:
+    cambios = _Cambios()
+
+    for obj in session.new:
+        if isinstance(obj, Factura):
+            cambios.factura(_actuales(obj, _CAMPOS_FACTURA), +1)
+            if obj.responsable_id:
+                cambios.alcance_factura.add(obj.responsable_id)
+        elif isinstance(obj, WorkflowAprobacionFactura) and obj.tiempo_total_aprobacion is not None:
+            cambios.aprobaciones.append((obj.factura_id, obj.tiempo_total_aprobacion, +1))
+        elif isinstance(obj, AsignacionNitResponsable) and obj.responsable_id:
+            cambios.alcance_asignacion.add(obj.responsable_id)
+
+    for obj in session.dirty:
+        if isinstance(obj, Factura):
+            if not _cambiado(obj, _CAMPOS_FACTURA):
+                continue
+            previos, actuales = _previos(obj, _CAMPOS_FACTURA), _actuales(obj, _CAMPOS_FACTURA)
+            cambios.factura(previos, -1)
+            cambios.factura(actuales, +1)
+            if (previos["responsable_id"], previos["proveedor_id"]) != (actuales["responsable_id"], actuales["proveedor_id"]):
+                cambios.alcance_factura.update(r for r in (previos["responsable_id"], actuales["responsable_id"]) if r)
+        elif isinstance(obj, WorkflowAprobacionFactura):
+            if not _cambiado(obj, ("tiempo_total_aprobacion", "factura_id")):
+                continue
+            previos = _previos(obj, ("tiempo_total_aprobacion", "factura_id"))
+            if previos["tiempo_total_aprobacion"] is not None:
+                cambios.aprobaciones.append((previos["factura_id"], previos["tiempo_total_aprobacion"], -1))
+            if obj.tiempo_total_aprobacion is not None:
+                cambios.aprobaciones.append((obj.factura_id, obj.tiempo_total_aprobacion, +1))
+        elif isinstance(obj, AsignacionNitResponsable):
+            if not _cambiado(obj, _CAMPOS_ASIGNACION):
+                continue
+            previos = _previos(obj, _CAMPOS_ASIGNACION)
+            cambios.alcance_asignacion.update(r for r in (previos["responsable_id"], obj.responsable_id) if r)
+
+    for obj in session.deleted:
+        if isinstance(obj, Factura):
+            previos = _previos(obj, _CAMPOS_FACTURA, cargar=False)
+            cambios.factura(previos, -1)
+            if previos["responsable_id"]:
+                cambios.alcance_factura.add(previos["responsable_id"])
+        elif isinstance(obj, WorkflowAprobacionFactura):
+            previos = _previos(obj, ("tiempo_total_aprobacion", "factura_id"), cargar=False)
+            if previos["tiempo_total_aprobacion"] is not None:
+                cambios.aprobaciones.append((previos["factura_id"], previos["tiempo_total_aprobacion"], -1))
+        elif isinstance(obj, AsignacionNitResponsable):
+            previos = _previos(obj, _CAMPOS_ASIGNACION, cargar=False)
+            if previos["responsable_id"]:
+                cambios.alcance_asignacion.add(previos["responsable_id"])
+
+    return cambios
+
+
+def _nuevo_delta() -> Dict[str, Any]:
+    return {"columnas": Counter(), "antiguas": Counter()}
+
+
+def calcular_deltas(cambios: _Cambios, proveedor_de_factura: Dict[int, Optional[int]]) -> Dict[Optional[int], Dict[str, Any]]:
+    """Delta por proveedor (None = factura sin proveedor): columnas y antiguas por fecha_emision."""
+    deltas: Dict[Optional[int], Dict[str, Any]] = defaultdict(_nuevo_delta)
+
+    for proveedor_id, estado, fecha_emision, signo in cambios.facturas:
+        if estado is None:
+            continue
+        delta = deltas[proveedor_id]
+        delta["columnas"][estado] += signo
+        if estado == EstadoFactura.en_revision.value and fecha_emision is not None:
+            delta["antiguas"][fecha_emision] += signo
+
+    for factura_id, segundos, signo in cambios.aprobaciones:
+        delta = deltas[proveedor_de_factura.get(factura_id)]
+        delta["columnas"]["aprobaciones_con_tiempo"] += signo
+        delta["columnas"]["segundos_aprobacion_total"] += signo * segundos
+
+    return deltas
+
+
+def _responsables_por_proveedor(conn: Connection, proveedor_ids: Set[int]) -> Dict[int, Set[int]]:
+    """
+    Responsables en cuyo alcance está cada proveedor, con la misma regla que
+    _obtener_proveedor_ids_de_responsable: NITs asignados o, para usuarios
+    sin asignaciones, proveedores de sus facturas.
+    """
+    resultado: Dict[int, Set[int]] = defaultdict(set)
+    if not proveedor_ids:
+        return resultado
+
+    A = AsignacionNitResponsable
+    por_nit = conn.execute(
+        select(Proveedor.id, A.responsable_id)
+        .join(A, A.nit == Proveedor.nit)
+        .where(Proveedor.id.in_(proveedor_ids), A.activo == True)
+    )
+    for proveedor_id, responsable_id in por_nit:
+        resultado[proveedor_id].add(responsable_id)
+
+    con_asignaciones = select(A.responsable_id).where(A.activo == True, A.responsable_id.isnot(None))
+    por_factura = conn.execute(
+        select(Factura.proveedor_id, Factura.responsable_id).where(
+            Factura.proveedor_id.in_(proveedor_ids),
+            Factura.responsable_id.isnot(None),
+            Factura.responsable_id.not_in(con_asignaciones),
+        ).distinct()
+    )
+    for proveedor_id, responsable_id in por_factura:
+        resultado[proveedor_id].add(responsable_id)
+
+    return resultado
+
+
+def _sin_asignaciones(conn: Connection, responsable_ids: Set[int]) -> Set[int]:
+    if not responsable_ids:
+        return set()
+    A = AsignacionNitResponsable
+    con = set(conn.execute(
+        select(A.responsable_id).where(A.responsable_id.in_(responsable_ids), A.activo == True).distinct()
+    ).scalars())
+    return responsable_ids - con
+
+
+def _aplicar(conn: Connection, responsable_id: int, delta: Dict[str, Any]) -> None:
+    """col = col + delta en la fila (si existe: las filas se materializan al leer)."""
+    tabla = DashboardWorkflowResponsable.__table__
+    valores = {columna: tabla.c[columna] + n for columna, n in delta["columnas"].items() if n}
+
+    antiguas = [(fecha, n) for fecha, n in delta["antiguas"].items() if n]
+    if antiguas:
+        valores["pendientes_antiguas"] = tabla.c.pendientes_antiguas + sum(
+            case((tabla.c.antiguas_corte >= fecha, n), else_=0) for fecha, n in antiguas
+        )
+
+    if valores:
+        conn.execute(update(tabla).where(tabla.c.responsable_id == responsable_id).values(**valores))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if not any(
+        isinstance(obj, (Factura, WorkflowAprobacionFactura, AsignacionNitResponsable))
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        return
+
+    cambios = _recolectar(session)
+    if cambios.vacio():
+        return
+
+    conn = session.connection()
+
+    proveedor_de_factura = {}
+    factura_ids = {factura_id for factura_id, _, _ in cambios.aprobaciones}
+    if factura_ids:
+        proveedor_de_factura = dict(conn.execute(
+            select(Factura.id, Factura.proveedor_id).where(Factura.id.in_(factura_ids))
+        ).all())
+
+    invalidar = cambios.alcance_asignacion | _sin_asignaciones(conn, cambios.alcance_factura)
+
+    deltas = calcular_deltas(cambios, proveedor_de_factura)
+    por_responsable: Dict[int, Dict[str, Any]] = defaultdict(_nuevo_delta)
+    destinatarios = _responsables_por_proveedor(conn, {p for p in deltas if p is not None})
+    for proveedor_id, delta in deltas.items():
+        for responsable_id in (GLOBAL, *destinatarios.get(proveedor_id, ())):
+            if responsable_id in invalidar:
+                continue
+            por_responsable[responsable_id]["columnas"].update(delta["columnas"])
+            por_responsable[responsable_id]["antiguas"].update(delta["antiguas"])
+
+    # Orden fijo (GLOBAL primero): transacciones concurrentes bloquean las filas en el mismo orden
+    for responsable_id in sorted(por_responsable):
+        _aplicar(conn, responsable_id, por_responsable[responsable_id])
+
+    if invalidar:
+        conn.execute(
+            delete(DashboardWorkflowResponsable).where(DashboardWorkflowResponsable.responsable_id.in_(invalidar))
+        )
+
+
+def registrar_mantenimiento() -> None:
+    """Registra los listeners before_flush/after_flush en todas las sesiones (idempotente)."""
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+# ==================== RECONCILIACIÓN ====================
+
+
+def _contadores(valores: Dict[str, Any]) -> Tuple:
+    return (bool(valores["tiene_proveedores"]),) + tuple(int(valores[c]) for c in _COLUMNAS_CONTADORES)
+
+
+def _comparar(db: Session) -> List[Tuple[int, Dict[str, Any], Tuple, Tuple]]:
+    """(responsable_id, valores esperados, esperado, materializado) de cada fila."""
+    resultado = []
+    for fila in db.execute(select(DashboardWorkflowResponsable)).scalars():
+        esperado = calcular(db, fila.responsable_id, fila.antiguas_corte)
+        materializado = {columna: getattr(fila, columna) for columna in ("tiene_proveedores", *_COLUMNAS_CONTADORES)}
+        resultado.append((fila.responsable_id, esperado, _contadores(esperado), _contadores(materializado)))
+    return resultado
+
+
+def verificar_consistencia(db: Session, muestra: int = 20) -> Dict[str, Any]:
+    """
+    Recalcula cada fila materializada (con su propio corte de antiguas)
+    y reporta las que difieren del cálculo en vivo.
+    """
+    filas = _comparar(db)
+    diferencias = [
+        (responsable_id, esperado, materializado)
+        for responsable_id, _, esperado, materializado in filas
+        if esperado != materializado
+    ]
+
+    return {
+        "consistente": not diferencias,
+        "filas": len(filas),
+        "diferencias": len(diferencias),
+        "columnas": ("tiene_proveedores",) + _COLUMNAS_CONTADORES,
+        "ejemplos": diferencias[:muestra],
+    }
+
+
+def reparar(db: Session) -> int:
+    """
+    Reescribe las filas que difieren del cálculo en vivo (en la transacción del caller).
+
+    Returns:
+        Número de filas corregidas
+    """
+    corregidas = 0
+    for responsable_id, valores, esperado, materializado in _comparar(db):
+        if esperado == materializado:
+            continue
+        db.execute(
+            update(DashboardWorkflowResponsable)
+            .where(DashboardWorkflowResponsable.responsable_id == responsable_id)
+            .values(**{k: v for k, v in valores.items() if k != "responsable_id"})
+        )
+        corregidas += 1
+
+    if corregidas:
+        logger.warning(f"dashboard_workflow_responsable: {corregidas} filas con drift corregidas")
+    return corregidas
@@ -0,0 +1,503 @@
+# app/services/estadisticas_montos.py
+"""
+Mantenimiento y lectura de estadisticas_montos (Welford por proveedor,
+concepto_hash y mes).
+
+Antes la clasificación de proveedores y el análisis de patrones releían todo
+el historial de facturas del proveedor para recalcular media, desviación y
+CV con el módulo statistics. Ahora:
+
+- Historial = facturas en ESTADOS_HISTORIAL con total_a_pagar > 0.
+- Un listener after_flush agrega cada factura que entra al historial a la
+  fila de su mes con la actualización de Welford (media y M2 de montos y de
+  los días desde la factura anterior), en la MISMA transacción.
+- Las facturas que salen del historial, cambian de monto o llegan con fecha
+  anterior a la última registrada reconstruyen solo su (proveedor,
+  concepto_hash), con una consulta acotada a ese grupo.
+- Las lecturas (de_concepto / de_proveedor) combinan las filas mensuales de
+  la ventana con la fórmula de Chan: a lo sumo una fila por mes.
+
+Las ventanas se resuelven por mes calendario (desde el mes de `desde`). El
+intervalo de cada factura se cuenta en su mes, aunque la anterior caiga
+fuera de la ventana.
+
+Quedan fuera las escrituras que no pasan por el ORM (SQL directo). Para esos
+casos:
+    python -m app.scripts.estadisticas_montos --verificar
+    python -m app.scripts.estadisticas_montos --reconstruir
+"""
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, event, func, inspect, insert, select, true, tuple_, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.estadistica_montos import EstadisticaMontos, SIN_CONCEPTO
+from app.models.factura import Factura, EstadoFactura
+from app.utils.logger import logger
+
+
+# Facturas que cuentan como historial de pagos del proveedor
+ESTADOS_HISTORIAL = (
+    EstadoFactura.aprobada.value,
+    EstadoFactura.aprobada_auto.value,
+    EstadoFactura.validada_contabilidad.value,
+)
+
+# Atributos de Factura que mueven las estadísticas
+_CAMPOS = ("proveedor_id", "concepto_hash", "fecha_emision", "estado", "total_a_pagar")
+
+Clave = Tuple[int, str]
+Mes = Tuple[int, int]
+
+
+# ==================== ACUMULADORES ====================
+
+
+@dataclass
+class Acumulador:
+    """Media y M2 de Welford; varianza muestral (n - 1), igual que statistics.stdev."""
+    n: int = 0
+    media: float = 0.0
+    m2: float = 0.0
+
+    def agregar(self, valor: float) -> None:
+        self.n += 1
+        delta = valor - self.media
+        self.media += delta / self.n
+        self.m2 += delta * (valor - self.media)
+
+    def combinar(self, otro: "Acumulador") -> "Acumulador":
+        """Fórmula de Chan: el resultado es el de agregar ambos conjuntos."""
+        if not otro.n:
+            return Acumulador(self.n, self.media, self.m2)
+        if not self.n:
+            return Acumulador(otro.n, otro.media, otro.m2)
+        n = self.n + otro.n
+        delta = otro.media - self.media
+        return Acumulador(
+            n,
+            self.media + delta * otro.n / n,
+            self.m2 + otro.m2 + delta * delta * self.n * otro.n / n,
+        )
+
+    @property
+    def varianza(self) -> float:
+        return max(0.0, self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def desviacion(self) -> float:
+        return math.sqrt(self.varianza)
+
+    @property
+    def cv(self) -> float:
+        """Coeficiente de variación en porcentaje."""
+        return self.desviacion / self.media * 100 if self.media > 0 else 0.0
+
+
+@dataclass
+class EstadisticasMontos:
+    """Estadísticas de un mes o de una ventana de meses combinados."""
+    montos: Acumulador = field(default_factory=Acumulador)
+    intervalos: Acumulador = field(default_factory=Acumulador)
+    minimo: Optional[Decimal] = None
+    maximo: Optional[Decimal] = None
+    primera_fecha: Optional[date] = None
+    ultima_fecha: Optional[date] = None
+    meses: int = 0
+
+    @property
+    def n(self) -> int:
+        return self.montos.n
+
+    def agregar(self, fecha: date, monto: Decimal, anterior: Optional[date] = None) -> None:
+        """Agrega una factura; `anterior` es la fecha de la factura previa del grupo."""
+        self.montos.agregar(float(monto))
+        if anterior is not None:
+            self.intervalos.agregar(float((fecha - anterior).days))
+        self.minimo = monto if self.minimo is None else min(self.minimo, monto)
+        self.maximo = monto if self.maximo is None else max(self.maximo, monto)
+        self.primera_fecha = fecha if self.primera_fecha is None else min(self.primera_fecha, fecha)
+        self.ultima_fecha = fecha if self.ultima_fecha is None else max(self.ultima_fecha, fecha)
+        self.meses = max(self.meses, 1)
+
+    def combinar(self, otro: "EstadisticasMontos") -> "EstadisticasMontos":
+        """Combina dos grupos de meses distintos (meses se suma)."""
+        return EstadisticasMontos(
+            montos=self.montos.combinar(otro.montos),
+            intervalos=self.intervalos.combinar(otro.intervalos),
+            minimo=_extremo(min, self.minimo, otro.minimo),
+            maximo=_extremo(max, self.maximo, otro.maximo),
+            primera_fecha=_extremo(min, self.primera_fecha, otro.primera_fecha),
+            ultima_fecha=_extremo(max, self.ultima_fecha, otro.ultima_fecha),
+            meses=self.meses + otro.meses,
+        )
+
+    @classmethod
+    def desde_fila(cls, fila) -> "EstadisticasMontos":
+        return cls(
+            montos=Acumulador(fila.n, fila.media, fila.m2),
+            intervalos=Acumulador(fila.n_intervalos, fila.media_intervalo, fila.m2_intervalo),
+            minimo=fila.minimo,
+            maximo=fila.maximo,
+            primera_fecha=fila.primera_fecha,
+            ultima_fecha=fila.ultima_fecha,
+            meses=1 if fila.n else 0,
+        )
+
+    def valores(self) -> Dict[str, Any]:
+        """Columnas de la fila mensual."""
+        return {
+            "n": self.montos.n, "media": self.montos.media, "m2": self.montos.m2,
+            "minimo": self.minimo, "maximo": self.maximo,
+            "primera_fecha": self.primera_fecha, "ultima_fecha": self.ultima_fecha,
+            "n_intervalos": self.intervalos.n,
+            "media_intervalo": self.intervalos.media,
+            "m2_intervalo": self.intervalos.m2,
+        }
+
+
+def _extremo(funcion, a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return funcion(a, b)
+
+
+# ==================== LECTURA ====================
+
+
+def _combinar_filas(filas: Iterable) -> EstadisticasMontos:
+    """Combina filas mensuales; meses = meses distintos (aunque haya varios conceptos)."""
+    resultado = EstadisticasMontos()
+    meses: Set[Mes] = set()
+    for fila in filas:
+        if not fila.n:
+            continue
+        resultado = resultado.combinar(EstadisticasMontos.desde_fila(fila))
+        meses.add((fila.año, fila.mes))
+    resultado.meses = len(meses)
+    return resultado
+
+
+def _filtro_desde(desde: Optional[date]):
+    if desde is None:
+        return true()
+    return tuple_(EstadisticaMontos.año, EstadisticaMontos.mes) >= (desde.year, desde.month)
+
+
+def de_concepto(
+    db: Session,
+    proveedor_id: int,
+    concepto_hash: Optional[str],
+    desde: Optional[date] = None
+) -> EstadisticasMontos:
+    """Historial de un proveedor y concepto desde el mes de `desde` (None = todo)."""
+    filas = db.execute(
+        select(EstadisticaMontos).where(
+            EstadisticaMontos.proveedor_id == proveedor_id,
+            EstadisticaMontos.concepto_hash == (concepto_hash or SIN_CONCEPTO),
+            _filtro_desde(desde),
+        )
+    ).scalars()
+    return _combinar_filas(filas)
+
+
+def de_proveedor(db: Session, proveedor_id: int, desde: Optional[date] = None) -> EstadisticasMontos:
+    """Historial de todos los conceptos de un proveedor desde el mes de `desde`."""
+    filas = db.execute(
+        select(EstadisticaMontos).where(
+            EstadisticaMontos.proveedor_id == proveedor_id,
+            _filtro_desde(desde),
+        )
+    ).scalars()
+    return _combinar_filas(filas)
+
+
+# ==================== MANTENIMIENTO EN EL FLUSH ====================
+
+
+def _valor_estado(estado) -> Optional[str]:
+    return getattr(estado, "value", estado)
+
+
+def _entrada(valores: Dict[str, Any]) -> Optional[Tuple[Clave, date, Decimal]]:
+    """(clave, fecha, monto) si la factura forma parte del historial."""
+    monto = valores["total_a_pagar"]
+    if (
+        _valor_estado(valores["estado"]) not in ESTADOS_HISTORIAL
+        or valores["proveedor_id"] is None
+        or valores["fecha_emision"] is None
+        or monto is None
+        or monto <= 0
+    ):
+        return None
+    clave = (valores["proveedor_id"], valores["concepto_hash"] or SIN_CONCEPTO)
+    return clave, valores["fecha_emision"], Decimal(monto)
+
+
+def _valores_actuales(factura: Factura) -> Dict[str, Any]:
+    return {campo: getattr(factura, campo) for campo in _CAMPOS}
+
+
+def _valores_previos(factura: Factura) -> Dict[str, Any]:
+    """Valores antes del flush, a partir del historial de atributos."""
+    estado = inspect(factura)
+    valores = {}
+    for campo in _CAMPOS:
+        historial = estado.attrs[campo].history
+        if historial.deleted:
+            valores[campo] = historial.deleted[0]
+        elif historial.unchanged:
+            valores[campo] = historial.unchanged[0]
+        else:
+            valores[campo] = getattr(factura, campo)
+    return valores
+
+
+def calcular_cambios(session: Session) -> Tuple[Dict[Clave, List[Tuple[date, Decimal]]], Set[Clave]]:
+    """
+    Cambios del historial en este flush.
+
+    Returns:
+        (altas por clave, claves que deben reconstruirse)
+    """
+    altas: Dict[Clave, List[Tuple[date, Decimal]]] = defaultdict(list)
+    reconstruir: Set[Clave] = set()
+
+    for obj in session.new:
+        if isinstance(obj, Factura):
+            entrada = _entrada(_valores_actuales(obj))
+            if entrada:
+                altas[entrada[0]].append(entrada[1:])
+
+    for obj in session.dirty:
+        if not isinstance(obj, Factura):
+            continue
+        if not any(inspect(obj).attrs[campo].history.has_changes() for campo in _CAMPOS):
+            continue
+        previa = _entrada(_valores_previos(obj))
+        actual = _entrada(_valores_actuales(obj))
+        if previa == actual:
+            continue
+        if previa:
+            reconstruir.add(previa[0])
+        if actual:
+            altas[actual[0]].append(actual[1:])
+
+    for obj in session.deleted:
+        if isinstance(obj, Factura):
+            previa = _entrada(_valores_previos(obj))
+            if previa:
+                reconstruir.add(previa[0])
+
+    return dict(altas), reconstruir
+
+
+def _filtro_clave(clave: Clave):
+    return and_(EstadisticaMontos.proveedor_id == clave[0], EstadisticaMontos.concepto_hash == clave[1])
+
+
+def _asegurar_fila(conn: Connection, clave: Clave, mes: Mes) -> None:
+    """Crea la fila del mes vacía si no existe (sin fallar si otra transacción la crea)."""
+    tabla = EstadisticaMontos.__table__
+    valores = {
+        "proveedor_id": clave[0], "concepto_hash": clave[1], "año": mes[0], "mes": mes[1],
+        "n": 0, "media": 0.0, "m2": 0.0, "n_intervalos": 0, "media_intervalo": 0.0, "m2_intervalo": 0.0,
+    }
+    dialecto = conn.dialect.name
+
+    if dialecto == "mysql":
+        conn.execute(insert(tabla).values(**valores).prefix_with("IGNORE"))
+        return
+
+    if dialecto in ("sqlite", "postgresql"):
+        if dialecto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        conn.execute(dialect_insert(tabla).values(**valores).on_conflict_do_nothing())
+        return
+
+    existe = conn.execute(
+        select(tabla.c.n).where(_filtro_clave(clave), tabla.c.año == mes[0], tabla.c.mes == mes[1])
+    ).first()
+    if existe is None:
+        conn.execute(insert(tabla).values(**valores))
+
+
+def _agregar_en_orden(conn: Connection, clave: Clave, altas: List[Tuple[date, Decimal]]) -> bool:
+    """
+    Welford sobre las filas mensuales si todas las altas son posteriores a la
+    última factura registrada del grupo.
+
+    Returns:
+        False si hay que reconstruir el grupo (alta con fecha anterior)
+    """
+    tabla = EstadisticaMontos.__table__
+    anterior = conn.execute(
+        select(tabla.c.ultima_fecha)
+        .where(_filtro_clave(clave), tabla.c.n > 0)
+        .order_by(tabla.c.año.desc(), tabla.c.mes.desc())
+        .limit(1)
+    ).scalar()
+    if anterior is not None and altas[0][0] < anterior:
+        return False
+
+    por_mes: Dict[Mes, List[Tuple[date, Decimal]]] = defaultdict(list)
+    for fecha, monto in altas:
+        por_mes[(fecha.year, fecha.month)].append((fecha, monto))
+
+    for mes in sorted(por_mes):
+        _asegurar_fila(conn, clave, mes)
+        fila = conn.execute(
+            select(tabla).where(_filtro_clave(clave), tabla.c.año == mes[0], tabla.c.mes == mes[1])
+            .with_for_update()
+        ).one()
+        estadisticas = EstadisticasMontos.desde_fila(fila)
+        for fecha, monto in por_mes[mes]:
+            estadisticas.agregar(fecha, monto, anterior)
+            anterior = fecha
+        conn.execute(
+            update(tabla)
+            .where(_filtro_clave(clave), tabla.c.año == mes[0], tabla.c.mes == mes[1])
+            .values(**estadisticas.valores())
+        )
+    return True
+
+
+def _select_historial():
+    """(proveedor_id, concepto_hash, fecha, monto) del historial, en orden de acumulación."""
+    concepto_hash = func.coalesce(Factura.concepto_hash, SIN_CONCEPTO)
+    return select(
+        Factura.proveedor_id, concepto_hash, Factura.fecha_emision, Factura.total_a_pagar
+    ).where(
+        Factura.estado.in_(ESTADOS_HISTORIAL),
+        Factura.proveedor_id.isnot(None),
+        Factura.fecha_emision.isnot(None),
+        Factura.total_a_pagar > 0,
+    ).order_by(
+        Factura.proveedor_id, concepto_hash, Factura.fecha_emision, Factura.id
+    )
+
+
+def _acumular_por_mes(filas: Iterable) -> Dict[Tuple[int, str, int, int], EstadisticasMontos]:
+    """Filas mensuales a partir de facturas ordenadas por clave y fecha."""
+    meses: Dict[Tuple[int, str, int, int], EstadisticasMontos] = {}
+    clave_anterior, fecha_anterior = None, None
+    for proveedor_id, concepto_hash, fecha, monto in filas:
+        clave = (proveedor_id, concepto_hash or SIN_CONCEPTO)
+        if clave != clave_anterior:
+            clave_anterior, fecha_anterior = clave, None
+        pk = (*clave, fecha.year, fecha.month)
+        meses.setdefault(pk, EstadisticasMontos()).agregar(fecha, Decimal(monto), fecha_anterior)
+        fecha_anterior = fecha
+    return meses
+
+
+def _insertar(conn, meses: Dict[Tuple[int, str, int, int], EstadisticasMontos]) -> None:
+    if meses:
+        conn.execute(insert(EstadisticaMontos.__table__), [
+            {"proveedor_id": p, "concepto_hash": c, "año": a, "mes": m, **estadisticas.valores()}
+            for (p, c, a, m), estadisticas in sorted(meses.items())
+        ])
+
+
+def reconstruir_clave(conn, clave: Clave) -> None:
+    """Recalcula las filas de un (proveedor, concepto_hash) desde sus facturas."""
+    proveedor_id, concepto_hash = clave
+    filtro_concepto = (
+        Factura.concepto_hash.is_(None) | (Factura.concepto_hash == SIN_CONCEPTO)
+        if concepto_hash == SIN_CONCEPTO
+        else Factura.concepto_hash == concepto_hash
+    )
+    filas = conn.execute(_select_historial().where(Factura.proveedor_id == proveedor_id, filtro_concepto))
+
+    conn.execute(delete(EstadisticaMontos.__table__).where(_filtro_clave(clave)))
+    _insertar(conn, _acumular_por_mes(filas))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if not any(isinstance(obj, Factura) for obj in (*session.new, *session.dirty, *session.deleted)):
+        return
+
+    altas, reconstruir = calcular_cambios(session)
+    if not altas and not reconstruir:
+        return
+
+    # Orden fijo de claves: transacciones concurrentes bloquean las filas en el mismo orden
+    conn = session.connection()
+    for clave in sorted(altas.keys() | reconstruir):
+        if clave in reconstruir or not _agregar_en_orden(conn, clave, sorted(altas[clave])):
+            reconstruir_clave(conn, clave)
+
+
+def registrar_mantenimiento() -> None:
+    """Registra el listener after_flush en todas las sesiones (idempotente)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+# ==================== RECONSTRUCCIÓN Y VERIFICACIÓN ====================
+
+
+def reconstruir(db: Session) -> int:
+    """
+    Reconstruye la tabla completa desde facturas (en la transacción del caller).
+
+    Returns:
+        Número de filas mensuales
+    """
+    db.execute(delete(EstadisticaMontos))
+    meses = _acumular_por_mes(db.execute(_select_historial()))
+    _insertar(db, meses)
+
+    logger.info(f"estadisticas_montos reconstruida: {len(meses)} filas")
+    return len(meses)
+
+
+def _iguales(a: Optional[EstadisticasMontos], b: Optional[EstadisticasMontos]) -> bool:
+    """Mismos valores; los acumuladores en float, con tolerancia de redondeo."""
+    if a is None or b is None:
+        return a is b
+    va, vb = a.valores(), b.valores()
+    return all(
+        math.isclose(va[col], vb[col], rel_tol=1e-9, abs_tol=1e-6)
+        if isinstance(va[col], float) or isinstance(vb[col], float)
+        else va[col] == vb[col]
+        for col in va
+    )
+
+
+def verificar_consistencia(db: Session, muestra: int = 20) -> Dict[str, Any]:
+    """
+    Compara la tabla contra las estadísticas calculadas en vivo desde facturas.
+
+    Las filas con n = 0 se ignoran.
+    """
+    esperado = _acumular_por_mes(db.execute(_select_historial()))
+
+    materializado = {
+        (fila.proveedor_id, fila.concepto_hash, fila.año, fila.mes): EstadisticasMontos.desde_fila(fila)
+        for fila in db.execute(select(EstadisticaMontos).where(EstadisticaMontos.n > 0)).scalars()
+    }
+
+    diferencias = [
+        (pk, esperado.get(pk), materializado.get(pk))
+        for pk in sorted(esperado.keys() | materializado.keys())
+        if not _iguales(esperado.get(pk), materializado.get(pk))
+    ]
+
+    return {
+        "consistente": not diferencias,
+        "grupos_esperados": len(esperado),
+        "grupos_materializados": len(materializado),
+        "diferencias": len(diferencias),
+        "ejemplos": diferencias[:muestra],
+    }
@@ -0,0 +1,418 @@
+# app/services/eventos_dashboard.py
+"""
+Contadores en vivo del dashboard (Server-Sent Events).
+
+En vez de que cada pestaña abierta consulte /workflow/dashboard o
+/dashboard/mes-actual cada pocos segundos, GET /dashboard/eventos mantiene
+una conexión SSE y recibe el DELTA de los contadores por estado cada vez
+que una transacción confirma cambios de facturas.
+
+Flujo:
+- Un listener after_flush anota en la sesión cada cambio de factura
+  (proveedor, estado y creado_en antes/después); after_commit lo publica.
+  Cubre aprobar_manual/rechazar del workflow, AutomationService, validar/
+  devolver del contador y cualquier otra escritura por el ORM.
+- Los suscriptores se agrupan por ámbito: "global" (admin/contador) o
+  "responsable:<id>" (sus proveedores). Cada cambio se convierte en delta
+  UNA vez por ámbito y se reparte a todas sus conexiones: N pestañas del
+  mismo ámbito cuestan un cálculo, no N.
+- Cada ámbito se re-sincroniza con la BD cada DASHBOARD_EVENTOS_RESYNC_SEGUNDOS
+  (escrituras fuera del ORM, otros procesos, cambio de mes, asignaciones
+  de NIT); si el conteo difiere se envía un evento "snapshot".
+
+El difusor es por proceso: con varios workers, un cambio confirmado en otro
+proceso llega en la siguiente re-sincronización.
+"""
+import asyncio
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, case, event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura, EstadoFactura
+from app.utils.date_helpers import DateHelper
+from app.utils.logger import logger
+
+
+AMBITO_GLOBAL = "global"
+
+# Atributos de Factura que mueven los contadores
+_CAMPOS = ("proveedor_id", "estado", "creado_en")
+
+_CAMBIOS_SESION = "eventos_dashboard_cambios"
+
+# Eventos pendientes por conexión antes de reemplazarlos por un snapshot
+_MAX_PENDIENTES = 256
+
+# (proveedor_id, estado, es_mes_actual) de una factura; None si no existe
+Huella = Optional[Tuple[Optional[int], str, bool]]
+Cambio = Tuple[Huella, Huella]
+
+
+def ambito_de_responsable(responsable_id: int) -> str:
+    return f"responsable:{responsable_id}"
+
+
+# ==================== CONTADORES ====================
+
+
+def contadores_vacios() -> Dict[str, Dict[str, int]]:
+    ceros = {"total": 0, **{estado.value: 0 for estado in EstadoFactura}}
+    return {"totales": dict(ceros), "mes_actual": dict(ceros)}
+
+
+def calcular_contadores(db: Session, proveedor_ids: Optional[Set[int]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Conteo por estado (total y mes actual por creado_en) en UNA consulta.
+
+    Args:
+        db: Sesión de base de datos
+        proveedor_ids: Proveedores del ámbito; None = todas las facturas
+    """
+    if proveedor_ids is not None and not proveedor_ids:
+        return contadores_vacios()
+
+    hoy = date.today()
+    inicio, fin = DateHelper.get_periodo_bounds(hoy.year, hoy.month)
+    del_mes = and_(Factura.creado_en >= inicio, Factura.creado_en < fin)
+
+    columnas = [func.count(Factura.id).label("total"), func.count(case((del_mes, Factura.id))).label("mes_total")]
+    for estado in EstadoFactura:
+        es_estado = Factura.estado == estado
+        columnas.append(func.count(case((es_estado, Factura.id))).label(estado.value))
+        columnas.append(func.count(case((and_(es_estado, del_mes), Factura.id))).label(f"mes_{estado.value}"))
+
+    query = db.query(*columnas)
+    if proveedor_ids is not None:
+        query = query.filter(Factura.proveedor_id.in_(proveedor_ids))
+    fila = query.one()
+
+    return {
+        "totales": {"total": fila.total, **{e.value: getattr(fila, e.value) for e in EstadoFactura}},
+        "mes_actual": {"total": fila.mes_total, **{e.value: getattr(fila, f"mes_{e.value}") for e in EstadoFactura}},
+    }
+
+
+def calcular_delta(cambios: Iterable[Cambio], proveedor_ids: Optional[Set[int]]) -> Dict[str, Dict[str, int]]:
+    """
+    Delta de los contadores de un ámbito para una lista de cambios.
+
+    Returns:
+        {"totales": {...}, "mes_actual": {...}} solo con las claves que cambian
+        (vacío si ningún cambio toca el ámbito)
+    """
+    totales: Counter = Counter()
+    mes_actual: Counter = Counter()
+
+    for antes, despues in cambios:
+        for huella, signo in ((antes, -1), (despues, +1)):
+            if huella is None:
+                continue
+            proveedor_id, estado, es_mes_actual = huella
+            if proveedor_ids is not None and proveedor_id not in proveedor_ids:
+                continue
+            totales["total"] += signo
+            totales[estado] += signo
+            if es_mes_actual:
+                mes_actual["total"] += signo
+                mes_actual[estado] += signo
+
+    delta = {}
+    for nombre, contador in (("totales", totales), ("mes_actual", mes_actual)):
+        claves = {clave: n for clave, n in contador.items() if n}
+        if claves:
+            delta[nombre] = claves
+    return delta
+
+
+def _aplicar_delta(contadores: Dict[str, Dict[str, int]], delta: Dict[str, Dict[str, int]]) -> None:
+    for grupo, claves in delta.items():
+        for clave, n in claves.items():
+            contadores[grupo][clave] = contadores[grupo].get(clave, 0) + n
+
+
+# ==================== DIFUSIÓN ====================
+
+
+@dataclass(eq=False)
+class Suscripcion:
+    """Una conexión SSE: su cola de eventos y el snapshot inicial."""
+    ambito: str
+    cola: asyncio.Queue
+    snapshot: Dict[str, Dict[str, int]]
+
+
+@dataclass(eq=False)
+class _Ambito:
+    proveedor_ids: Optional[Set[int]]
+    responsable_id: Optional[int]
+    contadores: Dict[str, Dict[str, int]]
+    loop: asyncio.AbstractEventLoop
+    suscripciones: Set[Suscripcion] = field(default_factory=set)
+
+
+class DifusorContadores:
+    """Reparte los deltas de contadores a las conexiones SSE, por ámbito."""
+
+    def __init__(self, resync_segundos: int = 60):
+        self._ambitos: Dict[str, _Ambito] = {}
+        self._lock = threading.Lock()
+        self._resync_segundos = resync_segundos
+        self._tarea_resync: Optional[asyncio.Task] = None
+
+    def hay_suscriptores(self) -> bool:
+        return bool(self._ambitos)
+
+    async def suscribir(
+        self,
+        ambito: str,
+        proveedor_ids: Optional[Iterable[int]] = None,
+        responsable_id: Optional[int] = None,
+    ) -> Suscripcion:
+        """
+        Registra una conexión en su ámbito.
+
+        El snapshot del ámbito se calcula solo para la primera conexión; las
+        siguientes reciben una copia del que ya se mantiene con deltas.
+        """
+        loop = asyncio.get_running_loop()
+
+        with self._lock:
+            existente = self._ambitos.get(ambito)
+            suscripcion = None if existente is None else self._agregar(ambito, existente)
+
+        if suscripcion is None:
+            ids = None if proveedor_ids is None else set(proveedor_ids)
+            contadores = await asyncio.to_thread(_calcular_en_sesion_propia, ids)
+            with self._lock:
+                existente = self._ambitos.setdefault(
+                    ambito, _Ambito(ids, responsable_id, contadores, loop)
+                )
+                suscripcion = self._agregar(ambito, existente)
+
+        if self._tarea_resync is None or self._tarea_resync.done():
+            self._tarea_resync = loop.create_task(self._resincronizar_periodicamente())
+
+        return suscripcion
+
+    @staticmethod
+    def _agregar(nombre: str, ambito: _Ambito) -> Suscripcion:
+        """Nueva conexión con copia del snapshot del ámbito (con el lock tomado)."""
+        suscripcion = Suscripcion(nombre, asyncio.Queue(maxsize=_MAX_PENDIENTES), _copiar(ambito.contadores))
+        ambito.suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion) -> None:
+        """Quita una conexión; el ámbito se descarta al quedar sin conexiones."""
+        with self._lock:
+            ambito = self._ambitos.get(suscripcion.ambito)
+            if ambito is None:
+                return
+            ambito.suscripciones.discard(suscripcion)
+            if not ambito.suscripciones:
+                del self._ambitos[suscripcion.ambito]
+
+    def publicar(self, cambios: List[Cambio]) -> None:
+        """
+        Publica cambios confirmados. Seguro desde cualquier hilo.
+
+        El delta se calcula una vez por ámbito y se encola en todas sus
+        conexiones desde el event loop.
+        """
+        with self._lock:
+            for ambito in self._ambitos.values():
+                delta = calcular_delta(cambios, ambito.proveedor_ids)
+                if not delta:
+                    continue
+                _aplicar_delta(ambito.contadores, delta)
+                self._enviar(ambito, {"tipo": "delta", **delta})
+
+    def _enviar(self, ambito: _Ambito, evento: Dict[str, Any]) -> None:
+        """Encola el evento en las conexiones del ámbito (con el lock tomado)."""
+        snapshot = {"tipo": "snapshot", **_copiar(ambito.contadores)}
+        for suscripcion in ambito.suscripciones:
+            try:
+                ambito.loop.call_soon_threadsafe(_entregar, suscripcion.cola, evento, snapshot)
+            except RuntimeError:
+                # Event loop cerrado (apagado de la app)
+                pass
+
+    async def _resincronizar_periodicamente(self) -> None:
+        while self.hay_suscriptores():
+            await asyncio.sleep(self._resync_segundos)
+            with self._lock:
+                pendientes = list(self._ambitos.items())
+
+            for nombre, ambito in pendientes:
+                try:
+                    await self._resincronizar(nombre, ambito)
+                except Exception as e:
+                    logger.warning(f"Error re-sincronizando contadores del ámbito {nombre}: {str(e)}")
+
+    async def _resincronizar(self, nombre: str, ambito: _Ambito) -> None:
+        proveedor_ids, contadores = await asyncio.to_thread(
+            _recalcular_ambito, ambito.proveedor_ids, ambito.responsable_id
+        )
+        with self._lock:
+            if self._ambitos.get(nombre) is not ambito:
+                return
+            ambito.proveedor_ids = proveedor_ids
+            if contadores != ambito.contadores:
+                ambito.contadores = contadores
+                self._enviar(ambito, {"tipo": "snapshot", **_copiar(contadores)})
+
+
+def _copiar(contadores: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    return {grupo: dict(claves) for grupo, claves in contadores.items()}
+
+
+def _entregar(cola: asyncio.Queue, evento: Dict[str, Any], snapshot: Dict[str, Any]) -> None:
+    """Encola en el event loop; si la conexión va atrasada, la pone al día con un snapshot."""
+    try:
+        cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        while not cola.empty():
+            cola.get_nowait()
+        cola.put_nowait(snapshot)
+
+
+def _calcular_en_sesion_propia(proveedor_ids: Optional[Set[int]]) -> Dict[str, Dict[str, int]]:
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return calcular_contadores(db, proveedor_ids)
+    finally:
+        db.close()
+
+
+def _recalcular_ambito(
+    proveedor_ids: Optional[Set[int]],
+    responsable_id: Optional[int]
+) -> Tuple[Optional[Set[int]], Dict[str, Dict[str, int]]]:
+    """Vuelve a leer los proveedores del responsable (asignaciones) y los contadores."""
+    from app.db.session import SessionLocal
+    from app.crud.factura import _obtener_proveedor_ids_de_responsable
+
+    db = SessionLocal()
+    try:
+        if responsable_id is not None:
+            proveedor_ids = set(_obtener_proveedor_ids_de_responsable(db, responsable_id))
+        return proveedor_ids, calcular_contadores(db, proveedor_ids)
+    finally:
+        db.close()
+
+
+def _crear_difusor() -> DifusorContadores:
+    from app.core.config import settings
+    return DifusorContadores(resync_segundos=settings.dashboard_eventos_resync_segundos)
+
+
+# Instancia global del difusor (singleton)
+_difusor = _crear_difusor()
+
+
+def get_difusor() -> DifusorContadores:
+    """Obtiene la instancia global del difusor de contadores."""
+    return _difusor
+
+
+# ==================== CAPTURA DE CAMBIOS ====================
+
+
+def _es_mes_actual(creado_en, hoy: date) -> bool:
+    if creado_en is None:
+        return True
+    return (creado_en.year, creado_en.month) == (hoy.year, hoy.month)
+
+
+def _huella(valores: Dict[str, Any], hoy: date) -> Huella:
+    estado = getattr(valores["estado"], "value", valores["estado"])
+    if estado is None:
+        return None
+    return valores["proveedor_id"], estado, _es_mes_actual(valores["creado_en"], hoy)
+
+
+def _valores_cargados(factura: Factura) -> Dict[str, Any]:
+    # inspect().dict no dispara SELECT de atributos expirados
+    cargados = inspect(factura).dict
+    return {campo: cargados.get(campo) for campo in _CAMPOS}
+
+
+def _valores_actuales(factura: Factura) -> Dict[str, Any]:
+    return {campo: getattr(factura, campo) for campo in _CAMPOS}
+
+
+def _valores_previos(factura: Factura, cargar: bool = True) -> Dict[str, Any]:
+    """
+    Valores antes del flush. cargar=False para facturas eliminadas (ya no
+    se pueden recargar de la BD).
+    """
+    estado = inspect(factura)
+    valores = {}
+    for campo in _CAMPOS:
+        historial = estado.attrs[campo].history
+        if historial.deleted:
+            valores[campo] = historial.deleted[0]
+        elif historial.unchanged:
+            valores[campo] = historial.unchanged[0]
+        else:
+            valores[campo] = getattr(factura, campo) if cargar else estado.dict.get(campo)
+    return valores
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if not _difusor.hay_suscriptores():
+        return
+
+    hoy = date.today()
+    cambios: List[Cambio] = []
+
+    # Nuevas: creado_en aún sin leer (server_default) => mes actual
+    for obj in session.new:
+        if isinstance(obj, Factura):
+            cambios.append((None, _huella(_valores_cargados(obj), hoy)))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Factura):
+            continue
+        estado = inspect(obj)
+        if not any(estado.attrs[campo].history.has_changes() for campo in _CAMPOS):
+            continue
+        cambios.append((_huella(_valores_previos(obj), hoy), _huella(_valores_actuales(obj), hoy)))
+
+    for obj in session.deleted:
+        if isinstance(obj, Factura):
+            cambios.append((_huella(_valores_previos(obj, cargar=False), hoy), None))
+
+    if cambios:
+        session.info.setdefault(_CAMBIOS_SESION, []).extend(cambios)
+
+
+def _after_commit(session: Session) -> None:
+    cambios = session.info.pop(_CAMBIOS_SESION, None)
+    if cambios:
+        try:
+            _difusor.publicar(cambios)
+        except Exception as e:
+            # Nunca romper el commit del llamador por el dashboard
+            logger.warning(f"Error publicando contadores del dashboard: {str(e)}")
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_CAMBIOS_SESION, None)
+
+
+def registrar_publicacion() -> None:
+    """Registra los listeners de captura en todas las sesiones (idempotente)."""
+    for nombre, listener in (
+        ("after_flush", _after_flush),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(Session, nombre, listener):
+            event.listen(Session, nombre, listener)
@@ -12,8 +12,8 @@ from datetime import datetime
 
 from app.models.factura import Factura
 from app.models.proveedor import Proveedor
-from app.models.workflow_aprobacion import AsignacionNitResponsable
-from sqlalchemy import and_, desc
+from app.crud.factura import filtro_visibilidad_responsable
+from sqlalchemy import desc
 
 
 def export_facturas_to_csv(
@@ -45,14 +45,10 @@ def export_facturas_to_csv(
 
     # Aplicar filtros
     if responsable_id:
-        # Obtener NITs asignados al usuario
-        nits_asignados = db.query(AsignacionNitResponsable.nit).filter(
-            and_(
-                AsignacionNitResponsable.responsable_id == responsable_id,
-                AsignacionNitResponsable.activo == True
-            )
+        # Facturas de los NITs asignados al usuario (semi-join en BD)
+        query = query.filter(
+            filtro_visibilidad_responsable(db, responsable_id, usar_workflow=False)
         )
-        query = query.filter(Proveedor.nit.in_(nits_asignados))
 
     if nit:
         query = query.filter(Proveedor.nit == nit)
@@ -149,14 +145,10 @@ def get_export_metadata(
     query = db.query(Factura).join(Proveedor)
 
     if responsable_id:
-        # Obtener NITs asignados al usuario
-        nits_asignados = db.query(AsignacionNitResponsable.nit).filter(
-            and_(
-                AsignacionNitResponsable.responsable_id == responsable_id,
-                AsignacionNitResponsable.activo == True
-            )
+        # Facturas de los NITs asignados al usuario (semi-join en BD)
+        query = query.filter(
+            filtro_visibilidad_responsable(db, responsable_id, usar_workflow=False)
         )
-        query = query.filter(Proveedor.nit.in_(nits_asignados))
 
     if fecha_desde:
         query = query.filter(Factura.fecha_emision >= fecha_desde)
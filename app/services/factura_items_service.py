@@ -78,10 +78,11 @@ class FacturaItemsService:
                 'errores': ['Factura no existe']
             }
 
-        # Eliminar items existentes (si los hay) para evitar duplicados
-        self.db.query(FacturaItem).filter(
-            FacturaItem.factura_id == factura_id
-        ).delete()
+        # Eliminar items existentes (si los hay) para evitar duplicados.
+        # Por el flush de la sesión (delete-orphan) y no con un DELETE masivo:
+        # así también salen del historial de precios (item_precio_historico)
+        factura.items.clear()
+        self.db.flush()
 
         items_creados = []
         errores = []
@@ -148,14 +149,12 @@ class FacturaItemsService:
             numero_linea=item_data.get('numero_linea', 1),
             descripcion=item_data.get('descripcion', ''),
             codigo_producto=item_data.get('codigo_producto'),
-            codigo_estandar=item_data.get('codigo_estandar'),
             cantidad=item_data.get('cantidad', 1),
             unidad_medida=item_data.get('unidad_medida', 'unidad'),
             precio_unitario=item_data.get('precio_unitario', 0),
             subtotal=item_data.get('subtotal', 0),
             total_impuestos=item_data.get('total_impuestos', 0),
             total=item_data.get('total', 0),
-            descuento_porcentaje=item_data.get('descuento_porcentaje'),
             descuento_valor=item_data.get('descuento_valor'),
             descripcion_normalizada=item_data.get('descripcion_normalizada'),
             item_hash=item_data.get('item_hash'),
@@ -209,10 +208,13 @@ class FacturaItemsService:
         Returns:
             Número de items eliminados
         """
-        count = self.db.query(FacturaItem).filter(
-            FacturaItem.factura_id == factura_id
-        ).delete()
+        factura = self.db.query(Factura).get(factura_id)
+        if not factura:
+            return 0
 
+        # Por el flush de la sesión (delete-orphan): actualiza item_precio_historico
+        count = len(factura.items)
+        factura.items.clear()
         self.db.commit()
 
         logger.info(f"Eliminados {count} items de factura {factura_id}")
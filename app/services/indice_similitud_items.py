@@ -0,0 +1,315 @@
+# app/services/indice_similitud_items.py
+"""
+Índice MinHash + LSH sobre descripcion_normalizada de items.
+
+ItemNormalizerService.calcular_similitud compara dos descripciones con
+Jaccard sobre sus conjuntos de palabras. Buscar el item histórico más
+parecido a una línea nueva con esa función recorre todo el historial del
+proveedor (O(n) por línea, O(n²) para deduplicar). Este índice:
+
+- Resume cada descripción en una firma MinHash de NUM_PERMUTACIONES
+  valores: la fracción de valores iguales entre dos firmas estima su
+  Jaccard.
+- Parte la firma en bandas (LSH): dos descripciones son candidatas si
+  coinciden en alguna banda completa. El número de bandas y filas se elige
+  para el umbral de Jaccard del índice (parametros_lsh).
+- Verifica los candidatos con el Jaccard exacto, así que no devuelve
+  falsos positivos; los falsos negativos son los pares sobre el umbral que
+  no comparten ninguna banda (probabilidad baja, ver el benchmark).
+
+Los índices se construyen en memoria por proveedor desde factura_items
+(IndicesProveedores) y se extienden con los items nuevos en cada consulta.
+Cada proceso guarda a lo sumo MAX_INDICES_PROVEEDORES índices; al pasarse
+descarta el usado hace más tiempo (se reconstruye si vuelve a pedirse).
+Benchmark contra la búsqueda exhaustiva:
+    python scripts/benchmark_similitud_items.py --items 100000
+"""
+import hashlib
+import random
+import threading
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from typing import Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura
+from app.models.factura_item import FacturaItem
+from app.services.item_normalizer import ItemNormalizerService
+
+
+NUM_PERMUTACIONES = 128
+UMBRAL_DEFECTO = 0.7
+# Los candidatos se verifican con el Jaccard exacto: un falso positivo cuesta
+# una comparación, un falso negativo pierde un resultado
+PESO_FALSOS_NEGATIVOS = 0.9
+# Índices (proveedor, umbral) por proceso: cada uno guarda NUM_PERMUTACIONES
+# enteros por palabra del vocabulario del proveedor más sus buckets
+MAX_INDICES_PROVEEDORES = 200
+
+# Primo de Mersenne 2^61 - 1 para las permutaciones (a * x + b) mod P
+_PRIMO = (1 << 61) - 1
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard de dos conjuntos de palabras (igual que calcular_similitud)."""
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def _integrar(funcion, inicio: float, fin: float, pasos: int = 100) -> float:
+    """Regla del punto medio."""
+    ancho = (fin - inicio) / pasos
+    return sum(funcion(inicio + (i + 0.5) * ancho) for i in range(pasos)) * ancho
+
+
+@lru_cache(maxsize=None)
+def parametros_lsh(umbral: float, num_permutaciones: int = NUM_PERMUTACIONES) -> Tuple[int, int]:
+    """
+    (bandas, filas por banda) que minimizan el área ponderada de falsos
+    positivos y falsos negativos de la curva 1 - (1 - s^filas)^bandas
+    alrededor del umbral.
+    """
+    if not 0.0 < umbral <= 1.0:
+        raise ValueError(f"Umbral de similitud fuera de (0, 1]: {umbral}")
+
+    def error(bandas: int, filas: int) -> float:
+        def no_candidato(s: float) -> float:
+            return (1 - s ** filas) ** bandas
+
+        falsos_positivos = _integrar(lambda s: 1 - no_candidato(s), 0.0, umbral)
+        falsos_negativos = _integrar(no_candidato, umbral, 1.0)
+        return (1 - PESO_FALSOS_NEGATIVOS) * falsos_positivos + PESO_FALSOS_NEGATIVOS * falsos_negativos
+
+    mejor, mejor_error = (1, num_permutaciones), float("inf")
+    for bandas in range(1, num_permutaciones + 1):
+        for filas in range(1, num_permutaciones // bandas + 1):
+            error_actual = error(bandas, filas)
+            if error_actual < mejor_error:
+                mejor, mejor_error = (bandas, filas), error_actual
+    return mejor
+
+
+class IndiceMinHash:
+    """
+    Índice de descripciones normalizadas para buscar las similares por
+    Jaccard de palabras sin compararlas contra todas.
+
+    El umbral del índice fija las bandas: buscar con un umbral mayor solo
+    filtra más; con uno menor pierde candidatos (conviene otro índice).
+    """
+
+    def __init__(
+        self,
+        umbral: float = UMBRAL_DEFECTO,
+        num_permutaciones: int = NUM_PERMUTACIONES,
+        semilla: int = 1
+    ):
+        self.umbral = umbral
+        self.bandas, self.filas = parametros_lsh(umbral, num_permutaciones)
+
+        aleatorio = random.Random(semilla)
+        self._permutaciones = [
+            (aleatorio.randrange(1, _PRIMO), aleatorio.randrange(0, _PRIMO))
+            for _ in range(self.bandas * self.filas)
+        ]
+        # Valores de las permutaciones por palabra: el vocabulario es mucho
+        # menor que el número de descripciones
+        self._valores_palabra: Dict[str, List[int]] = {}
+        self._palabras: Dict[Hashable, FrozenSet[str]] = {}
+        self._buckets: List[Dict[int, List[Hashable]]] = [defaultdict(list) for _ in range(self.bandas)]
+
+    def __len__(self) -> int:
+        return len(self._palabras)
+
+    def __contains__(self, clave: Hashable) -> bool:
+        return clave in self._palabras
+
+    def _valores(self, palabra: str) -> List[int]:
+        valores = self._valores_palabra.get(palabra)
+        if valores is None:
+            x = int.from_bytes(hashlib.blake2b(palabra.encode("utf-8"), digest_size=8).digest(), "big")
+            valores = [(a * x + b) % _PRIMO for a, b in self._permutaciones]
+            self._valores_palabra[palabra] = valores
+        return valores
+
+    def _firma(self, palabras: FrozenSet[str]) -> List[int]:
+        """Mínimo de cada permutación sobre las palabras."""
+        if len(palabras) == 1:
+            return self._valores(next(iter(palabras)))
+        return list(map(min, *(self._valores(palabra) for palabra in palabras)))
+
+    def _claves_bandas(self, firma: List[int]) -> Iterable[Tuple[int, int]]:
+        for banda in range(self.bandas):
+            yield banda, hash(tuple(firma[banda * self.filas:(banda + 1) * self.filas]))
+
+    def agregar(self, clave: Hashable, descripcion_normalizada: str) -> bool:
+        """
+        Indexa una descripción (ya normalizada) bajo `clave`.
+
+        Returns:
+            False si la clave ya estaba o la descripción está vacía
+        """
+        palabras = frozenset(descripcion_normalizada.split()) if descripcion_normalizada else frozenset()
+        if not palabras or clave in self._palabras:
+            return False
+
+        self._palabras[clave] = palabras
+        for banda, valor in self._claves_bandas(self._firma(palabras)):
+            self._buckets[banda][valor].append(clave)
+        return True
+
+    def candidatos(self, descripcion_normalizada: str) -> Set[Hashable]:
+        """Claves que comparten al menos una banda con la descripción (sin verificar)."""
+        palabras = frozenset(descripcion_normalizada.split()) if descripcion_normalizada else frozenset()
+        if not palabras:
+            return set()
+
+        encontrados: Set[Hashable] = set()
+        for banda, valor in self._claves_bandas(self._firma(palabras)):
+            encontrados.update(self._buckets[banda].get(valor, ()))
+        return encontrados
+
+    def buscar(
+        self,
+        descripcion_normalizada: str,
+        umbral: Optional[float] = None,
+        limite: Optional[int] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Claves con Jaccard exacto >= umbral (por defecto el del índice),
+        de mayor a menor similitud.
+        """
+        umbral = self.umbral if umbral is None else umbral
+        palabras = frozenset(descripcion_normalizada.split()) if descripcion_normalizada else frozenset()
+
+        resultado = []
+        for clave in self.candidatos(descripcion_normalizada):
+            similitud = _jaccard(palabras, self._palabras[clave])
+            if similitud >= umbral:
+                resultado.append((clave, similitud))
+
+        resultado.sort(key=lambda par: (-par[1], str(par[0])))
+        return resultado[:limite] if limite is not None else resultado
+
+    def pares_similares(self, umbral: Optional[float] = None) -> List[Tuple[Hashable, Hashable, float]]:
+        """
+        Pares (a, b) de claves indexadas, a agregada antes que b, con
+        Jaccard exacto >= umbral (para deduplicar), comparando solo las que
+        comparten bucket.
+        """
+        umbral = self.umbral if umbral is None else umbral
+        vistos: Set[Tuple[Hashable, Hashable]] = set()
+        pares = []
+
+        for buckets in self._buckets:
+            for claves in buckets.values():
+                for i, a in enumerate(claves):
+                    for b in claves[i + 1:]:
+                        # Cada bucket guarda las claves en orden de inserción
+                        par = (a, b)
+                        if par in vistos:
+                            continue
+                        vistos.add(par)
+                        similitud = _jaccard(self._palabras[a], self._palabras[b])
+                        if similitud >= umbral:
+                            pares.append((*par, similitud))
+
+        pares.sort(key=lambda par: (-par[2], str(par[0]), str(par[1])))
+        return pares
+
+
+# ==================== ÍNDICES POR PROVEEDOR ====================
+
+
+class IndicesProveedores:
+    """
+    Índices por (proveedor, umbral) en memoria del proceso, con clave
+    item_hash.
+
+    Cada consulta lee de factura_items solo los items con id mayor al último
+    indexado del proveedor. Los items eliminados siguen en el índice hasta
+    invalidar() (su descripción sigue siendo un item válido del proveedor).
+
+    LRU de a lo sumo `max_indices` índices: la memoria no crece con el número
+    de proveedores consultados durante la vida del proceso.
+    """
+
+    def __init__(self, max_indices: int = MAX_INDICES_PROVEEDORES):
+        self.max_indices = max(1, max_indices)
+        self._indices: "OrderedDict[Tuple[int, float], Tuple[IndiceMinHash, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._indices)
+
+    def obtener(self, db: Session, proveedor_id: int, umbral: float = UMBRAL_DEFECTO) -> IndiceMinHash:
+        """Índice del proveedor al día con factura_items."""
+        clave = (proveedor_id, umbral)
+        with self._lock:
+            indice, ultimo_id = self._indices.get(clave) or (IndiceMinHash(umbral), 0)
+
+        # Un item_hash por descripción; el id mayor marca hasta dónde se leyó
+        filas = db.execute(
+            select(
+                FacturaItem.item_hash,
+                FacturaItem.descripcion_normalizada,
+                func.max(FacturaItem.id),
+            ).join(
+                Factura, Factura.id == FacturaItem.factura_id
+            ).where(
+                Factura.proveedor_id == proveedor_id,
+                FacturaItem.id > ultimo_id,
+                FacturaItem.item_hash.isnot(None),
+            ).group_by(
+                FacturaItem.item_hash, FacturaItem.descripcion_normalizada
+            )
+        ).all()
+
+        with self._lock:
+            # Otra consulta concurrente pudo avanzar el mismo índice: agregar es idempotente
+            indice, actual = self._indices.get(clave, (indice, ultimo_id))
+            for item_hash, descripcion, _ in filas:
+                indice.agregar(item_hash, descripcion)
+            maximo = max((fila[2] for fila in filas), default=0)
+            self._indices[clave] = (indice, max(actual, maximo))
+            self._indices.move_to_end(clave)
+            while len(self._indices) > self.max_indices:
+                self._indices.popitem(last=False)
+            return indice
+
+    def invalidar(self, proveedor_id: Optional[int] = None) -> None:
+        """Descarta los índices de un proveedor (o todos): la próxima consulta los reconstruye."""
+        with self._lock:
+            if proveedor_id is None:
+                self._indices.clear()
+            else:
+                for clave in [c for c in self._indices if c[0] == proveedor_id]:
+                    del self._indices[clave]
+
+
+# Instancia global (por proceso)
+_indices_proveedores = IndicesProveedores()
+
+
+def get_indices_proveedores() -> IndicesProveedores:
+    """Obtiene la instancia global de índices por proveedor."""
+    return _indices_proveedores
+
+
+def buscar_items_similares(
+    db: Session,
+    proveedor_id: int,
+    descripcion: str,
+    umbral: float = UMBRAL_DEFECTO,
+    limite: int = 5
+) -> List[Tuple[str, float]]:
+    """
+    Items históricos del proveedor parecidos a una descripción (sin normalizar).
+
+    Returns:
+        [(item_hash, similitud)] de mayor a menor similitud
+    """
+    indice = _indices_proveedores.obtener(db, proveedor_id, umbral)
+    return indice.buscar(ItemNormalizerService.normalizar_texto(descripcion), limite=limite)
@@ -33,6 +33,7 @@ from app.models.presupuesto import LineaPresupuesto, EjecucionPresupuestal
 from app.models.workflow_aprobacion import AsignacionNitResponsable, WorkflowAprobacionFactura
 from app.services.auto_vinculacion import AutoVinculador
 from app.services.workflow_automatico import WorkflowAutomaticoService
+from app.services import visibilidad_facturas
 
 
 # Configurar logging
@@ -253,6 +254,7 @@ class InicializacionSistemaService:
                     creado_por="SISTEMA_INICIALIZACION"
                 )
                 self.db.add(nueva_asignacion)
+                visibilidad_facturas.sincronizar_nit(self.db, proveedor.nit, responsable_default_id)
                 asignaciones_creadas += 1
 
                 logger.info(f"    Asignación creada: {proveedor.nit} - {proveedor.razon_social[:50]}")
@@ -9,6 +9,7 @@ Usuario de:
 4. Persistencia en BD
 5. Activación de workflows
 6. Auditoría completa
+7. Encolado de la automatización (cola_automatizacion)
 
 Cambios principales (2025-11-06):
 - NUEVO: Auto-creación de proveedores desde facturas
@@ -26,6 +27,7 @@ from app.crud.audit import create_audit
 from app.crud.proveedor import get_or_create_proveedor
 from app.schemas.factura import FacturaCreate
 from app.services.provider_management import ProviderManagementException
+from app.services.automation.cola_automatizacion import encolar_factura
 from typing import Tuple, Optional
 import logging
 
@@ -48,6 +50,7 @@ def process_and_persist_invoice(
     4. Deduplicación por número + proveedor
     5. Creación de nueva factura
     6. Activación de workflow automático
+    7. Encolado de la decisión automática
 
     Args:
         db: Sesión de BD
@@ -293,6 +296,16 @@ def process_and_persist_invoice(
         # NO fallar la creación de la factura (datos financieros no se pierden)
         # PERO el error queda registrado y visible para corrección manual
 
+    # ============================================================================
+    # PASO 7: ENCOLAR AUTOMATIZACIÓN
+    # ============================================================================
+
+    # La decisión automática corre en segundo plano en segundos (no espera al
+    # barrido periódico). Si la cola está llena o detenida, la factura conserva
+    # automatizacion_pendiente y la procesa el barrido.
+    if not encolar_factura(inv.id, inv.proveedor_id):
+        logger.info(f"Factura {inv.id} queda pendiente para el barrido de automatización")
+
     return {"id": inv.id, "action": "created"}, "created"
 
 
@@ -0,0 +1,607 @@
+# app/services/item_precio_historico.py
+"""
+Mantenimiento y lectura de item_precio_historico (Welford del precio
+unitario por proveedor, item_hash y mes).
+
+Antes ComparadorItemsService leía factura_items unido a facturas en cada
+comparación para recalcular promedio y desviación de cada item. Ahora:
+
+- Un listener after_flush (registrar_mantenimiento, en app.db.session)
+  agrega cada item nuevo a la fila de su mes con la actualización de
+  Welford, en la MISMA transacción, venga de FacturaItemsService o de
+  cualquier otro código que use la sesión.
+- Si se eliminan o modifican items, o cambia el proveedor o la fecha de
+  una factura con items, se reconstruyen solo las filas afectadas.
+- Media y M2 no alcanzan para percentiles: cada fila guarda además un
+  histograma logarítmico del precio (cubetas con error relativo del 1%)
+  que se combina entre meses sumando conteos.
+- La comparación lee en una consulta las filas de todos los items de la
+  factura en sus meses completos y, en otra, los items del mes de la
+  factura anteriores a su fecha; los combina con la fórmula de Chan.
+
+Quedan fuera las escrituras que no pasan por el flush de la sesión (SQL
+directo, Query.delete / update masivos). Para esos casos:
+    python -m app.scripts.item_precio_historico --verificar
+    python -m app.scripts.item_precio_historico --reconstruir
+"""
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, delete, event, insert, inspect, or_, select, tuple_, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura
+from app.models.factura_item import FacturaItem
+from app.models.item_precio_historico import ItemPrecioHistorico
+from app.services.estadisticas_montos import Acumulador
+from app.utils.logger import logger
+
+
+Clave = Tuple[int, str]
+Mes = Tuple[int, int]
+# (proveedor_id, item_hash, año, mes)
+Grupo = Tuple[int, str, int, int]
+
+_CAMPOS_ITEM = ("factura_id", "item_hash", "precio_unitario", "cantidad")
+_CAMPOS_FACTURA = ("proveedor_id", "fecha_emision")
+
+# Percentiles: histograma logarítmico del precio unitario (como DDSketch).
+# La cubeta i cubre (γ^(i-1), γ^i]; su valor representativo tiene error
+# relativo <= PRECISION_PERCENTILES. Dos histogramas se combinan sumando
+# conteos, así que agregar un item y reconstruir dan exactamente lo mismo.
+# La migración e7c3a9f1b5d2 calcula las mismas cubetas en SQL.
+PRECISION_PERCENTILES = 0.01
+_GAMMA = (1 + PRECISION_PERCENTILES) / (1 - PRECISION_PERCENTILES)
+_LOG_GAMMA = math.log(_GAMMA)
+# Precios <= 0 (no tienen logaritmo)
+CUBETA_CERO = "z"
+
+
+def cubeta_precio(precio: Decimal) -> str:
+    """Cubeta del histograma de un precio (clave JSON)."""
+    if precio <= 0:
+        return CUBETA_CERO
+    return str(math.ceil(math.log(float(precio)) / _LOG_GAMMA))
+
+
+def _valor_cubeta(cubeta: str) -> float:
+    if cubeta == CUBETA_CERO:
+        return 0.0
+    return 2 * _GAMMA ** int(cubeta) / (_GAMMA + 1)
+
+
+def _orden_cubeta(cubeta: str) -> float:
+    return float("-inf") if cubeta == CUBETA_CERO else int(cubeta)
+
+
+@dataclass
+class PreciosItem:
+    """Historial de precios de un item en un mes o en una ventana de meses."""
+    precios: Acumulador = field(default_factory=Acumulador)
+    media_cantidad: float = 0.0
+    precio_min: Optional[Decimal] = None
+    precio_max: Optional[Decimal] = None
+    cantidad_min: Optional[Decimal] = None
+    cantidad_max: Optional[Decimal] = None
+    # (fecha, factura_id, precio, cantidad) del último item
+    ultimo: Optional[Tuple[date, int, Decimal, Decimal]] = None
+    # {cubeta_precio: items}
+    histograma: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def n(self) -> int:
+        return self.precios.n
+
+    @property
+    def desviacion_poblacional(self) -> float:
+        return math.sqrt(max(0.0, self.precios.m2 / self.n)) if self.n else 0.0
+
+    def percentil(self, q: float) -> Optional[float]:
+        """
+        Percentil q (0..1) del precio por rango más cercano sobre el
+        histograma: error relativo <= PRECISION_PERCENTILES. None sin items.
+        """
+        if not self.n or not self.histograma:
+            return None
+        rango = q * (self.n - 1)
+        acumulado = 0
+        for cubeta in sorted(self.histograma, key=_orden_cubeta):
+            acumulado += self.histograma[cubeta]
+            if acumulado > rango:
+                break
+        valor = _valor_cubeta(cubeta)
+        return min(max(valor, float(self.precio_min)), float(self.precio_max))
+
+    def agregar(self, fecha: date, factura_id: int, precio: Decimal, cantidad: Decimal) -> None:
+        """Agrega un item; en empate de (fecha, factura) el último agregado queda como último."""
+        self.precios.agregar(float(precio))
+        self.media_cantidad += (float(cantidad) - self.media_cantidad) / self.n
+        self.precio_min = _extremo(min, self.precio_min, precio)
+        self.precio_max = _extremo(max, self.precio_max, precio)
+        self.cantidad_min = _extremo(min, self.cantidad_min, cantidad)
+        self.cantidad_max = _extremo(max, self.cantidad_max, cantidad)
+        if self.ultimo is None or (fecha, factura_id) >= self.ultimo[:2]:
+            self.ultimo = (fecha, factura_id, precio, cantidad)
+        cubeta = cubeta_precio(precio)
+        self.histograma[cubeta] = self.histograma.get(cubeta, 0) + 1
+
+    def combinar(self, otro: "PreciosItem") -> "PreciosItem":
+        """Combina dos grupos de items (meses distintos)."""
+        n = self.n + otro.n
+        ultimos = [u for u in (self.ultimo, otro.ultimo) if u is not None]
+        histograma = dict(self.histograma)
+        for cubeta, items in otro.histograma.items():
+            histograma[cubeta] = histograma.get(cubeta, 0) + items
+        return PreciosItem(
+            precios=self.precios.combinar(otro.precios),
+            media_cantidad=(self.media_cantidad * self.n + otro.media_cantidad * otro.n) / n if n else 0.0,
+            precio_min=_extremo(min, self.precio_min, otro.precio_min),
+            precio_max=_extremo(max, self.precio_max, otro.precio_max),
+            cantidad_min=_extremo(min, self.cantidad_min, otro.cantidad_min),
+            cantidad_max=_extremo(max, self.cantidad_max, otro.cantidad_max),
+            ultimo=max(ultimos, key=lambda u: u[:2]) if ultimos else None,
+            histograma=histograma,
+        )
+
+    @classmethod
+    def desde_fila(cls, fila) -> "PreciosItem":
+        ultimo = None
+        if fila.ultima_fecha is not None:
+            ultimo = (fila.ultima_fecha, fila.ultima_factura_id, fila.ultimo_precio, fila.ultima_cantidad)
+        return cls(
+            precios=Acumulador(fila.n, fila.media, fila.m2),
+            media_cantidad=fila.media_cantidad,
+            precio_min=fila.precio_min,
+            precio_max=fila.precio_max,
+            cantidad_min=fila.cantidad_min,
+            cantidad_max=fila.cantidad_max,
+            ultimo=ultimo,
+            histograma=dict(fila.histograma or {}),
+        )
+
+    def valores(self) -> Dict[str, Any]:
+        """Columnas de la fila mensual."""
+        ultima_fecha, ultima_factura_id, ultimo_precio, ultima_cantidad = self.ultimo or (None, None, None, None)
+        return {
+            "n": self.precios.n, "media": self.precios.media, "m2": self.precios.m2,
+            "precio_min": self.precio_min, "precio_max": self.precio_max,
+            "media_cantidad": self.media_cantidad,
+            "cantidad_min": self.cantidad_min, "cantidad_max": self.cantidad_max,
+            "ultimo_precio": ultimo_precio, "ultima_cantidad": ultima_cantidad,
+            "ultima_fecha": ultima_fecha, "ultima_factura_id": ultima_factura_id,
+            "histograma": self.histograma,
+        }
+
+
+def _extremo(funcion, a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return funcion(a, b)
+
+
+# ==================== LECTURA ====================
+
+
+def sumar_meses(mes: Mes, meses: int) -> Mes:
+    indice = mes[0] * 12 + (mes[1] - 1) + meses
+    return indice // 12, indice % 12 + 1
+
+
+def ventana(fecha: date, meses_historico: int) -> Tuple[Mes, Mes]:
+    """
+    Los `meses_historico` meses completos anteriores al mes de `fecha`
+    (inclusive). El mes de `fecha` se lee aparte (items_del_mes).
+    """
+    mes = (fecha.year, fecha.month)
+    return sumar_meses(mes, -meses_historico), sumar_meses(mes, -1)
+
+
+def meses_por_item(
+    db: Session,
+    proveedor_id: int,
+    item_hashes: Iterable[str],
+    desde: Mes,
+    hasta: Mes
+) -> Dict[str, Dict[Mes, PreciosItem]]:
+    """Filas mensuales de los items de un proveedor entre dos meses (inclusive), en una consulta."""
+    item_hashes = set(item_hashes)
+    resultado: Dict[str, Dict[Mes, PreciosItem]] = defaultdict(dict)
+    if not item_hashes:
+        return resultado
+
+    filas = db.execute(
+        select(ItemPrecioHistorico).where(
+            ItemPrecioHistorico.proveedor_id == proveedor_id,
+            ItemPrecioHistorico.item_hash.in_(item_hashes),
+            tuple_(ItemPrecioHistorico.año, ItemPrecioHistorico.mes) >= desde,
+            tuple_(ItemPrecioHistorico.año, ItemPrecioHistorico.mes) <= hasta,
+            ItemPrecioHistorico.n > 0,
+        )
+    ).scalars()
+    for fila in filas:
+        resultado[fila.item_hash][(fila.año, fila.mes)] = PreciosItem.desde_fila(fila)
+    return resultado
+
+
+def combinar_meses(meses: Dict[Mes, PreciosItem], desde: Mes, hasta: Mes) -> PreciosItem:
+    """Historial de un item en la ventana [desde, hasta]."""
+    resultado = PreciosItem()
+    for mes, precios in meses.items():
+        if desde <= mes <= hasta:
+            resultado = resultado.combinar(precios)
+    return resultado
+
+
+def items_del_mes(
+    db: Session,
+    proveedor_id: int,
+    item_hashes: Iterable[str],
+    fechas: Iterable[date]
+) -> Dict[str, List[Tuple[date, int, Decimal, Decimal]]]:
+    """
+    Items de un proveedor en el mes de cada fecha y anteriores a ella, en
+    una consulta: la parte de la ventana que aún no es un mes completo.
+
+    Returns:
+        {item_hash: [(fecha, factura_id, precio, cantidad), ...]} en orden de acumulación
+    """
+    item_hashes = set(item_hashes)
+    resultado: Dict[str, List[Tuple[date, int, Decimal, Decimal]]] = defaultdict(list)
+
+    # Por mes basta el rango hasta la fecha más tardía
+    rangos: Dict[date, date] = {}
+    for fecha in fechas:
+        inicio = fecha.replace(day=1)
+        rangos[inicio] = max(fecha, rangos.get(inicio, fecha))
+    if not item_hashes or not rangos:
+        return resultado
+
+    filas = db.execute(_select_items().where(
+        Factura.proveedor_id == proveedor_id,
+        FacturaItem.item_hash.in_(item_hashes),
+        or_(*(
+            and_(Factura.fecha_emision >= inicio, Factura.fecha_emision < fin)
+            for inicio, fin in sorted(rangos.items())
+        )),
+    ))
+    for _, item_hash, fecha, factura_id, precio, cantidad in filas:
+        resultado[item_hash].append((fecha, factura_id, Decimal(precio), Decimal(cantidad)))
+    return resultado
+
+
+def historial_item(
+    meses: Dict[Mes, PreciosItem],
+    items_mes: List[Tuple[date, int, Decimal, Decimal]],
+    fecha: date,
+    meses_historico: int
+) -> PreciosItem:
+    """
+    Historial de un item para una factura de `fecha`: los meses completos
+    de la ventana más los items de su mes con fecha anterior (la factura y
+    las del mismo día quedan fuera).
+    """
+    precios = combinar_meses(meses, *ventana(fecha, meses_historico))
+    parcial = PreciosItem()
+    inicio = fecha.replace(day=1)
+    for fecha_item, factura_id, precio, cantidad in items_mes:
+        if inicio <= fecha_item < fecha:
+            parcial.agregar(fecha_item, factura_id, precio, cantidad)
+    return precios.combinar(parcial)
+
+
+# ==================== MANTENIMIENTO ====================
+
+
+def _filtro_fila(clave: Clave, mes: Mes):
+    return (
+        (ItemPrecioHistorico.proveedor_id == clave[0])
+        & (ItemPrecioHistorico.item_hash == clave[1])
+        & (ItemPrecioHistorico.año == mes[0])
+        & (ItemPrecioHistorico.mes == mes[1])
+    )
+
+
+def _asegurar_fila(conn: Connection, clave: Clave, mes: Mes) -> None:
+    """Crea la fila del mes vacía si no existe (sin fallar si otra transacción la crea)."""
+    tabla = ItemPrecioHistorico.__table__
+    valores = {
+        "proveedor_id": clave[0], "item_hash": clave[1], "año": mes[0], "mes": mes[1],
+        "n": 0, "media": 0.0, "m2": 0.0, "media_cantidad": 0.0,
+    }
+    dialecto = conn.dialect.name
+
+    if dialecto == "mysql":
+        conn.execute(insert(tabla).values(**valores).prefix_with("IGNORE"))
+        return
+
+    if dialecto in ("sqlite", "postgresql"):
+        if dialecto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        conn.execute(dialect_insert(tabla).values(**valores).on_conflict_do_nothing())
+        return
+
+    if conn.execute(select(tabla.c.n).where(_filtro_fila(clave, mes))).first() is None:
+        conn.execute(insert(tabla).values(**valores))
+
+
+def _agregar(conn: Connection, grupo: Grupo, altas: List[Tuple[date, int, Decimal, Decimal]]) -> None:
+    """Welford de items nuevos sobre la fila de su mes."""
+    clave, mes = grupo[:2], grupo[2:]
+    tabla = ItemPrecioHistorico.__table__
+    _asegurar_fila(conn, clave, mes)
+    fila = conn.execute(select(tabla).where(_filtro_fila(clave, mes)).with_for_update()).one()
+
+    precios = PreciosItem.desde_fila(fila)
+    for fecha, factura_id, precio, cantidad in altas:
+        precios.agregar(fecha, factura_id, precio, cantidad)
+    conn.execute(update(tabla).where(_filtro_fila(clave, mes)).values(**precios.valores()))
+
+
+def _select_items():
+    """(proveedor_id, item_hash, fecha, factura_id, precio, cantidad) en orden de acumulación."""
+    return select(
+        Factura.proveedor_id,
+        FacturaItem.item_hash,
+        Factura.fecha_emision,
+        Factura.id,
+        FacturaItem.precio_unitario,
+        FacturaItem.cantidad,
+    ).join(
+        Factura, Factura.id == FacturaItem.factura_id
+    ).where(
+        FacturaItem.item_hash.isnot(None),
+        Factura.proveedor_id.isnot(None),
+        Factura.fecha_emision.isnot(None),
+    ).order_by(
+        Factura.proveedor_id, FacturaItem.item_hash, Factura.fecha_emision, Factura.id, FacturaItem.id
+    )
+
+
+def _acumular_por_mes(filas: Iterable) -> Dict[Tuple[int, str, int, int], PreciosItem]:
+    """Filas mensuales a partir de items ordenados por clave, fecha, factura e id."""
+    meses: Dict[Tuple[int, str, int, int], PreciosItem] = {}
+    for proveedor_id, item_hash, fecha, factura_id, precio, cantidad in filas:
+        pk = (proveedor_id, item_hash, fecha.year, fecha.month)
+        meses.setdefault(pk, PreciosItem()).agregar(fecha, factura_id, Decimal(precio), Decimal(cantidad))
+    return meses
+
+
+def _insertar(conn, meses: Dict[Tuple[int, str, int, int], PreciosItem]) -> None:
+    if meses:
+        conn.execute(insert(ItemPrecioHistorico.__table__), [
+            {"proveedor_id": p, "item_hash": h, "año": a, "mes": m, **precios.valores()}
+            for (p, h, a, m), precios in sorted(meses.items())
+        ])
+
+
+def _reconstruir_mes(conn: Connection, proveedor_id: int, mes: Mes, item_hashes: Set[str]) -> None:
+    """Recalcula desde factura_items las filas de esos items en un mes."""
+    inicio = date(*mes, 1)
+    fin = date(*sumar_meses(mes, 1), 1)
+
+    filas = conn.execute(_select_items().where(
+        Factura.proveedor_id == proveedor_id,
+        FacturaItem.item_hash.in_(item_hashes),
+        Factura.fecha_emision >= inicio,
+        Factura.fecha_emision < fin,
+    )).all()
+    conn.execute(delete(ItemPrecioHistorico.__table__).where(
+        ItemPrecioHistorico.proveedor_id == proveedor_id,
+        ItemPrecioHistorico.item_hash.in_(item_hashes),
+        ItemPrecioHistorico.año == mes[0],
+        ItemPrecioHistorico.mes == mes[1],
+    ))
+    _insertar(conn, _acumular_por_mes(filas))
+
+
+# ==================== MANTENIMIENTO EN CADA FLUSH ====================
+
+
+def _valores_previos(obj, campos: Tuple[str, ...]) -> Tuple:
+    """Valores antes del flush, a partir del historial de atributos."""
+    estado = inspect(obj)
+    valores = []
+    for campo in campos:
+        historial = estado.attrs[campo].history
+        if historial.deleted:
+            valores.append(historial.deleted[0])
+        elif historial.unchanged:
+            valores.append(historial.unchanged[0])
+        else:
+            valores.append(getattr(obj, campo))
+    return tuple(valores)
+
+
+def _valores_actuales(obj, campos: Tuple[str, ...]) -> Tuple:
+    return tuple(getattr(obj, campo) for campo in campos)
+
+
+def _grupo(factura: Optional[Tuple[Optional[int], Optional[date]]], item_hash: Optional[str]) -> Optional[Grupo]:
+    """Fila mensual de un item, o None si no entra al historial."""
+    if factura is None or item_hash is None:
+        return None
+    proveedor_id, fecha = factura
+    if proveedor_id is None or fecha is None:
+        return None
+    return proveedor_id, item_hash, fecha.year, fecha.month
+
+
+def calcular_cambios(
+    session: Session,
+    conn: Connection,
+    flush_context
+) -> Tuple[Dict[Grupo, List[Tuple[date, int, Decimal, Decimal]]], Set[Grupo]]:
+    """
+    Cambios del historial de precios en este flush.
+
+    - Items nuevos: altas (Welford) en la fila de su mes.
+    - Items eliminados o con factura, hash, precio o cantidad cambiados:
+      se reconstruyen sus filas anterior y actual.
+    - Facturas con proveedor o fecha cambiados: se reconstruyen las filas
+      anteriores y actuales de sus items.
+
+    Returns:
+        (altas por fila, filas que deben reconstruirse)
+    """
+    # (proveedor_id, fecha_emision) antes del flush de las facturas modificadas o eliminadas
+    facturas_previas: Dict[int, Tuple] = {}
+    facturas_movidas: Set[int] = set()
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, Factura):
+            previa = _valores_previos(obj, _CAMPOS_FACTURA)
+            facturas_previas[obj.id] = previa
+            if obj in session.dirty and previa != _valores_actuales(obj, _CAMPOS_FACTURA):
+                facturas_movidas.add(obj.id)
+
+    nuevos = [obj for obj in session.new if isinstance(obj, FacturaItem)]
+    # Los quitados de factura.items (delete-orphan) siguen en session.dirty
+    eliminados = [
+        obj for obj in (*session.dirty, *session.deleted)
+        if isinstance(obj, FacturaItem) and flush_context.is_deleted(inspect(obj))
+    ]
+    cambiados = [
+        obj for obj in session.dirty
+        if isinstance(obj, FacturaItem) and not flush_context.is_deleted(inspect(obj))
+        and any(inspect(obj).attrs[campo].history.has_changes() for campo in _CAMPOS_ITEM)
+    ]
+
+    # (proveedor_id, fecha_emision) después del flush, en una consulta
+    ids = {item.factura_id for item in (*nuevos, *cambiados)} | facturas_movidas
+    ids.update(_valores_previos(item, _CAMPOS_ITEM)[0] for item in (*cambiados, *eliminados))
+    ids.discard(None)
+    actuales: Dict[int, Tuple] = {}
+    if ids:
+        actuales = {
+            factura_id: (proveedor_id, fecha)
+            for factura_id, proveedor_id, fecha in conn.execute(
+                select(Factura.id, Factura.proveedor_id, Factura.fecha_emision).where(Factura.id.in_(ids))
+            )
+        }
+
+    def previa(factura_id):
+        return facturas_previas.get(factura_id) or actuales.get(factura_id)
+
+    altas: Dict[Grupo, List[Tuple[date, int, Decimal, Decimal]]] = defaultdict(list)
+    reconstruir: Set[Optional[Grupo]] = set()
+
+    for item in sorted(nuevos, key=lambda i: i.id):
+        grupo = _grupo(actuales.get(item.factura_id), item.item_hash)
+        if grupo is not None:
+            fecha = actuales[item.factura_id][1]
+            altas[grupo].append((fecha, item.factura_id, Decimal(item.precio_unitario), Decimal(item.cantidad)))
+
+    for item in cambiados:
+        factura_id, item_hash = _valores_previos(item, _CAMPOS_ITEM)[:2]
+        reconstruir.add(_grupo(previa(factura_id), item_hash))
+        reconstruir.add(_grupo(actuales.get(item.factura_id), item.item_hash))
+
+    for item in eliminados:
+        factura_id, item_hash = _valores_previos(item, _CAMPOS_ITEM)[:2]
+        reconstruir.add(_grupo(previa(factura_id), item_hash))
+
+    if facturas_movidas:
+        for factura_id, item_hash in conn.execute(
+            select(FacturaItem.factura_id, FacturaItem.item_hash).where(
+                FacturaItem.factura_id.in_(facturas_movidas),
+                FacturaItem.item_hash.isnot(None),
+            ).distinct()
+        ):
+            reconstruir.add(_grupo(facturas_previas[factura_id], item_hash))
+            reconstruir.add(_grupo(actuales.get(factura_id), item_hash))
+
+    reconstruir.discard(None)
+    return {grupo: lista for grupo, lista in altas.items() if grupo not in reconstruir}, reconstruir
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if not any(
+        isinstance(obj, (Factura, FacturaItem)) for obj in (*session.new, *session.dirty, *session.deleted)
+    ):
+        return
+
+    conn = session.connection()
+    altas, reconstruir = calcular_cambios(session, conn, flush_context)
+
+    # Orden fijo de filas: transacciones concurrentes las bloquean en el mismo orden
+    por_mes: Dict[Tuple[int, int, int], Set[str]] = defaultdict(set)
+    for proveedor_id, item_hash, año, mes in reconstruir:
+        por_mes[(proveedor_id, año, mes)].add(item_hash)
+    for proveedor_id, año, mes in sorted(por_mes):
+        _reconstruir_mes(conn, proveedor_id, (año, mes), por_mes[(proveedor_id, año, mes)])
+
+    for grupo in sorted(altas):
+        _agregar(conn, grupo, altas[grupo])
+
+
+def registrar_mantenimiento() -> None:
+    """Registra el listener after_flush en todas las sesiones (idempotente)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+# ==================== RECONSTRUCCIÓN Y VERIFICACIÓN ====================
+
+
+def reconstruir(db: Session) -> int:
+    """
+    Reconstruye la tabla completa desde factura_items (en la transacción del caller).
+
+    Returns:
+        Número de filas mensuales
+    """
+    db.execute(delete(ItemPrecioHistorico))
+    meses = _acumular_por_mes(db.execute(_select_items()))
+    _insertar(db, meses)
+
+    logger.info(f"item_precio_historico reconstruida: {len(meses)} filas")
+    return len(meses)
+
+
+def _iguales(a: Optional[PreciosItem], b: Optional[PreciosItem]) -> bool:
+    """Mismos valores; los acumuladores en float, con tolerancia de redondeo."""
+    if a is None or b is None:
+        return a is b
+    va, vb = a.valores(), b.valores()
+    return all(
+        math.isclose(va[col], vb[col], rel_tol=1e-9, abs_tol=1e-6)
+        if isinstance(va[col], float) or isinstance(vb[col], float)
+        else va[col] == vb[col]
+        for col in va
+    )
+
+
+def verificar_consistencia(db: Session, muestra: int = 20) -> Dict[str, Any]:
+    """
+    Compara la tabla contra el historial calculado en vivo desde factura_items.
+
+    Las filas con n = 0 se ignoran.
+    """
+    esperado = _acumular_por_mes(db.execute(_select_items()))
+
+    materializado = {
+        (fila.proveedor_id, fila.item_hash, fila.año, fila.mes): PreciosItem.desde_fila(fila)
+        for fila in db.execute(select(ItemPrecioHistorico).where(ItemPrecioHistorico.n > 0)).scalars()
+    }
+
+    diferencias = [
+        (pk, esperado.get(pk), materializado.get(pk))
+        for pk in sorted(esperado.keys() | materializado.keys())
+        if not _iguales(esperado.get(pk), materializado.get(pk))
+    ]
+
+    return {
+        "consistente": not diferencias,
+        "grupos_esperados": len(esperado),
+        "grupos_materializados": len(materializado),
+        "diferencias": len(diferencias),
+        "ejemplos": diferencias[:muestra],
+    }
@@ -0,0 +1,234 @@
+# app/services/liderazgo.py
+"""
+Elección de líder entre workers para las tareas periódicas.
+
+Con uvicorn --workers N cada proceso ejecuta lifespan: el barrido de
+automatización y los jobs de notificaciones corrían N veces (mismas
+facturas procesadas, mismo resumen semanal enviado N veces).
+
+Cada tarea tiene un lease en la tabla liderazgo_tareas (MySQL y SQLite por
+igual; no depende de GET_LOCK):
+- Tomar/renovar es un UPDATE condicional ("soy el titular o el lease venció");
+  si la fila no existe, un INSERT que solo gana un worker (PK).
+- El ElectorLider de cada proceso renueva sus leases cada LIDER_LEASE_SEGUNDOS/3
+  en un hilo propio. Los jobs consultan es_lider() (estado local, sin BD).
+- Failover: si el líder muere, su lease vence y otro worker lo toma en su
+  siguiente renovación (a lo sumo LIDER_LEASE_SEGUNDOS + un intervalo).
+- El líder solo se considera tal hasta el vencimiento que él mismo escribió,
+  medido con su reloj monotónico: si no puede renovar, deja de ejecutar
+  antes de que otro pueda tomar el lease.
+
+Los vencimientos se escriben en UTC con el reloj de cada worker: entre
+hosts distintos el desfase de reloj debe ser menor que el lease (NTP).
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.liderazgo_tarea import LiderazgoTarea
+from app.utils.logger import logger
+
+
+TAREA_AUTOMATIZACION = "automatizacion"
+TAREA_NOTIFICACIONES = "notificaciones"
+
+TAREAS = (TAREA_AUTOMATIZACION, TAREA_NOTIFICACIONES)
+
+
+def identidad_proceso() -> str:
+    """host:pid:sufijo; el sufijo distingue un pid reutilizado tras un reinicio."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+# ==================== LEASES ====================
+
+
+def adquirir(
+    db: Session,
+    tarea: str,
+    titular: str,
+    duracion: timedelta,
+    ahora: Optional[datetime] = None
+) -> bool:
+    """
+    Toma o renueva el lease de `tarea` para `titular`.
+
+    Returns:
+        True si `titular` es el líder hasta ahora + duracion
+    """
+    ahora = ahora or datetime.utcnow()
+    valores = {"titular": titular, "vence_en": ahora + duracion, "renovado_en": ahora}
+
+    try:
+        renovado = db.execute(
+            update(LiderazgoTarea)
+            .where(
+                LiderazgoTarea.tarea == tarea,
+                or_(LiderazgoTarea.titular == titular, LiderazgoTarea.vence_en <= ahora)
+            )
+            .values(**valores)
+        )
+        if renovado.rowcount == 1:
+            db.commit()
+            return True
+
+        # Sin fila (primera vez) o lease vigente de otro: solo un INSERT gana la PK
+        db.execute(insert(LiderazgoTarea).values(tarea=tarea, **valores))
+        db.commit()
+        return True
+
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def liberar(db: Session, tarea: str, titular: str) -> None:
+    """Vence el lease si `titular` lo tiene: otro worker lo toma sin esperar."""
+    db.execute(
+        update(LiderazgoTarea)
+        .where(LiderazgoTarea.tarea == tarea, LiderazgoTarea.titular == titular)
+        .values(vence_en=datetime.utcnow())
+    )
+    db.commit()
+
+
+# ==================== ELECTOR POR PROCESO ====================
+
+
+class ElectorLider:
+    """Mantiene los leases de un proceso y responde es_lider() sin ir a la BD."""
+
+    def __init__(
+        self,
+        tareas: Iterable[str],
+        lease_segundos: int,
+        session_factory: Callable[[], Session] = SessionLocal,
+        titular: Optional[str] = None
+    ):
+        self.tareas = tuple(tareas)
+        self.duracion = timedelta(seconds=lease_segundos)
+        self.session_factory = session_factory
+        self.titular = titular or identidad_proceso()
+        # tarea -> instante (time.monotonic) hasta el que somos líder
+        self._vigente_hasta: Dict[str, float] = {}
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def es_lider(self, tarea: str) -> bool:
+        return self._vigente_hasta.get(tarea, 0.0) > time.monotonic()
+
+    def renovar(self) -> None:
+        """Intenta tomar/renovar todos los leases (un error no corta las demás tareas)."""
+        db = self.session_factory()
+        try:
+            for tarea in self.tareas:
+                inicio = time.monotonic()
+                era_lider = self.es_lider(tarea)
+                try:
+                    lider = adquirir(db, tarea, self.titular, self.duracion)
+                except Exception as e:
+                    db.rollback()
+                    logger.warning(f"No se pudo renovar el lease de '{tarea}': {str(e)}")
+                    continue
+
+                if lider:
+                    self._vigente_hasta[tarea] = inicio + self.duracion.total_seconds()
+                else:
+                    self._vigente_hasta.pop(tarea, None)
+
+                if lider != era_lider:
+                    logger.info(f"Worker {self.titular} {'es líder' if lider else 'dejó de ser líder'} de '{tarea}'")
+        finally:
+            db.close()
+
+    def iniciar(self) -> None:
+        """Primera elección en el acto (antes de arrancar los schedulers) y renovación en segundo plano."""
+        self.renovar()
+        self._hilo = threading.Thread(target=self._renovar_periodicamente, name="elector-lider", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join(5)
+
+        lideradas = [tarea for tarea in self.tareas if self.es_lider(tarea)]
+        self._vigente_hasta.clear()
+        if not lideradas:
+            return
+
+        db = self.session_factory()
+        try:
+            for tarea in lideradas:
+                liberar(db, tarea, self.titular)
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"No se pudieron liberar los leases {lideradas}: {str(e)}")
+        finally:
+            db.close()
+
+    def _renovar_periodicamente(self) -> None:
+        intervalo = self.duracion.total_seconds() / 3
+        while not self._detener.wait(intervalo):
+            self.renovar()
+
+
+# Elector global del proceso
+_elector: Optional[ElectorLider] = None
+
+
+def iniciar_elector() -> None:
+    """Inicia la elección de líder. Se ejecuta al iniciar la aplicación (en lifespan)."""
+    global _elector
+
+    if _elector is not None or not settings.lider_eleccion_habilitada:
+        return
+
+    _elector = ElectorLider(TAREAS, settings.lider_lease_segundos)
+    _elector.iniciar()
+    logger.info(
+        f"Elección de líder iniciada ({_elector.titular}): "
+        + ", ".join(f"{tarea}={'líder' if _elector.es_lider(tarea) else 'en espera'}" for tarea in TAREAS)
+    )
+
+
+def detener_elector() -> None:
+    """Libera los leases de este proceso. Se ejecuta al cerrar la aplicación (en lifespan)."""
+    global _elector
+
+    if _elector is not None:
+        _elector.detener()
+        _elector = None
+        logger.info("Elección de líder detenida")
+
+
+def es_lider(tarea: str) -> bool:
+    """
+    True si este proceso debe ejecutar `tarea`. Sin elector (elección
+    deshabilitada, scripts, ejecución manual) cada proceso es su propio líder.
+    """
+    return _elector is None or _elector.es_lider(tarea)
+
+
+def solo_lider(tarea: str):
+    """Decorador de jobs periódicos: fuera del líder no se ejecutan."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not es_lider(tarea):
+                logger.debug(f"'{funcion.__name__}' omitido: este worker no es líder de '{tarea}'")
+                return None
+            return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
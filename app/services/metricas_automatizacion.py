@@ -0,0 +1,238 @@
+# app/services/metricas_automatizacion.py
+"""
+Métricas del dashboard de automatización con caché en memoria.
+
+GET /automation/dashboard/metricas lo consulta cada pestaña abierta del
+dashboard. Los contadores salen de UNA consulta con agregación condicional
+sobre rangos de fecha_procesamiento_auto (indexables), y el resultado se
+guarda en un caché por proceso con TTL corto.
+
+El caché se invalida al confirmar cualquier transacción que cambie el
+estado o el procesamiento automático de una factura (AutomationService,
+aprobar/rechazar en workflow, contador...): un listener after_flush marca
+la sesión y after_commit limpia el caché.
+"""
+import threading
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import and_, case, event, func, inspect
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura, EstadoFactura
+from app.utils.logger import logger
+
+
+# Atributos de Factura que cambian las métricas
+_CAMPOS = ("estado", "fecha_procesamiento_auto")
+
+_MARCA_SESION = "metricas_automatizacion_sucias"
+
+
+def calcular_metricas(db: Session, ahora: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Calcula las métricas del dashboard: una consulta de contadores + top 10.
+
+    Args:
+        db: Sesión de base de datos
+        ahora: Instante de referencia (UTC); por defecto datetime.utcnow()
+    """
+    ahora = ahora or datetime.utcnow()
+    inicio_hoy = datetime.combine(ahora.date(), time.min)
+    fin_hoy = inicio_hoy + timedelta(days=1)
+    fecha_semana = ahora - timedelta(days=7)
+
+    procesada_hoy = and_(
+        Factura.fecha_procesamiento_auto >= inicio_hoy,
+        Factura.fecha_procesamiento_auto < fin_hoy
+    )
+    procesada_semana = Factura.fecha_procesamiento_auto >= fecha_semana
+    es_auto = Factura.estado == EstadoFactura.aprobada_auto
+    es_revision = Factura.estado == EstadoFactura.en_revision
+
+    # Todos los contadores involucran solo aprobada_auto / en_revision
+    fila = db.query(
+        func.count(case((and_(es_auto, procesada_hoy), Factura.id))).label("aprobadas_hoy"),
+        func.count(case((and_(es_revision, procesada_hoy), Factura.id))).label("revision_hoy"),
+        func.count(case((es_revision, Factura.id))).label("pendientes"),
+        func.count(case((procesada_semana, Factura.id))).label("semana"),
+        func.count(case((and_(es_auto, procesada_semana), Factura.id))).label("aprobadas_semana"),
+    ).filter(
+        Factura.estado.in_([EstadoFactura.aprobada_auto, EstadoFactura.en_revision])
+    ).one()
+
+    aprobadas_hoy = fila.aprobadas_hoy or 0
+    revision_hoy = fila.revision_hoy or 0
+    total_procesadas_hoy = aprobadas_hoy + revision_hoy
+    semana = fila.semana or 0
+    aprobadas_semana = fila.aprobadas_semana or 0
+
+    # Últimas 10 facturas procesadas automáticamente (proveedor por joined)
+    ultimas_facturas = db.query(Factura).filter(
+        Factura.fecha_procesamiento_auto.isnot(None)
+    ).order_by(
+        Factura.fecha_procesamiento_auto.desc()
+    ).limit(10).all()
+
+    return {
+        'success': True,
+        'timestamp': ahora.isoformat(),
+        'metricas_hoy': {
+            'facturas_aprobadas_automaticamente': aprobadas_hoy,
+            'facturas_en_revision_manual': revision_hoy,
+            'facturas_pendientes_procesamiento': fila.pendientes or 0,
+            'total_procesadas': total_procesadas_hoy,
+            'tasa_automatizacion_pct': round(
+                (aprobadas_hoy / total_procesadas_hoy * 100) if total_procesadas_hoy > 0 else 0,
+                1
+            )
+        },
+        'metricas_semana': {
+            'total_procesadas': semana,
+            'aprobadas_automaticamente': aprobadas_semana,
+            'tasa_automatizacion_pct': round(
+                (aprobadas_semana / semana * 100) if semana > 0 else 0,
+                1
+            )
+        },
+        'ultimas_facturas': [
+            {
+                'id': f.id,
+                'numero_factura': f.numero_factura,
+                'proveedor': f.proveedor.razon_social if f.proveedor else 'N/A',
+                'total': float(f.total_a_pagar) if f.total_a_pagar else 0,
+                'estado': f.estado.value if f.estado else 'pendiente',
+                'confianza': float(f.confianza_automatica) if f.confianza_automatica else 0,
+                'fecha_procesamiento': f.fecha_procesamiento_auto.isoformat() if f.fecha_procesamiento_auto else None,
+                'motivo': f.motivo_decision or 'Sin motivo'
+            }
+            for f in ultimas_facturas
+        ],
+        'estado_sistema': {
+            'automatizacion_activa': True,
+            'ultima_ejecucion': ultimas_facturas[0].fecha_procesamiento_auto.isoformat() if ultimas_facturas else None,
+            'proxima_ejecucion_programada': 'Cada hora en punto'
+        }
+    }
+
+
+class MetricasAutomatizacionCache:
+    """
+    Caché en memoria (por proceso) de las métricas del dashboard.
+
+    Un contador de generación evita guardar un resultado calculado mientras
+    otra transacción invalidaba el caché.
+    """
+
+    def __init__(self, ttl_seconds: int = 15):
+        self._cache: Optional[Dict[str, Any]] = None
+        self._last_refresh: Optional[datetime] = None
+        self._ttl_seconds = ttl_seconds
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def is_expired(self) -> bool:
+        """Verifica si el caché ha expirado"""
+        if self._last_refresh is None:
+            return True
+
+        age = datetime.utcnow() - self._last_refresh
+        return age.total_seconds() > self._ttl_seconds
+
+    def get(self, db: Session, force_refresh: bool = False) -> Dict[str, Any]:
+        """
+        Métricas desde el caché, recalculando si expiró o fue invalidado.
+
+        Args:
+            db: Sesión de base de datos
+            force_refresh: Ignora el caché y recalcula
+        """
+        with self._lock:
+            if not force_refresh and self._cache is not None and not self.is_expired():
+                return self._cache
+            generacion = self._generacion
+
+        metricas = calcular_metricas(db)
+
+        with self._lock:
+            if generacion == self._generacion:
+                self._cache = metricas
+                self._last_refresh = datetime.utcnow()
+
+        return metricas
+
+    def clear(self) -> None:
+        """Invalida el caché: la próxima consulta recalcula."""
+        with self._lock:
+            self._generacion += 1
+            self._cache = None
+            self._last_refresh = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estado del caché (para diagnóstico)."""
+        return {
+            "status": "empty" if self._cache is None else "active",
+            "last_refresh": self._last_refresh,
+            "ttl_seconds": self._ttl_seconds,
+            "expired": self.is_expired(),
+        }
+
+
+def _crear_cache() -> MetricasAutomatizacionCache:
+    from app.core.config import settings
+    return MetricasAutomatizacionCache(ttl_seconds=settings.automation_metricas_cache_ttl)
+
+
+# Instancia global del caché (singleton)
+_metricas_cache = _crear_cache()
+
+
+def get_metricas_cache() -> MetricasAutomatizacionCache:
+    """Obtiene la instancia global del caché de métricas."""
+    return _metricas_cache
+
+
+def invalidar_metricas() -> None:
+    """Invalida las métricas cacheadas de este proceso."""
+    _metricas_cache.clear()
+
+
+# ==================== INVALIDACIÓN AUTOMÁTICA ====================
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if session.info.get(_MARCA_SESION):
+        return
+
+    for obj in (*session.new, *session.deleted):
+        if isinstance(obj, Factura):
+            session.info[_MARCA_SESION] = True
+            return
+
+    for obj in session.dirty:
+        if isinstance(obj, Factura):
+            estado = inspect(obj)
+            if any(estado.attrs[campo].history.has_changes() for campo in _CAMPOS):
+                session.info[_MARCA_SESION] = True
+                return
+
+
+def _after_commit(session: Session) -> None:
+    if session.info.pop(_MARCA_SESION, False):
+        invalidar_metricas()
+        logger.debug("Métricas de automatización invalidadas")
+
+
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_MARCA_SESION, None)
+
+
+def registrar_invalidacion() -> None:
+    """Registra los listeners de invalidación en todas las sesiones (idempotente)."""
+    for nombre, listener in (
+        ("after_flush", _after_flush),
+        ("after_commit", _after_commit),
+        ("after_rollback", _after_rollback),
+    ):
+        if not event.contains(Session, nombre, listener):
+            event.listen(Session, nombre, listener)
@@ -0,0 +1,324 @@
+# app/services/regeneracion_patrones.py
+"""
+Regeneración por lotes de patrones_facturas.
+
+Antes AnalizadorPatrones.regenerar_todos_patrones hacía, por cada
+(proveedor, concepto), una consulta de historial y una búsqueda del patrón
+existente, y AnalizadorPatronesService cargaba las facturas como objetos ORM
+y hacía un SELECT por patrón antes de insertar o actualizar. Ahora:
+
+- Las facturas de la ventana se leen una sola vez, solo las columnas
+  necesarias, en lotes keyset por (fecha_emision, id).
+- En esa misma pasada cada grupo acumula (Welford) montos e intervalos, sus
+  meses distintos y sus últimas 12 facturas.
+- Los patrones existentes se leen con una consulta por lote y se escriben
+  con INSERT / UPDATE por lotes (un commit por lote).
+- En modo incremental solo se recalculan los proveedores con facturas
+  modificadas desde su análisis más antiguo. Las facturas que salen de la
+  ventana por antigüedad o se borran solo las recoge el modo completo.
+
+Qué es un grupo y cómo se convierte en patrón lo decide el llamador:
+AnalizadorPatrones y AnalizadorPatronesService usan reglas distintas.
+"""
+import hashlib
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura
+from app.models.patrones_facturas import PatronesFacturas
+from app.services.estadisticas_montos import EstadisticasMontos
+from app.utils.logger import logger
+
+
+TAMANO_LOTE = 1000
+ULTIMOS_PAGOS = 12
+
+Llave = Tuple[int, str]
+
+
+@dataclass
+class GrupoFacturas:
+    """Facturas de un (proveedor, concepto) acumuladas en orden de fecha."""
+    proveedor_id: int
+    concepto_normalizado: str
+    estadisticas: EstadisticasMontos = field(default_factory=EstadisticasMontos)
+    meses: Set[Tuple[int, int]] = field(default_factory=set)
+    # (factura_id, fecha, monto) de las últimas facturas, la más reciente al final
+    ultimas: Deque[Tuple[int, date, Decimal]] = field(default_factory=lambda: deque(maxlen=ULTIMOS_PAGOS))
+
+    @property
+    def n(self) -> int:
+        return self.estadisticas.n
+
+    @property
+    def concepto_hash(self) -> str:
+        return hashlib.md5(self.concepto_normalizado.encode('utf-8')).hexdigest()
+
+    def agregar(self, factura_id: int, fecha: date, monto: Decimal) -> None:
+        self.estadisticas.agregar(fecha, monto, self.estadisticas.ultima_fecha)
+        self.meses.add((fecha.year, fecha.month))
+        self.estadisticas.meses = len(self.meses)
+        self.ultimas.append((factura_id, fecha, monto))
+
+
+# ==================== LECTURA ====================
+
+
+def iterar_facturas(
+    db: Session,
+    desde: date,
+    estados: Sequence[Any],
+    proveedores: Optional[Sequence[int]] = None,
+    tamano_lote: int = TAMANO_LOTE
+) -> Iterator[Any]:
+    """
+    Facturas de la ventana (solo columnas) en orden (fecha_emision, id).
+
+    Lotes keyset en vez de un cursor de servidor, igual que
+    crud.factura.iter_all_facturas_for_dashboard.
+    """
+    consulta = select(
+        Factura.id,
+        Factura.proveedor_id,
+        Factura.concepto_normalizado,
+        Factura.concepto_principal,
+        Factura.fecha_emision,
+        Factura.total_a_pagar,
+    ).where(
+        Factura.fecha_emision >= desde,
+        Factura.estado.in_(estados),
+        Factura.total_a_pagar > 0,
+        Factura.proveedor_id.isnot(None),
+    )
+    if proveedores is not None:
+        consulta = consulta.where(Factura.proveedor_id.in_(proveedores))
+    consulta = consulta.order_by(Factura.fecha_emision, Factura.id).limit(tamano_lote)
+
+    lote = consulta
+    while True:
+        filas = db.execute(lote).all()
+        yield from filas
+        if len(filas) < tamano_lote:
+            return
+        ultima = filas[-1]
+        lote = consulta.where(or_(
+            Factura.fecha_emision > ultima.fecha_emision,
+            and_(Factura.fecha_emision == ultima.fecha_emision, Factura.id > ultima.id),
+        ))
+
+
+def agrupar(filas: Iterable[Any], clave: Callable[[Any], Optional[str]]) -> Tuple[Dict[Llave, GrupoFacturas], int]:
+    """
+    Acumula las filas por (proveedor_id, clave(fila)) en una sola pasada.
+
+    Las filas con clave vacía se cuentan como leídas pero no se agrupan.
+
+    Returns:
+        (grupos, filas leídas)
+    """
+    grupos: Dict[Llave, GrupoFacturas] = {}
+    leidas = 0
+    for fila in filas:
+        leidas += 1
+        if leidas % (TAMANO_LOTE * 10) == 0:
+            logger.info(f"Regeneración de patrones: {leidas} facturas leídas, {len(grupos)} grupos")
+
+        concepto = clave(fila)
+        if not concepto:
+            continue
+        llave = (fila.proveedor_id, concepto)
+        grupo = grupos.get(llave)
+        if grupo is None:
+            grupo = grupos[llave] = GrupoFacturas(fila.proveedor_id, concepto)
+        grupo.agregar(fila.id, fila.fecha_emision, Decimal(fila.total_a_pagar))
+
+    return grupos, leidas
+
+
+def proveedores_con_cambios(db: Session, desde: date) -> List[int]:
+    """
+    Proveedores con facturas en la ventana modificadas desde su análisis más
+    antiguo en patrones_facturas (o sin ningún patrón todavía).
+
+    Se compara con >= porque las fechas tienen resolución de segundos: una
+    factura tocada en el mismo segundo del análisis se vuelve a procesar.
+    """
+    analisis = select(
+        PatronesFacturas.proveedor_id,
+        func.min(PatronesFacturas.fecha_analisis).label("analizado_en"),
+    ).group_by(PatronesFacturas.proveedor_id).subquery()
+    analizado_en = func.max(analisis.c.analizado_en)
+
+    consulta = select(Factura.proveedor_id).outerjoin(
+        analisis, analisis.c.proveedor_id == Factura.proveedor_id
+    ).where(
+        Factura.proveedor_id.isnot(None),
+        Factura.fecha_emision >= desde,
+    ).group_by(Factura.proveedor_id).having(or_(
+        analizado_en.is_(None),
+        func.max(Factura.actualizado_en) >= analizado_en,
+    ))
+    return [proveedor_id for (proveedor_id,) in db.execute(consulta)]
+
+
+# ==================== ESCRITURA ====================
+
+
+def _ahora_bd(db: Session) -> datetime:
+    """Hora de la BD: se compara con facturas.actualizado_en (func.now())."""
+    ahora = db.execute(select(func.now())).scalar()
+    return datetime.fromisoformat(ahora) if isinstance(ahora, str) else ahora  # SQLite devuelve texto
+
+
+def _patrones_existentes(db: Session, llaves: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], List[Any]]:
+    """Patrones ya guardados por (proveedor_id, concepto_hash), en una consulta."""
+    llaves = set(llaves)
+    existentes: Dict[Tuple[int, str], List[Any]] = {}
+    if not llaves:
+        return existentes
+
+    filas = db.execute(
+        select(
+            PatronesFacturas.id,
+            PatronesFacturas.proveedor_id,
+            PatronesFacturas.concepto_hash,
+            PatronesFacturas.tipo_patron,
+            PatronesFacturas.monto_promedio,
+            PatronesFacturas.pagos_analizados,
+            PatronesFacturas.puede_aprobar_auto,
+        ).where(
+            PatronesFacturas.proveedor_id.in_({proveedor_id for proveedor_id, _ in llaves}),
+            PatronesFacturas.concepto_hash.in_({concepto_hash for _, concepto_hash in llaves}),
+        ).order_by(PatronesFacturas.id)
+    )
+    for fila in filas:
+        llave = (fila.proveedor_id, fila.concepto_hash)
+        if llave in llaves:
+            existentes.setdefault(llave, []).append(fila)
+    return existentes
+
+
+def persistir(
+    db: Session,
+    patrones: List[Dict[str, Any]],
+    analizado_en: datetime,
+    hay_cambios: Optional[Callable[[Any, Dict[str, Any]], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Inserta o actualiza los patrones por lotes de TAMANO_LOTE (commit por lote).
+
+    Args:
+        patrones: Valores de columnas de PatronesFacturas, con proveedor_id y concepto_hash
+        analizado_en: fecha_analisis de todos los patrones del lote
+        hay_cambios: (fila existente, patrón nuevo) -> si se actualiza; None = siempre.
+            Los que no cambian solo renuevan fecha_analisis.
+
+    Returns:
+        Conteos de nuevos / actualizados / sin_cambios y los cambios de tipo
+        [(tipo_anterior, tipo_nuevo)] de los actualizados
+    """
+    resultado = {"nuevos": 0, "actualizados": 0, "sin_cambios": 0, "cambios_tipo": []}
+
+    for inicio in range(0, len(patrones), TAMANO_LOTE):
+        lote = patrones[inicio:inicio + TAMANO_LOTE]
+        existentes = _patrones_existentes(db, ((p["proveedor_id"], p["concepto_hash"]) for p in lote))
+
+        nuevos, actualizaciones, sin_cambios = [], [], []
+        for patron in lote:
+            filas = existentes.get((patron["proveedor_id"], patron["concepto_hash"]))
+            valores = {**patron, "fecha_analisis": analizado_en}
+            if not filas:
+                nuevos.append(valores)
+            elif hay_cambios is None or hay_cambios(filas[0], patron):
+                # Duplicados de versiones anteriores: se actualizan todos
+                actualizaciones.extend({**valores, "id": fila.id} for fila in filas)
+                resultado["actualizados"] += 1
+                if filas[0].tipo_patron != patron["tipo_patron"]:
+                    resultado["cambios_tipo"].append((filas[0].tipo_patron, patron["tipo_patron"]))
+            else:
+                sin_cambios.extend(fila.id for fila in filas)
+                resultado["sin_cambios"] += 1
+
+        if nuevos:
+            db.execute(insert(PatronesFacturas), nuevos)
+        if actualizaciones:
+            db.execute(update(PatronesFacturas), actualizaciones)
+        if sin_cambios:
+            db.execute(
+                update(PatronesFacturas)
+                .where(PatronesFacturas.id.in_(sin_cambios))
+                .values(fecha_analisis=analizado_en)
+                .execution_options(synchronize_session=False)
+            )
+        resultado["nuevos"] += len(nuevos)
+        db.commit()
+
+        logger.info(f"Regeneración de patrones: {inicio + len(lote)}/{len(patrones)} patrones guardados")
+
+    return resultado
+
+
+def regenerar(
+    db: Session,
+    clave: Callable[[Any], Optional[str]],
+    construir: Callable[[GrupoFacturas], Optional[Dict[str, Any]]],
+    desde: date,
+    estados: Sequence[Any],
+    incremental: bool = False,
+    solo_proveedores: Optional[Sequence[int]] = None,
+    limite: Optional[int] = None,
+    hay_cambios: Optional[Callable[[Any, Dict[str, Any]], bool]] = None
+) -> Dict[str, Any]:
+    """
+    Regenera patrones_facturas desde las facturas de la ventana.
+
+    Args:
+        clave: Concepto normalizado de una fila de factura (None = no se agrupa)
+        construir: Valores del patrón de un grupo (None = el grupo no forma patrón)
+        desde: Inicio de la ventana (fecha_emision)
+        estados: Estados de factura que cuentan
+        incremental: Solo proveedores con facturas modificadas desde su último análisis
+        solo_proveedores: Restringe a estos proveedores
+        limite: Máximo de grupos a procesar
+        hay_cambios: Ver persistir
+
+    Returns:
+        Conteos de la ejecución y los patrones calculados ("patrones")
+    """
+    analizado_en = _ahora_bd(db)
+
+    proveedores = list(solo_proveedores) if solo_proveedores is not None else None
+    if incremental:
+        cambiados = proveedores_con_cambios(db, desde)
+        proveedores = cambiados if proveedores is None else sorted(set(proveedores) & set(cambiados))
+        logger.info(f"Regeneración incremental de patrones: {len(proveedores)} proveedores con cambios")
+
+    if proveedores is not None and not proveedores:
+        grupos, leidas = {}, 0
+    else:
+        grupos, leidas = agrupar(iterar_facturas(db, desde, estados, proveedores), clave)
+
+    llaves = sorted(grupos)
+    if limite:
+        llaves = llaves[:limite]
+    patrones = [patron for patron in (construir(grupos[llave]) for llave in llaves) if patron]
+
+    resultado = persistir(db, patrones, analizado_en, hay_cambios)
+    resultado.update({
+        "facturas_leidas": leidas,
+        "grupos": len(grupos),
+        "patrones": patrones,
+    })
+
+    logger.info(
+        f"Regeneración de patrones completada: {leidas} facturas, {len(grupos)} grupos, "
+        f"{resultado['nuevos']} nuevos, {resultado['actualizados']} actualizados, "
+        f"{resultado['sin_cambios']} sin cambios"
+    )
+    return resultado
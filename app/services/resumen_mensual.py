@@ -0,0 +1,274 @@
+# app/services/resumen_mensual.py
+"""
+Mantenimiento del rollup facturas_resumen_mensual.
+
+Las facturas cambian de estado en muchos sitios (workflow, contador,
+automatización, update_factura...). En vez de llamar al rollup desde cada
+uno, un listener after_flush de la sesión calcula el delta de cada factura
+nueva, modificada o eliminada y lo aplica con un UPSERT en la MISMA
+transacción: si el commit falla, el rollup tampoco cambia.
+
+Quedan fuera las escrituras que no pasan por el ORM (SQL directo, cargas
+masivas con Core). Para esos casos:
+    python -m app.scripts.resumen_mensual --verificar
+    python -m app.scripts.resumen_mensual --reconstruir
+"""
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, extract, func, inspect, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura
+from app.models.factura_resumen_mensual import FacturaResumenMensual, SIN_PROVEEDOR
+from app.utils.logger import logger
+
+
+# Atributos de Factura que mueven el rollup
+_CAMPOS = ("fecha_emision", "proveedor_id", "estado", "subtotal", "iva", "total_a_pagar")
+
+Clave = Tuple[int, int, int, str]
+
+
+def _valor_estado(estado) -> Optional[str]:
+    return getattr(estado, "value", estado)
+
+
+def _clave_y_aporte(valores: Dict[str, Any]) -> Optional[Tuple[Clave, list]]:
+    """(año, mes, proveedor, estado) y [n, con_monto, subtotal, iva, total] de una factura."""
+    fecha = valores["fecha_emision"]
+    estado = _valor_estado(valores["estado"])
+    if fecha is None or estado is None:
+        return None
+
+    clave = (fecha.year, fecha.month, valores["proveedor_id"] or SIN_PROVEEDOR, estado)
+    total = valores["total_a_pagar"]
+    aporte = [
+        1,
+        0 if total is None else 1,
+        Decimal(valores["subtotal"] or 0),
+        Decimal(valores["iva"] or 0),
+        Decimal(total or 0),
+    ]
+    return clave, aporte
+
+
+def _valores_actuales(factura: Factura) -> Dict[str, Any]:
+    return {campo: getattr(factura, campo) for campo in _CAMPOS}
+
+
+def _valores_previos(factura: Factura) -> Dict[str, Any]:
+    """Valores antes del flush, a partir del historial de atributos."""
+    estado = inspect(factura)
+    valores = {}
+    for campo in _CAMPOS:
+        historial = estado.attrs[campo].history
+        if historial.deleted:
+            valores[campo] = historial.deleted[0]
+        elif historial.unchanged:
+            valores[campo] = historial.unchanged[0]
+        else:
+            valores[campo] = getattr(factura, campo)
+    return valores
+
+
+def _acumular(deltas, valores: Dict[str, Any], signo: int) -> None:
+    resultado = _clave_y_aporte(valores)
+    if resultado is None:
+        return
+    clave, aporte = resultado
+    acumulado = deltas[clave]
+    for i, valor in enumerate(aporte):
+        acumulado[i] += signo * valor
+
+
+def calcular_deltas(session: Session) -> Dict[Clave, list]:
+    """Delta del rollup para las facturas pendientes de este flush."""
+    deltas: Dict[Clave, list] = defaultdict(lambda: [0, 0, Decimal(0), Decimal(0), Decimal(0)])
+
+    for obj in session.new:
+        if isinstance(obj, Factura):
+            _acumular(deltas, _valores_actuales(obj), +1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Factura):
+            continue
+        estado = inspect(obj)
+        if not any(estado.attrs[campo].history.has_changes() for campo in _CAMPOS):
+            continue
+        _acumular(deltas, _valores_previos(obj), -1)
+        _acumular(deltas, _valores_actuales(obj), +1)
+
+    for obj in session.deleted:
+        if isinstance(obj, Factura):
+            _acumular(deltas, _valores_previos(obj), -1)
+
+    return {clave: aporte for clave, aporte in deltas.items() if any(aporte)}
+
+
+def _upsert(conn: Connection, clave: Clave, aporte: list) -> None:
+    tabla = FacturaResumenMensual.__table__
+    año, mes, proveedor_id, estado = clave
+    n, con_monto, subtotal, iva, total = aporte
+    incrementos = {
+        "total_facturas": n,
+        "facturas_con_monto": con_monto,
+        "subtotal_total": subtotal,
+        "iva_total": iva,
+        "monto_total": total,
+    }
+    dialecto = conn.dialect.name
+
+    if dialecto == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(tabla).values(año=año, mes=mes, proveedor_id=proveedor_id, estado=estado, **incrementos)
+        stmt = stmt.on_duplicate_key_update(
+            actualizado_en=func.now(),
+            **{col: tabla.c[col] + stmt.inserted[col] for col in incrementos}
+        )
+        conn.execute(stmt)
+        return
+
+    if dialecto in ("sqlite", "postgresql"):
+        if dialecto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+
+        stmt = dialect_insert(tabla).values(año=año, mes=mes, proveedor_id=proveedor_id, estado=estado, **incrementos)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["año", "mes", "proveedor_id", "estado"],
+            set_={
+                "actualizado_en": func.now(),
+                **{col: tabla.c[col] + stmt.excluded[col] for col in incrementos}
+            }
+        )
+        conn.execute(stmt)
+        return
+
+    # Otros motores: UPDATE y, si no existía la fila, INSERT
+    resultado = conn.execute(
+        update(tabla).where(
+            tabla.c.año == año, tabla.c.mes == mes,
+            tabla.c.proveedor_id == proveedor_id, tabla.c.estado == estado
+        ).values(**{col: tabla.c[col] + valor for col, valor in incrementos.items()})
+    )
+    if resultado.rowcount == 0:
+        conn.execute(insert(tabla).values(año=año, mes=mes, proveedor_id=proveedor_id, estado=estado, **incrementos))
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    if not any(isinstance(obj, Factura) for obj in (*session.new, *session.dirty, *session.deleted)):
+        return
+
+    deltas = calcular_deltas(session)
+    if not deltas:
+        return
+
+    # Orden fijo de claves: dos transacciones concurrentes (workers de
+    # automatización) bloquean las filas del rollup en el mismo orden
+    conn = session.connection()
+    for clave in sorted(deltas):
+        _upsert(conn, clave, deltas[clave])
+
+
+def registrar_mantenimiento() -> None:
+    """Registra el listener after_flush en todas las sesiones (idempotente)."""
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+# ==================== RECONSTRUCCIÓN Y VERIFICACIÓN ====================
+
+
+def _select_desde_facturas():
+    """Agregado en vivo con las mismas columnas que el rollup."""
+    return select(
+        extract("year", Factura.fecha_emision),
+        extract("month", Factura.fecha_emision),
+        func.coalesce(Factura.proveedor_id, SIN_PROVEEDOR),
+        Factura.estado,
+        func.count(Factura.id),
+        func.count(Factura.total_a_pagar),
+        func.coalesce(func.sum(Factura.subtotal), 0),
+        func.coalesce(func.sum(Factura.iva), 0),
+        func.coalesce(func.sum(Factura.total_a_pagar), 0),
+    ).where(
+        Factura.fecha_emision.isnot(None)
+    ).group_by(
+        extract("year", Factura.fecha_emision),
+        extract("month", Factura.fecha_emision),
+        func.coalesce(Factura.proveedor_id, SIN_PROVEEDOR),
+        Factura.estado,
+    )
+
+
+def _normalizar(fila) -> Tuple:
+    año, mes, proveedor_id, estado, n, con_monto, subtotal, iva, total = fila
+    return (
+        int(año), int(mes), int(proveedor_id), _valor_estado(estado),
+        int(n), int(con_monto),
+        Decimal(str(subtotal)).quantize(Decimal("0.01")),
+        Decimal(str(iva)).quantize(Decimal("0.01")),
+        Decimal(str(total)).quantize(Decimal("0.01")),
+    )
+
+
+def reconstruir(db: Session) -> int:
+    """
+    Reconstruye el rollup completo desde facturas (en la transacción del caller).
+
+    Returns:
+        Número de filas del rollup
+    """
+    db.execute(delete(FacturaResumenMensual))
+
+    filas = [_normalizar(fila) for fila in db.execute(_select_desde_facturas())]
+    if filas:
+        db.execute(insert(FacturaResumenMensual), [
+            {
+                "año": año, "mes": mes, "proveedor_id": proveedor_id, "estado": estado,
+                "total_facturas": n, "facturas_con_monto": con_monto,
+                "subtotal_total": subtotal, "iva_total": iva, "monto_total": total,
+            }
+            for año, mes, proveedor_id, estado, n, con_monto, subtotal, iva, total in filas
+        ])
+
+    logger.info(f"facturas_resumen_mensual reconstruido: {len(filas)} filas")
+    return len(filas)
+
+
+def verificar_consistencia(db: Session, muestra: int = 20) -> Dict[str, Any]:
+    """
+    Compara el rollup contra el agregado en vivo de facturas.
+
+    Las filas del rollup con total_facturas = 0 (grupos vaciados por cambios
+    de estado) se ignoran.
+    """
+    esperado = {fila[:4]: fila[4:] for fila in map(_normalizar, db.execute(_select_desde_facturas()))}
+
+    rollup = db.execute(select(
+        FacturaResumenMensual.año, FacturaResumenMensual.mes,
+        FacturaResumenMensual.proveedor_id, FacturaResumenMensual.estado,
+        FacturaResumenMensual.total_facturas, FacturaResumenMensual.facturas_con_monto,
+        FacturaResumenMensual.subtotal_total, FacturaResumenMensual.iva_total,
+        FacturaResumenMensual.monto_total,
+    ).where(FacturaResumenMensual.total_facturas != 0))
+    materializado = {fila[:4]: fila[4:] for fila in map(_normalizar, rollup)}
+
+    diferencias = sorted(
+        (clave, esperado.get(clave), materializado.get(clave))
+        for clave in esperado.keys() | materializado.keys()
+        if esperado.get(clave) != materializado.get(clave)
+    )
+
+    return {
+        "consistente": not diferencias,
+        "grupos_esperados": len(esperado),
+        "grupos_materializados": len(materializado),
+        "diferencias": len(diferencias),
+        "ejemplos": diferencias[:muestra],
+    }
@@ -6,7 +6,9 @@ Configura y ejecuta notificaciones automáticas:
 - Resumen semanal: Lunes 8:00 AM
 - Alertas urgentes: Cada 3 días 8:00 AM
 
-Usa APScheduler para ejecución confiable y profesional.
+Usa APScheduler para ejecución confiable y profesional. Con varios workers
+cada proceso tiene su scheduler, pero los jobs solo se ejecutan en el líder
+de la tarea "notificaciones" (app.services.liderazgo).
 """
 
 import logging
@@ -17,6 +19,7 @@ from apscheduler.triggers.interval import IntervalTrigger
 
 from app.db.session import SessionLocal
 from app.services.notificaciones_programadas import NotificacionesProgramadasService
+from app.services.liderazgo import TAREA_NOTIFICACIONES, solo_lider
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +45,7 @@ def iniciar_scheduler_notificaciones():
     # JOB 1: Resumen Semanal - Lunes 8:00 AM
     # ========================================================================
     _scheduler.add_job(
-        func=_ejecutar_resumen_semanal,
+        func=solo_lider(TAREA_NOTIFICACIONES)(_ejecutar_resumen_semanal),
         trigger=CronTrigger(
             day_of_week='mon',  # Lunes
             hour=8,
@@ -57,7 +60,7 @@ def iniciar_scheduler_notificaciones():
     # JOB 2: Alertas Urgentes - Cada 3 días a las 8:00 AM
     # ========================================================================
     _scheduler.add_job(
-        func=_ejecutar_alertas_urgentes,
+        func=solo_lider(TAREA_NOTIFICACIONES)(_ejecutar_alertas_urgentes),
         trigger=IntervalTrigger(days=3, start_date=datetime.now().replace(hour=8, minute=0, second=0)),
         id='alertas_urgentes_facturas',
         name='Alertas Urgentes Facturas > 10 dias',
@@ -0,0 +1,214 @@
+# app/services/visibilidad_facturas.py
+"""
+Mantenimiento incremental de la tabla factura_visibilidad.
+
+Cada función toca SOLO las filas afectadas por el cambio que la origina
+(un workflow, un par NIT-usuario, una factura) con sentencias set-based
+(INSERT ... SELECT / DELETE ... IN), sin cargar objetos en memoria.
+Ninguna hace commit: participan en la transacción del caller.
+
+Si la tabla queda desalineada (cargas manuales, SQL directo), se corrige con:
+    python -m app.scripts.visibilidad_facturas --verificar
+    python -m app.scripts.visibilidad_facturas --reconstruir
+"""
+from typing import Any, Dict, Iterable, Set, Tuple
+
+from sqlalchemy import delete, exists, insert, literal, select
+from sqlalchemy.orm import Session
+
+from app.models.factura import Factura
+from app.models.factura_visibilidad import FacturaVisibilidad, ORIGEN_NIT, ORIGEN_WORKFLOW
+from app.models.proveedor import Proveedor
+from app.models.workflow_aprobacion import AsignacionNitResponsable, WorkflowAprobacionFactura
+from app.utils.logger import logger
+
+
+# ==================== CONSULTAS FUENTE ====================
+
+
+def _select_workflow():
+    """(usuario_id, origen, factura_id) esperados por workflows."""
+    return select(
+        WorkflowAprobacionFactura.responsable_id,
+        literal(ORIGEN_WORKFLOW),
+        WorkflowAprobacionFactura.factura_id
+    ).where(
+        WorkflowAprobacionFactura.responsable_id.isnot(None)
+    ).distinct()
+
+
+def _select_nit():
+    """(usuario_id, origen, factura_id) esperados por asignaciones NIT activas."""
+    return select(
+        AsignacionNitResponsable.responsable_id,
+        literal(ORIGEN_NIT),
+        Factura.id
+    ).select_from(AsignacionNitResponsable).join(
+        Proveedor, Proveedor.nit == AsignacionNitResponsable.nit
+    ).join(
+        Factura, Factura.proveedor_id == Proveedor.id
+    ).where(
+        AsignacionNitResponsable.activo == True
+    ).distinct()
+
+
+def _no_existe_fila(usuario_col, origen: str, factura_col):
+    """Guarda de idempotencia para INSERT ... SELECT."""
+    return ~exists().where(
+        FacturaVisibilidad.usuario_id == usuario_col,
+        FacturaVisibilidad.origen == origen,
+        FacturaVisibilidad.factura_id == factura_col
+    )
+
+
+def _insertar_desde(db: Session, seleccion) -> int:
+    result = db.execute(
+        insert(FacturaVisibilidad).from_select(
+            ["usuario_id", "origen", "factura_id"], seleccion
+        )
+    )
+    return result.rowcount or 0
+
+
+# ==================== MANTENIMIENTO INCREMENTAL ====================
+
+
+def registrar_workflows(db: Session, pares: Iterable[Tuple[int, int]]) -> int:
+    """
+    Registra visibilidad por workflow para pares (factura_id, usuario_id).
+
+    Se llama al crear workflows; los pares ya existentes se ignoran.
+    """
+    pares = {(f, u) for f, u in pares if f is not None and u is not None}
+    if not pares:
+        return 0
+
+    existentes = {
+        (f, u) for f, u in db.query(
+            FacturaVisibilidad.factura_id, FacturaVisibilidad.usuario_id
+        ).filter(
+            FacturaVisibilidad.origen == ORIGEN_WORKFLOW,
+            FacturaVisibilidad.factura_id.in_({f for f, _ in pares})
+        )
+    }
+    nuevos = pares - existentes
+    if nuevos:
+        db.execute(insert(FacturaVisibilidad), [
+            {"usuario_id": u, "origen": ORIGEN_WORKFLOW, "factura_id": f}
+            for f, u in nuevos
+        ])
+    return len(nuevos)
+
+
+def sincronizar_nit(db: Session, nit: str, usuario_id: int) -> int:
+    """
+    Recalcula la visibilidad por NIT de un par (nit, usuario).
+
+    Borra las filas origen='nit' del usuario para las facturas de ese NIT
+    y las vuelve a insertar si la asignación sigue activa. Cubre alta,
+    edición, reasignación y soft delete con la misma operación.
+
+    Returns:
+        Número de filas visibles tras sincronizar
+    """
+    if not nit or usuario_id is None:
+        return 0
+
+    # Las asignaciones recién agregadas a la sesión deben verse en el INSERT ... SELECT
+    db.flush()
+
+    facturas_del_nit = select(Factura.id).join(
+        Proveedor, Factura.proveedor_id == Proveedor.id
+    ).where(Proveedor.nit == nit)
+
+    db.execute(
+        delete(FacturaVisibilidad).where(
+            FacturaVisibilidad.usuario_id == usuario_id,
+            FacturaVisibilidad.origen == ORIGEN_NIT,
+            FacturaVisibilidad.factura_id.in_(facturas_del_nit)
+        ).execution_options(synchronize_session=False)
+    )
+
+    insertadas = _insertar_desde(
+        db,
+        _select_nit().where(
+            AsignacionNitResponsable.nit == nit,
+            AsignacionNitResponsable.responsable_id == usuario_id
+        )
+    )
+
+    logger.debug(
+        f"Visibilidad NIT {nit} -> Usuario {usuario_id}: {insertadas} facturas"
+    )
+    return insertadas
+
+
+def registrar_factura(db: Session, factura: Factura) -> int:
+    """
+    Registra la visibilidad por NIT de una factura recién creada.
+
+    Los workflows se registran aparte (registrar_workflows) al crearse.
+    """
+    if factura.id is None or factura.proveedor_id is None:
+        return 0
+
+    return _insertar_desde(
+        db,
+        _select_nit().where(
+            Factura.id == factura.id,
+            _no_existe_fila(AsignacionNitResponsable.responsable_id, ORIGEN_NIT, Factura.id)
+        )
+    )
+
+
+# ==================== RECONSTRUCCIÓN Y VERIFICACIÓN ====================
+
+
+def reconstruir(db: Session) -> Dict[str, int]:
+    """
+    Reconstruye la tabla completa desde workflows y asignaciones.
+
+    Borra y re-inserta dentro de la transacción del caller: los lectores
+    concurrentes siguen viendo la versión anterior hasta el commit.
+    """
+    db.execute(delete(FacturaVisibilidad))
+    por_workflow = _insertar_desde(db, _select_workflow())
+    por_nit = _insertar_desde(db, _select_nit())
+
+    logger.info(
+        f"factura_visibilidad reconstruida: {por_workflow} por workflow, {por_nit} por NIT"
+    )
+    return {"workflow": por_workflow, "nit": por_nit}
+
+
+def _filas(db: Session, seleccion) -> Set[Tuple[int, str, int]]:
+    return {tuple(fila) for fila in db.execute(seleccion)}
+
+
+def verificar_consistencia(db: Session, muestra: int = 20) -> Dict[str, Any]:
+    """
+    Compara la tabla materializada contra el cálculo desde las tablas fuente.
+
+    Returns:
+        {"consistente", "esperadas", "materializadas", "faltantes", "sobrantes",
+         "ejemplos_faltantes", "ejemplos_sobrantes"}
+    """
+    esperadas = _filas(db, _select_workflow()) | _filas(db, _select_nit())
+    materializadas = _filas(db, select(
+        FacturaVisibilidad.usuario_id,
+        FacturaVisibilidad.origen,
+        FacturaVisibilidad.factura_id
+    ))
+
+    faltantes = esperadas - materializadas
+    sobrantes = materializadas - esperadas
+
+    return {
+        "consistente": not faltantes and not sobrantes,
+        "esperadas": len(esperadas),
+        "materializadas": len(materializadas),
+        "faltantes": len(faltantes),
+        "sobrantes": len(sobrantes),
+        "ejemplos_faltantes": sorted(faltantes)[:muestra],
+        "ejemplos_sobrantes": sorted(sobrantes)[:muestra],
+    }
@@ -36,6 +36,7 @@ from app.models.workflow_aprobacion import (
 from app.utils.nit_validator import NitValidator
 from app.services.comparador_items import ComparadorItemsService
 from app.services.clasificacion_proveedores import ClasificacionProveedoresService
+from app.services import visibilidad_facturas
 
 logger = logging.getLogger(__name__)
 
@@ -237,6 +238,9 @@ class WorkflowAutomaticoService:
         factura.responsable_id = asignaciones[0].responsable_id
 
         self.db.flush()
+        visibilidad_facturas.registrar_workflows(
+            self.db, [(factura.id, responsable_id) for responsable_id in responsable_ids]
+        )
         self.db.commit()
         self.db.refresh(factura)
 
@@ -28,7 +28,8 @@ logger = logging.getLogger(__name__)
 
 def analizar_patrones_periodico(
     ventana_meses: int = 12,
-    forzar_recalculo: bool = False
+    forzar_recalculo: bool = False,
+    incremental: bool = False
 ) -> Dict[str, Any]:
     """
     Tarea programada de análisis de patrones.
@@ -38,6 +39,7 @@ def analizar_patrones_periodico(
     Args:
         ventana_meses: Cantidad de meses hacia atrás a analizar
         forzar_recalculo: Si True, recalcula todos los patrones
+        incremental: Solo proveedores con facturas modificadas desde el último análisis
 
     Returns:
         Resultado del análisis con estadísticas
@@ -47,6 +49,7 @@ def analizar_patrones_periodico(
     logger.info(f"Timestamp: {datetime.now().isoformat()}")
     logger.info(f"Ventana: {ventana_meses} meses")
     logger.info(f"Forzar recálculo: {forzar_recalculo}")
+    logger.info(f"Incremental: {incremental}")
     logger.info("="*80)
 
     db = SessionLocal()
@@ -57,7 +60,8 @@ def analizar_patrones_periodico(
 
         resultado = analizador.analizar_patrones_desde_bd(
             ventana_meses=ventana_meses,
-            forzar_recalculo=forzar_recalculo
+            forzar_recalculo=forzar_recalculo,
+            incremental=incremental
         )
 
         # Log de resultados
@@ -0,0 +1,227 @@
+# app/tasks/trabajos.py
+"""
+Tareas de la cola de trabajos (app.services.cola_trabajos) y runner de workers.
+
+Importar este módulo registra las tareas. Los workers corren dentro de la
+API (TRABAJOS_EN_PROCESO=true, en lifespan) o como proceso aparte:
+
+    python -m app.tasks.trabajos --hilos 4
+    python -m app.tasks.trabajos --colas mantenimiento --hilos 1
+
+Cada tarea recibe su propia sesión y el payload del trabajo como kwargs;
+lo que retorna se guarda en trabajos.resultado.
+"""
+import argparse
+import signal
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import factura as crud_factura
+from app.db.session import SessionLocal
+from app.services import cola_trabajos
+from app.services.cola_trabajos import COLA_MANTENIMIENTO, COLA_NOTIFICACIONES, COLAS, PoolTrabajadores, tarea
+from app.utils.logger import logger
+
+
+@tarea("notificaciones_procesamiento", cola=COLA_NOTIFICACIONES, max_intentos=3)
+def notificaciones_procesamiento(
+    db: Session,
+    facturas_revision: List[int],
+    resumen_general: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Avisos de revisión y resumen tras POST /automation/procesar."""
+    from app.services.automation.notification_service import NotificationService
+
+    notification_service = NotificationService()
+
+    notificadas = 0
+    for factura_id in facturas_revision:
+        factura = crud_factura.get_factura(db, factura_id)
+        if factura:
+            notification_service.notificar_revision_requerida(
+                db=db,
+                factura=factura,
+                motivo=factura.motivo_decision or "Requiere revisión manual",
+                confianza=float(factura.confianza_automatica or 0),
+                patron_detectado=factura.patron_recurrencia or "no_detectado"
+            )
+            notificadas += 1
+
+    notification_service.enviar_resumen_procesamiento(
+        db=db,
+        estadisticas_procesamiento={"resumen_general": resumen_general},
+        facturas_pendientes=crud_factura.get_facturas_pendientes_procesamiento(db)
+    )
+    return {"revisiones_notificadas": notificadas}
+
+
+@tarea("regenerar_patrones", cola=COLA_MANTENIMIENTO, max_intentos=2)
+def regenerar_patrones(db: Session, limit: Optional[int] = None, incremental: bool = False) -> Dict[str, Any]:
+    """POST /workflow/regenerar-patrones?en_segundo_plano=true"""
+    from app.models.patrones_facturas import PatronesFacturas
+    from app.services.analisis_patrones import AnalizadorPatrones
+
+    resultado = AnalizadorPatrones(db).regenerar_todos_patrones(limit=limit, incremental=incremental)
+    return {
+        "total_patrones": db.query(PatronesFacturas).count(),
+        "facturas_leidas": resultado["facturas_leidas"],
+        "nuevos": resultado["nuevos"],
+        "actualizados": resultado["actualizados"],
+    }
+
+
+@tarea("sincronizar_facturas_nit", cola=COLA_MANTENIMIENTO, max_intentos=3)
+def sincronizar_facturas_nit(db: Session) -> Dict[str, Any]:
+    """POST /admin/sincronizar-facturas?en_segundo_plano=true"""
+    resultado = crud_factura.sincronizar_responsables_por_nit(db)
+    db.commit()
+    return {
+        "total_actualizadas": resultado["total_actualizadas"],
+        "total_ignoradas": resultado["total_ignoradas"],
+    }
+
+
+@tarea("notificar_aprobaciones_retroactivas", cola=COLA_NOTIFICACIONES, max_intentos=3)
+def notificar_aprobaciones_retroactivas(db: Session, limite: int = 100) -> Dict[str, Any]:
+    """
+    POST /automation/notificar-aprobaciones-retroactivas
+
+    Workflows APROBADA_AUTO sin notificación de APROBACION_AUTOMATICA. Si se
+    reintenta tras un fallo, los ya notificados pueden recibir el correo de
+    nuevo (al menos una vez).
+    """
+    from app.models.workflow_aprobacion import (
+        EstadoFacturaWorkflow, NotificacionWorkflow, TipoAprobacion, TipoNotificacion, WorkflowAprobacionFactura
+    )
+    from app.services.automation.notification_service import NotificationService
+
+    workflows_aprobados_auto = db.query(WorkflowAprobacionFactura).filter(
+        WorkflowAprobacionFactura.estado == EstadoFacturaWorkflow.APROBADA_AUTO,
+        WorkflowAprobacionFactura.tipo_aprobacion == TipoAprobacion.AUTOMATICA
+    ).limit(limite).all()
+
+    notification_service = NotificationService()
+    notificaciones_enviadas = 0
+    errores = 0
+    detalles = []
+
+    for workflow in workflows_aprobados_auto:
+        try:
+            # Verificar si ya tiene notificación de aprobación automática
+            notificacion_existente = db.query(NotificacionWorkflow).filter(
+                NotificacionWorkflow.workflow_id == workflow.id,
+                NotificacionWorkflow.tipo == TipoNotificacion.APROBACION_AUTOMATICA
+            ).first()
+
+            if notificacion_existente:
+                logger.info(f"  ⏭️  Workflow {workflow.id} ya tiene notificación, saltando...")
+                continue
+
+            factura = workflow.factura
+            if not factura:
+                logger.warning(f"  ⚠️  Workflow {workflow.id} sin factura asociada")
+                errores += 1
+                continue
+
+            # Construir criterios cumplidos desde los datos guardados
+            criterios_cumplidos = []
+            if workflow.diferencias_detectadas:
+                diferencia_pct = workflow.diferencias_detectadas.get('diferencia_porcentual', 0)
+                criterios_cumplidos.append(f"Variación de monto: {diferencia_pct:.2f}%")
+
+            if workflow.porcentaje_similitud:
+                criterios_cumplidos.append(f"Similitud: {workflow.porcentaje_similitud}%")
+
+            if workflow.es_identica_mes_anterior:
+                criterios_cumplidos.append("Factura idéntica al mes anterior")
+
+            if not criterios_cumplidos:
+                criterios_cumplidos = ["Aprobada automáticamente por el sistema"]
+
+            # Construir información del patrón detectado
+            patron_detectado = "Mes sobre mes"
+            factura_referencia = None
+            variacion_monto = 0.0
+
+            if workflow.diferencias_detectadas:
+                variacion_monto = workflow.diferencias_detectadas.get('diferencia_porcentual', 0.0)
+                monto_anterior = workflow.diferencias_detectadas.get('monto_anterior', 0)
+                if monto_anterior:
+                    factura_referencia = f"Factura mes anterior: ${monto_anterior:,.2f}"
+
+            # Enviar notificación retroactiva
+            resultado = notification_service.notificar_aprobacion_automatica(
+                db=db,
+                factura=factura,
+                criterios_cumplidos=criterios_cumplidos,
+                confianza=0.95,  # Default para aprobaciones retroactivas
+                patron_detectado=patron_detectado,
+                factura_referencia=factura_referencia,
+                variacion_monto=variacion_monto
+            )
+
+            if resultado.get('exito'):
+                notificaciones_enviadas += resultado.get('notificaciones_enviadas', 0)
+                logger.info(f"   Notificación retroactiva enviada para workflow {workflow.id} - factura {factura.numero_factura}")
+
+                detalles.append({
+                    'workflow_id': workflow.id,
+                    'factura_id': factura.id,
+                    'numero_factura': factura.numero_factura,
+                    'responsable': workflow.responsable.nombre if workflow.responsable else 'N/A',
+                    'notificaciones_enviadas': resultado.get('notificaciones_enviadas', 0)
+                })
+            else:
+                errores += 1
+                logger.error(f"  ❌ Error enviando notificación para workflow {workflow.id}")
+
+        except Exception as e:
+            errores += 1
+            logger.error(f"  ❌ Error procesando workflow {workflow.id}: {str(e)}")
+
+    return {
+        "total_workflows_revisados": len(workflows_aprobados_auto),
+        "notificaciones_enviadas": notificaciones_enviadas,
+        "errores": errores,
+        "detalles": detalles[:20]  # Primeros 20 para no sobrecargar
+    }
+
+
+# ==================== RUNNER ====================
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Workers de la cola de trabajos")
+    parser.add_argument("--hilos", type=int, default=settings.trabajos_hilos)
+    parser.add_argument("--colas", nargs="+", choices=sorted(COLAS), default=None,
+                        help="Colas a consumir (default: todas)")
+    parser.add_argument("--purgar-dias", type=int, default=None,
+                        help="Antes de iniciar, eliminar completados con más de N días")
+    args = parser.parse_args(argv)
+
+    if args.purgar_dias is not None:
+        db = SessionLocal()
+        try:
+            eliminados = cola_trabajos.purgar_completados(db, dias=args.purgar_dias)
+            logger.info(f"Trabajos completados purgados: {eliminados}")
+        finally:
+            db.close()
+
+    pool = PoolTrabajadores(args.hilos, args.colas, espera_segundos=settings.trabajos_espera_segundos)
+
+    def _terminar(signum, frame):
+        logger.info("Señal recibida: terminando el trabajo en curso")
+        pool.detener()
+
+    signal.signal(signal.SIGTERM, _terminar)
+    signal.signal(signal.SIGINT, _terminar)
+
+    pool.iniciar()
+    logger.info(f"Workers iniciados: {pool.hilos} hilos, colas {', '.join(pool.colas)}")
+    pool.esperar()
+
+
+if __name__ == "__main__":
+    main()
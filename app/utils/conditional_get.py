@@ -0,0 +1,139 @@
+"""
+GET condicional (ETag / Last-Modified) para endpoints de lectura.
+
+El validador se calcula con UNA consulta barata (watermark): MAX(actualizado_en)
+de las tablas de las que depende la respuesta y, donde hay borrados, su
+COUNT(*). Junto con la ruta, los query params (filtros y cursor) y el
+alcance del usuario forma un ETag débil. Si coincide con If-None-Match se
+responde 304 sin ejecutar la consulta principal ni serializar:
+
+    FUENTES = ((Factura.actualizado_en, False), (CuentaCorreo.actualizada_en, True))
+
+    validador = ValidadorCondicional.desde_bd(db, request, FUENTES, alcance=current_user.id)
+    if validador.no_modificado():
+        return validador.respuesta_no_modificado()
+    ...
+    validador.aplicar(response)
+
+Limitación: solo cambia con las tablas de `fuentes`. Datos anidados de tablas
+sin actualizado_en (nombre del proveedor o del responsable) no invalidan
+el ETag hasta que cambie alguna fila de las fuentes.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+
+# (columna actualizado_en, contar filas): contar solo si la tabla tiene borrados
+Fuente = Tuple[Any, bool]
+
+# Las respuestas dependen del usuario: solo caché privado y siempre revalidar
+CACHE_CONTROL = "private, no-cache"
+
+
+def leer_watermark(db: Session, fuentes: Sequence[Fuente]) -> list:
+    """
+    MAX(actualizado_en) (y COUNT(*) si aplica) de cada fuente en UNA consulta.
+
+    Returns:
+        Lista plana [max_1, (count_1,) max_2, ...]
+    """
+    columnas = []
+    for columna, contar in fuentes:
+        columnas.append(select(func.max(columna)).scalar_subquery())
+        if contar:
+            columnas.append(select(func.count()).select_from(columna.class_).scalar_subquery())
+
+    return list(db.execute(select(*columnas)).one())
+
+
+def _ultima_modificacion(watermark: Sequence[Any]) -> Optional[datetime]:
+    # HTTP-date tiene resolución de segundos; fechas naive se toman como UTC
+    fechas = [
+        (valor.astimezone(timezone.utc) if valor.tzinfo else valor.replace(tzinfo=timezone.utc)).replace(microsecond=0)
+        for valor in watermark if isinstance(valor, datetime)
+    ]
+    return max(fechas) if fechas else None
+
+
+def _calcular_etag(partes: Sequence[Any]) -> str:
+    contenido = json.dumps(partes, default=str, separators=(",", ":"))
+    return f'W/"{hashlib.sha256(contenido.encode()).hexdigest()[:32]}"'
+
+
+def _etags_de(cabecera: str) -> set:
+    # Comparación débil: W/"x" y "x" son equivalentes
+    return {etag.strip().removeprefix("W/") for etag in cabecera.split(",")}
+
+
+@dataclass
+class ValidadorCondicional:
+    """ETag / Last-Modified de una respuesta y evaluación de la petición."""
+
+    request: Request
+    etag: str
+    ultima_modificacion: Optional[datetime]
+
+    @classmethod
+    def desde_bd(
+        cls,
+        db: Session,
+        request: Request,
+        fuentes: Sequence[Fuente],
+        alcance: Any = None,
+        *extra: Any
+    ) -> "ValidadorCondicional":
+        """
+        Args:
+            db: Sesión de base de datos
+            request: Petición (ruta y query params entran en el ETag)
+            fuentes: Tablas de las que depende la respuesta
+            alcance: Lo que distingue la vista del usuario (id, rol...)
+            extra: Otros datos de los que depende la respuesta (p. ej. la
+                fecha de hoy en vistas "mes actual")
+        """
+        watermark = leer_watermark(db, fuentes)
+        filtros = sorted(request.query_params.multi_items())
+        etag = _calcular_etag([request.url.path, filtros, alcance, list(extra), watermark])
+        return cls(request, etag, _ultima_modificacion(watermark))
+
+    def no_modificado(self) -> bool:
+        """True si la copia del cliente sigue vigente (If-None-Match / If-Modified-Since)."""
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match is not None:
+            etags = _etags_de(if_none_match)
+            return "*" in etags or self.etag.removeprefix("W/") in etags
+
+        # If-Modified-Since solo si el cliente no envía ETag (RFC 9110 13.1.3)
+        if_modified_since = self.request.headers.get("if-modified-since")
+        if if_modified_since and self.ultima_modificacion is not None:
+            try:
+                desde = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if desde.tzinfo is None:
+                desde = desde.replace(tzinfo=timezone.utc)
+            return self.ultima_modificacion <= desde
+
+        return False
+
+    def cabeceras(self) -> dict:
+        cabeceras = {"ETag": self.etag, "Cache-Control": CACHE_CONTROL}
+        if self.ultima_modificacion is not None:
+            cabeceras["Last-Modified"] = format_datetime(self.ultima_modificacion, usegmt=True)
+        return cabeceras
+
+    def respuesta_no_modificado(self) -> Response:
+        """304 sin cuerpo, con los mismos validadores."""
+        return Response(status_code=304, headers=self.cabeceras())
+
+    def aplicar(self, response: Response) -> None:
+        """Agrega ETag, Last-Modified y Cache-Control a la respuesta 200."""
+        response.headers.update(self.cabeceras())
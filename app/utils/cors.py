@@ -25,4 +25,7 @@ def setup_cors(app: FastAPI) -> None:
         allow_methods=["*"],
         allow_headers=["*"],
         allow_credentials=True,
+        # Listados que devuelven una lista plana publican el cursor keyset aquí;
+        # ETag para clientes que gestionan If-None-Match manualmente
+        expose_headers=["X-Next-Cursor", "ETag"],
     )
@@ -3,10 +3,220 @@ Utilidades para cursor-based pagination empresarial.
 
 Este módulo proporciona helpers para implementar paginación basada en cursores,
 optimizada para datasets grandes (10k+ registros).
+
+Cualquier listado puede paginar por keyset con una clave de orden arbitraria:
+
+    ORDEN = ((Workflow.creado_en, True), (Workflow.id, True))  # (columna, descendente)
+
+    items, next_cursor = paginar_keyset(query, ORDEN, limit, cursor, ambito="workflows")
+
+Los cursores son opacos y firmados (HMAC con SECRET_KEY): un cursor
+manipulado, o emitido por otro listado (ambito), se rechaza con
+CursorInvalidoError. La última columna del orden debe ser única (id) y
+ninguna columna del orden puede ser NULL.
 """
 import base64
-from typing import Optional, Tuple
-from datetime import datetime
+import hashlib
+import hmac
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+
+
+# (columna, descendente)
+OrdenKeyset = Sequence[Tuple[Any, bool]]
+
+_AMBITO_FACTURAS = "facturas"
+
+
+class CursorInvalidoError(ValueError):
+    """Cursor con firma inválida, de otro listado o mal formado."""
+
+
+# ==================== CODIFICACIÓN ====================
+
+
+def _serializar_valor(valor: Any) -> list:
+    if isinstance(valor, datetime):
+        return ["dt", valor.isoformat()]
+    if isinstance(valor, date):
+        return ["d", valor.isoformat()]
+    if isinstance(valor, Decimal):
+        return ["n", str(valor)]
+    if hasattr(valor, "value"):  # Enum
+        return ["s", valor.value]
+    return ["v", valor]
+
+
+def _deserializar_valor(par: list) -> Any:
+    tipo, valor = par
+    if tipo == "dt":
+        return datetime.fromisoformat(valor)
+    if tipo == "d":
+        return date.fromisoformat(valor)
+    if tipo == "n":
+        return Decimal(valor)
+    if tipo in ("s", "v"):
+        return valor
+    raise ValueError(f"Tipo de valor desconocido: {tipo}")
+
+
+def _firma(payload: bytes) -> str:
+    digest = hmac.new(settings.secret_key.encode(), b"cursor:" + payload, hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:16]).decode().rstrip("=")
+
+
+def _b64decode(dato: str) -> bytes:
+    return base64.urlsafe_b64decode(dato + "=" * (-len(dato) % 4))
+
+
+def encode_keyset_cursor(valores: Sequence[Any], ambito: str) -> str:
+    """
+    Codifica los valores de la clave de orden del último registro visto.
+
+    Args:
+        valores: Valores de las columnas del orden, en el mismo orden
+        ambito: Nombre del listado que emite el cursor
+
+    Returns:
+        Cursor opaco "<payload>.<firma>" (base64 url-safe)
+    """
+    payload = json.dumps(
+        {"a": ambito, "v": [_serializar_valor(v) for v in valores]},
+        separators=(",", ":")
+    ).encode()
+    return f"{base64.urlsafe_b64encode(payload).decode().rstrip('=')}.{_firma(payload)}"
+
+
+def decode_keyset_cursor(cursor: str, ambito: str) -> Optional[List[Any]]:
+    """
+    Decodifica y verifica un cursor.
+
+    Returns:
+        Lista de valores de la clave de orden, o None si el cursor es
+        inválido (firma, ámbito o formato)
+    """
+    try:
+        payload_b64, firma = cursor.split(".")
+        payload = _b64decode(payload_b64)
+        if not hmac.compare_digest(firma, _firma(payload)):
+            return None
+        datos = json.loads(payload)
+        if datos["a"] != ambito:
+            return None
+        return [_deserializar_valor(par) for par in datos["v"]]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return None
+
+
+# ==================== KEYSET ====================
+
+
+def keyset_predicate(orden: OrdenKeyset, valores: Sequence[Any]):
+    """
+    Condición "después de valores" para un orden lexicográfico arbitrario.
+
+    Para (a DESC, b ASC, id DESC) genera:
+        a < va OR (a = va AND b > vb) OR (a = va AND b = vb AND id < vid)
+    """
+    if len(orden) != len(valores):
+        raise CursorInvalidoError("El cursor no corresponde al orden del listado")
+
+    condiciones = []
+    for i, (columna, descendente) in enumerate(orden):
+        iguales = [orden[j][0] == valores[j] for j in range(i)]
+        siguiente = columna < valores[i] if descendente else columna > valores[i]
+        condiciones.append(and_(*iguales, siguiente))
+
+    return or_(*condiciones)
+
+
+def _valor_de(item: Any, columna: Any) -> Any:
+    return getattr(item, columna.key)
+
+
+def aplicar_keyset(query: Query, orden: OrdenKeyset, cursor: Optional[str], ambito: str) -> Query:
+    """Aplica ORDER BY y, si hay cursor, el predicado keyset a la query."""
+    if cursor:
+        valores = decode_keyset_cursor(cursor, ambito)
+        if valores is None:
+            raise CursorInvalidoError("Cursor inválido")
+        query = query.filter(keyset_predicate(orden, valores))
+
+    return query.order_by(*[col.desc() if descendente else col.asc() for col, descendente in orden])
+
+
+def paginar_keyset(
+    query: Query,
+    orden: OrdenKeyset,
+    limit: int,
+    cursor: Optional[str] = None,
+    ambito: str = "",
+) -> Tuple[list, Optional[str]]:
+    """
+    Página keyset: sin OFFSET, tiempo constante sin importar la profundidad.
+
+    Args:
+        query: Query ORM ya filtrada (sin ORDER BY)
+        orden: Columnas del orden con su dirección; la última debe ser única
+        limit: Registros por página
+        cursor: next_cursor de la página anterior (None = primera página)
+        ambito: Nombre del listado (un cursor de otro listado se rechaza)
+
+    Returns:
+        Tupla (items, next_cursor); next_cursor es None en la última página
+
+    Raises:
+        CursorInvalidoError: si el cursor fue manipulado o es de otro listado
+    """
+    filas = aplicar_keyset(query, orden, cursor, ambito).limit(limit + 1).all()
+
+    items = filas[:limit]
+    next_cursor = None
+    if len(filas) > limit and items:
+        ultimo = items[-1]
+        next_cursor = encode_keyset_cursor([_valor_de(ultimo, col) for col, _ in orden], ambito)
+
+    return items, next_cursor
+
+
+# ==================== CONTEO ====================
+
+
+def contar_total(query: Query, modo: str = "exacto") -> Tuple[int, bool]:
+    """
+    Total de registros de la query.
+
+    Args:
+        modo: "exacto" (COUNT(*)) o "estimado" (estimación del optimizador
+            con EXPLAIN, sin recorrer la tabla; solo MySQL/MariaDB, en otros
+            motores cae a COUNT(*))
+
+    Returns:
+        Tupla (total, es_estimado)
+    """
+    if modo == "estimado":
+        session = query.session
+        bind = session.get_bind()
+        if bind.dialect.name == "mysql":
+            sql = query.statement.compile(bind, compile_kwargs={"literal_binds": True})
+            plan = session.execute(text(f"EXPLAIN {sql}")).mappings().all()
+
+            estimado = 1.0
+            for fila in plan:
+                estimado *= float(fila.get("rows") or 0) * float(fila.get("filtered") or 100) / 100
+            return int(round(estimado)), True
+
+    return query.order_by(None).count(), False
+
+
+# ==================== FACTURAS (fecha_emision, id) ====================
 
 
 def encode_cursor(timestamp: datetime, entity_id: int) -> str:
@@ -23,10 +233,9 @@ def encode_cursor(timestamp: datetime, entity_id: int) -> str:
         entity_id: ID único de la factura
 
     Returns:
-        String base64 del cursor (ejemplo: "MjAyNS0xMC0wOFQxMDowMDowMHwxMjM0NQ==")
+        Cursor opaco y firmado (ver encode_keyset_cursor)
     """
-    cursor_str = f"{timestamp.isoformat()}|{entity_id}"
-    return base64.b64encode(cursor_str.encode()).decode()
+    return encode_keyset_cursor([timestamp, entity_id], _AMBITO_FACTURAS)
 
 
 def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
@@ -34,19 +243,18 @@ def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
     Decodifica un cursor en sus componentes (timestamp, id).
 
     Args:
-        cursor: String base64 del cursor
+        cursor: Cursor emitido por encode_cursor
 
     Returns:
-        Tupla (datetime, int) o None si el cursor es inválido
+        Tupla (fecha, int) o None si el cursor es inválido o fue manipulado
     """
-    try:
-        decoded = base64.b64decode(cursor.encode()).decode()
-        timestamp_str, entity_id_str = decoded.split('|')
-        timestamp = datetime.fromisoformat(timestamp_str)
-        entity_id = int(entity_id_str)
-        return timestamp, entity_id
-    except (ValueError, AttributeError):
+    valores = decode_keyset_cursor(cursor, _AMBITO_FACTURAS)
+    if not valores or len(valores) != 2:
+        return None
+    timestamp, entity_id = valores
+    if not isinstance(entity_id, int):
         return None
+    return timestamp, entity_id
 
 
 def build_cursor_from_factura(factura) -> str:
@@ -57,6 +265,6 @@ def build_cursor_from_factura(factura) -> str:
         factura: Objeto Factura con fecha_emision e id
 
     Returns:
-        Cursor codificado en base64
+        Cursor opaco y firmado
     """
     return encode_cursor(factura.fecha_emision, factura.id)
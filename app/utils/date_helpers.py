@@ -9,8 +9,8 @@ Autor: Senior Backend Development Team
 """
 
 from datetime import datetime, date
-from typing import Union, Tuple
-from sqlalchemy import func, and_
+from typing import Optional, Union, Tuple
+from sqlalchemy import and_, extract, true
 from sqlalchemy.orm import Session
 
 
@@ -88,13 +88,86 @@ class DateHelper:
         else:
             return f"{year}-{month - 1:02d}"
 
+    @staticmethod
+    def parse_periodo(periodo: str) -> Tuple[int, int]:
+        """
+        Convierte "YYYY-MM" en (año, mes).
+
+        Ejemplo:
+            >>> DateHelper.parse_periodo('2025-11')
+            (2025, 11)
+        """
+        year, month = map(int, periodo.split('-'))
+        return year, month
+
+    @staticmethod
+    def get_periodo_bounds(año: int, mes: Optional[int] = None) -> Tuple[date, date]:
+        """
+        Rango semiabierto [inicio, fin) de un mes o, sin mes, de un año completo.
+
+        Args:
+            año: Año del período
+            mes: Mes (1-12); None para el año completo
+
+        Returns:
+            Tupla (inicio, fin) con fin EXCLUIDO
+
+        Ejemplo:
+            >>> DateHelper.get_periodo_bounds(2025, 12)
+            (datetime.date(2025, 12, 1), datetime.date(2026, 1, 1))
+            >>> DateHelper.get_periodo_bounds(2025)
+            (datetime.date(2025, 1, 1), datetime.date(2026, 1, 1))
+        """
+        if mes is None:
+            return date(año, 1, 1), date(año + 1, 1, 1)
+
+        inicio = date(año, mes, 1)
+        fin = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+        return inicio, fin
+
+    @staticmethod
+    def create_año_mes_filter(fecha_column, año: Optional[int] = None, mes: Optional[int] = None):
+        """
+        Filtro por año y/o mes como rango sobre la columna de fecha.
+
+        IMPORTANTE: Nunca filtrar con YEAR()/MONTH() (o extract) sobre la
+        columna: la función impide usar los índices que empiezan por la
+        fecha y fuerza un recorrido completo. Un rango semiabierto
+        (fecha >= inicio AND fecha < fin) sí es indexable.
+
+        Solo un mes sin año (ej. "todos los octubres") no se puede expresar
+        como rango; en ese caso se usa extract('month').
+
+        Args:
+            fecha_column: Columna SQLAlchemy de tipo Date/DateTime
+            año: Año a filtrar (opcional)
+            mes: Mes a filtrar (opcional)
+
+        Returns:
+            Condición SQLAlchemy para usar en .filter()
+
+        Ejemplo:
+            >>> query = db.query(Factura).filter(
+            ...     DateHelper.create_año_mes_filter(Factura.fecha_emision, 2025, 11)
+            ... )
+        """
+        if año:
+            inicio, fin = DateHelper.get_periodo_bounds(año, mes)
+            return and_(fecha_column >= inicio, fecha_column < fin)
+
+        if mes:
+            return extract('month', fecha_column) == mes
+
+        return true()
+
     @staticmethod
     def create_periodo_filter(fecha_column, periodo: str):
         """
         Crea un filtro SQLAlchemy para filtrar por período.
 
         IMPORTANTE: Usar esta función en lugar de hacer comparaciones directas
-        de campos que no existen.
+        de campos que no existen. Genera un rango semiabierto sobre la
+        columna (indexable), ver create_año_mes_filter.
 
         Args:
             fecha_column: Columna SQLAlchemy de tipo Date/DateTime
@@ -108,17 +181,13 @@ class DateHelper:
             ...     DateHelper.create_periodo_filter(Factura.fecha_emision, '2025-11')
             ... )
         """
-        year, month = map(int, periodo.split('-'))
-
-        return and_(
-            func.year(fecha_column) == year,
-            func.month(fecha_column) == month
-        )
+        year, month = DateHelper.parse_periodo(periodo)
+        return DateHelper.create_año_mes_filter(fecha_column, year, month)
 
     @staticmethod
     def create_periodo_range_filter(fecha_column, desde_periodo: str, hasta_periodo: str):
         """
-        Crea un filtro para rango de períodos.
+        Crea un filtro para rango de períodos (ambos incluidos).
 
         Args:
             fecha_column: Columna SQLAlchemy de tipo Date/DateTime
@@ -137,17 +206,11 @@ class DateHelper:
             ...     )
             ... )
         """
-        desde_year, desde_month = map(int, desde_periodo.split('-'))
-        hasta_year, hasta_month = map(int, hasta_periodo.split('-'))
-
-        desde_date = date(desde_year, desde_month, 1)
-        # Calcular último día del mes
-        if hasta_month == 12:
-            hasta_date = date(hasta_year + 1, 1, 1)
-        else:
-            hasta_date = date(hasta_year, hasta_month + 1, 1)
+        desde_date, _ = DateHelper.get_periodo_bounds(*DateHelper.parse_periodo(desde_periodo))
+        _, hasta_date = DateHelper.get_periodo_bounds(*DateHelper.parse_periodo(hasta_periodo))
 
-        return fecha_column.between(desde_date, hasta_date)
+        # Semiabierto: BETWEEN incluía el día 1 del mes siguiente
+        return and_(fecha_column >= desde_date, fecha_column < hasta_date)
 
     @staticmethod
     def get_date_range_for_periodo(periodo: str) -> Tuple[date, date]:
@@ -0,0 +1,52 @@
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.query_monitor import QueryStats, _current_stats, report_n_plus_one
+
+
+class SQLMetricsMiddleware:
+    """
+    Middleware ASGI que mide las queries de cada request.
+
+    Agrega a la respuesta:
+    - X-DB-Queries: número de sentencias ejecutadas
+    - Server-Timing: db;dur=<ms>;desc="<n> queries" (visible en DevTools)
+    Y al terminar loguea las formas de sentencia repetidas (posible N+1).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", str(stats.count).encode()))
+                headers.append((
+                    b"server-timing",
+                    f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"'.encode()
+                ))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current_stats.reset(token)
+            report_n_plus_one(stats, f"{scope.get('method')} {scope.get('path')}")
+
+
+def setup_sql_metrics(app: FastAPI) -> None:
+    """
+    Activa la instrumentación de SQL por request.
+    """
+    if settings.sql_instrumentation_enabled:
+        app.add_middleware(SQLMetricsMiddleware)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Benchmark: /automation/dashboard/metricas
+
+Compara el throughput (requests/seg) de la implementación anterior (6 COUNT
+separados con func.date(), no indexable) contra la consulta única con
+agregación condicional sobre rangos y contra la misma detrás del caché en
+memoria, sobre facturas sintéticas en una BD SQLite temporal. Verifica
+además que las tres devuelven los mismos datos.
+
+Uso:
+    python scripts/benchmark_metricas_automatizacion.py
+    python scripts/benchmark_metricas_automatizacion.py --facturas 200000 --segundos 5
+"""
+
+import sys
+from pathlib import Path
+
+backend_dir = str(Path(__file__).parent.parent)
+sys.path.insert(0, backend_dir)
+
+import argparse
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, create_engine, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.db.query_monitor import instrument_engine, track_queries
+from app.models.factura import Factura, EstadoFactura
+from app.models.factura_item import FacturaItem
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.services.metricas_automatizacion import MetricasAutomatizacionCache, calcular_metricas
+
+PROVEEDORES = 50
+DIAS = 60
+
+
+def metricas_anterior(db):
+    """Implementación previa (6 consultas + top 10), solo como referencia."""
+    hoy = datetime.utcnow().date()
+
+    aprobadas_hoy = db.query(func.count(Factura.id)).filter(
+        and_(
+            Factura.estado == EstadoFactura.aprobada_auto,
+            func.date(Factura.fecha_procesamiento_auto) == hoy
+        )
+    ).scalar() or 0
+    revision_hoy = db.query(func.count(Factura.id)).filter(
+        and_(
+            Factura.estado == EstadoFactura.en_revision,
+            func.date(Factura.fecha_procesamiento_auto) == hoy
+        )
+    ).scalar() or 0
+    pendientes = db.query(func.count(Factura.id)).filter(
+        Factura.estado == EstadoFactura.en_revision
+    ).scalar() or 0
+    ultimas = db.query(Factura).filter(
+        Factura.fecha_procesamiento_auto.isnot(None)
+    ).order_by(Factura.fecha_procesamiento_auto.desc()).limit(10).all()
+
+    fecha_semana = datetime.utcnow() - timedelta(days=7)
+    semana = db.query(func.count(Factura.id)).filter(
+        and_(
+            Factura.fecha_procesamiento_auto >= fecha_semana,
+            Factura.estado.in_([EstadoFactura.aprobada_auto, EstadoFactura.en_revision])
+        )
+    ).scalar() or 0
+    aprobadas_semana = db.query(func.count(Factura.id)).filter(
+        and_(
+            Factura.fecha_procesamiento_auto >= fecha_semana,
+            Factura.estado == EstadoFactura.aprobada_auto
+        )
+    ).scalar() or 0
+
+    return {
+        "contadores": (aprobadas_hoy, revision_hoy, pendientes, semana, aprobadas_semana),
+        "ultimas": [f.id for f in ultimas],
+    }
+
+
+def resumir(metricas: dict) -> dict:
+    """Mismo formato que metricas_anterior para comparar salidas."""
+    hoy, sem = metricas["metricas_hoy"], metricas["metricas_semana"]
+    return {
+        "contadores": (
+            hoy["facturas_aprobadas_automaticamente"],
+            hoy["facturas_en_revision_manual"],
+            hoy["facturas_pendientes_procesamiento"],
+            sem["total_procesadas"],
+            sem["aprobadas_automaticamente"],
+        ),
+        "ultimas": [f["id"] for f in metricas["ultimas_facturas"]],
+    }
+
+
+def poblar(engine, total: int) -> None:
+    """Crea facturas sintéticas procesadas en los últimos DIAS días."""
+    # Factura carga proveedor, usuario (→ role) e items con eager loading
+    for modelo in (Role, Usuario, Proveedor, Factura, FacturaItem):
+        modelo.__table__.create(engine)
+
+    random.seed(42)
+    ahora = datetime.utcnow()
+    estados = list(EstadoFactura)
+
+    with engine.begin() as conn:
+        conn.execute(insert(Proveedor.__table__), [
+            {"id": i, "nit": f"900{i:06d}-1", "razon_social": f"Proveedor {i}"}
+            for i in range(1, PROVEEDORES + 1)
+        ])
+
+        filas = []
+        for factura_id in range(1, total + 1):
+            procesada = ahora - timedelta(seconds=random.randint(0, DIAS * 86400))
+            total_a_pagar = Decimal(random.randint(100_000, 50_000_000)) / 100
+            filas.append({
+                "id": factura_id,
+                "numero_factura": f"FE-{factura_id}",
+                "fecha_emision": procesada.date(),
+                "proveedor_id": random.randint(1, PROVEEDORES),
+                "total_a_pagar": total_a_pagar,
+                "estado": random.choice(estados),
+                "cufe": f"cufe-{factura_id}",
+                "fecha_procesamiento_auto": procesada if random.random() < 0.8 else None,
+            })
+        conn.execute(insert(Factura.__table__), filas)
+
+    print(f"Facturas sintéticas: {total} (procesadas en los últimos {DIAS} días)")
+
+
+def medir(nombre, fn, Session, segundos: float):
+    """Llama fn con una sesión nueva por request durante `segundos`."""
+    requests = 0
+    with track_queries() as stats:
+        inicio = time.perf_counter()
+        while time.perf_counter() - inicio < segundos:
+            db = Session()
+            try:
+                resultado = fn(db)
+            finally:
+                db.close()
+            requests += 1
+        duracion = time.perf_counter() - inicio
+
+    print(
+        f"{nombre:<28} {requests / duracion:>12.1f} {stats.count / requests:>14.2f}"
+    )
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark métricas de automatización")
+    parser.add_argument('--facturas', type=int, default=50_000)
+    parser.add_argument('--segundos', type=float, default=3.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/benchmark.db")
+        instrument_engine(engine)
+        poblar(engine, args.facturas)
+        Session = sessionmaker(bind=engine)
+        cache = MetricasAutomatizacionCache(ttl_seconds=15)
+
+        try:
+            print("\n" + "=" * 56)
+            print(f"{'Implementación':<28} {'Requests/seg':>12} {'Queries/req':>14}")
+            print("-" * 56)
+            anterior = medir("anterior (6 COUNT)", metricas_anterior, Session, args.segundos)
+            unica = medir("consulta única",
+                          lambda db: resumir(calcular_metricas(db)), Session, args.segundos)
+            cacheada = medir("consulta única + caché",
+                             lambda db: resumir(cache.get(db)), Session, args.segundos)
+            identica = anterior == unica == cacheada
+            print("Salida idéntica:", "SI" if identica else "NO")
+            if not identica:
+                sys.exit(1)
+        finally:
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
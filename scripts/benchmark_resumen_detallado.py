@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+Benchmark: /facturas/periodos/resumen-detallado
+
+Compara la implementación anterior (1 DISTINCT + 8 consultas por período)
+contra el GROUP BY en vivo con agregación condicional y contra la lectura
+del rollup facturas_resumen_mensual, sobre 5 años de facturas sintéticas en
+una BD SQLite temporal. Verifica además que las tres devuelven exactamente
+la misma salida.
+
+Uso:
+    python scripts/benchmark_resumen_detallado.py
+    python scripts/benchmark_resumen_detallado.py --facturas-por-mes 2000 --repeticiones 5
+"""
+
+import sys
+from pathlib import Path
+
+backend_dir = str(Path(__file__).parent.parent)
+sys.path.insert(0, backend_dir)
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import create_engine, desc, extract, func, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.factura import get_facturas_resumen_por_mes_detallado
+from app.db.query_monitor import instrument_engine, track_queries
+from app.models.factura import Factura, EstadoFactura
+from app.models.factura_resumen_mensual import FacturaResumenMensual
+from app.models.proveedor import Proveedor
+from app.services import resumen_mensual
+
+AÑOS = 5
+PROVEEDORES = 50
+
+
+def resumen_detallado_anterior(db, año=None, proveedor_id=None):
+    """Implementación previa (N+1 por período), solo como referencia."""
+    periodos_query = db.query(
+        extract('year', Factura.fecha_emision).label('año'),
+        extract('month', Factura.fecha_emision).label('mes'),
+    ).filter(Factura.fecha_emision.isnot(None)).distinct()
+
+    if año:
+        periodos_query = periodos_query.filter(extract('year', Factura.fecha_emision) == año)
+
+    resultado = []
+    for p_año, p_mes in periodos_query.order_by(desc('año'), desc('mes')).all():
+        base = db.query(Factura).filter(
+            extract('year', Factura.fecha_emision) == p_año,
+            extract('month', Factura.fecha_emision) == p_mes
+        )
+        if proveedor_id:
+            base = base.filter(Factura.proveedor_id == proveedor_id)
+
+        por_estado = {
+            estado.value: base.filter(Factura.estado == estado).count()
+            for estado in (EstadoFactura.en_revision, EstadoFactura.aprobada,
+                           EstadoFactura.aprobada_auto, EstadoFactura.rechazada)
+        }
+        total = base.count()
+        if total > 0:
+            resultado.append({
+                "periodo": f"{int(p_año)}-{int(p_mes):02d}",
+                "año": int(p_año),
+                "mes": int(p_mes),
+                "total_facturas": total,
+                "monto_total": float(base.with_entities(func.sum(Factura.total_a_pagar)).scalar() or 0.0),
+                "subtotal_total": float(base.with_entities(func.sum(Factura.subtotal)).scalar() or 0.0),
+                "iva_total": float(base.with_entities(func.sum(Factura.iva)).scalar() or 0.0),
+                "facturas_por_estado": por_estado
+            })
+    return resultado
+
+
+def poblar(engine, facturas_por_mes: int) -> None:
+    """Crea facturas sintéticas para los últimos AÑOS años."""
+    Proveedor.__table__.create(engine)
+    Factura.__table__.create(engine)
+    FacturaResumenMensual.__table__.create(engine)
+
+    random.seed(42)
+    estados = list(EstadoFactura)
+    año_final = date.today().year
+
+    with engine.begin() as conn:
+        conn.execute(insert(Proveedor.__table__), [
+            {"id": i, "nit": f"900{i:06d}-1", "razon_social": f"Proveedor {i}"}
+            for i in range(1, PROVEEDORES + 1)
+        ])
+
+        filas = []
+        factura_id = 0
+        for año in range(año_final - AÑOS + 1, año_final + 1):
+            for mes in range(1, 13):
+                for _ in range(facturas_por_mes):
+                    factura_id += 1
+                    subtotal = Decimal(random.randint(100_000, 50_000_000)) / 100
+                    iva = (subtotal * Decimal("0.19")).quantize(Decimal("0.01"))
+                    filas.append({
+                        "id": factura_id,
+                        "numero_factura": f"FE-{factura_id}",
+                        "fecha_emision": date(año, mes, random.randint(1, 28)),
+                        "proveedor_id": random.randint(1, PROVEEDORES),
+                        "subtotal": subtotal,
+                        "iva": iva,
+                        "total_a_pagar": subtotal + iva,
+                        "estado": random.choice(estados),
+                        "cufe": f"cufe-{factura_id}",
+                    })
+        conn.execute(insert(Factura.__table__), filas)
+
+    print(f"Facturas sintéticas: {factura_id} ({AÑOS} años, {facturas_por_mes}/mes)")
+
+
+def medir(nombre, fn, db, repeticiones: int):
+    tiempos = []
+    for _ in range(repeticiones):
+        with track_queries() as stats:
+            inicio = time.perf_counter()
+            resultado = fn(db)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    print(
+        f"{nombre:<28} {stats.count:>8} {statistics.median(tiempos):>12.1f} {stats.total_ms:>12.1f}"
+    )
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark resumen-detallado")
+    parser.add_argument('--facturas-por-mes', type=int, default=500)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/benchmark.db")
+        instrument_engine(engine)
+        poblar(engine, args.facturas_por_mes)
+        db = sessionmaker(bind=engine)()
+        resumen_mensual.reconstruir(db)
+        db.commit()
+
+        escenarios = [
+            ("todos los años", {}),
+            ("un año", {"año": date.today().year - 1}),
+            ("un proveedor", {"proveedor_id": 7}),
+        ]
+
+        try:
+            for titulo, filtros in escenarios:
+                print("\n" + "=" * 64)
+                print(f"Escenario: {titulo} {filtros or ''}")
+                print(f"{'Implementación':<28} {'Queries':>8} {'Mediana ms':>12} {'BD ms':>12}")
+                print("-" * 64)
+                anterior = medir("anterior (N por período)",
+                                 lambda s: resumen_detallado_anterior(s, **filtros), db, args.repeticiones)
+                en_vivo = medir("GROUP BY en vivo",
+                                lambda s: get_facturas_resumen_por_mes_detallado(s, en_vivo=True, **filtros),
+                                db, args.repeticiones)
+                rollup = medir("rollup mensual",
+                               lambda s: get_facturas_resumen_por_mes_detallado(s, **filtros), db, args.repeticiones)
+                identica = anterior == en_vivo == rollup
+                print("Salida idéntica:", "SI" if identica else "NO")
+                if not identica:
+                    sys.exit(1)
+        finally:
+            db.close()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+Benchmark: búsqueda de items similares
+
+Compara la búsqueda exhaustiva con ItemNormalizerService.calcular_similitud
+(una comparación por item del historial) contra el índice MinHash + LSH
+(app.services.indice_similitud_items) sobre descripciones sintéticas:
+variantes de productos base con palabras quitadas o agregadas. Reporta
+tiempos, candidatos verificados por consulta y el recall del índice
+respecto al resultado exacto (el índice no devuelve falsos positivos).
+
+Uso:
+    python scripts/benchmark_similitud_items.py
+    python scripts/benchmark_similitud_items.py --items 100000 --consultas 200 --umbral 0.6
+"""
+
+import sys
+from pathlib import Path
+
+backend_dir = str(Path(__file__).parent.parent)
+sys.path.insert(0, backend_dir)
+
+import argparse
+import random
+import time
+from itertools import combinations
+
+from app.services.indice_similitud_items import IndiceMinHash
+from app.services.item_normalizer import ItemNormalizerService
+
+VOCABULARIO = 8_000
+SILABAS = ["ca", "sa", "lu", "mo", "ter", "vi", "no", "re", "pla", "dor", "ser", "to", "li", "cen", "ma", "gi"]
+
+
+def generar(total: int, semilla: int = 42):
+    """Descripciones normalizadas: ~5 variantes por producto base."""
+    aleatorio = random.Random(semilla)
+    # dict.fromkeys y no set: el orden no depende de PYTHONHASHSEED
+    palabras = list(dict.fromkeys(
+        "".join(aleatorio.choices(SILABAS, k=aleatorio.randint(2, 4))) for _ in range(VOCABULARIO * 2)
+    ))[:VOCABULARIO]
+    bases = [aleatorio.sample(palabras, aleatorio.randint(4, 9)) for _ in range(max(1, total // 5))]
+
+    def variante(base):
+        desc = list(base)
+        if len(desc) > 3 and aleatorio.random() < 0.5:
+            desc.pop(aleatorio.randrange(len(desc)))
+        if aleatorio.random() < 0.4:
+            desc.insert(aleatorio.randrange(len(desc) + 1), aleatorio.choice(palabras))
+        if aleatorio.random() < 0.2:
+            desc.append(str(aleatorio.randint(1, 500)))
+        return " ".join(desc)
+
+    items = [variante(aleatorio.choice(bases)) for _ in range(total)]
+    consultas = [variante(aleatorio.choice(bases)) for _ in range(total)]
+    return items, consultas
+
+
+def exhaustiva(items, consulta, umbral):
+    return {
+        i for i, desc in enumerate(items)
+        if ItemNormalizerService.calcular_similitud(consulta, desc) >= umbral
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark búsqueda de items similares")
+    parser.add_argument('--items', type=int, default=100_000)
+    parser.add_argument('--consultas', type=int, default=100)
+    parser.add_argument('--umbral', type=float, default=0.7)
+    parser.add_argument('--items-pares', type=int, default=2_000,
+                        help='Items para comparar la deduplicación (la exhaustiva es O(n²))')
+    args = parser.parse_args()
+
+    items, consultas = generar(args.items)
+    consultas = consultas[:args.consultas]
+    print(f"Items: {len(items)}  Consultas: {len(consultas)}  Umbral: {args.umbral}")
+
+    inicio = time.perf_counter()
+    indice = IndiceMinHash(args.umbral)
+    for i, desc in enumerate(items):
+        indice.agregar(i, desc)
+    construccion = time.perf_counter() - inicio
+    print(f"Índice: {indice.bandas} bandas x {indice.filas} filas, construido en {construccion:.2f} s")
+
+    inicio = time.perf_counter()
+    esperados = [exhaustiva(items, consulta, args.umbral) for consulta in consultas]
+    t_exhaustiva = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    encontrados = [{i for i, _ in indice.buscar(consulta)} for consulta in consultas]
+    t_indice = time.perf_counter() - inicio
+
+    candidatos = sum(len(indice.candidatos(consulta)) for consulta in consultas) / len(consultas)
+    total_esperados = sum(len(e) for e in esperados)
+    aciertos = sum(len(e & f) for e, f in zip(esperados, encontrados))
+    falsos_positivos = sum(len(f - e) for e, f in zip(esperados, encontrados))
+
+    print("\n" + "=" * 64)
+    print(f"{'Búsqueda':<24} {'ms/consulta':>14} {'Comparaciones':>14}")
+    print("-" * 64)
+    print(f"{'exhaustiva':<24} {t_exhaustiva / len(consultas) * 1000:>14.2f} {len(items):>14}")
+    print(f"{'MinHash + LSH':<24} {t_indice / len(consultas) * 1000:>14.2f} {candidatos:>14.1f}")
+    print("-" * 64)
+    print(f"Aceleración: {t_exhaustiva / t_indice:.1f}x")
+    print(f"Recall: {aciertos}/{total_esperados} = {aciertos / total_esperados if total_esperados else 1:.4f}")
+    print(f"Falsos positivos: {falsos_positivos}")
+
+    # Deduplicación sobre un subconjunto
+    subconjunto = items[:args.items_pares]
+    inicio = time.perf_counter()
+    pares_esperados = {
+        (a, b) for (a, da), (b, db) in combinations(enumerate(subconjunto), 2)
+        if ItemNormalizerService.calcular_similitud(da, db) >= args.umbral
+    }
+    t_pares_exhaustiva = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    indice_pares = IndiceMinHash(args.umbral)
+    for i, desc in enumerate(subconjunto):
+        indice_pares.agregar(i, desc)
+    pares = {(a, b) for a, b, _ in indice_pares.pares_similares()}
+    t_pares_indice = time.perf_counter() - inicio
+
+    print(f"\nDeduplicación de {len(subconjunto)} items:")
+    print(f"   exhaustiva {t_pares_exhaustiva:.2f} s, índice {t_pares_indice:.2f} s, "
+          f"recall {len(pares & pares_esperados)}/{len(pares_esperados)}")
+    print("=" * 64)
+
+    if falsos_positivos or pares - pares_esperados:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,9 +12,9 @@ from fastapi.testclient import TestClient
 from sqlalchemy.orm import Session
 
 from app.main import app
-from app.db.session import get_db, SessionLocal
+from app.db.session import get_db, SessionLocal, engine
 from app.core.security import create_access_token
-from app.models.usuario import Usuario, Rol
+from app.models.role import Role as Rol
 from app.models.usuario import Usuario
 
 
@@ -27,38 +27,63 @@ def client():
 
 
 @pytest.fixture
-def db():
+def db(request):
     """Sesión de base de datos para pruebas.
 
-    Proporciona una sesión de prueba con rollback automático
-    después de cada test para mantener la BD limpia.
+    Ligada a una transacción que se revierte al final del test. Con
+    join_transaction_mode="create_savepoint" un commit del test (o de un
+    servicio) solo libera un SAVEPOINT: nada sale de la transacción externa.
+
+    Recibe por parametrización indirecta el registrar_mantenimiento del
+    listener after_flush a probar:
+
+        @pytest.mark.parametrize(
+            "db", [resumen_mensual.registrar_mantenimiento], indirect=True, ids=["resumen_mensual"]
+        )
     """
-    # Obtener sesión
-    session = SessionLocal()
+    registrar_mantenimiento = getattr(request, "param", None)
+    if registrar_mantenimiento is not None:
+        registrar_mantenimiento()
+
+    conexion = engine.connect()
+    transaccion = conexion.begin()
+    session = Session(bind=conexion, join_transaction_mode="create_savepoint")
 
     yield session
 
     # Rollback automático después del test
+    session.close()
+    transaccion.rollback()
+    conexion.close()
+
+
+@pytest.fixture
+def db_confirmada():
+    """Sesión que confirma de verdad, para datos que deben ver los requests del cliente HTTP."""
+    session = SessionLocal()
+
+    yield session
+
     session.rollback()
     session.close()
 
 
 @pytest.fixture
-def auth_token_contador(db: Session):
+def auth_token_contador(db_confirmada: Session):
     """Token de autenticación para usuario contador.
 
     Crea o recupera un usuario contador de prueba y devuelve
     un token JWT válido para usar en headers.
     """
     # Buscar o crear rol contador
-    rol = db.query(Rol).filter(Rol.nombre == "contador").first()
+    rol = db_confirmada.query(Rol).filter(Rol.nombre == "contador").first()
     if not rol:
         rol = Rol(nombre="contador")
-        db.add(rol)
-        db.flush()
+        db_confirmada.add(rol)
+        db_confirmada.flush()
 
     # Buscar o crear usuario contador
-    usuario = db.query(Usuario).filter(
+    usuario = db_confirmada.query(Usuario).filter(
         Usuario.email == "contador.test@empresa.com"
     ).first()
 
@@ -67,14 +92,14 @@ def auth_token_contador(db: Session):
             usuario="contador.test",
             email="contador.test@empresa.com",
             nombre="Contador Test",
-            password_hash="hash"  # En tests, la contraseña no se valida
+            password_hash="hash",  # En tests, la contraseña no se valida
+            role=rol
         )
-        db.add(usuario)
-        db.flush()
-        usuario.roles = [rol]
+        db_confirmada.add(usuario)
+        db_confirmada.flush()
 
-    db.commit()
-    db.refresh(usuario)
+    db_confirmada.commit()
+    db_confirmada.refresh(usuario)
 
     # Generar token
     token = create_access_token({"sub": usuario.usuario})
@@ -82,20 +107,20 @@ def auth_token_contador(db: Session):
 
 
 @pytest.fixture
-def auth_token_responsable(db: Session):
+def auth_token_responsable(db_confirmada: Session):
     """Token de autenticación para usuario responsable.
 
     Devuelve un token para un usuario con rol responsable.
     """
     # Buscar o crear rol responsable
-    rol = db.query(Rol).filter(Rol.nombre == "responsable").first()
+    rol = db_confirmada.query(Rol).filter(Rol.nombre == "responsable").first()
     if not rol:
         rol = Rol(nombre="responsable")
-        db.add(rol)
-        db.flush()
+        db_confirmada.add(rol)
+        db_confirmada.flush()
 
     # Buscar o crear usuario responsable
-    usuario = db.query(Usuario).filter(
+    usuario = db_confirmada.query(Usuario).filter(
         Usuario.email == "responsable.test@empresa.com"
     ).first()
 
@@ -104,14 +129,14 @@ def auth_token_responsable(db: Session):
             usuario="responsable.test",
             email="responsable.test@empresa.com",
             nombre="Usuario Test",
-            password_hash="hash"
+            password_hash="hash",
+            role=rol
         )
-        db.add(usuario)
-        db.flush()
-        usuario.roles = [rol]
+        db_confirmada.add(usuario)
+        db_confirmada.flush()
 
-    db.commit()
-    db.refresh(usuario)
+    db_confirmada.commit()
+    db_confirmada.refresh(usuario)
 
     # Generar token
     token = create_access_token({"sub": usuario.usuario})
@@ -119,7 +144,7 @@ def auth_token_responsable(db: Session):
 
 
 @pytest.fixture
-def limpiar_facturas_test(db: Session):
+def limpiar_facturas_test(db_confirmada: Session):
     """Limpia facturas de prueba antes y después de cada test.
 
     Busca y elimiza todas las facturas con números que comienzan con "TEST-"
@@ -128,18 +153,18 @@ def limpiar_facturas_test(db: Session):
     from app.models.factura import Factura
 
     # Limpiar antes
-    db.query(Factura).filter(
+    db_confirmada.query(Factura).filter(
         Factura.numero_factura.like("TEST-%")
     ).delete()
-    db.commit()
+    db_confirmada.commit()
 
     yield
 
     # Limpiar después
-    db.query(Factura).filter(
+    db_confirmada.query(Factura).filter(
         Factura.numero_factura.like("TEST-%")
     ).delete()
-    db.commit()
+    db_confirmada.commit()
 
 
 # ==================== CONFIGURACIÓN DE PYTEST ====================
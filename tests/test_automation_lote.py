@@ -0,0 +1,132 @@
+"""
+Tests del procesamiento en lote de AutomationService (historial precargado).
+
+El test diferencial ejecuta procesar_facturas completo sobre facturas
+reales de la BD en modo individual (consultas y commit por factura) y en
+modo lote (historial precargado, un commit), incluidas las decisiones de
+facturas anteriores del lote que pasan a ser historial de las siguientes.
+Se ejecuta dentro de una transacción que se revierte al final.
+"""
+from datetime import date
+from decimal import Decimal
+from typing import List
+
+import pytest
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.database import engine
+from app.models.factura import Factura, EstadoFactura
+from app.services.automation import AutomationService
+from app.services.automation.historial_precargado import HistorialPrecargado
+
+
+def _factura(id, fecha, estado=EstadoFactura.en_revision, **campos):
+    return Factura(
+        id=id, numero_factura=f"FE-{id}", proveedor_id=7, fecha_emision=fecha,
+        estado=estado, total_a_pagar=Decimal("100"), cufe=f"cufe-{id}", **campos
+    )
+
+
+class TestHistorialPrecargado:
+    """Búsquedas en memoria con la semántica de app.crud.factura."""
+
+    def test_limite_se_aplica_antes_de_filtrar_por_fecha(self):
+        facturas = [_factura(i, date(2025, i, 5), concepto_normalizado="arriendo") for i in range(1, 11)]
+        historial = HistorialPrecargado({7: sorted(facturas, key=lambda f: f.fecha_emision, reverse=True)})
+
+        assert [f.id for f in historial.por_concepto(7, "arriendo", limit=3)] == [10, 9, 8]
+
+    def test_desempate_por_id(self):
+        mismo_dia = [_factura(i, date(2025, 9, 5), orden_compra_numero="OC-1") for i in (3, 8, 5)]
+        historial = HistorialPrecargado({7: sorted(mismo_dia, key=lambda f: (f.fecha_emision, f.id), reverse=True)})
+
+        assert [f.id for f in historial.por_orden_compra("OC-1", 7)] == [8, 5, 3]
+
+    def test_aprobacion_dentro_del_lote_es_visible(self):
+        septiembre = _factura(1, date(2025, 9, 5))
+        octubre = _factura(2, date(2025, 10, 5))
+        historial = HistorialPrecargado({7: [octubre, septiembre]})
+
+        assert historial.mes_anterior(octubre) is None
+
+        septiembre.estado = EstadoFactura.aprobada_auto  # decisión de una factura anterior del lote
+
+        assert historial.mes_anterior(octubre) is septiembre
+
+
+class TestDiferencial:
+    """
+    procesar_facturas en modo lote y en modo individual deja las mismas
+    decisiones y el mismo estado en la BD.
+
+    Cada modo corre en un savepoint de una misma conexión que se revierte
+    al terminar: los commits por factura del modo individual no salen de él.
+    """
+
+    @pytest.fixture
+    def conexion(self):
+        conexion = engine.connect()
+        transaccion = conexion.begin()
+        yield conexion
+        transaccion.rollback()
+        conexion.close()
+
+    @staticmethod
+    def _facturas_a_procesar(conexion) -> List[int]:
+        """Las últimas facturas de los proveedores con más facturas, más antiguas primero."""
+        db = Session(bind=conexion)
+        try:
+            proveedores = [
+                proveedor_id for proveedor_id, _ in db.query(Factura.proveedor_id, func.count(Factura.id))
+                .filter(Factura.proveedor_id.isnot(None))
+                .group_by(Factura.proveedor_id)
+                .having(func.count(Factura.id) >= 3)
+                .order_by(func.count(Factura.id).desc())
+                .limit(3)
+            ]
+            servicio = AutomationService()
+            ids = []
+            for proveedor_id in proveedores:
+                recientes = db.query(Factura).filter(
+                    Factura.proveedor_id == proveedor_id
+                ).order_by(Factura.fecha_emision.desc(), Factura.id.desc()).limit(20).all()
+                ids.extend(f.id for f in reversed(recientes) if servicio._validar_datos_minimos(f))
+            return ids
+        finally:
+            db.close()
+
+    @staticmethod
+    def _procesar(conexion, ids: List[int], en_lote: bool):
+        """procesar_facturas completo; devuelve decisiones y estado final de cada factura."""
+        punto = conexion.begin_nested()
+        db = Session(bind=conexion, join_transaction_mode="create_savepoint")
+        try:
+            por_id = {f.id: f for f in db.query(Factura).filter(Factura.id.in_(ids))}
+            resumen = AutomationService().procesar_facturas(db, [por_id[i] for i in ids], en_lote=en_lote)
+
+            decisiones = [
+                (r['factura_id'], r['decision'], r['confianza'], r['estado'])
+                for r in resumen['facturas_procesadas_detalle']
+            ]
+            db.expire_all()
+            estado_final = {
+                f.id: (f.estado, f.confianza_automatica, f.factura_referencia_id, f.concepto_hash, f.tipo_factura)
+                for f in db.query(Factura).filter(Factura.id.in_(ids))
+            }
+            return resumen, decisiones, estado_final
+        finally:
+            db.close()
+            punto.rollback()
+
+    def test_mismo_resultado_en_lote_e_individual(self, conexion):
+        ids = self._facturas_a_procesar(conexion)
+        if len(ids) < 2:
+            pytest.skip("No hay proveedores con varias facturas")
+
+        individual, decisiones_individual, estado_individual = self._procesar(conexion, ids, en_lote=False)
+        en_lote, decisiones_lote, estado_lote = self._procesar(conexion, ids, en_lote=True)
+
+        assert decisiones_lote == decisiones_individual
+        assert estado_lote == estado_individual
+        for clave in ('facturas_procesadas', 'aprobadas_automaticamente', 'enviadas_revision', 'errores'):
+            assert en_lote[clave] == individual[clave], clave
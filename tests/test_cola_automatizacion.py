@@ -0,0 +1,81 @@
+"""
+Tests de la cola de automatización de facturas recién ingresadas.
+
+El pipeline (workflow + decisión) se reemplaza por uno que registra los
+lotes: se prueba el enrutamiento por proveedor y la backpressure.
+"""
+import threading
+
+from app.services.automation.cola_automatizacion import ColaAutomatizacion
+
+
+class _SesionFalsa:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class _Registro:
+    def __init__(self, bloquear: bool = False):
+        self.lotes = []
+        self.hilos = {}
+        self.liberar = threading.Event()
+        self.en_proceso = threading.Event()
+        self.procesadas = threading.Semaphore(0)
+        if not bloquear:
+            self.liberar.set()
+
+    def __call__(self, db, factura_ids):
+        self.en_proceso.set()
+        self.liberar.wait(5)
+        self.lotes.append(list(factura_ids))
+        for factura_id in factura_ids:
+            self.hilos[factura_id] = threading.current_thread().name
+            self.procesadas.release()
+
+    def esperar(self, n: int) -> None:
+        for _ in range(n):
+            assert self.procesadas.acquire(timeout=5)
+
+
+def test_mismo_proveedor_mismo_worker():
+    registro = _Registro()
+    cola = ColaAutomatizacion(workers=3, capacidad=30, session_factory=_SesionFalsa, procesar=registro)
+    cola.iniciar()
+    try:
+        for factura_id, proveedor_id in [(1, 7), (2, 8), (3, 7), (4, 9), (5, 7)]:
+            assert cola.encolar(factura_id, proveedor_id)
+        registro.esperar(5)
+    finally:
+        cola.detener()
+
+    assert registro.hilos[1] == registro.hilos[3] == registro.hilos[5]
+    assert [f for lote in registro.lotes for f in lote if f in (1, 3, 5)] == [1, 3, 5]
+
+
+def test_cola_llena_no_bloquea_y_rechaza():
+    registro = _Registro(bloquear=True)
+    cola = ColaAutomatizacion(workers=1, capacidad=1, session_factory=_SesionFalsa, procesar=registro)
+    cola.iniciar()
+    try:
+        assert cola.encolar(1, 7)
+        assert registro.en_proceso.wait(5)  # el worker tomó la 1 y quedó ocupado
+
+        assert cola.encolar(2, 7)
+        assert not cola.encolar(3, 7)
+        assert cola.rechazadas == 1
+
+        registro.liberar.set()
+        registro.esperar(2)
+    finally:
+        cola.detener()
+
+    assert sorted(registro.hilos) == [1, 2]
+
+
+def test_cola_detenida_no_acepta():
+    cola = ColaAutomatizacion(workers=1, capacidad=10, session_factory=_SesionFalsa, procesar=_Registro())
+
+    assert not cola.encolar(1, 7)
@@ -0,0 +1,128 @@
+"""
+Tests de la cola de trabajos persistida (app.services.cola_trabajos).
+
+Cada "worker" es un titular distinto sobre la misma BD SQLite; las tareas
+son funciones registradas solo para el test.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.liderazgo_tarea import LiderazgoTarea
+from app.models.trabajo import EstadoTrabajo, Trabajo
+from app.services import cola_trabajos
+from app.services.cola_trabajos import COLA_MANTENIMIENTO, encolar, ejecutar, procesar_uno, reservar, tarea
+
+
+COLA = cola_trabajos.COLA_DEFAULT
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'trabajos.db'}")
+    Trabajo.__table__.create(engine)
+    LiderazgoTarea.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def tareas(monkeypatch):
+    registro = {}
+    monkeypatch.setattr(cola_trabajos, "_TAREAS", registro)
+    return registro
+
+
+def test_error_reintenta_con_backoff_y_luego_dead_letter(session_factory, tareas):
+    @tarea("falla", max_intentos=2)
+    def falla(db):
+        raise RuntimeError("SMTP caído")
+
+    db = session_factory()
+    trabajo_id = encolar(db, "falla").id
+
+    trabajo = reservar(db, COLA, "worker-a")
+    assert ejecutar(db, trabajo, "worker-a") == EstadoTrabajo.pendiente
+    db.expire_all()
+    trabajo = db.get(Trabajo, trabajo_id)
+    assert trabajo.ultimo_error == "RuntimeError: SMTP caído"
+    assert trabajo.disponible_en > datetime.utcnow() + timedelta(seconds=20)
+    assert reservar(db, COLA, "worker-a") is None  # en backoff
+
+    trabajo = reservar(db, COLA, "worker-a", ahora=trabajo.disponible_en)
+    assert ejecutar(db, trabajo, "worker-a") == EstadoTrabajo.fallido
+    db.expire_all()
+    assert db.get(Trabajo, trabajo_id).estado == EstadoTrabajo.fallido
+
+    assert cola_trabajos.reintentar(db, trabajo_id)
+    assert db.get(Trabajo, trabajo_id).intentos == 0
+    db.close()
+
+
+def test_reserva_vencida_la_toma_otro_worker(session_factory, tareas):
+    ejecuciones = []
+    tarea("registra")(lambda db, n: ejecuciones.append(n) or n)
+
+    db = session_factory()
+    trabajo_id = encolar(db, "registra", {"n": 7}).id
+    ahora = datetime.utcnow()
+
+    assert reservar(db, COLA, "worker-a", ahora=ahora) is not None  # worker-a muere aquí
+    assert reservar(db, COLA, "worker-b", ahora=ahora + timedelta(seconds=10)) is None
+
+    trabajo = reservar(db, COLA, "worker-b", ahora=ahora + timedelta(seconds=301))
+    assert trabajo.intentos == 2
+    assert ejecutar(db, trabajo, "worker-b") == EstadoTrabajo.completado
+    db.expire_all()
+
+    completado = db.get(Trabajo, trabajo_id)
+    assert (completado.estado, completado.resultado, ejecuciones) == (EstadoTrabajo.completado, 7, [7])
+    db.close()
+
+
+def test_concurrencia_por_cola(session_factory, tareas, monkeypatch):
+    tarea("noop", cola=COLA_MANTENIMIENTO)(lambda db: None)
+    db = session_factory()
+    encolar(db, "noop")
+    encolar(db, "noop")
+
+    # Otro worker ocupa la única ranura de la cola de mantenimiento
+    cola_trabajos.adquirir(db, f"cola:{COLA_MANTENIMIENTO}:0", "worker-a", timedelta(minutes=30))
+    assert not procesar_uno(session_factory, COLA_MANTENIMIENTO, "worker-b")
+
+    cola_trabajos.liberar(db, f"cola:{COLA_MANTENIMIENTO}:0", "worker-a")
+    assert procesar_uno(session_factory, COLA_MANTENIMIENTO, "worker-b")
+
+    estado = cola_trabajos.estado_colas(db)["colas"][COLA_MANTENIMIENTO]
+    assert (estado["completado"], estado["pendiente"], estado["concurrencia"]) == (1, 1, 1)
+    db.close()
+
+
+def test_sin_trabajos_no_toma_ranuras(session_factory, tareas):
+    db = session_factory()
+    assert not procesar_uno(session_factory, COLA, "worker-a")
+    assert db.query(LiderazgoTarea).count() == 0
+    db.close()
+
+
+def test_latido_extiende_reserva_y_ranura(session_factory, tareas):
+    tarea("lenta")(lambda db: None)
+    db = session_factory()
+    trabajo_id = encolar(db, "lenta").id
+    ahora = datetime.utcnow()
+    ranura = f"cola:{COLA}:0"
+    duracion = timedelta(seconds=300)
+    cola_trabajos.adquirir(db, ranura, "worker-a", duracion, ahora=ahora)
+    reservar(db, COLA, "worker-a", ahora=ahora)
+
+    cola_trabajos._Latido(session_factory, trabajo_id, ranura, "worker-a", timedelta(minutes=30)).latir()
+    db.expire_all()
+
+    limite = ahora + timedelta(minutes=25)
+    assert db.get(Trabajo, trabajo_id).bloqueado_hasta > limite
+    assert db.get(LiderazgoTarea, ranura).vence_en > limite
+    # Con la reserva extendida, otro worker no la toma al vencer el timeout original
+    assert reservar(db, COLA, "worker-b", ahora=ahora + timedelta(seconds=301)) is None
+    db.close()
@@ -0,0 +1,113 @@
+"""
+Tests de ComparadorItemsService sobre historial mensual ya cargado (sin BD).
+"""
+import statistics
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.comparador_items import ComparadorItemsService
+from app.services.indice_similitud_items import IndiceMinHash
+from app.services.item_precio_historico import PreciosItem, combinar_meses
+
+
+def _item(item_id, item_hash, precio, cantidad=1, descripcion_normalizada=None):
+    return SimpleNamespace(
+        id=item_id,
+        numero_linea=item_id,
+        descripcion=f"Item {item_hash}",
+        descripcion_normalizada=descripcion_normalizada,
+        item_hash=item_hash,
+        cantidad=Decimal(cantidad),
+        precio_unitario=Decimal(precio),
+        total=Decimal(precio) * Decimal(cantidad),
+    )
+
+
+def _historial(*items):
+    """{(año, mes): PreciosItem} a partir de (fecha, precio, cantidad)."""
+    meses = {}
+    for factura_id, (fecha, precio, cantidad) in enumerate(items, start=1):
+        meses.setdefault((fecha.year, fecha.month), PreciosItem()).agregar(
+            fecha, factura_id, Decimal(precio), Decimal(cantidad)
+        )
+    return meses
+
+
+def test_estadisticas_historico():
+    comparador = ComparadorItemsService(db=None)
+    precios = ["130", "100", "110", "100", "120"]
+    meses = _historial(*[(date(2025, 1 + i, 1), precio, "2") for i, precio in enumerate(precios)])
+
+    stats = comparador._calcular_estadisticas_historico(combinar_meses(meses, (2025, 1), (2025, 12)))
+
+    valores = [float(p) for p in precios]
+    assert stats["veces_facturado"] == 5
+    assert stats["precio_promedio"] == pytest.approx(statistics.mean(valores))
+    assert stats["precio_desv_std"] == pytest.approx(statistics.pstdev(valores))
+    assert (stats["precio_min"], stats["precio_max"]) == (100.0, 130.0)
+    percentiles = (stats["precio_p25"], stats["precio_p50"], stats["precio_p75"])
+    assert percentiles == pytest.approx((100.0, 110.0, 120.0), rel=0.01)
+    assert (stats["ultimo_precio"], stats["cantidad_promedio"]) == (120.0, 2.0)
+
+
+def test_cada_factura_usa_su_ventana_del_historial_compartido():
+    """En un lote, el historial del proveedor se filtra por la ventana de cada factura."""
+    comparador = ComparadorItemsService(db=None)
+    historial = {
+        "luz": _historial((date(2025, 4, 1), "100", "1"), (date(2025, 5, 1), "100", "1")),
+    }
+    # Mes en curso: una factura anterior del mismo mes y la propia factura
+    items_mes = {
+        "luz": [
+            (date(2025, 6, 1), 7, Decimal("100"), Decimal("1")),
+            (date(2025, 6, 3), 8, Decimal("150"), Decimal("1")),
+        ],
+    }
+    factura = SimpleNamespace(
+        id=8, fecha_emision=date(2025, 6, 3), items=[_item(1, "luz", "150.00"), _item(2, "agua", "10.00")]
+    )
+
+    resultado = comparador._comparar_factura(factura, historial, items_mes, 12)
+    assert (resultado["items_con_alertas"], resultado["nuevos_items_count"]) == (1, 1)
+    assert resultado["alertas"][0]["tipo"] == "precio_variacion_alta"
+    assert resultado["recomendacion"] == "en_revision"
+    # Abril y mayo más la factura del 1 de junio; la propia factura queda fuera
+    historial_luz = resultado["detalles_items_alertas"][0]["historial"]
+    assert (historial_luz["veces_facturado"], historial_luz["ultimo_precio"]) == (3, 100.0)
+
+    # Factura de abril del mismo lote: su propio mes no entra en la ventana
+    anterior = SimpleNamespace(id=2, fecha_emision=date(2025, 4, 1), items=[_item(3, "luz", "100.00")])
+    resultado = comparador._comparar_factura(anterior, historial, items_mes, 12)
+    assert resultado["nuevos_items_count"] == 1
+
+
+def test_items_nuevos_sugieren_items_similares():
+    comparador = ComparadorItemsService(db=None)
+    indice = IndiceMinHash()
+    indice.agregar("hosting", "hosting aws plan premium mensual")
+    indice.agregar("soporte", "soporte tecnico mensual")
+    indice.agregar("nuevo", "hosting aws plan premium mensual anual")
+
+    factura = SimpleNamespace(
+        id=1, fecha_emision=date(2025, 6, 3),
+        items=[_item(1, "nuevo", "10.00", descripcion_normalizada="hosting aws plan premium mensual anual")]
+    )
+    resultado = comparador._comparar_factura(factura, {}, {}, 12, indice=lambda: indice)
+
+    # El propio item_hash no se sugiere
+    assert resultado["nuevos_items"][0]["items_similares"] == [{"item_hash": "hosting", "similitud": 0.833}]
+
+
+def test_sin_items_nuevos_no_obtiene_el_indice():
+    comparador = ComparadorItemsService(db=None)
+    historial = {"luz": _historial((date(2025, 5, 1), "100", "1"))}
+    factura = SimpleNamespace(id=1, fecha_emision=date(2025, 6, 3), items=[_item(1, "luz", "100.00")])
+
+    def indice():
+        raise AssertionError("No debería construir el índice")
+
+    resultado = comparador._comparar_factura(factura, historial, {}, 12, indice=indice)
+    assert resultado["items_ok"] == 1
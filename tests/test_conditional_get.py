@@ -0,0 +1,119 @@
+"""
+Tests del GET condicional (app.utils.conditional_get).
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import Depends, FastAPI, Request, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.query_monitor import instrument_engine
+from app.models.factura import Factura, EstadoFactura
+from app.models.factura_item import FacturaItem
+from app.models.proveedor import Proveedor
+from app.models.role import Role
+from app.models.usuario import Usuario
+from app.utils.conditional_get import ValidadorCondicional
+from app.utils.sql_metrics import SQLMetricsMiddleware
+
+
+FUENTES = ((Factura.actualizado_en, False),)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'etag.db'}")
+    instrument_engine(engine)
+    # Factura carga proveedor, usuario (→ role) e items con eager loading
+    for modelo in (Role, Usuario, Proveedor, Factura, FacturaItem):
+        modelo.__table__.create(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Factura.__table__), [
+            {
+                "id": i,
+                "numero_factura": f"FE-{i}",
+                "fecha_emision": date(2025, 10, i),
+                "estado": EstadoFactura.en_revision,
+                "cufe": f"cufe-{i}",
+                "actualizado_en": datetime(2025, 10, i, 12, 0),
+            }
+            for i in range(1, 6)
+        ])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def client(engine):
+    SessionTest = sessionmaker(bind=engine)
+
+    def get_test_db():
+        db = SessionTest()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app = FastAPI()
+    app.add_middleware(SQLMetricsMiddleware)
+
+    @app.get("/facturas")
+    def listar(request: Request, response: Response, estado: str = "en_revision", db=Depends(get_test_db)):
+        validador = ValidadorCondicional.desde_bd(db, request, FUENTES, "admin")
+        if validador.no_modificado():
+            return validador.respuesta_no_modificado()
+
+        facturas = db.query(Factura).filter(Factura.estado == estado).order_by(Factura.id).all()
+        validador.aplicar(response)
+        return [f.numero_factura for f in facturas]
+
+    return TestClient(app)
+
+
+class TestGetCondicional:
+
+    def test_304_con_una_sola_query(self, client):
+        primera = client.get("/facturas")
+        etag = primera.headers["etag"]
+
+        segunda = client.get("/facturas", headers={"If-None-Match": etag})
+
+        assert primera.status_code == 200
+        assert primera.headers["x-db-queries"] == "3"  # watermark + listado + items (selectin)
+        assert segunda.status_code == 304
+        assert segunda.headers["x-db-queries"] == "1"  # solo watermark
+        assert segunda.headers["etag"] == etag
+        assert segunda.content == b""
+
+    def test_cambio_en_la_fuente_invalida_el_etag(self, client, engine):
+        etag = client.get("/facturas").headers["etag"]
+
+        with engine.begin() as conn:
+            conn.execute(
+                update(Factura.__table__)
+                .where(Factura.__table__.c.id == 3)
+                .values(estado=EstadoFactura.aprobada, actualizado_en=datetime(2025, 10, 31, 12, 0))
+            )
+
+        respuesta = client.get("/facturas", headers={"If-None-Match": etag})
+
+        assert respuesta.status_code == 200
+        assert respuesta.json() == ["FE-1", "FE-2", "FE-4", "FE-5"]
+        assert respuesta.headers["etag"] != etag
+
+    def test_otros_filtros_otro_etag(self, client):
+        etag = client.get("/facturas").headers["etag"]
+
+        respuesta = client.get("/facturas?estado=aprobada", headers={"If-None-Match": etag})
+
+        assert respuesta.status_code == 200
+
+    def test_if_modified_since(self, client):
+        last_modified = client.get("/facturas").headers["last-modified"]
+
+        assert client.get("/facturas", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+        antes = (datetime(2025, 10, 5, 12, 0) - timedelta(days=1)).strftime("%a, %d %b %Y %H:%M:%S GMT")
+        assert client.get("/facturas", headers={"If-Modified-Since": antes}).status_code == 200
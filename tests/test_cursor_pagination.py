@@ -0,0 +1,65 @@
+"""
+Tests de los cursores keyset (app.utils.cursor_pagination).
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from app.models.factura import Factura
+from app.utils.cursor_pagination import (
+    CursorInvalidoError,
+    decode_cursor,
+    decode_keyset_cursor,
+    encode_cursor,
+    encode_keyset_cursor,
+    keyset_predicate,
+)
+
+
+class TestCursorFirmado:
+    """Cursores opacos con firma HMAC."""
+
+    def test_ida_y_vuelta_conserva_tipos(self):
+        valores = [date(2025, 10, 8), datetime(2025, 10, 8, 14, 30), Decimal("1500.50"), "aprobada", 42]
+
+        cursor = encode_keyset_cursor(valores, "prueba")
+
+        assert decode_keyset_cursor(cursor, "prueba") == valores
+
+    def test_cursor_manipulado_se_rechaza(self):
+        cursor = encode_keyset_cursor([date(2025, 10, 8), 42], "prueba")
+        payload, firma = cursor.split(".")
+        manipulado = f"{payload[:-2]}AA.{firma}"
+
+        assert decode_keyset_cursor(manipulado, "prueba") is None
+
+    def test_cursor_de_otro_listado_se_rechaza(self):
+        cursor = encode_keyset_cursor([42], "proveedores")
+
+        assert decode_keyset_cursor(cursor, "workflows") is None
+
+    def test_cursor_legacy_base64_se_rechaza(self):
+        assert decode_cursor("MjAyNS0xMC0wOFQxMDowMDowMHwxMjM0NQ==") is None
+
+    def test_cursor_de_facturas(self):
+        cursor = encode_cursor(date(2025, 10, 8), 12345)
+
+        assert decode_cursor(cursor) == (date(2025, 10, 8), 12345)
+
+
+class TestKeysetPredicate:
+    """Predicado lexicográfico para órdenes arbitrarios."""
+
+    def test_orden_mixto(self):
+        orden = ((Factura.fecha_emision, True), (Factura.numero_factura, False), (Factura.id, True))
+
+        sql = str(keyset_predicate(orden, [date(2025, 10, 8), "F-1", 10]))
+
+        assert sql.count(" OR ") == 2
+        assert "facturas.fecha_emision <" in sql
+        assert "facturas.numero_factura >" in sql
+        assert "facturas.id <" in sql
+
+    def test_valores_no_coinciden_con_orden(self):
+        with pytest.raises(CursorInvalidoError):
+            keyset_predicate(((Factura.id, True),), [1, 2])
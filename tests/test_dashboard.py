@@ -0,0 +1,41 @@
+"""
+Tests del dashboard mensual: estadísticas agregadas en SQL.
+
+Se ejecutan dentro de una transacción que se revierte al final:
+no dejan cambios en la BD.
+"""
+from datetime import date
+
+from sqlalchemy.orm import Session
+from app.api.v1.routers.dashboard import contar_por_estado, filtros_mes, pagina_facturas
+from app.models.factura import Factura, EstadoFactura
+
+
+class TestDashboardAgregado:
+    """contar_por_estado coincide con contar en Python; la página respeta limit."""
+
+    def test_conteo_por_estado_coincide_con_python(self, db: Session):
+        hoy = date.today()
+        filtros = filtros_mes(hoy.year, hoy.month)
+
+        conteos = contar_por_estado(db, filtros)
+        facturas = db.query(Factura).filter(*filtros).all()
+
+        assert conteos["total"] == len(facturas)
+        for estado in EstadoFactura:
+            assert conteos[estado.value] == sum(1 for f in facturas if f.estado == estado)
+
+    def test_paginas_recorren_todo_el_mes_sin_repetir(self, db: Session):
+        hoy = date.today()
+        filtros = filtros_mes(hoy.year, hoy.month)
+
+        vistos = []
+        cursor = None
+        while True:
+            pagina, cursor = pagina_facturas(db, filtros, 5, cursor, "test")
+            assert len(pagina) <= 5
+            vistos.extend(f.id for f in pagina)
+            if not cursor:
+                break
+
+        assert len(vistos) == len(set(vistos)) == contar_por_estado(db, filtros)["total"]
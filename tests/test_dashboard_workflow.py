@@ -0,0 +1,96 @@
+"""
+Tests de los contadores precalculados de /workflow/dashboard.
+
+Se ejecutan dentro de una transacción que se revierte al final:
+no dejan cambios en la BD.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import Session
+from app.models.dashboard_workflow_responsable import DashboardWorkflowResponsable, GLOBAL
+from app.models.factura import Factura, EstadoFactura
+from app.services import dashboard_workflow
+
+
+class TestSegundosAprobacion:
+
+    def test_ignora_microsegundos(self):
+        inicio = datetime(2025, 10, 1, 8, 0, 0, 900000)
+        fin = datetime(2025, 10, 1, 9, 0, 0, 100000)
+
+        assert dashboard_workflow.segundos_aprobacion(inicio, fin) == 3600
+
+    def test_sin_aprobacion(self):
+        assert dashboard_workflow.segundos_aprobacion(datetime(2025, 10, 1), None) is None
+
+
+class TestCalcularDeltas:
+
+    def test_aprobar_factura_antigua(self):
+        cambios = dashboard_workflow._Cambios()
+        fecha = date(2025, 10, 1)
+        cambios.facturas = [(7, "en_revision", fecha, -1), (7, "aprobada", fecha, +1)]
+        cambios.aprobaciones = [(100, 3600, +1)]
+
+        deltas = dashboard_workflow.calcular_deltas(cambios, {100: 7})
+
+        assert dict(deltas[7]["columnas"]) == {
+            "en_revision": -1, "aprobada": 1,
+            "aprobaciones_con_tiempo": 1, "segundos_aprobacion_total": 3600,
+        }
+        assert dict(deltas[7]["antiguas"]) == {fecha: -1}
+
+
+@pytest.mark.parametrize(
+    "db", [dashboard_workflow.registrar_mantenimiento], indirect=True, ids=["dashboard_workflow"]
+)
+class TestDashboardWorkflow:
+    """Mantenimiento en el flush y reconciliación."""
+
+    def test_materializa_igual_que_en_vivo(self, db: Session):
+        fila = dashboard_workflow.obtener(db, None)
+
+        assert dashboard_workflow.a_respuesta(fila) == dashboard_workflow.a_respuesta(
+            dashboard_workflow.calcular_en_vivo(db, None)
+        )
+
+    def test_cambio_de_estado_mueve_contadores(self, db: Session):
+        factura = db.query(Factura).filter(Factura.estado == EstadoFactura.en_revision).first()
+        if not factura:
+            pytest.skip("No hay facturas en revisión")
+
+        antes = dashboard_workflow.obtener(db, None)
+        en_revision, aprobadas = antes.en_revision, antes.aprobada
+        db.flush()
+
+        factura.estado = EstadoFactura.aprobada
+        db.flush()
+        db.expire_all()
+
+        despues = db.get(DashboardWorkflowResponsable, GLOBAL)
+        assert despues.en_revision == en_revision - 1
+        assert despues.aprobada == aprobadas + 1
+        assert dashboard_workflow.verificar_consistencia(db)["consistente"]
+
+    def test_reparar_corrige_drift(self, db: Session):
+        dashboard_workflow.obtener(db, None)
+        db.query(DashboardWorkflowResponsable).filter(
+            DashboardWorkflowResponsable.responsable_id == GLOBAL
+        ).update({"en_revision": -5}, synchronize_session=False)
+
+        assert not dashboard_workflow.verificar_consistencia(db)["consistente"]
+        assert dashboard_workflow.reparar(db) >= 1
+        assert dashboard_workflow.verificar_consistencia(db)["consistente"]
+
+    def test_corte_vencido_se_renueva(self, db: Session):
+        dashboard_workflow.obtener(db, None)
+        db.query(DashboardWorkflowResponsable).filter(
+            DashboardWorkflowResponsable.responsable_id == GLOBAL
+        ).update({"antiguas_corte": date.today() - timedelta(days=30)}, synchronize_session=False)
+        db.expire_all()
+
+        fila = dashboard_workflow.obtener(db, None)
+
+        assert fila.antiguas_corte == dashboard_workflow.corte_antiguas()
+        assert fila.pendientes_antiguas == dashboard_workflow.calcular(db, GLOBAL)["pendientes_antiguas"]
@@ -0,0 +1,54 @@
+"""
+Tests del engine único y la telemetría del pool de conexiones.
+"""
+import pytest
+from sqlalchemy import create_engine, exc as sa_exc, text
+
+from app.db.pool_monitor import InstrumentedQueuePool, get_pool_status, pool_stats
+
+
+class TestPoolUnico:
+    """app.core.database y app.db.session deben compartir el mismo pool."""
+
+    def test_database_reexporta_engine_de_session(self):
+        import app.core.database as database
+        import app.db.session as session
+
+        assert database.engine is session.engine
+        assert database.SessionLocal is session.SessionLocal
+        assert database.get_db is session.get_db
+
+
+class TestTelemetriaPool:
+
+    @pytest.fixture
+    def engine(self, tmp_path):
+        engine = create_engine(
+            f"sqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.2,
+        )
+        pool_stats.reset()
+        yield engine
+        engine.dispose()
+
+    def test_reporta_conexiones_en_uso(self, engine):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            estado = get_pool_status(engine)
+            assert estado["checked_out"] == 1
+            assert estado["size"] == 1
+
+        assert get_pool_status(engine)["checked_out"] == 0
+        assert pool_stats.snapshot()["checkouts"] == 1
+
+    def test_registra_timeout_por_pool_agotado(self, engine):
+        with engine.connect():
+            with pytest.raises(sa_exc.TimeoutError):
+                engine.connect()
+
+        stats = pool_stats.snapshot()
+        assert stats["timeouts"] == 1
+        assert stats["wait_max_ms"] >= 200
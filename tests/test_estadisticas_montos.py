@@ -0,0 +1,94 @@
+"""
+Tests de estadisticas_montos (Welford por proveedor, concepto y mes).
+
+Los que usan BD se ejecutan dentro de una transacción que se revierte al
+final: no dejan cambios en la BD.
+"""
+import statistics
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy.orm import Session
+from app.models.factura import Factura, EstadoFactura
+from app.services import estadisticas_montos
+from app.services.estadisticas_montos import ESTADOS_HISTORIAL, Acumulador
+
+
+def test_acumulador_coincide_con_statistics():
+    """Welford y la combinación de Chan dan lo mismo que statistics."""
+    valores = [1250000.0, 1249000.5, 1310000.0, 980000.25, 1250000.0, 1500000.75]
+
+    total = Acumulador()
+    for valor in valores:
+        total.agregar(valor)
+    izquierda, derecha = Acumulador(), Acumulador()
+    for valor in valores[:2]:
+        izquierda.agregar(valor)
+    for valor in valores[2:]:
+        derecha.agregar(valor)
+
+    for acumulado in (total, izquierda.combinar(derecha), derecha.combinar(izquierda)):
+        assert acumulado.n == len(valores)
+        assert acumulado.media == pytest.approx(statistics.mean(valores))
+        assert acumulado.desviacion == pytest.approx(statistics.stdev(valores))
+
+
+@pytest.mark.parametrize(
+    "db", [estadisticas_montos.registrar_mantenimiento], indirect=True, ids=["estadisticas_montos"]
+)
+class TestEstadisticasMontos:
+    """Mantenimiento en el flush y lectura por ventana."""
+
+    def _factura_en_revision(self, db: Session) -> Factura:
+        factura = db.query(Factura).filter(
+            Factura.estado == EstadoFactura.en_revision,
+            Factura.proveedor_id.isnot(None),
+            Factura.fecha_emision.isnot(None),
+            Factura.total_a_pagar > 0
+        ).first()
+        if not factura:
+            pytest.skip("No hay facturas en revisión")
+        return factura
+
+    def test_reconstruir_deja_estadisticas_consistentes(self, db: Session):
+        """Tras reconstruir, el verificador no encuentra diferencias."""
+        estadisticas_montos.reconstruir(db)
+
+        assert estadisticas_montos.verificar_consistencia(db)["consistente"]
+
+    def test_aprobar_y_revertir_mantiene_consistencia(self, db: Session):
+        """Entrar al historial agrega la factura; salir reconstruye su grupo."""
+        factura = self._factura_en_revision(db)
+        estadisticas_montos.reconstruir(db)
+        antes = estadisticas_montos.de_proveedor(db, factura.proveedor_id).n
+
+        factura.estado = EstadoFactura.aprobada
+        db.flush()
+        assert estadisticas_montos.de_proveedor(db, factura.proveedor_id).n == antes + 1
+        assert estadisticas_montos.verificar_consistencia(db)["consistente"]
+
+        factura.total_a_pagar = factura.total_a_pagar + Decimal("1000")
+        db.flush()
+        assert estadisticas_montos.verificar_consistencia(db)["consistente"]
+
+        factura.estado = EstadoFactura.rechazada
+        db.flush()
+        assert estadisticas_montos.de_proveedor(db, factura.proveedor_id).n == antes
+        assert estadisticas_montos.verificar_consistencia(db)["consistente"]
+
+    def test_fecha_anterior_al_historial_reconstruye_el_grupo(self, db: Session):
+        """Una factura aprobada con fecha previa a la última del grupo no rompe los intervalos."""
+        factura = self._factura_en_revision(db)
+        primera = db.query(Factura.fecha_emision).filter(
+            Factura.proveedor_id == factura.proveedor_id,
+            Factura.estado.in_(ESTADOS_HISTORIAL)
+        ).order_by(Factura.fecha_emision).first()
+        estadisticas_montos.reconstruir(db)
+
+        if primera:
+            factura.fecha_emision = primera.fecha_emision - timedelta(days=40)
+        factura.estado = EstadoFactura.aprobada
+        db.flush()
+
+        assert estadisticas_montos.verificar_consistencia(db)["consistente"]
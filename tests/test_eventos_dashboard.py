@@ -0,0 +1,85 @@
+"""
+Tests de los contadores en vivo del dashboard (app.services.eventos_dashboard).
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.services import eventos_dashboard
+from app.services.eventos_dashboard import DifusorContadores, calcular_delta, contadores_vacios
+
+
+class TestCalcularDelta:
+    """Conversión de cambios de facturas en deltas por ámbito."""
+
+    def test_cambio_de_estado_mueve_contadores(self):
+        cambios = [((7, "en_revision", True), (7, "aprobada", True))]
+
+        delta = calcular_delta(cambios, None)
+
+        assert delta == {
+            "totales": {"en_revision": -1, "aprobada": 1},
+            "mes_actual": {"en_revision": -1, "aprobada": 1},
+        }
+
+    def test_factura_nueva_de_otro_mes_no_toca_mes_actual(self):
+        delta = calcular_delta([(None, (7, "en_revision", False))], None)
+
+        assert delta == {"totales": {"total": 1, "en_revision": 1}}
+
+    def test_proveedor_fuera_del_ambito_se_ignora(self):
+        cambios = [((7, "en_revision", True), (7, "aprobada", True))]
+
+        assert calcular_delta(cambios, {1, 2, 3}) == {}
+
+
+class TestDifusorContadores:
+    """Un cálculo por ámbito, repartido a todas sus conexiones."""
+
+    def test_fan_out_por_ambito(self, monkeypatch):
+        calculos = []
+
+        def calcular(proveedor_ids):
+            calculos.append(proveedor_ids)
+            contadores = contadores_vacios()
+            contadores["totales"].update(total=1, en_revision=1)
+            return contadores
+
+        monkeypatch.setattr(eventos_dashboard, "_calcular_en_sesion_propia", calcular)
+
+        async def escenario():
+            difusor = DifusorContadores(resync_segundos=3600)
+            pestañas = [await difusor.suscribir("responsable:5", [7]) for _ in range(3)]
+            otro = await difusor.suscribir("responsable:6", [8])
+
+            difusor.publicar([((7, "en_revision", True), (7, "aprobada", True))])
+            await asyncio.sleep(0)
+
+            eventos = [p.cola.get_nowait() for p in pestañas]
+            otro_vacio = otro.cola.empty()
+
+            for suscripcion in (*pestañas, otro):
+                difusor.cancelar(suscripcion)
+            return eventos, otro_vacio, difusor.hay_suscriptores()
+
+        eventos, otro_vacio, quedan = asyncio.run(escenario())
+
+        assert len(calculos) == 2  # uno por ámbito, no por conexión
+        assert all(e == eventos[0] for e in eventos)
+        assert eventos[0]["tipo"] == "delta"
+        assert eventos[0]["totales"] == {"en_revision": -1, "aprobada": 1}
+        assert otro_vacio
+        assert not quedan
+
+
+def test_stream_responsable_id_solo_admin():
+    """Un rol distinto de admin no puede suscribirse a otro responsable."""
+    from app.api.v1.routers.dashboard import stream_eventos_dashboard
+
+    contador = SimpleNamespace(id=3, usuario="contador", role=SimpleNamespace(nombre="contador"))
+
+    with pytest.raises(HTTPException) as error:
+        stream_eventos_dashboard(responsable_id=5, db=None, current_user=contador)
+    assert error.value.status_code == 403
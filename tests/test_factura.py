@@ -8,3 +8,18 @@ client = TestClient(app)
 def test_health_and_docs():
     r = client.get("/docs")
     assert r.status_code == 200
+
+
+def test_iter_all_facturas_mismo_orden_que_lista_completa():
+    from app.db.session import SessionLocal
+    from app.crud.factura import list_all_facturas_for_dashboard, iter_all_facturas_for_dashboard
+
+    db = SessionLocal()
+    try:
+        esperado = [f.id for f in list_all_facturas_for_dashboard(db)]
+        db.expunge_all()
+        streaming = [f.id for f in iter_all_facturas_for_dashboard(db, batch_size=7)]
+    finally:
+        db.close()
+
+    assert streaming == esperado
@@ -0,0 +1,61 @@
+"""
+Tests de la tabla materializada factura_visibilidad.
+
+Se ejecutan dentro de una transacción que se revierte al final:
+no dejan cambios en la BD.
+"""
+import pytest
+from sqlalchemy.orm import Session
+from app.crud.factura import filtro_visibilidad_responsable
+from app.models import Factura, AsignacionNitResponsable, FacturaVisibilidad, Proveedor
+from app.models.factura_visibilidad import ORIGEN_NIT
+from app.services import visibilidad_facturas
+
+
+class TestFacturaVisibilidad:
+    """Mantenimiento incremental y verificador de consistencia."""
+
+    def test_reconstruir_deja_tabla_consistente(self, db: Session):
+        """Tras reconstruir, el verificador no encuentra diferencias."""
+        visibilidad_facturas.reconstruir(db)
+
+        resultado = visibilidad_facturas.verificar_consistencia(db)
+
+        assert resultado["consistente"], resultado
+
+    def test_soft_delete_quita_visibilidad_por_nit(self, db: Session):
+        """Al desactivar una asignación, el usuario deja de ver las facturas del NIT."""
+        asignacion = db.query(AsignacionNitResponsable).join(
+            Proveedor, Proveedor.nit == AsignacionNitResponsable.nit
+        ).join(
+            Factura, Factura.proveedor_id == Proveedor.id
+        ).filter(
+            AsignacionNitResponsable.activo == True
+        ).first()
+        if not asignacion:
+            pytest.skip("No hay asignaciones activas con facturas")
+
+        visibilidad_facturas.reconstruir(db)
+        visibles_antes = db.query(Factura).filter(
+            filtro_visibilidad_responsable(db, asignacion.responsable_id, usar_workflow=False)
+        ).count()
+
+        asignacion.activo = False
+        visibilidad_facturas.sincronizar_nit(db, asignacion.nit, asignacion.responsable_id)
+
+        restantes_del_nit = db.query(FacturaVisibilidad).join(
+            Factura, Factura.id == FacturaVisibilidad.factura_id
+        ).join(
+            Proveedor, Proveedor.id == Factura.proveedor_id
+        ).filter(
+            FacturaVisibilidad.usuario_id == asignacion.responsable_id,
+            FacturaVisibilidad.origen == ORIGEN_NIT,
+            Proveedor.nit == asignacion.nit
+        ).count()
+        visibles_despues = db.query(Factura).filter(
+            filtro_visibilidad_responsable(db, asignacion.responsable_id, usar_workflow=False)
+        ).count()
+
+        assert restantes_del_nit == 0
+        assert visibles_despues < visibles_antes
+        assert visibilidad_facturas.verificar_consistencia(db)["consistente"]
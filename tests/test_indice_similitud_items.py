@@ -0,0 +1,99 @@
+"""
+Tests del índice MinHash + LSH de descripciones de items
+(app.services.indice_similitud_items).
+
+Índices en memoria: no usan BD.
+"""
+import random
+from itertools import combinations
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.indice_similitud_items import IndiceMinHash, IndicesProveedores, parametros_lsh
+from app.services.item_normalizer import ItemNormalizerService
+
+
+def _descripciones(total, semilla=7):
+    """Variantes de unos pocos productos base (palabras quitadas o agregadas)."""
+    aleatorio = random.Random(semilla)
+    vocabulario = [f"palabra{i}" for i in range(300)]
+    bases = [aleatorio.sample(vocabulario, 6) for _ in range(total // 4)]
+    descripciones = []
+    for _ in range(total):
+        desc = list(aleatorio.choice(bases))
+        if aleatorio.random() < 0.5:
+            desc.pop(aleatorio.randrange(len(desc)))
+        if aleatorio.random() < 0.3:
+            desc.append(aleatorio.choice(vocabulario))
+        descripciones.append(" ".join(desc))
+    return descripciones
+
+
+def test_parametros_lsh():
+    bandas, filas = parametros_lsh(0.7)
+    assert bandas * filas <= 128
+    # Umbral más alto: más filas por banda (más selectivo)
+    assert parametros_lsh(0.9)[1] > filas
+    with pytest.raises(ValueError):
+        parametros_lsh(0.0)
+
+
+def test_buscar_coincide_con_busqueda_exhaustiva():
+    """Sin falsos positivos y sin perder los pares claramente sobre el umbral."""
+    descripciones = _descripciones(400)
+    indice = IndiceMinHash(0.7)
+    for i, desc in enumerate(descripciones):
+        indice.agregar(i, desc)
+
+    for consulta in descripciones[:50]:
+        exactos = {
+            i: ItemNormalizerService.calcular_similitud(consulta, desc)
+            for i, desc in enumerate(descripciones)
+        }
+        encontrados = dict(indice.buscar(consulta))
+        assert all(exactos[i] == pytest.approx(s) and s >= 0.7 for i, s in encontrados.items())
+        assert {i for i, s in exactos.items() if s >= 0.8} <= set(encontrados)
+
+    # Umbral de consulta mayor al del índice: solo filtra
+    assert all(s >= 0.9 for _, s in indice.buscar(descripciones[0], umbral=0.9))
+
+
+def test_agregar_y_descripciones_vacias():
+    indice = IndiceMinHash()
+    assert indice.agregar("a", "hosting aws plan premium")
+    assert not indice.agregar("a", "otra descripcion")
+    assert not indice.agregar("b", "")
+    assert len(indice) == 1 and "a" in indice
+    assert indice.buscar("") == []
+    assert indice.buscar("hosting aws plan premium", limite=1) == [("a", 1.0)]
+
+
+def test_pares_similares():
+    descripciones = _descripciones(200)
+    indice = IndiceMinHash(0.7)
+    for i, desc in enumerate(descripciones):
+        indice.agregar(i, desc)
+
+    pares = {(a, b): s for a, b, s in indice.pares_similares()}
+    exactos = {
+        (a, b): ItemNormalizerService.calcular_similitud(da, db)
+        for (a, da), (b, db) in combinations(enumerate(descripciones), 2)
+    }
+    assert all(a < b and s == pytest.approx(exactos[(a, b)]) and s >= 0.7 for (a, b), s in pares.items())
+    assert {par for par, s in exactos.items() if s >= 0.8} <= set(pares)
+
+
+def test_indices_por_proveedor_lru():
+    """Al pasar max_indices se descarta el índice usado hace más tiempo."""
+    db = SimpleNamespace(execute=lambda consulta: SimpleNamespace(all=lambda: []))
+    indices = IndicesProveedores(max_indices=2)
+
+    primero = indices.obtener(db, 1)
+    indices.obtener(db, 2)
+    assert indices.obtener(db, 1) is primero  # 1 pasa a ser el más reciente
+    indices.obtener(db, 3)
+
+    assert len(indices) == 2
+    assert indices.obtener(db, 1) is primero
+    assert [proveedor for proveedor, _ in indices._indices] == [3, 1]
@@ -0,0 +1,244 @@
+"""
+Tests del historial de precios por item (app.services.item_precio_historico).
+
+Los de acumulación y combinación son en memoria. TestMantenimiento usa la
+BD dentro de una transacción que se revierte al final (los servicios hacen
+commit sobre un savepoint): no deja cambios.
+"""
+import importlib.util
+import statistics
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Factura, FacturaItem, ItemPrecioHistorico
+from app.models.factura import EstadoFactura
+from app.services import item_precio_historico
+from app.services.comparador_items import ComparadorItemsService
+from app.services.factura_items_service import FacturaItemsService
+from app.services.item_precio_historico import (
+    PRECISION_PERCENTILES, PreciosItem, _acumular_por_mes, combinar_meses, historial_item, sumar_meses, ventana
+)
+
+VERSIONES = Path(__file__).parent.parent / "alembic" / "versions"
+MIGRACION = VERSIONES / "d4a8e2f6b1c7_add_item_precio_historico.py"
+MIGRACION_HISTOGRAMA = VERSIONES / "e7c3a9f1b5d2_add_histograma_item_precio_historico.py"
+
+
+def _cargar_migracion(ruta: Path):
+    spec = importlib.util.spec_from_file_location(ruta.stem, ruta)
+    migracion = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migracion)
+    return migracion
+
+
+def test_combinar_meses_equivale_a_acumular_todo():
+    """Combinar las filas mensuales da lo mismo que acumular todos los items."""
+    precios = ["1000.50", "980.00", "1010.25", "995.00", "1200.00", "1001.75", "990.00"]
+    filas = [
+        (7, "abc", date(2025, 1 + i % 3, 1 + i), 100 + i, Decimal(precio), Decimal(i + 1))
+        for i, precio in enumerate(precios)
+    ]
+    filas.sort(key=lambda f: (f[2], f[3]))
+
+    meses = _acumular_por_mes(filas)
+    assert sorted(meses) == [(7, "abc", 2025, 1), (7, "abc", 2025, 2), (7, "abc", 2025, 3)]
+
+    total = combinar_meses({(a, m): p for (_, _, a, m), p in meses.items()}, (2025, 1), (2025, 3))
+    valores = [float(p) for p in precios]
+    assert total.n == len(valores)
+    assert total.precios.media == pytest.approx(statistics.mean(valores))
+    assert total.desviacion_poblacional == pytest.approx(statistics.pstdev(valores))
+    assert total.media_cantidad == pytest.approx(4.0)
+    assert (total.precio_min, total.precio_max) == (Decimal("980.00"), Decimal("1200.00"))
+    assert total.ultimo == max((f[2], f[3], f[4], f[5]) for f in filas)
+
+
+def test_percentiles_de_meses_combinados():
+    """Los histogramas mensuales combinados dan el percentil con error <= 1%."""
+    valores = [round(50 + (i * 37) % 101 + i / 7, 2) for i in range(60)] + [0.0]
+    meses = {}
+    for i, valor in enumerate(valores):
+        meses.setdefault((2025, 1 + i % 4), PreciosItem()).agregar(
+            date(2025, 1 + i % 4, 1), i, Decimal(str(valor)), Decimal("1")
+        )
+
+    total = combinar_meses(meses, (2025, 1), (2025, 4))
+    ordenados = sorted(valores)
+    for q in (0.0, 0.25, 0.5, 0.75, 1.0):
+        exacto = ordenados[int(q * (len(ordenados) - 1))]
+        assert total.percentil(q) == pytest.approx(exacto, rel=PRECISION_PERCENTILES, abs=1e-9)
+    assert PreciosItem().percentil(0.5) is None
+
+
+def test_valores_ida_y_vuelta():
+    precios = PreciosItem()
+    precios.agregar(date(2025, 3, 10), 5, Decimal("10.5"), Decimal("2"))
+    precios.agregar(date(2025, 3, 10), 5, Decimal("11.5"), Decimal("1"))
+
+    fila = type("Fila", (), precios.valores())
+    copia = PreciosItem.desde_fila(fila)
+    assert copia.valores() == precios.valores()
+    assert copia.ultimo == (date(2025, 3, 10), 5, Decimal("11.5"), Decimal("1"))
+
+
+def test_ventana_meses_completos_anteriores():
+    assert sumar_meses((2025, 1), -1) == (2024, 12)
+    assert sumar_meses((2024, 11), 14) == (2026, 1)
+    assert ventana(date(2025, 3, 15), 12) == ((2024, 3), (2025, 2))
+    assert combinar_meses({(2025, 3): PreciosItem()}, *ventana(date(2025, 3, 1), 1)).n == 0
+
+
+def test_historial_item_incluye_el_mes_hasta_la_fecha():
+    meses = {(2025, 5): PreciosItem()}
+    meses[(2025, 5)].agregar(date(2025, 5, 20), 1, Decimal("100"), Decimal("1"))
+    items_mes = [
+        (date(2025, 6, 2), 2, Decimal("110"), Decimal("1")),
+        (date(2025, 6, 10), 3, Decimal("500"), Decimal("1")),  # la propia factura
+        (date(2025, 6, 12), 4, Decimal("900"), Decimal("1")),
+    ]
+
+    precios = historial_item(meses, items_mes, date(2025, 6, 10), 12)
+    assert (precios.n, precios.precio_max) == (2, Decimal("110"))
+    assert precios.ultimo == (date(2025, 6, 2), 2, Decimal("110"), Decimal("1"))
+
+
+@pytest.mark.parametrize(
+    "db", [item_precio_historico.registrar_mantenimiento], indirect=True, ids=["item_precio_historico"]
+)
+class TestMantenimiento:
+    """Listener after_flush, servicio de items, comparador y carga inicial contra la BD."""
+
+    @pytest.fixture(autouse=True)
+    def historial(self, db: Session):
+        item_precio_historico.reconstruir(db)
+
+    @staticmethod
+    def _item_con_historial(db: Session) -> FacturaItem:
+        """Item de la factura más reciente de un proveedor con items en meses anteriores."""
+        item = db.execute(
+            select(FacturaItem).join(Factura, Factura.id == FacturaItem.factura_id).where(
+                FacturaItem.item_hash.isnot(None),
+                Factura.proveedor_id.isnot(None),
+            ).order_by(Factura.fecha_emision.desc(), Factura.id.desc())
+        ).scalars().first()
+        if item is None:
+            pytest.skip("No hay facturas con items")
+        return item
+
+    @staticmethod
+    def _fila(db: Session, factura: Factura, item_hash: str):
+        return db.get(ItemPrecioHistorico, (
+            factura.proveedor_id, item_hash, factura.fecha_emision.year, factura.fecha_emision.month
+        ))
+
+    @staticmethod
+    def _datos_item(item: FacturaItem, precio: Decimal, numero_linea: int = 1):
+        return {
+            "numero_linea": numero_linea,
+            "descripcion": item.descripcion,
+            "descripcion_normalizada": item.descripcion_normalizada,
+            "item_hash": item.item_hash,
+            "cantidad": Decimal("1"),
+            "precio_unitario": precio,
+            "subtotal": precio,
+            "total": precio,
+        }
+
+    @staticmethod
+    def _nueva_factura(db: Session, referencia: Factura, fecha: date, sufijo: str) -> Factura:
+        factura = Factura(
+            numero_factura=f"TEST-IPH-{sufijo}",
+            cufe=f"TEST-IPH-{sufijo}",
+            proveedor_id=referencia.proveedor_id,
+            fecha_emision=fecha,
+            estado=EstadoFactura.en_revision,
+            total_a_pagar=Decimal("1"),
+        )
+        db.add(factura)
+        db.flush()
+        return factura
+
+    def test_items_de_factura_nueva_se_agregan(self, db: Session):
+        """crear_items_desde_extractor en una factura sin items: Welford sobre la fila del mes."""
+        item = self._item_con_historial(db)
+        referencia = item.factura
+        n_antes = self._fila(db, referencia, item.item_hash).n
+
+        factura = self._nueva_factura(db, referencia, referencia.fecha_emision, "nueva")
+        resultado = FacturaItemsService(db).crear_items_desde_extractor(
+            factura.id, [self._datos_item(item, Decimal("9999"))]
+        )
+
+        assert resultado["items_creados"] == 1
+        fila = self._fila(db, referencia, item.item_hash)
+        assert (fila.n, fila.precio_max) == (n_antes + 1, Decimal("9999"))
+        assert item_precio_historico.verificar_consistencia(db)["consistente"]
+
+    def test_reextraccion_reemplaza_items_en_el_historial(self, db: Session):
+        """Re-extraer una factura saca sus items anteriores del historial y agrega los nuevos."""
+        item = self._item_con_historial(db)
+        factura, item_hash = item.factura, item.item_hash
+        n_antes = self._fila(db, factura, item_hash).n
+        items_factura = sum(1 for i in factura.items if i.item_hash == item_hash)
+
+        FacturaItemsService(db).crear_items_desde_extractor(
+            factura.id, [self._datos_item(item, Decimal("7777"))]
+        )
+
+        fila = self._fila(db, factura, item_hash)
+        assert (fila.n, fila.ultimo_precio) == (n_antes - items_factura + 1, Decimal("7777"))
+        assert item_precio_historico.verificar_consistencia(db)["consistente"]
+
+    def test_eliminar_items_factura(self, db: Session):
+        item = self._item_con_historial(db)
+        factura, item_hash = item.factura, item.item_hash
+        n_antes = self._fila(db, factura, item_hash).n
+        items_factura = sum(1 for i in factura.items if i.item_hash == item_hash)
+
+        FacturaItemsService(db).eliminar_items_factura(factura.id)
+
+        fila = self._fila(db, factura, item_hash)
+        assert (fila.n if fila else 0) == n_antes - items_factura
+        assert item_precio_historico.verificar_consistencia(db)["consistente"]
+
+    def test_items_insertados_fuera_del_servicio_los_ve_el_comparador(self, db: Session):
+        """Items agregados con la sesión (sin FacturaItemsService) entran al historial del comparador."""
+        item = self._item_con_historial(db)
+        factura = item.factura
+        fecha = factura.fecha_emision
+        comparador = ComparadorItemsService(db)
+
+        def veces_facturado():
+            resultado = comparador.comparar_factura_vs_historial(factura.id)
+            detalles = resultado["detalles_items_ok"] + resultado["detalles_items_alertas"]
+            return next(d["historial"]["veces_facturado"] for d in detalles if d["item_id"] == item.id)
+
+        veces_antes = veces_facturado()
+
+        # Una factura del mes anterior (fila mensual) y otra del mismo mes con fecha anterior
+        fechas = [date(*item_precio_historico.sumar_meses((fecha.year, fecha.month), -1), 1)]
+        if fecha.day > 1:
+            fechas.append(fecha.replace(day=1))
+        for n, fecha_nueva in enumerate(fechas):
+            nueva = self._nueva_factura(db, factura, fecha_nueva, f"fuera-{n}")
+            db.add(FacturaItem(factura_id=nueva.id, **self._datos_item(item, Decimal("123"))))
+        db.flush()
+
+        assert veces_facturado() == veces_antes + len(fechas)
+        assert item_precio_historico.verificar_consistencia(db)["consistente"]
+
+    def test_carga_inicial_de_la_migracion(self, db: Session):
+        """La carga inicial y los histogramas de las migraciones llegan a lo mismo que reconstruir."""
+        if db.get_bind().dialect.name != "mysql":
+            pytest.skip("La carga inicial usa funciones de MySQL")
+
+        db.execute(delete(ItemPrecioHistorico))
+        db.execute(text(_cargar_migracion(MIGRACION).CARGA_INICIAL))
+        db.execute(text(_cargar_migracion(MIGRACION_HISTOGRAMA).HISTOGRAMAS))
+
+        assert item_precio_historico.verificar_consistencia(db)["consistente"]
@@ -0,0 +1,75 @@
+"""
+Tests de la elección de líder entre workers (app.services.liderazgo).
+
+Cada "worker" es un ElectorLider con otro titular sobre la misma BD SQLite.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.liderazgo_tarea import LiderazgoTarea
+from app.services import liderazgo
+from app.services.liderazgo import ElectorLider, adquirir
+
+
+TAREA = liderazgo.TAREA_NOTIFICACIONES
+LEASE = timedelta(seconds=60)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'liderazgo.db'}")
+    LiderazgoTarea.__table__.create(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+class TestAdquirir:
+
+    def test_un_solo_titular_mientras_el_lease_esta_vigente(self, session_factory):
+        db = session_factory()
+        ahora = datetime(2026, 10, 18, 8, 0)
+
+        assert adquirir(db, TAREA, "worker-a", LEASE, ahora)
+        assert not adquirir(db, TAREA, "worker-b", LEASE, ahora + timedelta(seconds=30))
+        assert adquirir(db, TAREA, "worker-a", LEASE, ahora + timedelta(seconds=30))
+        db.close()
+
+    def test_lease_vencido_pasa_a_otro_worker(self, session_factory):
+        db = session_factory()
+        ahora = datetime(2026, 10, 18, 8, 0)
+        adquirir(db, TAREA, "worker-a", LEASE, ahora)
+
+        # worker-a murió: nadie renovó
+        assert adquirir(db, TAREA, "worker-b", LEASE, ahora + timedelta(seconds=61))
+        assert not adquirir(db, TAREA, "worker-a", LEASE, ahora + timedelta(seconds=62))
+        db.close()
+
+
+class TestElectorLider:
+
+    def test_failover_al_liberar(self, session_factory):
+        a = ElectorLider([TAREA], 60, session_factory, titular="worker-a")
+        b = ElectorLider([TAREA], 60, session_factory, titular="worker-b")
+
+        a.renovar()
+        b.renovar()
+        assert a.es_lider(TAREA) and not b.es_lider(TAREA)
+
+        a.detener()
+        b.renovar()
+        assert b.es_lider(TAREA) and not a.es_lider(TAREA)
+
+    def test_solo_lider_omite_el_job_fuera_del_lider(self, session_factory, monkeypatch):
+        seguidor = ElectorLider([TAREA], 60, session_factory, titular="worker-b")
+        ElectorLider([TAREA], 60, session_factory, titular="worker-a").renovar()
+        seguidor.renovar()
+        monkeypatch.setattr(liderazgo, "_elector", seguidor)
+
+        ejecuciones = []
+        job = liderazgo.solo_lider(TAREA)(lambda: ejecuciones.append(1))
+        job()
+
+        assert ejecuciones == []
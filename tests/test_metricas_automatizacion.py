@@ -0,0 +1,77 @@
+"""
+Tests del caché de métricas del dashboard de automatización.
+"""
+import pytest
+from sqlalchemy.orm import Session
+from app.core.database import SessionLocal
+from app.models.factura import Factura, EstadoFactura
+from app.services import metricas_automatizacion
+from app.services.metricas_automatizacion import MetricasAutomatizacionCache
+
+
+class TestMetricasCache:
+    """TTL, invalidación y carrera cálculo/invalidación."""
+
+    @pytest.fixture
+    def llamadas(self, monkeypatch):
+        llamadas = []
+
+        def calcular(db):
+            llamadas.append(db)
+            return {"llamada": len(llamadas)}
+
+        monkeypatch.setattr(metricas_automatizacion, "calcular_metricas", calcular)
+        return llamadas
+
+    def test_segunda_consulta_sale_del_cache(self, llamadas):
+        cache = MetricasAutomatizacionCache(ttl_seconds=60)
+
+        assert cache.get(None) == cache.get(None) == {"llamada": 1}
+        assert len(llamadas) == 1
+
+    def test_clear_fuerza_recalculo(self, llamadas):
+        cache = MetricasAutomatizacionCache(ttl_seconds=60)
+        cache.get(None)
+
+        cache.clear()
+
+        assert cache.get(None) == {"llamada": 2}
+
+    def test_no_guarda_resultado_invalidado_durante_el_calculo(self, monkeypatch):
+        cache = MetricasAutomatizacionCache(ttl_seconds=60)
+
+        def calcular_e_invalidar(db):
+            cache.clear()  # otra transacción confirma mientras se calcula
+            return {"viejo": True}
+
+        monkeypatch.setattr(metricas_automatizacion, "calcular_metricas", calcular_e_invalidar)
+
+        cache.get(None)
+
+        assert cache.get_stats()["status"] == "empty"
+
+
+class TestInvalidacionAlConfirmar:
+    """El listener invalida el caché al confirmar cambios de estado."""
+
+    @pytest.fixture
+    def db(self) -> Session:
+        metricas_automatizacion.registrar_invalidacion()
+        db = SessionLocal()
+        yield db
+        db.rollback()
+        db.close()
+
+    def test_cambio_de_estado_marca_la_sesion(self, db: Session):
+        factura = db.query(Factura).filter(Factura.estado == EstadoFactura.en_revision).first()
+        if not factura:
+            pytest.skip("No hay facturas en revisión")
+
+        factura.estado = EstadoFactura.aprobada
+        db.flush()
+
+        assert db.info.get(metricas_automatizacion._MARCA_SESION)
+
+        db.rollback()
+
+        assert not db.info.get(metricas_automatizacion._MARCA_SESION)
@@ -0,0 +1,79 @@
+"""
+Tests de los filtros de período (DateHelper).
+
+Los filtros por año/mes deben ser rangos semiabiertos sobre la columna de
+fecha para que MySQL pueda usar los índices que empiezan por ella. Los
+tests con EXPLAIN solo corren contra MySQL/MariaDB.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.models.factura import Factura
+from app.utils.date_helpers import DateHelper
+
+
+class TestPeriodoBounds:
+    """Cálculo de rangos semiabiertos."""
+
+    def test_mes_normal(self):
+        assert DateHelper.get_periodo_bounds(2025, 7) == (date(2025, 7, 1), date(2025, 8, 1))
+
+    def test_diciembre_cruza_de_año(self):
+        assert DateHelper.get_periodo_bounds(2025, 12) == (date(2025, 12, 1), date(2026, 1, 1))
+
+    def test_año_completo(self):
+        assert DateHelper.get_periodo_bounds(2025) == (date(2025, 1, 1), date(2026, 1, 1))
+
+    def test_parse_periodo(self):
+        assert DateHelper.parse_periodo("2025-03") == (2025, 3)
+
+
+class TestPeriodoExplain:
+    """EXPLAIN: los filtros de período usan índice sobre la fecha."""
+
+    @pytest.fixture(autouse=True)
+    def solo_mysql(self, db: Session):
+        if db.bind.dialect.name != "mysql":
+            pytest.skip("EXPLAIN solo se valida en MySQL/MariaDB")
+
+    def _explain(self, db: Session, query) -> list:
+        sql = query.statement.compile(db.bind, compile_kwargs={"literal_binds": True})
+        return db.execute(text(f"EXPLAIN {sql}")).mappings().all()
+
+    def _assert_usa_indice(self, plan: list, indices: set):
+        fila = plan[0]
+        assert fila["type"] != "ALL", plan
+        assert indices & set((fila["possible_keys"] or "").split(",")), plan
+
+    def test_periodo_fecha_emision_usa_indice(self, db: Session):
+        query = db.query(Factura.id).filter(
+            DateHelper.create_periodo_filter(Factura.fecha_emision, "2025-10")
+        )
+
+        self._assert_usa_indice(
+            self._explain(db, query),
+            {"idx_facturas_fecha_estado"}
+        )
+
+    def test_periodo_por_proveedor_usa_indice(self, db: Session):
+        query = db.query(Factura.id).filter(
+            Factura.proveedor_id == 1,
+            DateHelper.create_año_mes_filter(Factura.fecha_emision, 2025, 10)
+        )
+
+        self._assert_usa_indice(
+            self._explain(db, query),
+            {"idx_facturas_proveedor_fecha", "idx_facturas_fecha_estado"}
+        )
+
+    def test_dashboard_creado_en_usa_indice(self, db: Session):
+        query = db.query(Factura.id).filter(
+            DateHelper.create_año_mes_filter(Factura.creado_en, 2025, 10)
+        )
+
+        self._assert_usa_indice(
+            self._explain(db, query),
+            {"idx_facturas_creado_en_estado"}
+        )
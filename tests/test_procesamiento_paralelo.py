@@ -0,0 +1,89 @@
+"""
+Tests del reparto de facturas pendientes entre workers (ProcesadorParalelo).
+
+El procesamiento de cada proveedor se reemplaza por uno que registra qué
+hilo lo atendió: se prueba el particionado y la agregación, no la decisión.
+"""
+import threading
+
+from app.services.automation import procesamiento_paralelo
+from app.services.automation.procesamiento_paralelo import ProcesadorParalelo
+
+
+class _SesionFalsa:
+    def rollback(self):
+        pass
+
+    def expunge_all(self):
+        pass
+
+    def close(self):
+        pass
+
+
+GRUPOS = {1: [10, 11, 12], 2: [20], 3: [30, 31], None: [40]}
+# proveedor_id None es un grupo válido (facturas sin proveedor)
+SIN_FALLA = object()
+
+
+def _preparar(monkeypatch, falla_proveedor=SIN_FALLA):
+    atendidos = {}
+
+    def pendientes_por_proveedor(db, limit):
+        return GRUPOS
+
+    def facturas_pendientes(db, limit, ids):
+        return list(ids)
+
+    def procesar_facturas(self, db, facturas, modo_debug=False, en_lote=None):
+        proveedor_id = next(p for p, ids in GRUPOS.items() if ids == facturas)
+        if proveedor_id == falla_proveedor:
+            raise RuntimeError("falla simulada")
+        atendidos[proveedor_id] = threading.current_thread().name
+        return {
+            'facturas_procesadas': len(facturas),
+            'aprobadas_automaticamente': 1,
+            'enviadas_revision': len(facturas) - 1,
+            'errores': 0,
+            'facturas_procesadas_detalle': [{'factura_id': f} for f in facturas],
+        }
+
+    crud = procesamiento_paralelo.crud_factura
+    monkeypatch.setattr(crud, "get_pendientes_procesamiento_por_proveedor", pendientes_por_proveedor)
+    monkeypatch.setattr(crud, "get_facturas_pendientes_procesamiento", facturas_pendientes)
+    monkeypatch.setattr(procesamiento_paralelo.AutomationService, "procesar_facturas", procesar_facturas)
+    return atendidos
+
+
+def test_cada_proveedor_en_un_solo_worker(monkeypatch):
+    atendidos = _preparar(monkeypatch)
+
+    resumen = ProcesadorParalelo(workers=3, session_factory=_SesionFalsa).procesar_facturas_pendientes()
+
+    assert set(atendidos) == set(GRUPOS)
+    assert sorted(d['factura_id'] for d in resumen['facturas_procesadas_detalle']) == sorted(
+        f for ids in GRUPOS.values() for f in ids
+    )
+    assert resumen['facturas_procesadas'] == 7
+    assert resumen['aprobadas_automaticamente'] == 4
+    assert resumen['resumen_general']['workers'] == 3
+    assert sum(w['proveedores'] for w in resumen['workers']) == 4
+    assert sum(w['facturas_procesadas'] for w in resumen['workers']) == 7
+
+
+def test_error_de_un_proveedor_no_detiene_a_los_demas(monkeypatch):
+    atendidos = _preparar(monkeypatch, falla_proveedor=3)
+
+    resumen = ProcesadorParalelo(workers=2, session_factory=_SesionFalsa).procesar_facturas_pendientes()
+
+    assert set(atendidos) == {1, 2, None}
+    assert resumen['errores'] == 2
+    assert resumen['facturas_procesadas'] == 5
+
+
+def test_no_crea_mas_workers_que_proveedores(monkeypatch):
+    _preparar(monkeypatch)
+
+    resumen = ProcesadorParalelo(workers=16, session_factory=_SesionFalsa).procesar_facturas_pendientes()
+
+    assert len(resumen['workers']) == len(GRUPOS)
@@ -0,0 +1,79 @@
+"""
+Tests de la regeneración por lotes de patrones_facturas
+(app.services.regeneracion_patrones).
+
+Agrupación y cálculo sobre filas en memoria: no usan BD.
+"""
+import statistics
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.patrones_facturas import TipoPatron
+from app.services.analisis_patrones import AnalizadorPatrones
+from app.services.analisis_patrones_service import AnalizadorPatronesService
+from app.services.regeneracion_patrones import ULTIMOS_PAGOS, agrupar
+
+
+def _fila(factura_id, proveedor_id, concepto, fecha, monto, concepto_principal=None):
+    return SimpleNamespace(
+        id=factura_id,
+        proveedor_id=proveedor_id,
+        concepto_normalizado=concepto,
+        concepto_principal=concepto_principal,
+        fecha_emision=fecha,
+        total_a_pagar=Decimal(monto),
+    )
+
+
+def test_agrupar_acumula_en_una_pasada():
+    """Cada grupo tiene las mismas estadísticas que calcularlas sobre sus facturas."""
+    montos = ["100000.00", "101500.00", "99000.00"] * 6
+    filas = [
+        _fila(i, 7, "ARRIENDO", date(2025, 1 + i % 12, 5 if i < 12 else 20), monto)
+        for i, monto in enumerate(montos)
+    ]
+    filas.sort(key=lambda f: (f.fecha_emision, f.id))
+    filas.append(_fila(99, 8, None, date(2025, 12, 1), "5.00"))
+
+    grupos, leidas = agrupar(filas, lambda fila: fila.concepto_normalizado)
+
+    assert leidas == len(filas)
+    assert list(grupos) == [(7, "ARRIENDO")]
+    grupo = grupos[(7, "ARRIENDO")]
+    valores = [float(f.total_a_pagar) for f in filas[:-1]]
+    assert grupo.n == len(valores)
+    assert grupo.estadisticas.montos.media == pytest.approx(statistics.mean(valores))
+    assert grupo.estadisticas.montos.desviacion == pytest.approx(statistics.stdev(valores))
+    assert len(grupo.meses) == 12
+    assert grupo.estadisticas.intervalos.n == len(valores) - 1
+    assert [pago[0] for pago in grupo.ultimas] == [f.id for f in filas[-1 - ULTIMOS_PAGOS:-1]]
+
+
+def test_patrones_desde_grupo():
+    """Los dos analizadores construyen su patrón desde el mismo grupo acumulado."""
+    filas = [
+        _fila(i, 3, None, date(2025, mes, 10), "250000.00", concepto_principal="Energía")
+        for i, mes in enumerate(range(1, 6))
+    ]
+    servicio = AnalizadorPatronesService(db=None)
+    grupos, _ = agrupar(filas, servicio._clave_grupo)
+    grupo = grupos[(3, "energia")]
+
+    patron = servicio._patron_desde_grupo(grupo)
+    assert patron["tipo_patron"] == TipoPatron.TIPO_A
+    assert patron["frecuencia_detectada"] == "mensual"
+    assert patron["puede_aprobar_auto"] == 1
+    assert (patron["monto_minimo"], patron["ultimo_pago_fecha"]) == (Decimal("250000.00"), date(2025, 5, 10))
+
+    patron = AnalizadorPatrones(db=None)._patron_desde_grupo(grupo)
+    assert patron["pagos_analizados"] == 5
+    assert patron["pagos_detalle"][0] == {
+        "periodo": "2025-05", "monto": 250000.0, "factura_id": 4, "fecha": "2025-05-10"
+    }
+
+    # Menos de MIN_MESES_DIFERENTES meses: no forma patrón
+    grupos, _ = agrupar(filas[:1] * 3, servicio._clave_grupo)
+    assert servicio._patron_desde_grupo(grupos[(3, "energia")]) is None
@@ -0,0 +1,65 @@
+"""
+Tests del rollup facturas_resumen_mensual.
+
+Se ejecutan dentro de una transacción que se revierte al final:
+no dejan cambios en la BD.
+"""
+import pytest
+from sqlalchemy.orm import Session
+from app.crud.factura import (
+    get_facturas_resumen_por_mes,
+    get_estadisticas_periodo,
+    count_facturas_por_periodo,
+)
+from app.models.factura import Factura, EstadoFactura
+from app.services import resumen_mensual
+
+
+@pytest.mark.parametrize(
+    "db", [resumen_mensual.registrar_mantenimiento], indirect=True, ids=["resumen_mensual"]
+)
+class TestResumenMensual:
+    """Mantenimiento en el flush y lectura desde el rollup."""
+
+    def test_reconstruir_deja_rollup_consistente(self, db: Session):
+        """Tras reconstruir, el verificador no encuentra diferencias."""
+        resumen_mensual.reconstruir(db)
+
+        resultado = resumen_mensual.verificar_consistencia(db)
+
+        assert resultado["consistente"], resultado
+
+    def test_cambio_de_estado_mueve_el_rollup(self, db: Session):
+        """Aprobar una factura en revisión la mueve de grupo sin perder consistencia."""
+        factura = db.query(Factura).filter(
+            Factura.estado == EstadoFactura.en_revision,
+            Factura.fecha_emision.isnot(None)
+        ).first()
+        if not factura:
+            pytest.skip("No hay facturas en revisión")
+
+        resumen_mensual.reconstruir(db)
+        periodo = f"{factura.fecha_emision.year}-{factura.fecha_emision.month:02d}"
+        en_revision_antes = count_facturas_por_periodo(db, periodo, estado=EstadoFactura.en_revision.value)
+
+        factura.estado = EstadoFactura.aprobada
+        db.flush()
+
+        en_revision_despues = count_facturas_por_periodo(db, periodo, estado=EstadoFactura.en_revision.value)
+
+        assert en_revision_despues == en_revision_antes - 1
+        assert resumen_mensual.verificar_consistencia(db)["consistente"]
+
+    def test_rollup_coincide_con_consulta_en_vivo(self, db: Session):
+        """Los endpoints de períodos devuelven lo mismo desde el rollup y en vivo."""
+        resumen_mensual.reconstruir(db)
+
+        resumen = get_facturas_resumen_por_mes(db)
+        assert resumen == get_facturas_resumen_por_mes(db, en_vivo=True)
+
+        if resumen:
+            periodo = resumen[0]["periodo"]
+            desde_rollup = get_estadisticas_periodo(db, periodo)
+            en_vivo = get_estadisticas_periodo(db, periodo, en_vivo=True)
+            assert desde_rollup["total_facturas"] == en_vivo["total_facturas"]
+            assert desde_rollup["monto_total"] == pytest.approx(en_vivo["monto_total"])
@@ -0,0 +1,70 @@
+"""
+Tests de la instrumentación SQL por request (X-DB-Queries / Server-Timing / N+1).
+"""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.query_monitor import instrument_engine, track_queries
+from app.utils.sql_metrics import SQLMetricsMiddleware
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'metrics.db'}")
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestTrackQueries:
+
+    def test_cuenta_sentencias_y_formas_repetidas(self, engine):
+        with track_queries() as stats:
+            with engine.connect() as conn:
+                for i in range(12):
+                    conn.execute(text("SELECT :valor"), {"valor": i})
+                conn.execute(text("SELECT 1"))
+
+        assert stats.count == 13
+        repetidas = stats.repeated_shapes(threshold=10)
+        assert len(repetidas) == 1
+        assert repetidas[0][1] == 12
+
+    def test_fuera_de_contexto_no_acumula(self, engine):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+
+        with track_queries() as stats:
+            pass
+        assert stats.count == 0
+
+
+class TestMiddleware:
+
+    def test_headers_de_respuesta(self, engine):
+        SessionTest = sessionmaker(bind=engine)
+
+        def get_test_db():
+            db = SessionTest()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app = FastAPI()
+        app.add_middleware(SQLMetricsMiddleware)
+
+        @app.get("/tres-queries")
+        def tres_queries(db=Depends(get_test_db)):
+            for _ in range(3):
+                db.execute(text("SELECT 1"))
+            return {"ok": True}
+
+        response = TestClient(app).get("/tres-queries")
+
+        assert response.status_code == 200
+        assert response.headers["x-db-queries"] == "3"
+        assert response.headers["server-timing"].startswith("db;dur=")